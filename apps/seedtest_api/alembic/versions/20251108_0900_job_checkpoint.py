@@ -0,0 +1,67 @@
+"""Create job_checkpoint table for sharded nightly jobs
+
+Revision ID: 20251108_0900_job_checkpoint
+Revises: 20251107_1100_student_emotive
+Create Date: 2025-11-08 09:00:00.000000
+
+One row per (job, run, shard): progress counters, last processed key and
+status, so a partially completed run can resume where each shard stopped.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251108_0900_job_checkpoint"
+down_revision = "20251107_1100_student_emotive"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name: str) -> bool:
+    """Check if a table exists."""
+    from sqlalchemy import inspect
+
+    insp = inspect(conn)
+    return insp.has_table(table_name)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _table_exists(conn, "job_checkpoint"):
+        op.create_table(
+            "job_checkpoint",
+            sa.Column("job_name", sa.Text, nullable=False),
+            sa.Column("run_key", sa.Text, nullable=False),
+            sa.Column("shard", sa.Integer, nullable=False),
+            sa.Column("n_shards", sa.Integer, nullable=False),
+            sa.Column(
+                "status", sa.Text, nullable=False, server_default="running"
+            ),  # running, done, failed
+            sa.Column("total", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("processed", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("failed", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("last_key", sa.Text, nullable=True),
+            sa.Column("error", sa.Text, nullable=True),
+            sa.Column(
+                "started_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("NOW()"),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("NOW()"),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("job_name", "run_key", "shard"),
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "job_checkpoint"):
+        op.drop_table("job_checkpoint")
@@ -12,6 +12,8 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from sqlalchemy import text
 
+from shared.llm.http_pool import close_pools
+
 from ..core.config import config as app_config
 from ..middleware.correlation import CorrelationIdMiddleware
 from ..routers.metrics import router as metrics_router
@@ -56,6 +58,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown (if needed, e.g., close connections)
     # db_service.close_engine() if you implement it
+    await close_pools()
 
 
 app = FastAPI(
@@ -3,15 +3,25 @@ Aggregate daily topic features from attempt VIEW and update features_topic_daily
 - Uses attempt VIEW to compute: attempts, correct, avg_time_ms, rt_median, hints
 - Optionally includes IRT theta estimates from mirt_ability or student_topic_theta
 - Upserts to features_topic_daily table (Dev Contract 2-6)
+- Modes:
+  bulk (default): one GROUP BY over the whole lookback window, staged in a
+    temp table and merged with a single INSERT ... ON CONFLICT
+  per-user: per (user, topic, date) queries; users are hash-sharded across
+    AGG_WORKERS processes (see jobs.sharded) with per-shard checkpoints
+- Improvement index is computed once per (user, date), not once per topic
 Environment:
   AGG_LOOKBACK_DAYS (optional, default 7): Number of days to aggregate back from today
   AGG_INCLUDE_THETA (optional, default false): Whether to include IRT theta estimates
+  AGG_MODE (optional, default bulk): bulk | per-user
+  AGG_WORKERS (optional, default JOB_WORKERS or 1): Worker processes (per-user mode)
 """
 
 # cSpell:ignore LOOKBACK Upserted
 from __future__ import annotations
 
+from contextlib import nullcontext
 from datetime import date, datetime, timedelta
+from functools import partial
 import os
 import sys
 from pathlib import Path
@@ -31,34 +41,55 @@ def _ensure_project_root_on_path() -> None:
 _ensure_project_root_on_path()
 
 from sqlalchemy import text
+from apps.seedtest_api.jobs.sharded import DEFAULT_WORKERS, run_sharded
 from apps.seedtest_api.services.db import get_session
 from apps.seedtest_api.services.metrics import compute_improvement_index
 
 LOOKBACK_DAYS = int(os.getenv("AGG_LOOKBACK_DAYS", "7"))
 INCLUDE_THETA = os.getenv("AGG_INCLUDE_THETA", "false").lower() == "true"
+WORKERS = int(os.getenv("AGG_WORKERS", str(DEFAULT_WORKERS)))
+MODE = os.getenv("AGG_MODE", "bulk").lower()
+JOB_NAME = "aggregate_features_daily"
 
 
-def _distinct_user_topic_date_combos(
-    session, since_date: date
-) -> list[tuple[str, str, date]]:
-    """Find all (user_id, topic_id, date) combinations from attempt VIEW."""
+def _distinct_users(session, since_date: date) -> list[str]:
+    """Find users with attempts since since_date (shard keys)."""
     result = session.execute(
         text(
             """
-            SELECT DISTINCT
-                student_id::text AS user_id,
-                topic_id,
-                DATE(completed_at) AS date
+            SELECT DISTINCT student_id::text AS user_id
             FROM attempt
             WHERE completed_at >= :since
               AND student_id IS NOT NULL
               AND topic_id IS NOT NULL
-            ORDER BY user_id, topic_id, date
         """
         ),
         {"since": datetime.combine(since_date, datetime.min.time())},
     )
-    return [(row[0], row[1], row[2]) for row in result.fetchall()]
+    return [row[0] for row in result.fetchall()]
+
+
+def _user_topic_dates(
+    session, user_id: str, since_date: date
+) -> list[tuple[str, date]]:
+    """Find (topic_id, date) combinations for one user from attempt VIEW."""
+    result = session.execute(
+        text(
+            """
+            SELECT DISTINCT topic_id, DATE(completed_at) AS date
+            FROM attempt
+            WHERE student_id::text = :user_id
+              AND completed_at >= :since
+              AND topic_id IS NOT NULL
+            ORDER BY topic_id, date
+        """
+        ),
+        {
+            "user_id": user_id,
+            "since": datetime.combine(since_date, datetime.min.time()),
+        },
+    )
+    return [(row[0], row[1]) for row in result.fetchall()]
 
 
 def _aggregate_one_day(session, user_id: str, topic_id: str, target_date: date) -> dict:
@@ -216,12 +247,297 @@ def _upsert_features_daily(
     session.commit()
 
 
-def main(anchor_date: date | None = None, dry_run: bool = False) -> int:
+def _improvement_memoized(
+    session,
+    user_id: str,
+    target_date: date,
+    memo: dict[tuple[str, date], float | None],
+    savepoint: bool = False,
+) -> float | None:
+    """compute_improvement_index, computed once per (user_id, date).
+
+    With savepoint=True the lookup runs in a SAVEPOINT. The error is caught
+    outside it, so a failed query is rolled back to the savepoint instead of
+    aborting the enclosing transaction.
+    """
+    key = (user_id, target_date)
+    if key not in memo:
+        improvement = None
+        try:
+            with session.begin_nested() if savepoint else nullcontext():
+                improvement = compute_improvement_index(
+                    session, user_id, target_date, window_days=14
+                )
+        except Exception as e:
+            if os.getenv("DEBUG", "").lower() == "true":
+                print(
+                    f"[DEBUG] Improvement calculation failed for user={user_id} date={target_date}: {e}"
+                )
+        memo[key] = improvement
+    return memo[key]
+
+
+# ---------------------------------------------------------------------------
+# Bulk (set-based) mode
+# ---------------------------------------------------------------------------
+
+_STAGE_TABLE = "tmp_features_topic_daily"
+
+
+def _stage_daily_aggregates(session, since_date: date, anchor_date: date) -> int:
+    """Aggregate the whole window into a temp table with one GROUP BY.
+
+    Same statistics and date range as _aggregate_one_day over every combo
+    from since_date through anchor_date. Returns the number of staged rows.
+    """
+    session.execute(text(f"DROP TABLE IF EXISTS {_STAGE_TABLE}"))
+    session.execute(
+        text(
+            f"""
+            CREATE TEMP TABLE {_STAGE_TABLE} ON COMMIT DROP AS
+            SELECT
+                student_id::text AS user_id,
+                topic_id,
+                DATE(completed_at) AS date,
+                COUNT(*)::int AS attempts,
+                SUM(CASE WHEN correct THEN 1 ELSE 0 END)::int AS correct,
+                AVG(response_time_ms)::int AS avg_time_ms,
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY response_time_ms)::int AS rt_median,
+                SUM(CASE WHEN hint_used THEN 1 ELSE 0 END)::int AS hints,
+                NULL::double precision AS theta_estimate,
+                NULL::double precision AS theta_sd,
+                NULL::double precision AS improvement
+            FROM attempt
+            WHERE completed_at >= :since
+              AND completed_at < :until
+              AND student_id IS NOT NULL
+              AND topic_id IS NOT NULL
+            GROUP BY 1, 2, 3
+        """
+        ),
+        {
+            "since": datetime.combine(since_date, datetime.min.time()),
+            "until": datetime.combine(
+                anchor_date + timedelta(days=1), datetime.min.time()
+            ),
+        },
+    )
+    return int(
+        session.execute(text(f"SELECT COUNT(*) FROM {_STAGE_TABLE}")).scalar() or 0
+    )
+
+
+def _stage_theta(session) -> None:
+    """Fill theta columns like _load_theta_if_needed, in one UPDATE."""
+    session.execute(
+        text(
+            f"""
+            UPDATE {_STAGE_TABLE} t
+            SET theta_estimate = s.theta,
+                theta_sd = s.se
+            FROM (
+                SELECT
+                    f.user_id, f.topic_id, f.date,
+                    COALESCE(stt.theta, ma.theta) AS theta,
+                    CASE WHEN stt.theta IS NOT NULL THEN stt.se ELSE ma.se END AS se
+                FROM {_STAGE_TABLE} f
+                LEFT JOIN LATERAL (
+                    SELECT theta, se
+                    FROM student_topic_theta
+                    WHERE user_id = f.user_id
+                      AND topic_id = f.topic_id
+                      AND updated_at < f.date + 1
+                    ORDER BY updated_at DESC
+                    LIMIT 1
+                ) stt ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT theta, se
+                    FROM mirt_ability
+                    WHERE user_id = f.user_id
+                      AND fitted_at < f.date + 1
+                    ORDER BY fitted_at DESC
+                    LIMIT 1
+                ) ma ON TRUE
+            ) s
+            WHERE t.user_id = s.user_id
+              AND t.topic_id = s.topic_id
+              AND t.date = s.date
+        """
+        )
+    )
+
+
+def _stage_improvement(session) -> int:
+    """Compute improvement once per staged (user, date) and apply it in one UPDATE.
+
+    Each computation runs in a SAVEPOINT so a failing lookup cannot abort
+    the transaction holding the temp table. Returns the number of pairs.
+    """
+    pairs = session.execute(
+        text(f"SELECT DISTINCT user_id, date FROM {_STAGE_TABLE}")
+    ).fetchall()
+
+    memo: dict[tuple[str, date], float | None] = {}
+    for user_id, target_date in pairs:
+        _improvement_memoized(session, user_id, target_date, memo, savepoint=True)
+
+    rows = [
+        {"user_id": u, "date": d, "improvement": v}
+        for (u, d), v in memo.items()
+        if v is not None
+    ]
+    if rows:
+        session.execute(
+            text(
+                f"""
+                CREATE TEMP TABLE {_STAGE_TABLE}_improvement (
+                    user_id TEXT, date DATE, improvement DOUBLE PRECISION
+                ) ON COMMIT DROP
+            """
+            )
+        )
+        session.execute(
+            text(
+                f"""
+                INSERT INTO {_STAGE_TABLE}_improvement (user_id, date, improvement)
+                VALUES (:user_id, :date, :improvement)
+            """
+            ),
+            rows,
+        )
+        session.execute(
+            text(
+                f"""
+                UPDATE {_STAGE_TABLE} t
+                SET improvement = i.improvement
+                FROM {_STAGE_TABLE}_improvement i
+                WHERE t.user_id = i.user_id AND t.date = i.date
+            """
+            )
+        )
+    return len(pairs)
+
+
+def _merge_staged(session) -> int:
+    """Upsert all staged rows into features_topic_daily in one statement."""
+    result = session.execute(
+        text(
+            f"""
+            INSERT INTO features_topic_daily
+              (user_id, topic_id, date, attempts, correct, avg_time_ms, hints,
+               theta_estimate, theta_sd, rt_median, improvement, last_seen_at, computed_at)
+            SELECT
+              user_id, topic_id, date, attempts, correct, avg_time_ms, hints,
+              theta_estimate, theta_sd, rt_median, improvement, NOW(), NOW()
+            FROM {_STAGE_TABLE}
+            ON CONFLICT (user_id, topic_id, date)
+            DO UPDATE SET
+              attempts = EXCLUDED.attempts,
+              correct = EXCLUDED.correct,
+              avg_time_ms = EXCLUDED.avg_time_ms,
+              hints = EXCLUDED.hints,
+              theta_estimate = EXCLUDED.theta_estimate,
+              theta_sd = EXCLUDED.theta_sd,
+              rt_median = EXCLUDED.rt_median,
+              improvement = EXCLUDED.improvement,
+              last_seen_at = NOW(),
+              computed_at = NOW()
+        """
+        )
+    )
+    return int(result.rowcount or 0)
+
+
+def _bulk_aggregate(session, since_date: date, anchor_date: date) -> dict:
+    """Set-based aggregation of the whole window (single transaction).
+
+    The caller commits (or rolls back for a dry run); the temp tables are
+    dropped on commit.
+    """
+    staged = _stage_daily_aggregates(session, since_date, anchor_date)
+    if staged == 0:
+        return {"staged": 0, "user_dates": 0, "upserted": 0}
+    if INCLUDE_THETA:
+        _stage_theta(session)
+    user_dates = _stage_improvement(session)
+    upserted = _merge_staged(session)
+    return {"staged": staged, "user_dates": user_dates, "upserted": upserted}
+
+
+# ---------------------------------------------------------------------------
+# Per-user mode
+# ---------------------------------------------------------------------------
+
+
+def _aggregate_user(
+    session, user_id: str, since_date: date, anchor_date: date, dry_run: bool
+) -> None:
+    """Aggregate and upsert every (topic, date) of one user (shard work unit).
+
+    Raises if any combination failed, so the user counts as failed.
+    """
+    failed = 0
+    memo: dict[tuple[str, date], float | None] = {}
+    combos = _user_topic_dates(session, user_id, since_date)
+    for topic_id, target_date in combos:
+        # Skip future dates
+        if target_date > anchor_date:
+            continue
+
+        try:
+            stats = _aggregate_one_day(session, user_id, topic_id, target_date)
+
+            # Load theta if needed
+            theta_estimate, theta_sd = _load_theta_if_needed(
+                session, user_id, topic_id, target_date
+            )
+
+            # Calculate improvement index (accuracy or theta-based delta)
+            improvement = _improvement_memoized(session, user_id, target_date, memo)
+
+            if not dry_run:
+                _upsert_features_daily(
+                    session,
+                    user_id,
+                    topic_id,
+                    target_date,
+                    stats,
+                    theta_estimate,
+                    theta_sd,
+                    improvement,
+                )
+
+            if os.getenv("DEBUG", "").lower() == "true":
+                print(
+                    f"[DEBUG] OK user={user_id} topic={topic_id} date={target_date} attempts={stats['attempts']}"
+                )
+
+        except Exception as e:
+            failed += 1
+            session.rollback()
+            print(
+                f"[ERROR] user={user_id} topic={topic_id} date={target_date} error={e}"
+            )
+
+    if failed:
+        raise RuntimeError(f"{failed} of {len(combos)} (topic, date) combinations failed")
+
+
+def main(
+    anchor_date: date | None = None,
+    dry_run: bool = False,
+    workers: int | None = None,
+    resume: bool = True,
+    mode: str | None = None,
+) -> int:
     """Aggregate daily topic features for all active users/topics.
 
     Args:
         anchor_date: Date to aggregate for (defaults to yesterday, as today may be incomplete)
         dry_run: If True, skip database commits (for testing)
+        workers: Worker processes (defaults to AGG_WORKERS; per-user mode)
+        resume: Continue a partially completed run for the same anchor date (per-user mode)
+        mode: "bulk" or "per-user" (defaults to AGG_MODE)
 
     Returns:
         Exit code: 0 on success, 1 on failure
@@ -235,83 +551,64 @@ def main(anchor_date: date | None = None, dry_run: bool = False) -> int:
         anchor_date = date.today() - timedelta(days=1)
 
     since_date = anchor_date - timedelta(days=LOOKBACK_DAYS)
-
-    processed = 0
-    failed = 0
+    workers = workers or WORKERS
+    mode = (mode or MODE).lower()
 
     try:
-        with get_session() as session:
-            combos = _distinct_user_topic_date_combos(session, since_date)
-
-            if not combos:
+        if mode == "bulk":
+            with get_session() as session:
                 print(
-                    f"[INFO] No (user_id, topic_id, date) combinations found (lookback={LOOKBACK_DAYS} days); exiting."
+                    f"[INFO] Bulk-aggregating features; since={since_date}, anchor={anchor_date}, dry_run={dry_run}"
                 )
-                return 0
+                counts = _bulk_aggregate(session, since_date, anchor_date)
+                if dry_run:
+                    session.rollback()
+                    print("[INFO] Dry-run mode: rolled back all changes")
 
+            duration_ms = int((time.time() - start_time) * 1000)
             print(
-                f"[INFO] Aggregating features for {len(combos)} (user, topic, date) combinations; since={since_date}, anchor={anchor_date}, dry_run={dry_run}"
+                f"[INFO] Summary: staged={counts['staged']}, user_dates={counts['user_dates']}, upserted={counts['upserted']}, duration_ms={duration_ms}"
             )
+            return 0
 
-            for user_id, topic_id, target_date in combos:
-                # Skip future dates
-                if target_date > anchor_date:
-                    continue
-
-                try:
-                    stats = _aggregate_one_day(session, user_id, topic_id, target_date)
-
-                    # Load theta if needed
-                    theta_estimate, theta_sd = _load_theta_if_needed(
-                        session, user_id, topic_id, target_date
-                    )
-
-                    # Calculate improvement index (accuracy or theta-based delta)
-                    improvement = None
-                    try:
-                        improvement = compute_improvement_index(
-                            session, user_id, target_date, window_days=14
-                        )
-                    except Exception as e:
-                        if os.getenv("DEBUG", "").lower() == "true":
-                            print(
-                                f"[DEBUG] Improvement calculation failed for user={user_id} topic={topic_id} date={target_date}: {e}"
-                            )
-
-                    if not dry_run:
-                        _upsert_features_daily(
-                            session,
-                            user_id,
-                            topic_id,
-                            target_date,
-                            stats,
-                            theta_estimate,
-                            theta_sd,
-                            improvement,
-                        )
-
-                    processed += 1
-
-                    if os.getenv("DEBUG", "").lower() == "true":
-                        print(
-                            f"[DEBUG] OK user={user_id} topic={topic_id} date={target_date} attempts={stats['attempts']}"
-                        )
-
-                except Exception as e:
-                    failed += 1
-                    print(
-                        f"[ERROR] user={user_id} topic={topic_id} date={target_date} error={e}"
-                    )
-
-            if dry_run:
-                session.rollback()
-                print("[INFO] Dry-run mode: rolled back all changes")
+        with get_session() as session:
+            users = _distinct_users(session, since_date)
+
+        if not users:
+            print(
+                f"[INFO] No (user_id, topic_id, date) combinations found (lookback={LOOKBACK_DAYS} days); exiting."
+            )
+            return 0
+
+        print(
+            f"[INFO] Aggregating features for {len(users)} users; since={since_date}, anchor={anchor_date}, workers={workers}, dry_run={dry_run}"
+        )
+
+        summary = run_sharded(
+            JOB_NAME,
+            f"{anchor_date.isoformat()}:{LOOKBACK_DAYS}",
+            users,
+            partial(
+                _aggregate_user,
+                since_date=since_date,
+                anchor_date=anchor_date,
+                dry_run=dry_run,
+            ),
+            get_session,
+            n_workers=workers,
+            resume=resume,
+            dry_run=dry_run,
+        )
+
+        if dry_run:
+            print("[INFO] Dry-run mode: rolled back all changes")
 
         duration_ms = int((time.time() - start_time) * 1000)
         print(
-            f"[INFO] Summary: processed={processed}, failed={failed}, duration_ms={duration_ms}"
+            f"[INFO] Summary: processed_users={summary.processed}, failed_users={summary.failed}, skipped_users={summary.skipped}, duration_ms={duration_ms}"
         )
-        return 0
+        # A crashed shard leaves its checkpoint behind; rerun to resume it
+        return 0 if summary.ok else 1
 
     except Exception as e:
         print(f"[FATAL] Unhandled exception: {e}")
@@ -339,6 +636,23 @@ def cli() -> None:
         action="store_true",
         help="Do not commit changes to database",
     )
+    parser.add_argument(
+        "--workers",
+        help="Worker processes (defaults to AGG_WORKERS)",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore checkpoints from a previous run of the same date",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["bulk", "per-user"],
+        help="Aggregation mode (defaults to AGG_MODE)",
+        default=None,
+    )
 
     args = parser.parse_args()
 
@@ -350,7 +664,13 @@ def cli() -> None:
             print(f"[ERROR] Invalid date format: {args.date} (expected YYYY-MM-DD)")
             exit(1)
 
-    exit_code = main(anchor_date=anchor_date, dry_run=args.dry_run)
+    exit_code = main(
+        anchor_date=anchor_date,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        resume=not args.no_resume,
+        mode=args.mode,
+    )
     exit(exit_code)
 
 
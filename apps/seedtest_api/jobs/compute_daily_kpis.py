@@ -3,14 +3,18 @@ Compute daily KPIs (P/S and weekly aggregates) for all active users.
 - Uses services.metrics.calculate_and_store_weekly_kpi
 - Iterates distinct user_ids from exam_results in the last N days (default 30)
 - Writes to weekly_kpi (Dev Contracts 1-5)
+- Users are hash-sharded across KPI_WORKERS processes (see jobs.sharded);
+  progress is checkpointed per shard so an interrupted run resumes
 Environment:
   METRICS_DEFAULT_TARGET (optional)
   METRICS_USE_BAYESIAN (optional)
+  KPI_WORKERS (optional, default JOB_WORKERS or 1): Worker processes
 """
 
 # cSpell:ignore LOOKBACK kpis
 from __future__ import annotations
 from datetime import date, datetime, timedelta
+from functools import partial
 import os
 import sys
 from pathlib import Path
@@ -40,6 +44,7 @@ except Exception:
 
 
 # Project imports (adjust if your project structure differs)
+from apps.seedtest_api.jobs.sharded import DEFAULT_WORKERS, run_sharded
 from apps.seedtest_api.services.db import get_session
 from apps.seedtest_api.services.metrics import (
     calculate_and_store_weekly_kpi,
@@ -47,6 +52,8 @@ from apps.seedtest_api.services.metrics import (
 )
 
 LOOKBACK_DAYS = int(os.getenv("KPI_LOOKBACK_DAYS", "30"))
+WORKERS = int(os.getenv("KPI_WORKERS", str(DEFAULT_WORKERS)))
+JOB_NAME = "compute_daily_kpis"
 
 
 def _table_exists(session, name: str) -> bool:
@@ -154,12 +161,26 @@ def _distinct_recent_users(session) -> list[str]:
     return []
 
 
-def main(anchor_date: date | None = None, dry_run: bool = False) -> int:
+def _compute_user_kpis(session, uid: str, wk: date) -> None:
+    """Compute and store one user's weekly KPIs (shard work unit)."""
+    payload = calculate_and_store_weekly_kpi(session, uid, wk)
+    if os.getenv("DEBUG", "").lower() == "true":
+        print(f"[DEBUG] OK user={uid} kpis={payload.get('kpis',{})}")
+
+
+def main(
+    anchor_date: date | None = None,
+    dry_run: bool = False,
+    workers: int | None = None,
+    resume: bool = True,
+) -> int:
     """Compute daily KPIs for all active users.
 
     Args:
         anchor_date: Date to compute KPIs for (defaults to today)
         dry_run: If True, skip database commits (for testing)
+        workers: Worker processes (defaults to KPI_WORKERS)
+        resume: Continue a partially completed run for the same day
 
     Returns:
         Exit code: 0 on success, 1 on failure
@@ -170,45 +191,43 @@ def main(anchor_date: date | None = None, dry_run: bool = False) -> int:
 
     today = anchor_date or date.today()
     wk = iso_week_start(today)
-
-    processed = 0
-    failed = 0
+    workers = workers or WORKERS
 
     try:
         with get_session() as session:
             users = _distinct_recent_users(session)
-            if not users:
-                print(
-                    f"[INFO] No recent users found (lookback={LOOKBACK_DAYS} days); exiting."
-                )
-                return 0
-
+        if not users:
             print(
-                f"[INFO] Computing KPIs for {len(users)} users; week_start={wk}, dry_run={dry_run}"
+                f"[INFO] No recent users found (lookback={LOOKBACK_DAYS} days); exiting."
             )
+            return 0
+
+        print(
+            f"[INFO] Computing KPIs for {len(users)} users; week_start={wk}, workers={workers}, dry_run={dry_run}"
+        )
+
+        # Runs are keyed by run date: the job runs daily, so resume must only
+        # continue an interrupted run from the same day, not skip the week
+        summary = run_sharded(
+            JOB_NAME,
+            today.isoformat(),
+            users,
+            partial(_compute_user_kpis, wk=wk),
+            get_session,
+            n_workers=workers,
+            resume=resume,
+            dry_run=dry_run,
+        )
 
-            for uid in users:
-                try:
-                    payload = calculate_and_store_weekly_kpi(session, uid, wk)
-                    processed += 1
-                    # optional log
-                    if os.getenv("DEBUG", "").lower() == "true":
-                        print(f"[DEBUG] OK user={uid} kpis={payload.get('kpis',{})}")
-                except Exception as e:
-                    failed += 1
-                    # best-effort; continue others
-                    print(f"[ERROR] user={uid} error={e}")
-
-            # Rollback if dry-run
-            if dry_run:
-                session.rollback()
-                print("[INFO] Dry-run mode: rolled back all changes")
+        if dry_run:
+            print("[INFO] Dry-run mode: rolled back all changes")
 
         duration_ms = int((time.time() - start_time) * 1000)
         print(
-            f"[INFO] Summary: processed_users={processed}, failed_users={failed}, week={wk}, duration_ms={duration_ms}"
+            f"[INFO] Summary: processed_users={summary.processed}, failed_users={summary.failed}, skipped_users={summary.skipped}, week={wk}, duration_ms={duration_ms}"
         )
-        return 0
+        # A crashed shard leaves its checkpoint behind; rerun to resume it
+        return 0 if summary.ok else 1
 
     except Exception as e:
         print(f"[FATAL] Unhandled exception: {e}")
@@ -236,6 +255,17 @@ def cli() -> None:
         action="store_true",
         help="Do not commit changes to database",
     )
+    parser.add_argument(
+        "--workers",
+        help="Worker processes (defaults to KPI_WORKERS)",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore checkpoints from a previous run for the same day",
+    )
 
     args = parser.parse_args()
 
@@ -247,7 +277,12 @@ def cli() -> None:
             print(f"[ERROR] Invalid date format: {args.date} (expected YYYY-MM-DD)")
             exit(1)
 
-    exit_code = main(anchor_date=anchor_date, dry_run=args.dry_run)
+    exit_code = main(
+        anchor_date=anchor_date,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        resume=not args.no_resume,
+    )
     exit(exit_code)
 
 
@@ -41,13 +41,17 @@ def load_user_kpis(session, user_id: str, week_start: date) -> Optional[Dict[str
     )
     row = result.fetchone()
     if row:
-        kpis = row[0]
-        if isinstance(kpis, str):
-            return json.loads(kpis)
-        return kpis
+        return _parse_kpis(row[0])
     return None
 
 
+def _parse_kpis(kpis: Any) -> Optional[Dict[str, Any]]:
+    """weekly_kpi.kpis value (jsonb or JSON text) -> dict."""
+    if isinstance(kpis, str):
+        return json.loads(kpis)
+    return kpis
+
+
 def load_ability_trend(session, user_id: str, weeks: int = 8) -> List[Dict[str, Any]]:
     """Load ability (theta) trend over multiple weeks."""
     since_date = date.today() - timedelta(weeks=weeks)
@@ -66,15 +70,16 @@ def load_ability_trend(session, user_id: str, weeks: int = 8) -> List[Dict[str,
         ),
         {"user_id": user_id, "since": since_date},
     )
-    rows = result.fetchall()
-    return [
-        {
-            "theta": float(row[0]) if row[0] is not None else None,
-            "se": float(row[1]) if row[1] is not None else None,
-            "date": row[2].isoformat() if row[2] else None,
-        }
-        for row in rows
-    ]
+    return [_ability_row(row) for row in result.fetchall()]
+
+
+def _ability_row(row) -> Dict[str, Any]:
+    """(theta, se, fitted_at) -> ability trend point."""
+    return {
+        "theta": float(row[0]) if row[0] is not None else None,
+        "se": float(row[1]) if row[1] is not None else None,
+        "date": row[2].isoformat() if row[2] else None,
+    }
 
 
 def load_goal_data(session, user_id: str) -> List[Dict[str, Any]]:
@@ -95,17 +100,18 @@ def load_goal_data(session, user_id: str) -> List[Dict[str, Any]]:
         ),
         {"user_id": user_id},
     )
-    rows = result.fetchall()
-    return [
-        {
-            "subject_id": row[0],
-            "interest": row[1],
-            "target_score": row[2],
-            "target_date": row[3].isoformat() if row[3] else None,
-            "updated_at": row[4].isoformat() if row[4] else None,
-        }
-        for row in rows
-    ]
+    return [_goal_row(row) for row in result.fetchall()]
+
+
+def _goal_row(row) -> Dict[str, Any]:
+    """(subject_id, interest, target_score, target_date, updated_at) -> goal."""
+    return {
+        "subject_id": row[0],
+        "interest": row[1],
+        "target_score": row[2],
+        "target_date": row[3].isoformat() if row[3] else None,
+        "updated_at": row[4].isoformat() if row[4] else None,
+    }
 
 
 def load_topic_features(
@@ -136,22 +142,23 @@ def load_topic_features(
         ),
         {"user_id": user_id, "week_start": week_start, "week_end": week_end},
     )
-    rows = result.fetchall()
-    return [
-        {
-            "topic_id": row[0],
-            "date": row[1].isoformat() if row[1] else None,
-            "attempts": row[2],
-            "correct": row[3],
-            "avg_time_ms": row[4],
-            "rt_median": float(row[5]) if row[5] is not None else None,
-            "hints": row[6],
-            "theta_estimate": float(row[7]) if row[7] is not None else None,
-            "theta_sd": float(row[8]) if row[8] is not None else None,
-            "improvement": float(row[9]) if row[9] is not None else None,
-        }
-        for row in rows
-    ]
+    return [_topic_feature_row(row) for row in result.fetchall()]
+
+
+def _topic_feature_row(row) -> Dict[str, Any]:
+    """features_topic_daily columns (as selected above) -> topic feature."""
+    return {
+        "topic_id": row[0],
+        "date": row[1].isoformat() if row[1] else None,
+        "attempts": row[2],
+        "correct": row[3],
+        "avg_time_ms": row[4],
+        "rt_median": float(row[5]) if row[5] is not None else None,
+        "hints": row[6],
+        "theta_estimate": float(row[7]) if row[7] is not None else None,
+        "theta_sd": float(row[8]) if row[8] is not None else None,
+        "improvement": float(row[9]) if row[9] is not None else None,
+    }
 
 
 def load_item_params(session, user_id: str, weeks: int = 4) -> List[Dict[str, Any]]:
@@ -178,18 +185,19 @@ def load_item_params(session, user_id: str, weeks: int = 4) -> List[Dict[str, An
         ),
         {"user_id": user_id, "since": since_date},
     )
-    rows = result.fetchall()
-    return [
-        {
-            "item_id": row[0],
-            "discrimination": float(row[1]) if row[1] is not None else None,
-            "difficulty": float(row[2]) if row[2] is not None else None,
-            "guessing": float(row[3]) if row[3] is not None else None,
-            "model": row[4],
-            "fitted_at": row[5].isoformat() if row[5] else None,
-        }
-        for row in rows
-    ]
+    return [_item_param_row(row) for row in result.fetchall()]
+
+
+def _item_param_row(row) -> Dict[str, Any]:
+    """(item_id, a, b, c, model, fitted_at) -> item parameters."""
+    return {
+        "item_id": row[0],
+        "discrimination": float(row[1]) if row[1] is not None else None,
+        "difficulty": float(row[2]) if row[2] is not None else None,
+        "guessing": float(row[3]) if row[3] is not None else None,
+        "model": row[4],
+        "fitted_at": row[5].isoformat() if row[5] else None,
+    }
 
 
 def render_quarto_report(
@@ -257,19 +265,40 @@ def render_quarto_report(
         return None
 
 
-def upload_to_s3(file_path: Path, bucket: str, key: str) -> Optional[str]:
+def make_s3_client():
+    """Create a boto3 S3 client from AWS_* env (thread-safe; share it).
+
+    Returns None if boto3 is not installed.
+    """
+    try:
+        import boto3  # type: ignore
+    except ImportError:
+        print("[ERROR] boto3 not installed. Install: pip install boto3")
+        return None
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION", "ap-northeast-2"),
+    )
+
+
+def upload_to_s3(
+    file_path: Path, bucket: str, key: str, s3_client=None
+) -> Optional[str]:
     """Upload file to S3 and return public URL.
 
     Args:
         file_path: Local file path
         bucket: S3 bucket name
         key: S3 object key
+        s3_client: Optional shared client (see make_s3_client)
 
     Returns:
         S3 URL or None if failed
     """
     try:
-        import boto3  # type: ignore
         from botocore.exceptions import ClientError  # type: ignore
     except ImportError:
         print("[ERROR] boto3 not installed. Install: pip install boto3")
@@ -277,12 +306,10 @@ def upload_to_s3(file_path: Path, bucket: str, key: str) -> Optional[str]:
 
     try:
         region = os.getenv("AWS_REGION", "ap-northeast-2")
-        s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            region_name=region,
-        )
+        if s3_client is None:
+            s3_client = make_s3_client()
+            if s3_client is None:
+                return None
 
         s3_client.upload_file(
             str(file_path),
@@ -386,7 +413,12 @@ def load_bayesian_growth(session, user_id: str) -> Optional[Dict[str, Any]]:
     row = result.fetchone()
     if not row:
         return None
-    k = row[0] or {}
+    return _bayesian_growth_from_kpis(row[0])
+
+
+def _bayesian_growth_from_kpis(k: Any) -> Optional[Dict[str, Any]]:
+    """Goal probability P and sigma from a latest weekly_kpi.kpis value."""
+    k = k or {}
     if isinstance(k, str):
         try:
             k = json.loads(k)
@@ -496,14 +528,24 @@ def load_survival_risk(session, user_id: str) -> Optional[Dict[str, Any]]:
         {"user_id": user_id},
     )
     kpi_row = kpi_result.fetchone()
+    return _survival_risk(
+        kpi_row[0] if kpi_row else None, load_survival_meta(session)
+    )
+
+
+def _survival_risk(churn_value: Any, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine a user's weekly_kpi.S value with the survival model meta."""
     churn_risk = None
-    if kpi_row and kpi_row[0]:
+    if churn_value:
         try:
-            churn_risk = float(kpi_row[0])
+            churn_risk = float(churn_value)
         except Exception:
             pass
+    return {"churn_risk": churn_risk, **meta}
+
 
-    # Get survival model meta
+def load_survival_meta(session) -> Dict[str, Any]:
+    """Most recent survival model coefficients and hazard ratios (global)."""
     meta_result = session.execute(
         text(
             """
@@ -532,7 +574,6 @@ def load_survival_risk(session, user_id: str) -> Optional[Dict[str, Any]]:
         fit_meta = {"coefficients": coeffs or {}, "hazard_ratios": hrs or {}}
 
     return {
-        "churn_risk": churn_risk,
         "fit_meta": fit_meta,
         "fitted_at": (
             meta_row[2].isoformat()
@@ -566,7 +607,11 @@ def load_user_segment(session, user_id: str) -> Optional[Dict[str, Any]]:
     row = result.fetchone()
     if not row:
         return None
+    return _segment_row(row)
+
 
+def _segment_row(row) -> Dict[str, Any]:
+    """(segment_label, features_snapshot, assigned_at, description) -> segment."""
     features = row[1] if row[1] else {}
     if isinstance(features, str):
         try:
@@ -582,6 +627,27 @@ def load_user_segment(session, user_id: str) -> Optional[Dict[str, Any]]:
     }
 
 
+def build_report_data(
+    user_id: str, week_start: date, **sections: Any
+) -> Dict[str, Any]:
+    """Template data for one user's report (keys read by the Quarto template)."""
+    return {
+        "user_id": user_id,
+        "week_start": week_start.isoformat(),
+        "kpis": sections.get("kpis"),
+        "ability_trend": sections.get("ability_trend", []),
+        "goals": sections.get("goals", []),
+        "topic_features": sections.get("topic_features", []),
+        "item_params": sections.get("item_params", []),
+        "recommendations": sections.get("recommendations", []),
+        "linking_constants": sections.get("linking_constants", {}),
+        "bayesian_growth": sections.get("bayesian_growth"),
+        "prophet_forecast": sections.get("prophet_forecast"),
+        "survival_risk": sections.get("survival_risk"),
+        "user_segment": sections.get("user_segment"),
+    }
+
+
 def generate_report_for_user(
     user_id: str,
     week_start: date,
@@ -617,21 +683,21 @@ def generate_report_for_user(
             return None
 
         # Prepare data for template
-        data = {
-            "user_id": user_id,
-            "week_start": week_start.isoformat(),
-            "kpis": kpis,
-            "ability_trend": ability_trend,
-            "goals": goals,
-            "topic_features": topic_features,
-            "item_params": item_params,
-            "recommendations": recommendations,
-            "linking_constants": linking_constants,
-            "bayesian_growth": bayesian_growth,
-            "prophet_forecast": prophet_forecast,
-            "survival_risk": survival_risk,
-            "user_segment": user_segment,
-        }
+        data = build_report_data(
+            user_id,
+            week_start,
+            kpis=kpis,
+            ability_trend=ability_trend,
+            goals=goals,
+            topic_features=topic_features,
+            item_params=item_params,
+            recommendations=recommendations,
+            linking_constants=linking_constants,
+            bayesian_growth=bayesian_growth,
+            prophet_forecast=prophet_forecast,
+            survival_risk=survival_risk,
+            user_segment=user_segment,
+        )
 
         # Render Quarto report
         with tempfile.TemporaryDirectory() as tmpdir:
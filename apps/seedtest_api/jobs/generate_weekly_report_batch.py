@@ -2,7 +2,9 @@
 Generate weekly reports for multiple users (batch mode).
 This is an enhanced version that supports:
 - Cohort-based filtering
-- Parallel processing (optional)
+- Parallel processing: report inputs are prefetched per chunk of users with
+  cohort-wide bulk queries, rendered in a bounded process pool and uploaded
+  concurrently from a thread pool
 - Progress tracking
 - Error handling per user
 
@@ -12,17 +14,28 @@ Environment:
   S3_BUCKET (required): S3 bucket name
   COHORT_FILTER (optional): SQL WHERE clause for user filtering (e.g., "org_id = 'org123'")
   MAX_USERS (optional): Maximum users to process (default: 1000)
-  PARALLEL (optional): Number of parallel workers (default: 1, no parallelization)
+  PARALLEL (optional): Number of render worker processes (default: 1, render in-process)
+  UPLOAD_CONCURRENCY (optional): Concurrent S3 uploads (default: 8)
+  PREFETCH_CHUNK (optional): Users per bulk prefetch (default: 500)
 """
 
 from __future__ import annotations
 
 import argparse
 import os
+import shutil
 import sys
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import date, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 # Ensure "apps.*" imports work
@@ -40,12 +53,29 @@ _ensure_project_root_on_path()
 
 from sqlalchemy import text
 from apps.seedtest_api.jobs.generate_weekly_report import (
-    generate_report_for_user,
-    main as single_user_main,
+    _ability_row,
+    _bayesian_growth_from_kpis,
+    _goal_row,
+    _item_param_row,
+    _load_linking_constants,
+    _parse_kpis,
+    _segment_row,
+    _survival_risk,
+    _topic_feature_row,
+    build_report_data,
+    load_prophet_forecast,
+    load_survival_meta,
+    make_s3_client,
+    render_quarto_report,
+    upload_to_s3,
 )
 from apps.seedtest_api.services.db import get_session
 from apps.seedtest_api.services.metrics import week_start as iso_week_start
 
+PARALLEL = int(os.getenv("PARALLEL", "1"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+PREFETCH_CHUNK = int(os.getenv("PREFETCH_CHUNK", "500"))
+
 
 def load_active_users(
     session,
@@ -83,26 +113,296 @@ def load_active_users(
     return [row[0] for row in result.fetchall()]
 
 
+def _rows_by_user(session, sql: str, params: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Run a cohort query whose first column is user_id; group the rest by user."""
+    grouped: Dict[str, List[Any]] = {}
+    for row in session.execute(text(sql), params).fetchall():
+        grouped.setdefault(str(row[0]), []).append(tuple(row[1:]))
+    return grouped
+
+
+def prefetch_report_inputs(
+    session,
+    user_ids: List[str],
+    week_start: date,
+    trend_weeks: int = 8,
+    item_weeks: int = 4,
+) -> Dict[str, Dict[str, Any]]:
+    """Load every report section for a chunk of users with bulk queries.
+
+    One query per section for the whole chunk (instead of ~11 per user);
+    global sections (linking constants, Prophet forecast, survival model
+    meta) are loaded once. Mirrors the per-user loaders in
+    generate_weekly_report.
+
+    Returns:
+        Dict of user_id -> template data; users without KPIs for the week
+        are omitted
+    """
+    week_end = week_start + timedelta(days=6)
+    uids = [str(u) for u in user_ids]
+
+    kpis = _rows_by_user(
+        session,
+        """
+        SELECT user_id, kpis
+        FROM weekly_kpi
+        WHERE user_id = ANY(:uids) AND week_start = :week_start
+        """,
+        {"uids": uids, "week_start": week_start},
+    )
+    latest = _rows_by_user(
+        session,
+        """
+        SELECT DISTINCT ON (user_id) user_id, kpis, kpis->>'S' AS churn_risk
+        FROM weekly_kpi
+        WHERE user_id = ANY(:uids)
+        ORDER BY user_id, week_start DESC
+        """,
+        {"uids": uids},
+    )
+    trend = _rows_by_user(
+        session,
+        """
+        SELECT user_id, theta, se, fitted_at
+        FROM mirt_ability
+        WHERE user_id = ANY(:uids)
+          AND fitted_at >= :since
+        ORDER BY user_id, fitted_at ASC
+        """,
+        {"uids": uids, "since": date.today() - timedelta(weeks=trend_weeks)},
+    )
+    goals = _rows_by_user(
+        session,
+        """
+        SELECT
+            student_id::text AS user_id,
+            subject_id,
+            interest_1_5,
+            target_score,
+            target_date,
+            updated_at
+        FROM interest_goal
+        WHERE student_id::text = ANY(:uids)
+        ORDER BY user_id, updated_at DESC
+        """,
+        {"uids": uids},
+    )
+    topics = _rows_by_user(
+        session,
+        """
+        SELECT
+            user_id,
+            topic_id,
+            date,
+            attempts,
+            correct,
+            avg_time_ms,
+            rt_median,
+            hints,
+            theta_mean,
+            theta_sd,
+            improvement
+        FROM features_topic_daily
+        WHERE user_id = ANY(:uids)
+          AND date >= :week_start
+          AND date <= :week_end
+        ORDER BY user_id, topic_id, date
+        """,
+        {"uids": uids, "week_start": week_start, "week_end": week_end},
+    )
+    items = _rows_by_user(
+        session,
+        """
+        SELECT user_id, item_id, discrimination, difficulty, guessing, model, fitted_at
+        FROM (
+            SELECT
+                d.*,
+                ROW_NUMBER() OVER (
+                    PARTITION BY d.user_id ORDER BY d.fitted_at DESC
+                ) AS rn
+            FROM (
+                SELECT DISTINCT
+                    a.student_id::text AS user_id,
+                    p.item_id,
+                    p.params->>'a' AS discrimination,
+                    p.params->>'b' AS difficulty,
+                    p.params->>'c' AS guessing,
+                    p.model,
+                    p.fitted_at
+                FROM mirt_item_params p
+                INNER JOIN attempt a ON p.item_id = a.item_id::text
+                WHERE a.student_id::text = ANY(:uids)
+                  AND a.completed_at >= :since
+                  AND p.params ? 'b'
+            ) d
+        ) ranked
+        WHERE rn <= 200
+        ORDER BY user_id, fitted_at DESC
+        """,
+        {"uids": uids, "since": date.today() - timedelta(weeks=item_weeks)},
+    )
+    segments = _rows_by_user(
+        session,
+        """
+        SELECT DISTINCT ON (s.user_id)
+            s.user_id,
+            s.segment_label,
+            s.features_snapshot,
+            s.assigned_at,
+            m.segment_description
+        FROM user_segment s
+        LEFT JOIN segment_meta m ON s.segment_label = m.segment_label
+        WHERE s.user_id = ANY(:uids)
+        ORDER BY s.user_id, s.assigned_at DESC
+        """,
+        {"uids": uids},
+    )
+
+    # Global sections: identical for every user
+    linking_constants = _load_linking_constants(session)
+    prophet_forecast = load_prophet_forecast(session, "")
+    survival_meta = load_survival_meta(session)
+
+    inputs: Dict[str, Dict[str, Any]] = {}
+    for uid in uids:
+        week_kpis = _parse_kpis(kpis[uid][0][0]) if uid in kpis else None
+        if not week_kpis:
+            continue
+        latest_kpis, churn = latest[uid][0] if uid in latest else (None, None)
+        inputs[uid] = build_report_data(
+            uid,
+            week_start,
+            kpis=week_kpis,
+            ability_trend=[_ability_row(r) for r in trend.get(uid, [])],
+            goals=[_goal_row(r) for r in goals.get(uid, [])],
+            topic_features=[_topic_feature_row(r) for r in topics.get(uid, [])],
+            item_params=[_item_param_row(r) for r in items.get(uid, [])],
+            recommendations=[],
+            linking_constants=linking_constants,
+            bayesian_growth=(
+                _bayesian_growth_from_kpis(latest_kpis) if uid in latest else None
+            ),
+            prophet_forecast=prophet_forecast,
+            survival_risk=_survival_risk(churn, survival_meta),
+            user_segment=_segment_row(segments[uid][0]) if uid in segments else None,
+        )
+    return inputs
+
+
+def render_report_task(
+    user_id: str,
+    template_dir: str,
+    data: Dict[str, Any],
+    output_format: str,
+    out_root: str,
+) -> Optional[str]:
+    """Render one report from a private copy of the template directory.
+
+    render_quarto_report writes _data.json into the template directory, so
+    concurrent renders must not share it. Module-level so it can run in a
+    worker process. Returns the rendered file (moved under out_root until
+    it is uploaded) or None if rendering failed.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work_dir = Path(tmpdir) / "template"
+        shutil.copytree(template_dir, work_dir)
+        output_dir = Path(tmpdir) / "output"
+        output_dir.mkdir()
+
+        rendered = render_quarto_report(work_dir, data, output_dir, format=output_format)
+        if not rendered:
+            return None
+
+        target = Path(out_root) / f"{user_id}.{output_format}"
+        shutil.move(str(rendered), str(target))
+        return str(target)
+
+
+def upload_report_task(
+    path: str,
+    user_id: str,
+    week_start: date,
+    output_format: str,
+    bucket: str,
+    s3_client=None,
+) -> Optional[str]:
+    """Upload one rendered report and remove the local file."""
+    key = f"reports/{user_id}/{week_start.isoformat()}/report.{output_format}"
+    try:
+        return upload_to_s3(Path(path), bucket, key, s3_client=s3_client)
+    finally:
+        Path(path).unlink(missing_ok=True)
+
+
+def save_report_artifacts(
+    session,
+    artifacts: List[Tuple[str, str]],
+    week_start: date,
+    format: str = "html",
+) -> None:
+    """Upsert many (user_id, url) report artifacts with one executemany."""
+    if not artifacts:
+        return
+    session.execute(
+        text(
+            """
+            INSERT INTO report_artifacts (user_id, week_start, format, url, generated_at)
+            VALUES (:user_id, :week_start, :format, :url, NOW())
+            ON CONFLICT (user_id, week_start, format)
+            DO UPDATE SET
+                url = EXCLUDED.url,
+                generated_at = NOW()
+            """
+        ),
+        [
+            {"user_id": uid, "week_start": week_start, "format": format, "url": url}
+            for uid, url in artifacts
+        ],
+    )
+    session.commit()
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    size = max(size, 1)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
 def generate_reports_batch(
     week_start: date,
     cohort_filter: Optional[str] = None,
     max_users: int = 1000,
-    parallel: int = 1,
+    parallel: int = PARALLEL,
     dry_run: bool = False,
+    upload_concurrency: int = UPLOAD_CONCURRENCY,
+    prefetch_chunk: int = PREFETCH_CHUNK,
+    template_dir: Optional[Path] = None,
 ) -> dict:
     """Generate reports for multiple users in batch.
 
+    Three overlapping stages per chunk of users:
+    1. Prefetch: bulk-load all report inputs for the chunk (prefetch_report_inputs)
+    2. Render: render_report_task in a pool of `parallel` processes, keeping
+       at most 2 * parallel renders in flight
+    3. Upload: finished renders go to a thread pool of upload_concurrency
+       workers sharing one S3 client; artifact rows are saved per chunk
+
     Args:
         week_start: Week start date
         cohort_filter: Optional SQL WHERE clause for filtering
         max_users: Maximum users to process
-        parallel: Number of parallel workers (currently not implemented, sequential only)
+        parallel: Render worker processes (1 renders in this process)
         dry_run: If True, skip S3 upload and DB save
+        upload_concurrency: Concurrent S3 uploads
+        prefetch_chunk: Users per bulk prefetch
+        template_dir: Quarto template directory (default: reports/quarto)
 
     Returns:
         Dictionary with summary stats: {processed, failed, skipped, total}
     """
-    template_dir = Path(__file__).parent.parent.parent / "reports" / "quarto"
+    if template_dir is None:
+        template_dir = Path(__file__).parent.parent.parent / "reports" / "quarto"
     if not template_dir.exists():
         print(f"[ERROR] Template directory not found: {template_dir}")
         return {"processed": 0, "failed": 0, "skipped": 0, "total": 0}
@@ -120,55 +420,121 @@ def generate_reports_batch(
         return {"processed": 0, "failed": 0, "skipped": 0, "total": 0}
 
     total = len(user_ids)
-    processed = 0
-    failed = 0
-    skipped = 0
-
+    stats = {"processed": 0, "failed": 0, "skipped": 0, "total": total}
     print(
         f"[INFO] Generating reports for {total} users; "
-        f"week={week_start}, format={output_format}, "
+        f"week={week_start}, format={output_format}, parallel={parallel}, "
         f"cohort_filter={cohort_filter}, dry_run={dry_run}"
     )
 
-    for idx, user_id in enumerate(user_ids, 1):
-        try:
-            result = generate_report_for_user(
-                user_id,
-                week_start,
-                template_dir,
-                output_format,
-                s3_bucket,
+    s3_client = make_s3_client() if s3_bucket else None
+    max_in_flight = max(parallel, 1) * 2
+    done = 0
+
+    def _progress(status: str) -> None:
+        nonlocal done
+        done += 1
+        stats[status] += 1
+        if done % 10 == 0:
+            print(
+                f"[PROGRESS] {done}/{total} processed; "
+                f"success={stats['processed']}, failed={stats['failed']}"
             )
 
-            if result:
-                processed += 1
-                if idx % 10 == 0:
-                    print(
-                        f"[PROGRESS] {idx}/{total} processed; success={processed}, failed={failed}"
-                    )
-            else:
-                skipped += 1
-                print(f"[WARN] Skipped user={user_id} (no KPIs or render failed)")
-
-        except Exception as e:
-            failed += 1
-            print(f"[ERROR] Failed for user={user_id}: {e}")
-            # Continue processing other users
-            continue
-
-    summary = {
-        "processed": processed,
-        "failed": failed,
-        "skipped": skipped,
-        "total": total,
-    }
+    with tempfile.TemporaryDirectory() as out_root, ThreadPoolExecutor(
+        max_workers=max(upload_concurrency, 1)
+    ) as uploader:
+        renderer = ProcessPoolExecutor(max_workers=parallel) if parallel > 1 else None
+        try:
+            for chunk in _chunks([str(u) for u in user_ids], prefetch_chunk):
+                with get_session() as session:
+                    inputs = prefetch_report_inputs(session, chunk, week_start)
+
+                renders: Dict[Future, str] = {}
+                uploads: Dict[Future, str] = {}
+
+                def _on_rendered(fut: Future, user_id: str) -> None:
+                    try:
+                        path = fut.result()
+                    except Exception as e:
+                        print(f"[ERROR] Failed for user={user_id}: {e}")
+                        _progress("failed")
+                        return
+                    if not path:
+                        print(f"[WARN] Skipped user={user_id} (render failed)")
+                        _progress("skipped")
+                    elif s3_bucket:
+                        uploads[
+                            uploader.submit(
+                                upload_report_task,
+                                path,
+                                user_id,
+                                week_start,
+                                output_format,
+                                s3_bucket,
+                                s3_client,
+                            )
+                        ] = user_id
+                    else:
+                        # Dry run / no bucket: rendering is the whole job
+                        Path(path).unlink(missing_ok=True)
+                        _progress("processed")
+
+                def _drain(block_until: int) -> None:
+                    while len(renders) > block_until:
+                        finished, _ = wait(renders, return_when=FIRST_COMPLETED)
+                        for fut in finished:
+                            _on_rendered(fut, renders.pop(fut))
+
+                for user_id in chunk:
+                    data = inputs.pop(user_id, None)
+                    if data is None:
+                        print(f"[WARN] Skipped user={user_id} (no KPIs)")
+                        _progress("skipped")
+                        continue
+                    args = (user_id, str(template_dir), data, output_format, out_root)
+                    if renderer is None:
+                        fut: Future = Future()
+                        try:
+                            fut.set_result(render_report_task(*args))
+                        except Exception as e:
+                            fut.set_exception(e)
+                        _on_rendered(fut, user_id)
+                    else:
+                        renders[renderer.submit(render_report_task, *args)] = user_id
+                        _drain(max_in_flight - 1)
+                _drain(0)
+
+                artifacts: List[Tuple[str, str]] = []
+                for fut in list(uploads):
+                    user_id = uploads[fut]
+                    try:
+                        url = fut.result()
+                    except Exception as e:
+                        print(f"[ERROR] Failed for user={user_id}: {e}")
+                        _progress("failed")
+                        continue
+                    if url:
+                        artifacts.append((user_id, url))
+                        _progress("processed")
+                    else:
+                        print(f"[WARN] Skipped user={user_id} (upload failed)")
+                        _progress("skipped")
+
+                if artifacts:
+                    with get_session() as session:
+                        save_report_artifacts(
+                            session, artifacts, week_start, output_format
+                        )
+        finally:
+            if renderer is not None:
+                renderer.shutdown(wait=True, cancel_futures=True)
 
     print(
-        f"[INFO] Batch complete: processed={processed}, failed={failed}, "
-        f"skipped={skipped}, total={total}"
+        f"[INFO] Batch complete: processed={stats['processed']}, "
+        f"failed={stats['failed']}, skipped={stats['skipped']}, total={total}"
     )
-
-    return summary
+    return stats
 
 
 def main() -> int:
@@ -192,6 +558,12 @@ def main() -> int:
         default=1000,
         help="Maximum users to process (default: 1000)",
     )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=PARALLEL,
+        help=f"Render worker processes (default: PARALLEL env or {PARALLEL})",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -211,7 +583,7 @@ def main() -> int:
         week_start=week_start,
         cohort_filter=args.cohort,
         max_users=args.max_users,
-        parallel=1,  # Sequential for now; parallel processing can be added later
+        parallel=args.parallel,
         dry_run=args.dry_run,
     )
 
@@ -0,0 +1,392 @@
+"""
+Sharded, resumable execution for nightly per-user jobs.
+- Partitions keys (user_ids) by a stable hash into N shards
+- Runs shards in a process pool; each worker builds its own pooled engine
+- Tracks per-shard progress and failures in the job_checkpoint table
+- Resumes a partially completed run: finished shards are skipped and
+  unfinished shards continue after their last checkpointed key
+Environment:
+  JOB_WORKERS (optional, default 1): Worker processes (1 = run in-process)
+  JOB_SHARDS (optional, default = workers): Number of hash shards
+  JOB_CHECKPOINT_EVERY (optional, default 200): Keys between checkpoint writes
+"""
+
+# cSpell:ignore crc
+from __future__ import annotations
+
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+WorkFn = Callable[[Session, str], None]
+SessionFactory = Callable[[], ContextManager[Session]]
+
+DEFAULT_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+DEFAULT_SHARDS = int(os.getenv("JOB_SHARDS", "0")) or None
+CHECKPOINT_EVERY = int(os.getenv("JOB_CHECKPOINT_EVERY", "200"))
+
+
+@dataclass
+class ShardResult:
+    shard: int
+    total: int = 0
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    status: str = "done"
+    error: Optional[str] = None
+
+
+@dataclass
+class ShardedRunSummary:
+    job_name: str
+    run_key: str
+    shards: list[ShardResult] = field(default_factory=list)
+    duration_ms: int = 0
+
+    @property
+    def processed(self) -> int:
+        return sum(s.processed for s in self.shards)
+
+    @property
+    def failed(self) -> int:
+        return sum(s.failed for s in self.shards)
+
+    @property
+    def skipped(self) -> int:
+        return sum(s.skipped for s in self.shards)
+
+    @property
+    def ok(self) -> bool:
+        return all(s.status == "done" for s in self.shards)
+
+
+def shard_of(key: str, n_shards: int) -> int:
+    """Stable shard index for a key (same in every process and run)."""
+    return zlib.crc32(str(key).encode("utf-8")) % max(n_shards, 1)
+
+
+def partition(keys: Iterable[str], n_shards: int) -> list[list[str]]:
+    """Split keys into n_shards sorted lists by hash."""
+    shards: list[list[str]] = [[] for _ in range(max(n_shards, 1))]
+    for key in keys:
+        shards[shard_of(key, n_shards)].append(str(key))
+    for s in shards:
+        s.sort()
+    return shards
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint table
+# ---------------------------------------------------------------------------
+
+
+def ensure_checkpoint_table(session: Session) -> None:
+    """Create job_checkpoint if the migration has not been applied."""
+    session.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS job_checkpoint (
+              job_name TEXT NOT NULL,
+              run_key TEXT NOT NULL,
+              shard INTEGER NOT NULL,
+              n_shards INTEGER NOT NULL,
+              status TEXT NOT NULL DEFAULT 'running',
+              total INTEGER NOT NULL DEFAULT 0,
+              processed INTEGER NOT NULL DEFAULT 0,
+              failed INTEGER NOT NULL DEFAULT 0,
+              last_key TEXT,
+              error TEXT,
+              started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+              updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (job_name, run_key, shard)
+            )
+            """
+        )
+    )
+    session.commit()
+
+
+def load_checkpoints(
+    session: Session, job_name: str, run_key: str, n_shards: int
+) -> dict[int, dict]:
+    """Checkpoint rows for a run, keyed by shard.
+
+    Rows written with a different shard count are ignored (keys would map
+    to different shards), so changing JOB_SHARDS restarts the run.
+    """
+    rows = session.execute(
+        text(
+            """
+            SELECT shard, status, processed, failed, last_key
+            FROM job_checkpoint
+            WHERE job_name = :job AND run_key = :run AND n_shards = :n
+            """
+        ),
+        {"job": job_name, "run": run_key, "n": n_shards},
+    ).fetchall()
+    return {
+        int(r[0]): {
+            "status": r[1],
+            "processed": int(r[2] or 0),
+            "failed": int(r[3] or 0),
+            "last_key": r[4],
+        }
+        for r in rows
+    }
+
+
+def _save_checkpoint(
+    session: Session,
+    job_name: str,
+    run_key: str,
+    shard: int,
+    n_shards: int,
+    result: ShardResult,
+    last_key: Optional[str],
+) -> None:
+    session.execute(
+        text(
+            """
+            INSERT INTO job_checkpoint
+              (job_name, run_key, shard, n_shards, status, total, processed,
+               failed, last_key, error, started_at, updated_at)
+            VALUES
+              (:job, :run, :shard, :n, :status, :total, :processed,
+               :failed, :last_key, :error, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT (job_name, run_key, shard)
+            DO UPDATE SET
+              n_shards = EXCLUDED.n_shards,
+              status = EXCLUDED.status,
+              total = EXCLUDED.total,
+              processed = EXCLUDED.processed,
+              failed = EXCLUDED.failed,
+              last_key = EXCLUDED.last_key,
+              error = EXCLUDED.error,
+              updated_at = CURRENT_TIMESTAMP
+            """
+        ),
+        {
+            "job": job_name,
+            "run": run_key,
+            "shard": shard,
+            "n": n_shards,
+            "status": result.status,
+            "total": result.total,
+            "processed": result.processed,
+            "failed": result.failed,
+            "last_key": last_key,
+            "error": result.error,
+        },
+    )
+    session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+
+def _init_worker() -> None:
+    """Drop the engine inherited from the parent so this process pools its own."""
+    from apps.seedtest_api.services import db
+
+    db._ENGINE = None
+    db._SessionLocal = None
+
+
+def run_shard(
+    job_name: str,
+    run_key: str,
+    shard: int,
+    n_shards: int,
+    keys: list[str],
+    work: WorkFn,
+    session_factory: SessionFactory,
+    checkpoint: Optional[dict] = None,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    dry_run: bool = False,
+) -> ShardResult:
+    """Process one shard's keys in order, checkpointing as it goes.
+
+    A failing key is rolled back and counted; the shard continues. Keys at
+    or before the checkpoint's last_key are skipped on resume.
+    """
+    result = ShardResult(shard=shard, total=len(keys))
+    last_key = None
+    if checkpoint:
+        result.processed = checkpoint["processed"]
+        result.failed = checkpoint["failed"]
+        last_key = checkpoint["last_key"]
+        if last_key is not None:
+            pending = [k for k in keys if k > last_key]
+            result.skipped = len(keys) - len(pending)
+            keys = pending
+
+    verbose = os.getenv("DEBUG", "").lower() == "true"
+
+    with session_factory() as session:
+        if not dry_run:
+            result.status = "running"
+            _save_checkpoint(
+                session, job_name, run_key, shard, n_shards, result, last_key
+            )
+
+        try:
+            for i, key in enumerate(keys, start=1):
+                try:
+                    work(session, key)
+                    result.processed += 1
+                    if verbose:
+                        print(f"[DEBUG] OK job={job_name} shard={shard} key={key}")
+                except Exception as e:
+                    result.failed += 1
+                    session.rollback()
+                    print(
+                        f"[ERROR] job={job_name} shard={shard} key={key} error={e}"
+                    )
+                last_key = key
+
+                if not dry_run and i % max(checkpoint_every, 1) == 0:
+                    _save_checkpoint(
+                        session, job_name, run_key, shard, n_shards, result, last_key
+                    )
+        except Exception as e:
+            # Lost connection etc.: record where the shard stopped, then resume later
+            result.status = "failed"
+            result.error = str(e)
+            if not dry_run:
+                session.rollback()
+                _save_checkpoint(
+                    session, job_name, run_key, shard, n_shards, result, last_key
+                )
+            raise
+
+        result.status = "done"
+        if dry_run:
+            session.rollback()
+        else:
+            _save_checkpoint(
+                session, job_name, run_key, shard, n_shards, result, last_key
+            )
+
+    return result
+
+
+def _run_shard_safe(*args, **kwargs) -> ShardResult:
+    """run_shard that reports a crashed shard instead of raising."""
+    try:
+        return run_shard(*args, **kwargs)
+    except Exception as e:
+        return ShardResult(
+            shard=args[2], total=len(args[4]), status="failed", error=str(e)
+        )
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def run_sharded(
+    job_name: str,
+    run_key: str,
+    keys: Iterable[str],
+    work: WorkFn,
+    session_factory: SessionFactory,
+    n_workers: int = DEFAULT_WORKERS,
+    n_shards: Optional[int] = DEFAULT_SHARDS,
+    resume: bool = True,
+    dry_run: bool = False,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+) -> ShardedRunSummary:
+    """Run work(session, key) for every key across hash shards.
+
+    Args:
+        job_name: Job identifier stored in job_checkpoint
+        run_key: Run identifier (e.g. anchor date); resume matches on it
+        keys: Work keys, typically user_ids
+        work: Module-level function (picklable) doing one key's work
+        session_factory: Context manager yielding a Session (e.g. get_session)
+        n_workers: Worker processes; 1 runs all shards in this process
+        n_shards: Hash shards (default: n_workers)
+        resume: Skip work already recorded in job_checkpoint for this run
+        dry_run: Roll back all work and write no checkpoints
+
+    Returns:
+        ShardedRunSummary with per-shard progress and failures
+    """
+    start_time = time.time()
+    n_workers = max(n_workers, 1)
+    n_shards = max(n_shards or n_workers, 1)
+    shards = partition(keys, n_shards)
+
+    checkpoints: dict[int, dict] = {}
+    if not dry_run:
+        with session_factory() as session:
+            ensure_checkpoint_table(session)
+            if resume:
+                checkpoints = load_checkpoints(session, job_name, run_key, n_shards)
+
+    summary = ShardedRunSummary(job_name=job_name, run_key=run_key)
+    jobs = []
+    for shard, shard_keys in enumerate(shards):
+        cp = checkpoints.get(shard)
+        if cp and cp["status"] == "done":
+            summary.shards.append(
+                ShardResult(
+                    shard=shard,
+                    total=len(shard_keys),
+                    processed=cp["processed"],
+                    failed=cp["failed"],
+                    skipped=len(shard_keys),
+                )
+            )
+            print(f"[INFO] job={job_name} shard={shard} already done; skipping")
+            continue
+        jobs.append(
+            (job_name, run_key, shard, n_shards, shard_keys, work, session_factory, cp)
+        )
+
+    def _report(res: ShardResult) -> None:
+        summary.shards.append(res)
+        print(
+            f"[INFO] job={job_name} shard={res.shard}/{n_shards} status={res.status} "
+            f"processed={res.processed} failed={res.failed} skipped={res.skipped} "
+            f"({len(summary.shards)}/{n_shards} shards finished)"
+        )
+        if res.error:
+            print(f"[ERROR] job={job_name} shard={res.shard} error={res.error}")
+
+    if n_workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            _report(
+                _run_shard_safe(
+                    *job, checkpoint_every=checkpoint_every, dry_run=dry_run
+                )
+            )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, len(jobs)), initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_shard_safe,
+                    *job,
+                    checkpoint_every=checkpoint_every,
+                    dry_run=dry_run,
+                )
+                for job in jobs
+            ]
+            for fut in as_completed(futures):
+                _report(fut.result())
+
+    summary.shards.sort(key=lambda s: s.shard)
+    summary.duration_ms = int((time.time() - start_time) * 1000)
+    return summary
@@ -16,6 +16,7 @@ from __future__ import annotations
 from typing import Iterable, Mapping, Optional, Sequence, Tuple
 
 from shared.adaptive import KeyMap, choose_next_item, run_adaptive_session
+from shared.adaptive_batch import BatchSimulationResult, simulate_batch
 
 # Default key mapping for the SeedTest questions schema
 SEEDTEST_KEYMAP = KeyMap(
@@ -81,8 +82,34 @@ def simulate_adaptive_run(
     )
 
 
+def simulate_adaptive_batch(
+    pool: Sequence[Mapping],
+    true_thetas: Sequence[float],
+    max_items: int = 5,
+    sem_threshold: Optional[float] = None,
+    **kwargs,
+) -> BatchSimulationResult:
+    """Simulate many adaptive sessions at once using the SeedTest key mapping.
+
+    Each examinee follows the same path as simulate_adaptive_run; extra
+    keyword arguments (estimator, stochastic, seed, n_workers, shard_size)
+    are passed to shared.adaptive_batch.simulate_batch.
+
+    Returns a BatchSimulationResult with exposure, bias and test length.
+    """
+    return simulate_batch(
+        pool,
+        true_thetas,
+        max_items=max_items,
+        sem_threshold=sem_threshold,
+        keymap=SEEDTEST_KEYMAP,
+        **kwargs,
+    )
+
+
 __all__ = [
     "SEEDTEST_KEYMAP",
     "choose_next_question",
     "simulate_adaptive_run",
+    "simulate_adaptive_batch",
 ]
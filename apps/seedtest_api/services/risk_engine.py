@@ -5,9 +5,11 @@ from __future__ import annotations
 from datetime import date, timedelta
 from decimal import Decimal
 from statistics import mean, median
-from typing import Dict, List
+from typing import Dict, Iterator, List, Sequence
+from uuid import uuid4
 
 from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from ..models import Attendance, ClassSummary, RiskFlag
@@ -20,138 +22,230 @@ def compute_week_start(d: date) -> date:
     return d - timedelta(days=d.weekday())
 
 
-def build_class_summary(
-    db: Session, tenant_id: str, classroom_id: str, week: date
-) -> None:
-    """Build class summary for a given classroom and week.
+# Attendance lookback that defines class membership for summaries
+# (same 4-week window the attendance risk rule uses)
+MEMBERSHIP_LOOKBACK_DAYS = 28
 
-    Aggregates:
-    - Mean/median/top10/bottom10 theta
-    - 7-day theta growth (delta_theta_7d)
-    - Attendance rates (absent/late)
-    - Stability score (1/IQR of theta distribution)
-    - Risk count
+# Rows per class_summary upsert and ids per member IN list; keeps every
+# statement far below the driver's 65,535 bind-parameter limit
+BATCH_SIZE = 1000
 
-    Args:
-        db: Database session
-        tenant_id: Tenant identifier for multitenancy
-        classroom_id: Classroom identifier
-        week: Week start date (Monday)
-    """
-    # Fetch all student theta values for this class and week
-    # Using weekly_kpi which contains aggregated theta estimates per user
-    kpi_stmt = select(WeeklyKPI).where(WeeklyKPI.week_start == week)
-    kpi_rows = db.execute(kpi_stmt).scalars().all()
 
-    theta_values = []
-    for kpi in kpi_rows:
-        if isinstance(kpi.kpis, dict) and "theta" in kpi.kpis:
-            theta_values.append(float(kpi.kpis["theta"]))
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
 
-    if not theta_values:
-        # No data for this week, skip
-        return
 
-    mean_theta = float(mean(theta_values))
-    median_theta = float(median(theta_values))
+def compute_class_stats(
+    theta_values: List[float], delta_values: List[float]
+) -> Dict[str, float] | None:
+    """Compute theta distribution statistics for one class.
+
+    Quantiles use the same index rule as the dashboard has always shown
+    (``sorted[max(int(n * q) - 1, 0)]``), so batch and single-class
+    summaries agree.
+
+    Returns:
+        Dict with mean/median/top10/bottom10 theta, delta_theta_7d and
+        stability_score (1/IQR), or None when the class has no thetas
+    """
+    if not theta_values:
+        return None
 
     sorted_thetas = sorted(theta_values)
     n = len(sorted_thetas)
-    top10_idx = max(int(n * 0.9) - 1, 0)
-    bottom10_idx = max(int(n * 0.1) - 1, 0)
-    top10_theta = float(sorted_thetas[top10_idx]) if top10_idx < n else mean_theta
-    bottom10_theta = (
-        float(sorted_thetas[bottom10_idx]) if bottom10_idx < n else mean_theta
+
+    def at(q: float) -> float:
+        return float(sorted_thetas[max(int(n * q) - 1, 0)])
+
+    iqr = max(at(0.75) - at(0.25), 1e-6)
+    return {
+        "mean_theta": float(mean(sorted_thetas)),
+        "median_theta": float(median(sorted_thetas)),
+        "top10_theta": at(0.9),
+        "bottom10_theta": at(0.1),
+        "delta_theta_7d": float(mean(delta_values)) if delta_values else 0.0,
+        "stability_score": float(1.0 / iqr),
+    }
+
+
+def load_class_members(
+    db: Session, tenant_id: str, classroom_ids: List[str], week: date
+) -> Dict[str, set[str]]:
+    """Map classroom_id -> student ids seen in attendance around the week.
+
+    One query for all classrooms; a student belongs to every class they
+    have attendance in between MEMBERSHIP_LOOKBACK_DAYS before the week and
+    the end of the week.
+    """
+    if not classroom_ids:
+        return {}
+    stmt = (
+        select(Attendance.classroom_id, Attendance.student_id)
+        .where(
+            Attendance.tenant_id == tenant_id,
+            Attendance.classroom_id.in_(classroom_ids),
+            Attendance.date >= week - timedelta(days=MEMBERSHIP_LOOKBACK_DAYS),
+            Attendance.date < week + timedelta(days=7),
+        )
+        .distinct()
     )
+    members: Dict[str, set[str]] = {}
+    for classroom_id, student_id in db.execute(stmt).all():
+        members.setdefault(classroom_id, set()).add(student_id)
+    return members
+
+
+def build_class_summaries(
+    db: Session, tenant_id: str, classroom_ids: List[str], week: date
+) -> int:
+    """Build class summaries for many classrooms in one pass.
+
+    Issues a fixed number of statements per BATCH_SIZE members/rows
+    rather than per class: membership, the week's KPIs for members only,
+    attendance counts and risk counts grouped by classroom, then bulk
+    upserts into class_summary (ON CONFLICT on classroom_id + week_start).
+
+    Args:
+        db: Database session
+        tenant_id: Tenant identifier for multitenancy
+        classroom_ids: Classroom identifiers
+        week: Week start date (Monday)
 
-    # 7-day growth: average delta_theta from current week
-    delta_values = [
-        float(kpi.kpis.get("delta_theta", 0))
-        for kpi in kpi_rows
-        if isinstance(kpi.kpis, dict) and "delta_theta" in kpi.kpis
-    ]
-    delta_theta_7d = float(mean(delta_values)) if delta_values else 0.0
+    Returns:
+        Number of class_summary rows written
+    """
+    classroom_ids = list(dict.fromkeys(classroom_ids))
+    members = load_class_members(db, tenant_id, classroom_ids, week)
+    if not members:
+        # No data for this week, skip
+        return 0
+
+    # Week's KPIs, only for students who belong to one of the classes
+    all_members = sorted(set().union(*members.values()))
+    kpis_by_user = {}
+    for chunk in _chunks(all_members, BATCH_SIZE):
+        kpi_stmt = select(WeeklyKPI.user_id, WeeklyKPI.kpis).where(
+            WeeklyKPI.week_start == week, WeeklyKPI.user_id.in_(chunk)
+        )
+        kpis_by_user.update(
+            (user_id, kpis)
+            for user_id, kpis in db.execute(kpi_stmt).all()
+            if isinstance(kpis, dict)
+        )
 
-    # Attendance rates for the week
+    # Attendance rates for the week, grouped per classroom
     week_end = week + timedelta(days=7)
     att_stmt = (
-        select(Attendance.status, func.count())
+        select(Attendance.classroom_id, Attendance.status, func.count())
         .where(
             Attendance.tenant_id == tenant_id,
-            Attendance.classroom_id == classroom_id,
+            Attendance.classroom_id.in_(classroom_ids),
             Attendance.date >= week,
             Attendance.date < week_end,
         )
-        .group_by(Attendance.status)
+        .group_by(Attendance.classroom_id, Attendance.status)
     )
-    att_rows = db.execute(att_stmt).all()
+    att_by_class: Dict[str, Dict[str, int]] = {}
+    for classroom_id, status, n in db.execute(att_stmt).all():
+        att_by_class.setdefault(classroom_id, {})[status] = int(n)
 
-    total_att = sum(count for _, count in att_rows) or 1
-    late_count = next((count for status, count in att_rows if status == "late"), 0)
-    absent_count = next((count for status, count in att_rows if status == "absent"), 0)
-
-    late_rate = float(late_count) / total_att
-    absent_rate = float(absent_count) / total_att
-
-    # Stability score: inverse of IQR (interquartile range)
-    q1_idx = max(int(n * 0.25) - 1, 0)
-    q3_idx = max(int(n * 0.75) - 1, 0)
-    q1 = sorted_thetas[q1_idx] if q1_idx < n else mean_theta
-    q3 = sorted_thetas[q3_idx] if q3_idx < n else mean_theta
-    iqr = max(q3 - q1, 1e-6)
-    stability_score = float(1.0 / iqr)
-
-    # Risk count
-    risk_count_stmt = select(func.count()).where(
-        RiskFlag.tenant_id == tenant_id,
-        RiskFlag.classroom_id == classroom_id,
-        RiskFlag.week_start == week,
+    # Risk counts (includes flags added earlier in this batch via autoflush)
+    risk_stmt = (
+        select(RiskFlag.classroom_id, func.count())
+        .where(
+            RiskFlag.tenant_id == tenant_id,
+            RiskFlag.classroom_id.in_(classroom_ids),
+            RiskFlag.week_start == week,
+        )
+        .group_by(RiskFlag.classroom_id)
     )
-    risks_count = db.execute(risk_count_stmt).scalar() or 0
-
-    # Upsert class_summary
-    # Check if exists
-    existing = db.execute(
-        select(ClassSummary).where(
-            ClassSummary.tenant_id == tenant_id,
-            ClassSummary.classroom_id == classroom_id,
-            ClassSummary.week_start == week,
+    risks_by_class = {cid: int(n) for cid, n in db.execute(risk_stmt).all()}
+
+    rows = []
+    for classroom_id in classroom_ids:
+        class_kpis = [
+            kpis_by_user[u]
+            for u in sorted(members.get(classroom_id, ()))
+            if u in kpis_by_user
+        ]
+        stats = compute_class_stats(
+            [float(k["theta"]) for k in class_kpis if "theta" in k],
+            [float(k.get("delta_theta", 0)) for k in class_kpis if "delta_theta" in k],
         )
-    ).scalar_one_or_none()
-
-    if existing:
-        existing.mean_theta = Decimal(str(mean_theta))
-        existing.median_theta = Decimal(str(median_theta))
-        existing.top10_theta = Decimal(str(top10_theta))
-        existing.bottom10_theta = Decimal(str(bottom10_theta))
-        existing.delta_theta_7d = Decimal(str(delta_theta_7d))
-        existing.attendance_absent_rate = Decimal(str(absent_rate))
-        existing.attendance_late_rate = Decimal(str(late_rate))
-        existing.stability_score = Decimal(str(stability_score))
-        existing.risks_count = int(risks_count)
-    else:
-        from uuid import uuid4
-
-        summary = ClassSummary(
+        if stats is None:
+            continue
+
+        att = att_by_class.get(classroom_id, {})
+        total_att = sum(att.values()) or 1
+        stats["attendance_absent_rate"] = float(att.get("absent", 0)) / total_att
+        stats["attendance_late_rate"] = float(att.get("late", 0)) / total_att
+
+        row = {k: Decimal(str(v)) for k, v in stats.items()}
+        row.update(
             id=str(uuid4()),
             tenant_id=tenant_id,
             classroom_id=classroom_id,
             week_start=week,
-            mean_theta=Decimal(str(mean_theta)),
-            median_theta=Decimal(str(median_theta)),
-            top10_theta=Decimal(str(top10_theta)),
-            bottom10_theta=Decimal(str(bottom10_theta)),
-            delta_theta_7d=Decimal(str(delta_theta_7d)),
-            attendance_absent_rate=Decimal(str(absent_rate)),
-            attendance_late_rate=Decimal(str(late_rate)),
-            stability_score=Decimal(str(stability_score)),
-            risks_count=int(risks_count),
+            risks_count=risks_by_class.get(classroom_id, 0),
         )
-        db.add(summary)
+        rows.append(row)
+
+    if not rows:
+        return 0
+
+    for chunk in _chunks(rows, BATCH_SIZE):
+        stmt = pg_insert(ClassSummary).values(chunk)
+        updated = {
+            col: stmt.excluded[col]
+            for col in chunk[0]
+            if col not in ("id", "classroom_id", "week_start")
+        }
+        updated["updated_at"] = func.now()
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ClassSummary.classroom_id, ClassSummary.week_start],
+                set_=updated,
+            )
+        )
+    return len(rows)
+
+
+def build_class_summary(
+    db: Session, tenant_id: str, classroom_id: str, week: date
+) -> None:
+    """Build class summary for a given classroom and week.
+
+    Aggregates:
+    - Mean/median/top10/bottom10 theta
+    - 7-day theta growth (delta_theta_7d)
+    - Attendance rates (absent/late)
+    - Stability score (1/IQR of theta distribution)
+    - Risk count
+
+    Single-class form of build_class_summaries.
+
+    Args:
+        db: Database session
+        tenant_id: Tenant identifier for multitenancy
+        classroom_id: Classroom identifier
+        week: Week start date (Monday)
+    """
+    build_class_summaries(db, tenant_id, [classroom_id], week)
+
+
+def _growth_window(week: date) -> List[date]:
+    """Week starts covered by the low-growth rule (current + 3 previous)."""
+    return [week - timedelta(days=7 * i) for i in range(0, 4)]
 
 
 def run_risk_rules(
-    db: Session, tenant_id: str, classroom_id: str, week: date, grade: str | None = None
+    db: Session,
+    tenant_id: str,
+    classroom_id: str,
+    week: date,
+    grade: str | None = None,
+    kpi_rows: Sequence[WeeklyKPI] | None = None,
 ) -> None:
     """Run risk detection rules for a classroom and week using dynamic thresholds.
 
@@ -166,9 +260,9 @@ def run_risk_rules(
         classroom_id: Classroom identifier
         week: Week start date (Monday)
         grade: Optional grade level for grade-specific thresholds
+        kpi_rows: Preloaded WeeklyKPI rows for the growth window (batch mode
+            loads them once for all classrooms)
     """
-    from uuid import uuid4
-
     # Resolve dynamic thresholds (class > grade > tenant > default)
     thr_growth = resolve_thresholds(
         db, tenant_id, "low_growth", class_id=classroom_id, grade=grade
@@ -179,9 +273,11 @@ def run_risk_rules(
 
     # Rule 1: Low growth
     # Get last 4 weeks of data per student
-    weeks = [week - timedelta(days=7 * i) for i in range(0, 4)]
-    kpi_stmt = select(WeeklyKPI).where(WeeklyKPI.week_start.in_(weeks))
-    kpi_rows = db.execute(kpi_stmt).scalars().all()
+    if kpi_rows is None:
+        kpi_stmt = select(WeeklyKPI).where(
+            WeeklyKPI.week_start.in_(_growth_window(week))
+        )
+        kpi_rows = db.execute(kpi_stmt).scalars().all()
 
     by_student: Dict[str, List[tuple[date, float]]] = {}
     for kpi in kpi_rows:
@@ -287,13 +383,17 @@ def run_teacher_dashboard_batch(
     today = date.today()
     week = compute_week_start(today)
 
+    # Growth-window KPIs are the same for every classroom; load them once
+    kpi_stmt = select(WeeklyKPI).where(WeeklyKPI.week_start.in_(_growth_window(week)))
+    kpi_rows = db.execute(kpi_stmt).scalars().all()
+
     for classroom_id in classroom_ids:
         grade = grade_map.get(classroom_id) if grade_map else None
 
         # Run risk detection with dynamic thresholds
-        run_risk_rules(db, tenant_id, classroom_id, week, grade)
+        run_risk_rules(db, tenant_id, classroom_id, week, grade, kpi_rows=kpi_rows)
 
-        # Build class summary
-        build_class_summary(db, tenant_id, classroom_id, week)
+    # Build all class summaries in one pass (risk counts see the new flags)
+    build_class_summaries(db, tenant_id, classroom_ids, week)
 
     db.commit()
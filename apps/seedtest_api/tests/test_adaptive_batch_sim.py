@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from apps.seedtest_api.services.adaptive import (
+    SEEDTEST_KEYMAP,
+    simulate_adaptive_batch,
+    simulate_adaptive_run,
+)
+from shared.adaptive import run_adaptive_session
+
+
+def _pool(n: int = 40, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "question_id": 1000 + i,
+            "discrimination": float(rng.uniform(0.5, 2.5)),
+            "difficulty": float(rng.uniform(-3.0, 3.0)),
+            "guessing": float(rng.uniform(0.0, 0.3)),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("estimator", ["mle", "eap"])
+@pytest.mark.parametrize("sem_threshold", [None, 0.5])
+def test_batch_matches_scalar_runs(estimator, sem_threshold):
+    pool = _pool()
+    thetas = np.linspace(-2.5, 2.5, 15)
+
+    result = simulate_adaptive_batch(
+        pool, thetas, max_items=10, sem_threshold=sem_threshold, estimator=estimator
+    )
+
+    for row, true_theta in enumerate(thetas):
+        theta, ids = run_adaptive_session(
+            pool,
+            float(true_theta),
+            max_items=10,
+            sem_threshold=sem_threshold,
+            estimator=estimator,
+            keymap=SEEDTEST_KEYMAP,
+        )
+        assert result.administered_ids(row) == ids
+        assert result.theta_hat[row] == pytest.approx(theta, abs=1e-6)
+        assert result.test_length[row] == len(ids)
+
+
+def test_simulate_adaptive_run_matches_batch_row():
+    pool = _pool()
+    theta, ids = simulate_adaptive_run(pool, 0.8, max_items=6)
+    result = simulate_adaptive_batch(pool, [0.8], max_items=6)
+
+    assert result.administered_ids(0) == ids
+    assert result.theta_hat[0] == pytest.approx(theta, abs=1e-6)
+
+
+def test_batch_report_and_sharding():
+    pool = _pool(n=60)
+    thetas = np.random.default_rng(5).normal(size=300)
+
+    single = simulate_adaptive_batch(pool, thetas, max_items=8)
+    sharded = simulate_adaptive_batch(
+        pool, thetas, max_items=8, n_workers=2, shard_size=100
+    )
+
+    np.testing.assert_allclose(single.theta_hat, sharded.theta_hat)
+    np.testing.assert_array_equal(single.administered, sharded.administered)
+
+    # Every examinee sees max_items items, so exposure sums to test length
+    assert single.exposure.sum() == pytest.approx(8.0)
+    summary = single.summary()
+    assert summary["n_examinees"] == 300
+    assert summary["mean_test_length"] == 8.0
+    assert sum(row["n"] for row in summary["conditional"]) == 300
+
+
+def test_stochastic_runs_are_seeded():
+    pool = _pool()
+    thetas = np.zeros(50)
+
+    r1 = simulate_adaptive_batch(pool, thetas, stochastic=True, seed=3)
+    r2 = simulate_adaptive_batch(pool, thetas, stochastic=True, seed=3)
+
+    np.testing.assert_array_equal(r1.theta_hat, r2.theta_hat)
+
+
+def test_missing_guessing_is_treated_as_zero():
+    pool = _pool()
+    for item in pool[::2]:
+        item["guessing"] = None
+    zeroed = [{**item, "guessing": item["guessing"] or 0.0} for item in pool]
+
+    result = simulate_adaptive_batch(pool, [0.3, -1.0], max_items=6)
+    expected = simulate_adaptive_batch(zeroed, [0.3, -1.0], max_items=6)
+
+    np.testing.assert_array_equal(result.administered, expected.administered)
+    np.testing.assert_allclose(result.theta_hat, expected.theta_hat)
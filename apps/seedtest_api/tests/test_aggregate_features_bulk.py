@@ -0,0 +1,126 @@
+"""Unit tests for the set-based features_topic_daily aggregation."""
+
+from __future__ import annotations
+
+from contextlib import nullcontext
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from apps.seedtest_api.jobs import aggregate_features_daily as agg
+
+
+def _bulk_session(pairs):
+    """Session mock: COUNT(*) returns 3 staged rows, DISTINCT returns pairs."""
+    session = MagicMock()
+    session.begin_nested.return_value = nullcontext()
+
+    def execute(stmt, params=None):
+        sql = str(stmt)
+        result = MagicMock()
+        if "SELECT COUNT(*)" in sql:
+            result.scalar.return_value = 3
+        elif "SELECT DISTINCT user_id, date" in sql:
+            result.fetchall.return_value = pairs
+        result.rowcount = 3
+        return result
+
+    session.execute.side_effect = execute
+    return session
+
+
+def test_bulk_aggregate_uses_a_handful_of_statements():
+    pairs = [("u1", date(2025, 11, 1)), ("u1", date(2025, 11, 2)), ("u2", date(2025, 11, 1))]
+    session = _bulk_session(pairs)
+
+    with patch.object(agg, "compute_improvement_index", return_value=0.25) as imp:
+        counts = agg._bulk_aggregate(session, date(2025, 10, 25), date(2025, 11, 2))
+
+    assert counts == {"staged": 3, "user_dates": 3, "upserted": 3}
+    assert imp.call_count == len(pairs)
+
+    statements = [str(c.args[0]) for c in session.execute.call_args_list]
+    assert sum("GROUP BY" in s for s in statements) == 1
+    assert sum("INSERT INTO features_topic_daily" in s for s in statements) == 1
+    assert len(statements) <= 8
+    # Improvement rows are staged with one executemany
+    staged = [c for c in session.execute.call_args_list if isinstance(c.args[-1], list)]
+    assert len(staged) == 1 and len(staged[0].args[-1]) == len(pairs)
+
+
+def test_bulk_aggregate_skips_empty_window():
+    session = MagicMock()
+    session.execute.return_value.scalar.return_value = 0
+
+    counts = agg._bulk_aggregate(session, date(2025, 10, 25), date(2025, 11, 2))
+
+    assert counts["upserted"] == 0
+    assert session.execute.call_count == 3  # drop, create, count
+
+
+def test_per_user_mode_memoizes_improvement_per_date():
+    session = MagicMock()
+    d = date(2025, 11, 1)
+
+    with patch.object(
+        agg, "_user_topic_dates", return_value=[("t1", d), ("t2", d), ("t3", d)]
+    ), patch.object(
+        agg, "_aggregate_one_day", return_value={"attempts": 1}
+    ), patch.object(
+        agg, "compute_improvement_index", return_value=0.1
+    ) as imp:
+        agg._aggregate_user(session, "u1", date(2025, 10, 25), d, dry_run=True)
+
+    assert imp.call_count == 1
+
+
+def test_failed_improvement_rolls_back_to_savepoint():
+    """A DB error inside the SAVEPOINT leaves the outer transaction usable."""
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+
+    engine = create_engine("sqlite://")
+
+    # pysqlite: let SQLAlchemy emit BEGIN/SAVEPOINT itself
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    d = date(2025, 11, 1)
+    with Session(engine) as session:
+        session.execute(
+            text(f"CREATE TABLE {agg._STAGE_TABLE} (user_id TEXT, date DATE)")
+        )
+        session.execute(text("CREATE TABLE scratch (user_id TEXT)"))
+        session.execute(
+            text(f"INSERT INTO {agg._STAGE_TABLE} VALUES ('bad', :d), ('ok', :d)"),
+            {"d": d},
+        )
+
+        def improvement(session, user_id, target_date, window_days):
+            session.execute(text("INSERT INTO scratch VALUES (:u)"), {"u": user_id})
+            if user_id == "bad":
+                session.execute(text("SELECT * FROM missing_table"))
+            return None
+
+        with patch.object(agg, "compute_improvement_index", side_effect=improvement):
+            assert agg._stage_improvement(session) == 2
+
+        # The failing lookup's writes are rolled back; the rest survives
+        scratch = session.execute(text("SELECT user_id FROM scratch")).scalars().all()
+        assert scratch == ["ok"]
+        assert session.execute(
+            text(f"SELECT COUNT(*) FROM {agg._STAGE_TABLE}")
+        ).scalar() == 2
+        session.commit()
+
+    with patch.object(agg, "compute_improvement_index", side_effect=OperationalError(
+        "SELECT 1", {}, Exception("boom")
+    )):
+        memo = {}
+        assert agg._improvement_memoized(MagicMock(), "u1", d, memo) is None
+        assert memo == {("u1", d): None}
@@ -0,0 +1,174 @@
+"""Unit tests for the single-pass teacher dashboard class summary batch."""
+
+from __future__ import annotations
+
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from apps.seedtest_api.services import risk_engine
+from apps.seedtest_api.services.thresholds import EffectiveThresholds
+
+WEEK = date(2025, 11, 3)
+
+
+class FakeSession:
+    """Sync session answering statements by the table they read."""
+
+    def __init__(self, members, kpis, attendance, risks):
+        self.members = members  # [(classroom_id, student_id)]
+        self.kpis = kpis  # {user_id: kpis}
+        self.attendance = attendance  # [(classroom_id, status, n)]
+        self.risks = risks  # [(classroom_id, n)]
+        self.statements: list = []
+        self.added: list = []
+        self.commit = MagicMock()
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        sql = _sql(stmt)
+        result = MagicMock()
+        if sql.startswith("INSERT INTO class_summary"):
+            return result
+        if "FROM weekly_kpi" in sql:
+            if "weekly_kpi.user_id IN" in sql:
+                bound = {
+                    v
+                    for values in stmt.compile().params.values()
+                    if isinstance(values, list)
+                    for v in values
+                }
+                result.all.return_value = [
+                    (u, k) for u, k in self.kpis.items() if u in bound
+                ]
+            else:
+                result.scalars.return_value.all.return_value = []
+        elif "FROM risk_flag" in sql:
+            result.all.return_value = self.risks
+        elif "SELECT DISTINCT attendance.classroom_id" in sql:
+            result.all.return_value = self.members
+        elif "GROUP BY attendance.classroom_id, attendance.status" in sql:
+            result.all.return_value = self.attendance
+        else:
+            result.all.return_value = []
+        return result
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _session():
+    return FakeSession(
+        members=[("c1", "u1"), ("c1", "u2"), ("c1", "u3"), ("c2", "u3"), ("c2", "u4")],
+        kpis={
+            "u1": {"theta": -1.0, "delta_theta": 0.2},
+            "u2": {"theta": 0.0},
+            "u3": {"theta": 1.0, "delta_theta": -0.1},
+            "u4": {"theta": 2.0},
+        },
+        attendance=[("c1", "present", 8), ("c1", "absent", 2), ("c2", "late", 1)],
+        risks=[("c2", 3)],
+    )
+
+
+def test_class_stats_match_dashboard_quantile_rule():
+    thetas = [0.5, -1.0, 2.0, 0.0, 1.0, -0.5, 1.5, 0.25, -2.0, 0.75]
+
+    stats = risk_engine.compute_class_stats(thetas, [0.1, -0.3])
+
+    ordered = sorted(thetas)
+    assert stats["mean_theta"] == pytest.approx(sum(thetas) / 10)
+    assert stats["median_theta"] == pytest.approx(0.375)
+    assert stats["top10_theta"] == ordered[8]
+    assert stats["bottom10_theta"] == ordered[0]
+    assert stats["stability_score"] == pytest.approx(1.0 / (ordered[6] - ordered[1]))
+    assert stats["delta_theta_7d"] == pytest.approx(-0.1)
+
+    assert risk_engine.compute_class_stats([], []) is None
+    assert risk_engine.compute_class_stats([0.3], [])["stability_score"] == 1e6
+
+
+def test_summaries_partition_by_membership_and_bulk_upsert():
+    db = _session()
+
+    written = risk_engine.build_class_summaries(db, "t1", ["c1", "c2", "c3"], WEEK)
+
+    assert written == 2
+    # membership, member KPIs, attendance, risks, upsert
+    assert len(db.statements) == 5
+    assert "weekly_kpi.user_id IN" in _sql(db.statements[1])
+
+    upsert = db.statements[-1].compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT (classroom_id, week_start) DO UPDATE" in str(upsert)
+    rows = {
+        upsert.params[f"classroom_id_m{i}"]: {
+            k[: -len(f"_m{i}")]: v
+            for k, v in upsert.params.items()
+            if k.endswith(f"_m{i}")
+        }
+        for i in range(2)
+    }
+    c1, c2 = rows["c1"], rows["c2"]
+    assert float(c1["mean_theta"]) == pytest.approx(0.0)
+    assert float(c1["delta_theta_7d"]) == pytest.approx(0.05)
+    assert float(c1["attendance_absent_rate"]) == pytest.approx(0.2)
+    assert c1["risks_count"] == 0
+    assert float(c2["mean_theta"]) == pytest.approx(1.5)
+    assert float(c2["attendance_late_rate"]) == pytest.approx(1.0)
+    assert c2["risks_count"] == 3
+
+
+def test_batch_statement_count_does_not_grow_with_kpi_loads(monkeypatch):
+    monkeypatch.setattr(
+        risk_engine, "resolve_thresholds", lambda *a, **k: EffectiveThresholds()
+    )
+
+    def kpi_loads(n_classes):
+        db = _session()
+        classes = [f"c{i}" for i in range(1, n_classes + 1)]
+        risk_engine.run_teacher_dashboard_batch(db, "t1", classes)
+        db.commit.assert_called_once()
+        return sum("FROM weekly_kpi" in _sql(s) for s in db.statements)
+
+    assert kpi_loads(2) == kpi_loads(40) == 2
+
+
+def test_large_batches_stay_under_the_bind_parameter_limit(monkeypatch):
+    monkeypatch.setattr(risk_engine, "BATCH_SIZE", 1000)
+    n_classes = 2500
+    db = FakeSession(
+        members=[
+            (f"c{i}", f"u{i}-{j}") for i in range(n_classes) for j in range(2)
+        ],
+        kpis={
+            f"u{i}-{j}": {"theta": float(j)}
+            for i in range(n_classes)
+            for j in range(2)
+        },
+        attendance=[],
+        risks=[],
+    )
+
+    written = risk_engine.build_class_summaries(
+        db, "t1", [f"c{i}" for i in range(n_classes)], WEEK
+    )
+
+    assert written == n_classes
+    kpi_loads = [s for s in db.statements if "FROM weekly_kpi" in _sql(s)]
+    upserts = [
+        s for s in db.statements if _sql(s).startswith("INSERT INTO class_summary")
+    ]
+    assert len(kpi_loads) == 5  # 5,000 members
+    assert len(upserts) == 3  # 2,500 rows
+    for stmt in kpi_loads + upserts:
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        n_binds = sum(len(v) if isinstance(v, list) else 1 for v in params.values())
+        assert n_binds < 65535
+    last = upserts[-1].compile(dialect=postgresql.dialect()).params
+    assert sum(k.startswith("classroom_id_m") for k in last) == 500
@@ -0,0 +1,133 @@
+"""Tests for the sharded, resumable nightly job runner."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.seedtest_api.jobs.sharded import partition, run_sharded, shard_of
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", future=True)
+    SessionLocal = sessionmaker(bind=engine, class_=Session)
+
+    @contextmanager
+    def get_session():
+        session = SessionLocal()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    return get_session
+
+
+def test_partition_is_stable_and_complete():
+    keys = [f"user-{i}" for i in range(500)]
+    shards = partition(keys, 4)
+
+    assert sorted(k for s in shards for k in s) == sorted(keys)
+    for idx, shard in enumerate(shards):
+        assert shard == sorted(shard)
+        assert all(shard_of(k, 4) == idx for k in shard)
+
+
+def test_run_sharded_counts_failures(tmp_path):
+    get_session = _session_factory(tmp_path)
+    seen: list[str] = []
+
+    def work(session, key):
+        seen.append(key)
+        if key.endswith("7"):
+            raise ValueError("boom")
+
+    keys = [f"u{i}" for i in range(30)]
+    summary = run_sharded("job", "2025-11-08", keys, work, get_session, n_shards=3)
+
+    assert sorted(seen) == sorted(keys)
+    assert summary.ok
+    assert summary.failed == 3
+    assert summary.processed == 27
+
+    with get_session() as session:
+        rows = session.execute(
+            text("SELECT status, processed + failed FROM job_checkpoint")
+        ).fetchall()
+    assert len(rows) == 3
+    assert all(r[0] == "done" for r in rows)
+    assert sum(r[1] for r in rows) == 30
+
+
+def test_run_sharded_resumes_from_checkpoint(tmp_path):
+    get_session = _session_factory(tmp_path)
+    keys = [f"u{i:02d}" for i in range(40)]
+    crash_on = partition(keys, 2)[1][10]
+    seen: list[str] = []
+
+    def flaky(session, key):
+        if key == crash_on:
+            raise ConnectionError("lost connection")
+        seen.append(key)
+
+    # Crash the shard itself (not a per-key error) at crash_on
+    def crashing(session, key):
+        if key == crash_on:
+            raise SystemExit("worker died")
+        seen.append(key)
+
+    try:
+        run_sharded(
+            "job", "run-1", keys, crashing, get_session, n_shards=2, checkpoint_every=5
+        )
+    except BaseException:
+        pass
+
+    first_pass = set(seen)
+    seen.clear()
+    summary = run_sharded(
+        "job", "run-1", keys, flaky, get_session, n_shards=2, checkpoint_every=5
+    )
+
+    assert summary.ok
+    # Finished shard 0 is skipped entirely; shard 1 resumes after its checkpoint
+    assert not set(seen) & set(partition(keys, 2)[0])
+    assert first_pass | set(seen) >= set(keys) - {crash_on}
+    assert summary.skipped >= len(partition(keys, 2)[0]) + 10
+
+
+def test_daily_kpi_job_recomputes_each_day_of_the_week(tmp_path, monkeypatch):
+    from datetime import date
+
+    from apps.seedtest_api.jobs import compute_daily_kpis
+
+    get_session = _session_factory(tmp_path)
+    users = [f"u{i}" for i in range(6)]
+    computed: list[tuple[str, date]] = []
+
+    monkeypatch.setattr(compute_daily_kpis, "get_session", get_session)
+    monkeypatch.setattr(compute_daily_kpis, "_distinct_recent_users", lambda s: users)
+    monkeypatch.setattr(
+        compute_daily_kpis,
+        "calculate_and_store_weekly_kpi",
+        lambda session, uid, wk: computed.append((uid, wk)) or {},
+    )
+
+    # Monday and Tuesday of the same ISO week
+    assert compute_daily_kpis.main(anchor_date=date(2025, 11, 3), workers=1) == 0
+    assert compute_daily_kpis.main(anchor_date=date(2025, 11, 4), workers=1) == 0
+
+    assert sorted(computed) == sorted(
+        [(u, date(2025, 11, 3)) for u in users] * 2
+    )
+
+    # A rerun on the same day still resumes (nothing left to do)
+    computed.clear()
+    assert compute_daily_kpis.main(anchor_date=date(2025, 11, 4), workers=1) == 0
+    assert computed == []
@@ -0,0 +1,141 @@
+"""Unit tests for the prefetch/render/upload weekly report batch pipeline."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from apps.seedtest_api.jobs import generate_weekly_report_batch as batch
+
+WEEK = date(2025, 11, 3)
+
+
+def _prefetch_session(user_ids):
+    """Session mock answering each bulk query with one row per user."""
+    session = MagicMock()
+
+    def execute(stmt, params=None):
+        sql = str(stmt)
+        result = MagicMock()
+        rows = []
+        if "week_start = :week_start" in sql:
+            # Only even users have KPIs for the week
+            rows = [(u, '{"A_t": 0.5}') for u in user_ids if int(u[1:]) % 2 == 0]
+        elif "DISTINCT ON (user_id)" in sql:
+            rows = [(u, {"P": 0.7, "sigma": 0.1}, "0.25") for u in user_ids]
+        elif "FROM mirt_ability" in sql:
+            rows = [(u, 0.1, 0.3, datetime(2025, 11, 1)) for u in user_ids]
+        elif "FROM user_segment" in sql:
+            rows = [(u, "steady", "{}", datetime(2025, 11, 1), "desc") for u in user_ids]
+        result.fetchall.return_value = rows
+        result.fetchone.return_value = None
+        return result
+
+    session.execute.side_effect = execute
+    return session
+
+
+def test_prefetch_issues_constant_queries_for_chunk():
+    small = [f"u{i}" for i in range(4)]
+    large = [f"u{i}" for i in range(40)]
+
+    s_small, s_large = _prefetch_session(small), _prefetch_session(large)
+    inputs = batch.prefetch_report_inputs(s_small, small, WEEK)
+    batch.prefetch_report_inputs(s_large, large, WEEK)
+
+    assert s_small.execute.call_count == s_large.execute.call_count
+    # Users without KPIs for the week are left out
+    assert sorted(inputs) == ["u0", "u2"]
+
+    data = inputs["u2"]
+    assert data["kpis"] == {"A_t": 0.5}
+    assert data["ability_trend"][0]["theta"] == 0.1
+    assert data["survival_risk"]["churn_risk"] == 0.25
+    assert data["user_segment"]["segment_label"] == "steady"
+
+
+def test_render_task_uses_private_template_copy(tmp_path):
+    template = tmp_path / "quarto"
+    template.mkdir()
+    (template / "index.qmd").write_text("# report")
+    out_root = tmp_path / "out"
+    out_root.mkdir()
+    seen = []
+
+    def fake_render(template_dir, data, output_dir, format="html"):
+        seen.append(Path(template_dir))
+        (Path(template_dir) / "_data.json").write_text("{}")
+        out = Path(output_dir) / f"index.{format}"
+        out.write_text(data["user_id"])
+        return out
+
+    with patch.object(batch, "render_quarto_report", side_effect=fake_render):
+        path = batch.render_report_task(
+            "u1", str(template), {"user_id": "u1"}, "html", str(out_root)
+        )
+
+    assert seen[0] != template
+    assert not (template / "_data.json").exists()
+    assert Path(path).read_text() == "u1"
+
+
+def test_batch_uploads_and_saves_artifacts_once_per_chunk(tmp_path, monkeypatch):
+    template = tmp_path / "quarto"
+    template.mkdir()
+    users = [f"u{i}" for i in range(6)]
+    sessions = []
+
+    @contextmanager
+    def get_session():
+        session = MagicMock()
+        sessions.append(session)
+        yield session
+
+    def fake_prefetch(session, chunk, week_start):
+        return {u: {"user_id": u} for u in chunk if u != "u5"}
+
+    def fake_render(user_id, template_dir, data, output_format, out_root):
+        if user_id == "u4":
+            raise RuntimeError("quarto crashed")
+        path = Path(out_root) / f"{user_id}.{output_format}"
+        path.write_text(user_id)
+        return str(path)
+
+    uploaded = []
+
+    def fake_upload(path, bucket, key, s3_client=None):
+        uploaded.append(key)
+        return f"https://{bucket}/{key}"
+
+    monkeypatch.setenv("S3_BUCKET", "reports")
+    monkeypatch.setenv("REPORT_FORMAT", "html")
+    with patch.object(batch, "get_session", get_session), patch.object(
+        batch, "load_active_users", return_value=users
+    ), patch.object(
+        batch, "prefetch_report_inputs", side_effect=fake_prefetch
+    ), patch.object(
+        batch, "render_report_task", side_effect=fake_render
+    ), patch.object(
+        batch, "upload_to_s3", side_effect=fake_upload
+    ), patch.object(
+        batch, "make_s3_client", return_value=object()
+    ):
+        stats = batch.generate_reports_batch(
+            WEEK, parallel=1, prefetch_chunk=3, template_dir=template
+        )
+
+    assert stats == {"processed": 4, "failed": 1, "skipped": 1, "total": 6}
+    assert sorted(uploaded) == sorted(
+        f"reports/{u}/{WEEK.isoformat()}/report.html" for u in ["u0", "u1", "u2", "u3"]
+    )
+
+    # One executemany per chunk with that chunk's artifacts
+    saved = [
+        c.args[1]
+        for s in sessions
+        for c in s.execute.call_args_list
+        if len(c.args) > 1 and isinstance(c.args[1], list)
+    ]
+    assert [len(rows) for rows in saved] == [3, 1]
@@ -0,0 +1,50 @@
+"""message_search_keyset_indexes
+
+Revision ID: 015_message_search_keyset
+Revises: 014_merge_multiple_heads
+Create Date: 2025-12-01 10:00:00.000000
+
+Indexes for message search with keyset pagination:
+- Ensure the stored messages.content_tsv column and its GIN index exist
+  (search now matches against the column instead of to_tsvector(content))
+- Partial (created_at, id) index on live messages for date-sorted search
+  pages seeking past a (created_at, id) cursor
+"""
+
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "015_message_search_keyset"
+down_revision: Union[str, None] = "014_merge_multiple_heads"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated column: maintained by PostgreSQL on every insert and edit
+    op.execute(
+        """
+        ALTER TABLE messages
+        ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED;
+    """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_content_tsv
+        ON messages USING gin (content_tsv);
+    """
+    )
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_live_created_id
+        ON messages (created_at DESC, id DESC)
+        WHERE deleted_at IS NULL;
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_messages_live_created_id;")
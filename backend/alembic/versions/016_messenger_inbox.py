@@ -0,0 +1,117 @@
+"""add_messenger_inbox
+
+Revision ID: 016_messenger_inbox
+Revises: 015_message_search_keyset
+Create Date: 2025-12-02 10:00:00.000000
+
+Materialized per-user inbox: one row per conversation participant with
+the last message preview, unread count and last activity. Rows cascade
+with the participant row. Existing conversations are backfilled from
+messages and conversation_participants.last_read_at.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "016_messenger_inbox"
+down_revision: Union[str, None] = "015_message_search_keyset"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "messenger_inbox",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("last_message_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("last_message_preview", sa.String(length=200), nullable=True),
+        sa.Column("last_sender_id", sa.Integer(), nullable=True),
+        sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("read_through_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.PrimaryKeyConstraint("user_id", "conversation_id"),
+        sa.ForeignKeyConstraint(
+            ["conversation_id", "user_id"],
+            [
+                "conversation_participants.conversation_id",
+                "conversation_participants.user_id",
+            ],
+            name="fk_inbox_participant",
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["last_message_id"], ["messages.id"], ondelete="SET NULL"
+        ),
+    )
+    op.create_index(
+        "idx_inbox_user_updated",
+        "messenger_inbox",
+        ["user_id", "updated_at", "conversation_id"],
+    )
+
+    # Backfill from existing messages. The preview mirrors
+    # app.messenger.inbox.preview_text: whitespace collapsed, cut to 120
+    # characters with an ellipsis, placeholders for image/file messages.
+    op.execute(
+        r"""
+        INSERT INTO messenger_inbox (
+            user_id, conversation_id, last_message_id, last_message_preview,
+            last_sender_id, last_message_at, unread_count, read_through_at,
+            updated_at
+        )
+        SELECT
+            p.user_id,
+            p.conversation_id,
+            lm.id,
+            CASE
+                WHEN pv.body <> '' AND char_length(pv.body) > 120
+                    THEN left(pv.body, 119) || '…'
+                WHEN pv.body <> '' THEN pv.body
+                WHEN lm.message_type = 'image' THEN '[Image]'
+                WHEN lm.message_type = 'file'
+                    THEN coalesce('[File] ' || nullif(lm.file_name, ''), '[File]')
+            END,
+            lm.sender_id,
+            lm.created_at,
+            (
+                SELECT count(*)
+                FROM messages m
+                WHERE m.conversation_id = p.conversation_id
+                  AND m.deleted_at IS NULL
+                  AND m.sender_id IS DISTINCT FROM p.user_id
+                  AND (p.last_read_at IS NULL OR m.created_at > p.last_read_at)
+            ),
+            p.last_read_at,
+            COALESCE(lm.created_at, c.updated_at)
+        FROM conversation_participants p
+        JOIN conversations c ON c.id = p.conversation_id
+        LEFT JOIN LATERAL (
+            SELECT id, content, message_type, file_name, sender_id, created_at
+            FROM messages
+            WHERE conversation_id = p.conversation_id
+              AND deleted_at IS NULL
+            ORDER BY created_at DESC
+            LIMIT 1
+        ) lm ON true
+        LEFT JOIN LATERAL (
+            SELECT btrim(regexp_replace(lm.content, '\s+', ' ', 'g')) AS body
+        ) pv ON true
+        ON CONFLICT (user_id, conversation_id) DO NOTHING;
+    """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_inbox_user_updated", table_name="messenger_inbox")
+    op.drop_table("messenger_inbox")
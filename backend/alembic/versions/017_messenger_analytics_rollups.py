@@ -0,0 +1,101 @@
+"""add_messenger_analytics_rollups
+
+Revision ID: 017_messenger_analytics_rollups
+Revises: 016_messenger_inbox
+Create Date: 2025-12-04 10:00:00.000000
+
+Pre-aggregated analytics counts (per minute/hour/day by event type,
+conversation, user and message type), maintained by the analytics stream
+consumer. message.sent rollups are backfilled from existing messages;
+minute rollups only for the retention window.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "017_messenger_analytics_rollups"
+down_revision: Union[str, None] = "016_messenger_inbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "messenger_analytics_rollups",
+        sa.Column("granularity", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("event_type", sa.String(length=50), nullable=False),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("message_type", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("content_chars", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint(
+            "granularity",
+            "bucket_start",
+            "event_type",
+            "conversation_id",
+            "user_id",
+            "message_type",
+        ),
+        sa.CheckConstraint(
+            "granularity IN ('minute', 'hour', 'day')",
+            name="ck_analytics_rollups_granularity",
+        ),
+    )
+    op.create_index(
+        "idx_analytics_rollups_event_bucket",
+        "messenger_analytics_rollups",
+        ["event_type", "granularity", "bucket_start"],
+    )
+    op.create_index(
+        "idx_analytics_rollups_conversation",
+        "messenger_analytics_rollups",
+        ["conversation_id", "event_type", "granularity", "bucket_start"],
+    )
+
+    # Backfill message.sent rollups from existing messages
+    for granularity, since in (
+        ("minute", "now() - interval '2 days'"),
+        ("hour", None),
+        ("day", None),
+    ):
+        window = f"AND created_at >= {since}" if since else ""
+        op.execute(
+            f"""
+            INSERT INTO messenger_analytics_rollups (
+                granularity, bucket_start, event_type, conversation_id,
+                user_id, message_type, count, content_chars
+            )
+            SELECT
+                '{granularity}',
+                date_trunc('{granularity}', created_at AT TIME ZONE 'UTC')
+                    AT TIME ZONE 'UTC',
+                'message.sent',
+                conversation_id,
+                coalesce(sender_id, 0),
+                left(coalesce(message_type, ''), 20),
+                count(*),
+                coalesce(sum(length(content)), 0)
+            FROM messages
+            WHERE deleted_at IS NULL {window}
+            GROUP BY 2, 4, 5, 6
+            ON CONFLICT DO NOTHING;
+        """
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_analytics_rollups_conversation",
+        table_name="messenger_analytics_rollups",
+    )
+    op.drop_index(
+        "idx_analytics_rollups_event_bucket",
+        table_name="messenger_analytics_rollups",
+    )
+    op.drop_table("messenger_analytics_rollups")
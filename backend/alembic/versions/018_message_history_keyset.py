@@ -0,0 +1,44 @@
+"""message_history_keyset_index
+
+Revision ID: 018_message_history_keyset
+Revises: 017_messenger_analytics_rollups
+Create Date: 2025-12-05 10:00:00.000000
+
+Partial (conversation_id, created_at DESC, id DESC) index on live messages
+so every message history page, in either direction, is one range scan
+seeking past a (created_at, id) cursor. Built CONCURRENTLY outside the
+migration transaction so writes to messages are not blocked meanwhile.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "018_message_history_keyset"
+down_revision: Union[str, None] = "017_messenger_analytics_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_messages_conversation_live",
+            "messages",
+            ["conversation_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_where=sa.text("deleted_at IS NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_messages_conversation_live",
+            table_name="messages",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
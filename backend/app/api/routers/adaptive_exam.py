@@ -35,6 +35,7 @@ from app.core.services.exam_engine import AdaptiveEngine
 from app.core.services.adaptive_state_store import AdaptiveEngineStateStore
 from app.core.services.item_bank import ItemBankService
 from app.core.services.score_utils import summarize_theta
+from app.services.item_bank_snapshot import get_item_bank_snapshot_sync
 
 # DB, Auth & Redis
 from app.core.database import get_db
@@ -503,12 +504,13 @@ def get_next_item(
     )
     attempted_ids = [att.item_id for att in attempts if att.item_id is not None]
 
-    # Use ItemBankService to select next item
-    item_bank = ItemBankService(db)
+    # Use ItemBankService to select next item (cached array-backed item bank)
+    item_bank = ItemBankService(db, snapshot=get_item_bank_snapshot_sync(db))
     candidates = item_bank.get_candidate_items(
         exam_session_id=exam_session.id,
         theta=engine.theta,
         window=2.0,  # ±2.0 difficulty range
+        max_candidates=10,  # theta-grid index lookup instead of a full scan
     )
 
     best_item = item_bank.pick_best_item(candidates) if candidates else None
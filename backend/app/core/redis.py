@@ -5,6 +5,7 @@ Redis client configuration and utilities for DreamSeedAI.
 
 Provides:
  - Async Redis client singleton
+ - Binary (non-decoding) async Redis client singleton
  - Connection management
  - Configuration from environment variables
 
@@ -72,6 +73,30 @@ def get_redis() -> redis.Redis:
     )
 
 
+@lru_cache
+def get_redis_binary() -> redis.Redis:
+    """
+    Get global async Redis client that returns raw bytes (singleton).
+    
+    Same configuration as get_redis(), but with decode_responses=False
+    for stores that keep packed binary values (e.g. AdaptiveEngineStateStore).
+    
+    Returns:
+        redis.Redis: Async Redis client with decode_responses=False
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return redis.from_url(redis_url, decode_responses=False)
+    
+    return redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        db=int(os.getenv("REDIS_DB", "0")),
+        password=os.getenv("REDIS_PASSWORD"),
+        decode_responses=False,
+    )
+
+
 async def ping_redis() -> bool:
     """
     Test Redis connection.
@@ -12,15 +12,18 @@ Integrated with:
  - app.models.item.Item
  - app.models.core_entities.Attempt
  - app.core.services.exam_engine (item_information)
+ - app.services.item_bank_snapshot.ItemBankSnapshot (optional array-backed fast path)
 """
 
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.models.item import Item
 from app.models.core_entities import Attempt
 from app.core.services.exam_engine import item_information
+from app.services.item_bank_snapshot import ItemBankSnapshot
 
 
 class ItemBankService:
@@ -44,16 +47,27 @@ class ItemBankService:
             topic="algebra"
         )
         next_item = bank.pick_best_item(candidates)
+
+        # Array-backed fast path
+        bank = ItemBankService(db, snapshot=get_item_bank_snapshot_sync(db))
     """
 
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        snapshot: Optional[ItemBankSnapshot] = None,
+    ):
         """
         Initialize ItemBank service.
 
         Args:
             session: SQLAlchemy database session
+            snapshot: Optional in-process item bank snapshot. When given,
+                get_candidate_items ranks items from its arrays instead of
+                loading Item rows on every call.
         """
         self.session = session
+        self.snapshot = snapshot
 
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # 1. Load Unattempted Items
@@ -190,6 +204,7 @@ class ItemBankService:
         subject: Optional[str] = None,
         topic: Optional[str] = None,
         window: float = 1.0,
+        max_candidates: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Full pipeline: Load unattempted items → difficulty filter → info rank.
@@ -209,6 +224,8 @@ class ItemBankService:
             subject: Optional subject filter ("math", "english", etc.)
             topic: Optional topic filter ("algebra", "geometry", etc.)
             window: Difficulty window size (default: 1.0)
+            max_candidates: Optional limit on number of candidates returned
+                (with a snapshot, taken from its theta-grid index)
 
         Returns:
             List of item dicts sorted by information
@@ -225,6 +242,16 @@ class ItemBankService:
             if candidates:
                 next_item = candidates[0]  # Highest information
         """
+        if self.snapshot is not None:
+            return self.snapshot.select_candidates(
+                theta=theta,
+                attempted=self._session_attempted_mask(exam_session_id),
+                subject=subject,
+                topic=topic,
+                difficulty_window=window,
+                max_candidates=max_candidates,
+            )
+
         # Step 1: Load unattempted items
         raw_items = self.load_unattempted_items(exam_session_id, subject, topic)
 
@@ -248,7 +275,22 @@ class ItemBankService:
 
         # Step 3: Rank by Fisher information
         ranked = self.rank_by_information(theta, candidates)
-        return ranked
+        return ranked[:max_candidates] if max_candidates else ranked
+
+    def _session_attempted_mask(self, exam_session_id: int) -> np.ndarray:
+        """
+        Return the snapshot's attempted bitmask for a session.
+
+        Built from the Attempt table (item IDs only) on every call, so
+        attempts written by other workers are always excluded.
+        """
+        rows = (
+            self.session.query(Attempt.item_id)
+            .filter(Attempt.exam_session_id == exam_session_id)
+            .filter(Attempt.item_id.isnot(None))
+            .all()
+        )
+        return self.snapshot.attempted_mask(row[0] for row in rows)
 
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # 5. Pick Best Item
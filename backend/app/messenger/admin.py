@@ -17,6 +17,7 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy import select, func, and_, desc, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.messenger.inbox import get_inbox_service
 from app.models.user import User
 from app.models.messenger_models import (
     Conversation,
@@ -251,6 +252,8 @@ class AdminService:
         # Soft delete message
         message.deleted_at = datetime.utcnow()
         message.content = "[Content removed by moderator]"
+        await db.flush()
+        await get_inbox_service().record_delete(db, message)
 
         # Log the action
         log_entry = await self.log_moderation_action(
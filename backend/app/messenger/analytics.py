@@ -12,7 +12,8 @@ Features:
 - Redis caching for fast retrieval
 - Time-based aggregations (hourly, daily, weekly, monthly)
 - Per-user, per-conversation, and global analytics
-- Event-driven tracking
+- Event-driven tracking (Redis Stream, see analytics_rollups)
+- Dashboard queries read pre-aggregated rollups, not the messages table
 - Background aggregation workers
 """
 
@@ -28,6 +29,14 @@ from typing import Optional
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.messenger.analytics_rollups import (
+    NIL_UUID,
+    STREAM_KEY,
+    STREAM_MAXLEN,
+    bucket_floor,
+    rollup_granularity,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,6 +86,38 @@ class AnalyticsService:
         self.redis = redis_client
         self.cache_ttl = 300  # 5 minutes default cache TTL
 
+    @staticmethod
+    def _rollup_filters(
+        granularity: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        conversation_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+    ) -> list:
+        """WHERE clauses selecting message.sent rollups for a range."""
+        from app.models.messenger_models import AnalyticsRollup
+        import uuid
+
+        filters = [
+            AnalyticsRollup.granularity == granularity,
+            AnalyticsRollup.event_type == AnalyticsEventType.MESSAGE_SENT.value,
+        ]
+        if start_date:
+            filters.append(
+                AnalyticsRollup.bucket_start >= bucket_floor(start_date, granularity)
+            )
+        if end_date:
+            filters.append(
+                AnalyticsRollup.bucket_start <= bucket_floor(end_date, "minute")
+            )
+        if conversation_id:
+            filters.append(
+                AnalyticsRollup.conversation_id == uuid.UUID(conversation_id)
+            )
+        if user_id:
+            filters.append(AnalyticsRollup.user_id == user_id)
+        return filters
+
     # ========================================================================
     # Message Statistics
     # ========================================================================
@@ -102,50 +143,31 @@ class AnalyticsService:
         Returns:
             dict with message statistics
         """
-        from app.models.messenger_models import Message
-        import uuid
+        from app.models.messenger_models import AnalyticsRollup
 
-        # Build query
-        query = select(
-            func.count(Message.id).label("total_messages"),
-            func.count(
-                func.distinct(
-                    func.case((Message.message_type == "text", Message.id), else_=None)
-                )
-            ).label("text_messages"),
-            func.count(
-                func.distinct(
-                    func.case((Message.message_type == "image", Message.id), else_=None)
-                )
-            ).label("image_messages"),
-            func.count(
-                func.distinct(
-                    func.case((Message.message_type == "file", Message.id), else_=None)
-                )
-            ).label("file_messages"),
-            func.count(
-                func.distinct(
-                    func.case(
-                        (Message.message_type == "system", Message.id), else_=None
-                    )
-                )
-            ).label("system_messages"),
-            func.count(func.distinct(Message.sender_id)).label("unique_senders"),
-            func.avg(func.length(Message.content)).label("avg_message_length"),
-        ).where(Message.deleted_at.is_(None))
+        granularity = rollup_granularity(start_date, end_date)
+        sent = func.sum(AnalyticsRollup.count)
 
-        # Apply filters
-        if conversation_id:
-            query = query.where(Message.conversation_id == uuid.UUID(conversation_id))
+        def sent_of_type(message_type: str):
+            return sent.filter(AnalyticsRollup.message_type == message_type)
 
-        if user_id:
-            query = query.where(Message.sender_id == user_id)
-
-        if start_date:
-            query = query.where(Message.created_at >= start_date)
-
-        if end_date:
-            query = query.where(Message.created_at <= end_date)
+        query = select(
+            sent.label("total_messages"),
+            sent_of_type("text").label("text_messages"),
+            sent_of_type("image").label("image_messages"),
+            sent_of_type("file").label("file_messages"),
+            sent_of_type("system").label("system_messages"),
+            func.count(func.distinct(AnalyticsRollup.user_id))
+            .filter(AnalyticsRollup.user_id != 0)
+            .label("unique_senders"),
+            (
+                func.sum(AnalyticsRollup.content_chars) / func.nullif(sent, 0)
+            ).label("avg_message_length"),
+        ).where(
+            *self._rollup_filters(
+                granularity, start_date, end_date, conversation_id, user_id
+            )
+        )
 
         result = await db.execute(query)
         row = result.first()
@@ -162,12 +184,12 @@ class AnalyticsService:
             }
 
         stats = {
-            "total_messages": row.total_messages or 0,
-            "text_messages": row.text_messages or 0,
-            "image_messages": row.image_messages or 0,
-            "file_messages": row.file_messages or 0,
-            "system_messages": row.system_messages or 0,
-            "unique_senders": row.unique_senders or 0,
+            "total_messages": int(row.total_messages or 0),
+            "text_messages": int(row.text_messages or 0),
+            "image_messages": int(row.image_messages or 0),
+            "file_messages": int(row.file_messages or 0),
+            "system_messages": int(row.system_messages or 0),
+            "unique_senders": int(row.unique_senders or 0),
             "avg_message_length": float(row.avg_message_length or 0),
         }
 
@@ -211,42 +233,41 @@ class AnalyticsService:
         Returns:
             List of {timestamp, count} dicts
         """
-        from app.models.messenger_models import Message
-        import uuid
+        from app.models.messenger_models import AnalyticsRollup
 
         # Calculate start date
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        # Determine date truncation based on interval
-        if interval == TimeInterval.HOURLY:
-            date_trunc = func.date_trunc("hour", Message.created_at)
-        elif interval == TimeInterval.DAILY:
-            date_trunc = func.date_trunc("day", Message.created_at)
-        elif interval == TimeInterval.WEEKLY:
-            date_trunc = func.date_trunc("week", Message.created_at)
-        else:  # MONTHLY
-            date_trunc = func.date_trunc("month", Message.created_at)
-
-        # Build query
+        # Hourly/daily points are rollup buckets; weeks and months are
+        # folded from day rollups
+        granularity = "hour" if interval == TimeInterval.HOURLY else "day"
+        if interval == TimeInterval.WEEKLY:
+            bucket = func.date_trunc("week", AnalyticsRollup.bucket_start)
+        elif interval == TimeInterval.MONTHLY:
+            bucket = func.date_trunc("month", AnalyticsRollup.bucket_start)
+        else:
+            bucket = AnalyticsRollup.bucket_start
+
         query = (
-            select(date_trunc.label("timestamp"), func.count(Message.id).label("count"))
-            .where(and_(Message.created_at >= start_date, Message.deleted_at.is_(None)))
+            select(
+                bucket.label("timestamp"),
+                func.sum(AnalyticsRollup.count).label("message_count"),
+            )
+            .where(
+                *self._rollup_filters(
+                    granularity, start_date, None, conversation_id, user_id
+                )
+            )
             .group_by("timestamp")
             .order_by("timestamp")
         )
 
-        # Apply filters
-        if conversation_id:
-            query = query.where(Message.conversation_id == uuid.UUID(conversation_id))
-
-        if user_id:
-            query = query.where(Message.sender_id == user_id)
-
         result = await db.execute(query)
         rows = result.all()
 
         return [
-            {"timestamp": row.timestamp.isoformat(), "count": row.count} for row in rows
+            {"timestamp": row.timestamp.isoformat(), "count": int(row.message_count)}
+            for row in rows
         ]
 
     async def get_top_senders(
@@ -268,36 +289,25 @@ class AnalyticsService:
         Returns:
             List of {user_id, username, message_count} dicts
         """
-        from app.models.messenger_models import Message
+        from app.models.messenger_models import AnalyticsRollup
         from app.models.user import User
-        import uuid
 
         start_date = datetime.utcnow() - timedelta(days=days)
+        message_count = func.sum(AnalyticsRollup.count)
 
-        # Build query
         query = (
             select(
-                Message.sender_id,
-                User.username,
-                func.count(Message.id).label("message_count"),
-            )
-            .join(User, Message.sender_id == User.id)
-            .where(
-                and_(
-                    Message.created_at >= start_date,
-                    Message.deleted_at.is_(None),
-                    Message.sender_id.isnot(None),
-                )
+                AnalyticsRollup.user_id.label("sender_id"),
+                User.full_name.label("username"),
+                message_count.label("message_count"),
             )
-            .group_by(Message.sender_id, User.username)
-            .order_by(func.count(Message.id).desc())
+            .join(User, AnalyticsRollup.user_id == User.id)
+            .where(*self._rollup_filters("day", start_date, None, conversation_id))
+            .group_by(AnalyticsRollup.user_id, User.full_name)
+            .order_by(message_count.desc())
             .limit(limit)
         )
 
-        # Apply conversation filter
-        if conversation_id:
-            query = query.where(Message.conversation_id == uuid.UUID(conversation_id))
-
         result = await db.execute(query)
         rows = result.all()
 
@@ -305,7 +315,7 @@ class AnalyticsService:
             {
                 "user_id": row.sender_id,
                 "username": row.username,
-                "message_count": row.message_count,
+                "message_count": int(row.message_count),
             }
             for row in rows
         ]
@@ -408,17 +418,14 @@ class AnalyticsService:
         Returns:
             dict with active user counts
         """
-        from app.models.messenger_models import Message
+        from app.models.messenger_models import AnalyticsRollup
 
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
 
         # Users who sent messages
-        query = select(func.count(func.distinct(Message.sender_id))).where(
-            and_(
-                Message.created_at >= cutoff_time,
-                Message.sender_id.isnot(None),
-                Message.deleted_at.is_(None),
-            )
+        query = select(func.count(func.distinct(AnalyticsRollup.user_id))).where(
+            *self._rollup_filters("hour", cutoff_time),
+            AnalyticsRollup.user_id != 0,
         )
         result = await db.execute(query)
         active_users = result.scalar() or 0
@@ -444,10 +451,14 @@ class AnalyticsService:
         Returns:
             dict with engagement metrics
         """
-        from app.models.messenger_models import Message
+        from app.models.messenger_models import AnalyticsRollup
         from app.models.user import User
 
         start_date = datetime.utcnow() - timedelta(days=days)
+        sender_filters = [
+            *self._rollup_filters("day", start_date),
+            AnalyticsRollup.user_id != 0,
+        ]
 
         # Total registered users
         total_users_query = select(func.count(User.id))
@@ -455,28 +466,18 @@ class AnalyticsService:
         total_users = total_users_result.scalar() or 0
 
         # Active users (sent at least 1 message)
-        active_users_query = select(func.count(func.distinct(Message.sender_id))).where(
-            and_(
-                Message.created_at >= start_date,
-                Message.sender_id.isnot(None),
-                Message.deleted_at.is_(None),
-            )
-        )
+        active_users_query = select(
+            func.count(func.distinct(AnalyticsRollup.user_id))
+        ).where(*sender_filters)
         active_users_result = await db.execute(active_users_query)
         active_users = active_users_result.scalar() or 0
 
         # Engaged users (sent 5+ messages)
         engaged_users_query = (
-            select(Message.sender_id)
-            .where(
-                and_(
-                    Message.created_at >= start_date,
-                    Message.sender_id.isnot(None),
-                    Message.deleted_at.is_(None),
-                )
-            )
-            .group_by(Message.sender_id)
-            .having(func.count(Message.id) >= 5)
+            select(AnalyticsRollup.user_id)
+            .where(*sender_filters)
+            .group_by(AnalyticsRollup.user_id)
+            .having(func.sum(AnalyticsRollup.count) >= 5)
         )
         engaged_users_result = await db.execute(engaged_users_query)
         engaged_users = len(engaged_users_result.all())
@@ -626,44 +627,25 @@ class AnalyticsService:
         Returns:
             List of conversation stats dicts
         """
-        from app.models.messenger_models import Message
+        from app.models.messenger_models import AnalyticsRollup
 
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        # Build query based on sort criteria
-        if sort_by == "messages":
-            query = (
-                select(
-                    Message.conversation_id,
-                    func.count(Message.id).label("message_count"),
-                )
-                .where(
-                    and_(
-                        Message.created_at >= start_date,
-                        Message.deleted_at.is_(None),
-                    )
-                )
-                .group_by(Message.conversation_id)
-                .order_by(func.count(Message.id).desc())
-                .limit(limit)
+        # Only message volume is rolled up; other sort criteria fall back to it
+        message_count = func.sum(AnalyticsRollup.count)
+        query = (
+            select(
+                AnalyticsRollup.conversation_id,
+                message_count.label("message_count"),
             )
-        else:
-            # Default to message count
-            query = (
-                select(
-                    Message.conversation_id,
-                    func.count(Message.id).label("message_count"),
-                )
-                .where(
-                    and_(
-                        Message.created_at >= start_date,
-                        Message.deleted_at.is_(None),
-                    )
-                )
-                .group_by(Message.conversation_id)
-                .order_by(func.count(Message.id).desc())
-                .limit(limit)
+            .where(
+                *self._rollup_filters("day", start_date),
+                AnalyticsRollup.conversation_id != NIL_UUID,
             )
+            .group_by(AnalyticsRollup.conversation_id)
+            .order_by(message_count.desc())
+            .limit(limit)
+        )
 
         result = await db.execute(query)
         rows = result.all()
@@ -696,25 +678,45 @@ class AnalyticsService:
             conversation_id: Optional conversation ID
             metadata: Optional event metadata
         """
-        event_data = {
+        if not self.redis:
+            return
+
+        # Flat string fields; the rollup consumer parses them back
+        fields = {
             "event_type": event_type.value,
             "timestamp": datetime.utcnow().isoformat(),
-            "user_id": user_id,
-            "conversation_id": conversation_id,
-            "metadata": metadata or {},
+            "user_id": "" if user_id is None else str(user_id),
+            "conversation_id": conversation_id or "",
+            "metadata": json.dumps(metadata or {}, default=str),
         }
 
-        # Store in Redis for real-time processing
-        if self.redis:
-            try:
-                # Add to events stream
-                await self.redis.lpush("analytics:events", json.dumps(event_data))
-                # Trim to last 10000 events
-                await self.redis.ltrim("analytics:events", 0, 9999)
-
-                logger.debug(f"Tracked event: {event_type.value}")
-            except Exception as e:
-                logger.error(f"Failed to track event: {e}")
+        try:
+            await self.redis.xadd(
+                STREAM_KEY, fields, maxlen=STREAM_MAXLEN, approximate=True
+            )
+            logger.debug(f"Tracked event: {event_type.value}")
+        except Exception as e:
+            logger.error(f"Failed to track event: {e}")
+
+    async def track_message_sent(self, message, **extra) -> None:
+        """
+        Track MESSAGE_SENT for a persisted message.
+
+        Args:
+            message: Message row (sender, conversation, type and content)
+            **extra: Additional metadata (e.g. thread/reply ids)
+        """
+        await self.track_event(
+            event_type=AnalyticsEventType.MESSAGE_SENT,
+            user_id=message.sender_id,
+            conversation_id=str(message.conversation_id),
+            metadata={
+                "message_id": str(message.id),
+                "message_type": message.message_type,
+                "content_length": len(message.content or ""),
+                **extra,
+            },
+        )
 
     # ========================================================================
     # Caching
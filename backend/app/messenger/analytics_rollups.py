@@ -0,0 +1,416 @@
+"""
+Analytics event stream consumer and rollup maintenance
+
+AnalyticsService.track_event appends events to a Redis Stream
+(analytics:stream, XADD with approximate MAXLEN). This module drains the
+stream through a consumer group and folds the events into
+messenger_analytics_rollups: per-minute, per-hour and per-day counts keyed
+by event type, conversation, user and message type. The dashboard queries
+in AnalyticsService read these rollups instead of scanning messages.
+
+Delivery:
+- Consumers in the group share the stream; each batch is XACKed only after
+  its rollup upsert commits (at-least-once)
+- Entries left pending by a dead consumer are reclaimed with XAUTOCLAIM
+- Rollup keys are upserted in sorted order so concurrent consumers do not
+  deadlock on the same rows
+- Minute rollups are pruned after ANALYTICS_MINUTE_RETENTION_DAYS
+
+Environment:
+    ANALYTICS_STREAM_MAXLEN: Approximate stream length cap (default: 1000000)
+    ANALYTICS_ROLLUP_BATCH: Max events per consumer batch (default: 1000)
+    ANALYTICS_MINUTE_RETENTION_DAYS: Minute rollup retention (default: 2)
+
+Usage:
+    from app.messenger.analytics_rollups import (
+        start_analytics_rollups,
+        stop_analytics_rollups,
+    )
+
+    # FastAPI startup / shutdown events
+    start_analytics_rollups()
+    await stop_analytics_rollups()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "analytics:stream"
+ROLLUP_GROUP = "analytics-rollups"
+STREAM_MAXLEN = int(os.getenv("ANALYTICS_STREAM_MAXLEN", "1000000"))
+ROLLUP_BATCH = int(os.getenv("ANALYTICS_ROLLUP_BATCH", "1000"))
+MINUTE_RETENTION_DAYS = int(os.getenv("ANALYTICS_MINUTE_RETENTION_DAYS", "2"))
+
+GRANULARITIES = ("minute", "hour", "day")
+
+# Neutral values for dimensions an event does not have
+NIL_UUID = uuid.UUID(int=0)
+
+# (granularity, bucket_start, event_type, conversation_id, user_id, message_type)
+RollupKey = tuple[str, datetime, str, uuid.UUID, int, str]
+
+
+def bucket_floor(ts: datetime, granularity: str) -> datetime:
+    """Start of the rollup bucket containing ts (UTC, timezone-aware)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    else:
+        ts = ts.astimezone(timezone.utc)
+
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_granularity(
+    start: Optional[datetime],
+    end: Optional[datetime] = None,
+    now: Optional[datetime] = None,
+) -> str:
+    """
+    Finest rollup granularity worth reading for a time range.
+
+    Minute rollups only for short ranges still inside their retention,
+    hour rollups up to a week, day rollups otherwise.
+    """
+    if start is None:
+        return "day"
+
+    now = bucket_floor(now or datetime.utcnow(), "minute")
+    start = bucket_floor(start, "minute")
+    end = bucket_floor(end, "minute") if end else now
+    span = end - start
+
+    if span <= timedelta(hours=6) and start >= now - timedelta(
+        days=MINUTE_RETENTION_DAYS
+    ):
+        return "minute"
+    if span <= timedelta(days=7):
+        return "hour"
+    return "day"
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def aggregate_events(entries: list[tuple[Any, dict]]) -> dict[RollupKey, list[int]]:
+    """
+    Fold stream entries into rollup increments.
+
+    Args:
+        entries: [(entry_id, fields), ...] as returned by XREADGROUP
+
+    Returns:
+        {rollup key: [count, content_chars]} for every granularity
+    """
+    rollups: dict[RollupKey, list[int]] = {}
+
+    for _entry_id, raw in entries:
+        fields = {_text(k): _text(v) for k, v in raw.items()}
+        event_type = fields.get("event_type")
+        if not event_type:
+            continue
+
+        try:
+            ts = datetime.fromisoformat(fields.get("timestamp", ""))
+        except ValueError:
+            continue
+
+        try:
+            conversation_id = uuid.UUID(fields["conversation_id"])
+        except (KeyError, ValueError):
+            conversation_id = NIL_UUID
+
+        try:
+            user_id = int(fields.get("user_id") or 0)
+        except ValueError:
+            user_id = 0
+
+        try:
+            metadata = json.loads(fields.get("metadata") or "{}")
+        except ValueError:
+            metadata = {}
+        if not isinstance(metadata, dict):
+            metadata = {}
+        message_type = str(metadata.get("message_type") or "")[:20]
+        try:
+            chars = int(metadata.get("content_length") or 0)
+        except (TypeError, ValueError):
+            chars = 0
+
+        for granularity in GRANULARITIES:
+            key = (
+                granularity,
+                bucket_floor(ts, granularity),
+                event_type[:50],
+                conversation_id,
+                user_id,
+                message_type,
+            )
+            acc = rollups.get(key)
+            if acc is None:
+                rollups[key] = [1, chars]
+            else:
+                acc[0] += 1
+                acc[1] += chars
+
+    return rollups
+
+
+async def write_rollups(db: AsyncSession, rollups: dict[RollupKey, list[int]]) -> None:
+    """Add rollup increments with a single upsert (keys in sorted order)."""
+    if not rollups:
+        return
+
+    keys = sorted(rollups, key=lambda k: (k[0], k[1], k[2], str(k[3]), k[4], k[5]))
+    await db.execute(
+        text(
+            """
+            INSERT INTO messenger_analytics_rollups (
+                granularity, bucket_start, event_type, conversation_id,
+                user_id, message_type, count, content_chars
+            )
+            SELECT * FROM unnest(
+                CAST(:granularity AS varchar[]),
+                CAST(:bucket_start AS timestamptz[]),
+                CAST(:event_type AS varchar[]),
+                CAST(:conversation_id AS uuid[]),
+                CAST(:user_id AS integer[]),
+                CAST(:message_type AS varchar[]),
+                CAST(:count AS bigint[]),
+                CAST(:content_chars AS bigint[])
+            )
+            ON CONFLICT (
+                granularity, bucket_start, event_type, conversation_id,
+                user_id, message_type
+            ) DO UPDATE SET
+                count = messenger_analytics_rollups.count + EXCLUDED.count,
+                content_chars = messenger_analytics_rollups.content_chars
+                    + EXCLUDED.content_chars
+            """
+        ),
+        {
+            "granularity": [k[0] for k in keys],
+            "bucket_start": [k[1] for k in keys],
+            "event_type": [k[2] for k in keys],
+            "conversation_id": [k[3] for k in keys],
+            "user_id": [k[4] for k in keys],
+            "message_type": [k[5] for k in keys],
+            "count": [rollups[k][0] for k in keys],
+            "content_chars": [rollups[k][1] for k in keys],
+        },
+    )
+
+
+class AnalyticsRollupConsumer:
+    """
+    Consumer-group reader folding analytics:stream into rollup tables.
+
+    Run one or more per deployment (each with a distinct consumer_name);
+    the group splits the stream between them.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        session_factory: Optional[Callable[[], Any]] = None,
+        consumer_name: Optional[str] = None,
+        batch_size: int = ROLLUP_BATCH,
+        block_ms: int = 5000,
+        claim_idle_ms: int = 60000,
+    ):
+        self.redis = redis_client
+        self._session_factory = session_factory
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+
+        self._group_ready = False
+        self._stopping = False
+        self._last_claim = 0.0
+        self._last_prune = 0.0
+
+        self.events_processed = 0
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and stream) if missing."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(
+                STREAM_KEY, ROLLUP_GROUP, id="0", mkstream=True
+            )
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def consume_once(self) -> int:
+        """
+        Read one batch, upsert its rollups, then acknowledge it.
+
+        Returns:
+            Number of stream entries processed
+        """
+        await self.ensure_group()
+
+        entries: list[tuple[Any, dict]] = []
+
+        # Periodically take over entries a dead consumer never acknowledged
+        now = time.monotonic()
+        if now - self._last_claim >= self.claim_idle_ms / 1000:
+            self._last_claim = now
+            claimed = await self.redis.xautoclaim(
+                STREAM_KEY,
+                ROLLUP_GROUP,
+                self.consumer_name,
+                min_idle_time=self.claim_idle_ms,
+                start_id="0-0",
+                count=self.batch_size,
+            )
+            entries.extend(claimed[1] if claimed else [])
+
+        if len(entries) < self.batch_size:
+            response = await self.redis.xreadgroup(
+                ROLLUP_GROUP,
+                self.consumer_name,
+                {STREAM_KEY: ">"},
+                count=self.batch_size - len(entries),
+                block=None if entries else self.block_ms,
+            )
+            for _stream, stream_entries in response or []:
+                entries.extend(stream_entries)
+
+        # Deleted entries come back from XAUTOCLAIM with no fields
+        entries = [(entry_id, fields) for entry_id, fields in entries if entry_id]
+        if not entries:
+            return 0
+
+        rollups = aggregate_events([e for e in entries if e[1]])
+        if rollups:
+            async with self._new_session() as db:
+                await write_rollups(db, rollups)
+                await db.commit()
+
+        await self.redis.xack(STREAM_KEY, ROLLUP_GROUP, *[e[0] for e in entries])
+        self.events_processed += len(entries)
+        return len(entries)
+
+    async def prune_minute_rollups(self) -> None:
+        """Delete minute rollups older than the retention window."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=MINUTE_RETENTION_DAYS)
+        async with self._new_session() as db:
+            await db.execute(
+                text(
+                    """
+                    DELETE FROM messenger_analytics_rollups
+                    WHERE granularity = 'minute' AND bucket_start < :cutoff
+                    """
+                ),
+                {"cutoff": cutoff},
+            )
+            await db.commit()
+
+    def stop(self) -> None:
+        """Ask run() to return after the current batch."""
+        self._stopping = True
+
+    async def run(self) -> None:
+        """Consume until stop() is called (or the task is cancelled)."""
+        logger.info(f"Analytics rollup consumer started: {self.consumer_name}")
+        while not self._stopping:
+            try:
+                await self.consume_once()
+
+                now = time.monotonic()
+                if now - self._last_prune >= 3600:
+                    self._last_prune = now
+                    await self.prune_minute_rollups()
+
+            except asyncio.CancelledError:
+                logger.info("Analytics rollup consumer cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Analytics rollup consumer error: {e}")
+                await asyncio.sleep(1)
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+
+_rollup_task: Optional[asyncio.Task] = None
+_rollup_consumer: Optional[AnalyticsRollupConsumer] = None
+
+
+def start_analytics_rollups(
+    session_factory: Optional[Callable[[], Any]] = None, **consumer_kwargs: Any
+) -> Optional[asyncio.Task]:
+    """
+    Start the process-wide rollup consumer task (idempotent).
+
+    Call this in FastAPI startup event.
+
+    Returns:
+        The consumer task, or None when analytics has no Redis client
+    """
+    global _rollup_task, _rollup_consumer
+    if _rollup_task is not None and not _rollup_task.done():
+        return _rollup_task
+
+    from app.messenger.analytics import get_analytics_service
+
+    redis_client = get_analytics_service().redis
+    if redis_client is None:
+        logger.warning("Analytics rollup consumer disabled: no Redis client")
+        return None
+
+    _rollup_consumer = AnalyticsRollupConsumer(
+        redis_client, session_factory=session_factory, **consumer_kwargs
+    )
+    _rollup_task = asyncio.create_task(_rollup_consumer.run())
+    return _rollup_task
+
+
+async def stop_analytics_rollups() -> None:
+    """
+    Stop the rollup consumer after its current batch.
+
+    Waits for the blocking read to return, then cancels if it does not.
+    Unacknowledged entries stay pending and are reclaimed on restart.
+    Call this in FastAPI shutdown event.
+    """
+    global _rollup_task, _rollup_consumer
+    task, consumer = _rollup_task, _rollup_consumer
+    _rollup_task = _rollup_consumer = None
+    if task is None or consumer is None:
+        return
+
+    consumer.stop()
+    try:
+        await asyncio.wait_for(task, timeout=consumer.block_ms / 1000 + 5)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
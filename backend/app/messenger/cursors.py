@@ -0,0 +1,37 @@
+"""
+Opaque pagination cursors for messenger listings
+
+Cursors are URL-safe base64 of a small JSON object holding the sort key of
+the last row on a page. Clients treat them as opaque strings and send them
+back unchanged; the issuing endpoint decodes and validates the fields.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(payload: dict[str, Any]) -> str:
+    """Encode a keyset position as an opaque cursor string."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
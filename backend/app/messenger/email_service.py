@@ -9,12 +9,37 @@ Multi-channel email notification system with:
 - Email preferences
 - Bulk sending with rate limiting
 
+Delivery:
+- SMTP sessions are pooled: each connection is opened, TLS-negotiated and
+  authenticated once, then reused for many messages
+- Digests are dispatched with bounded concurrency; notifications for a
+  whole chunk of users are prefetched in one query
+- Per-recipient limits use a token bucket, shared through Redis when a
+  client is available (in-process otherwise)
+- Templates are compiled once and cached (missing .txt variants too);
+  blasts render many contexts against one compiled template, optionally
+  across a process pool
+
+Environment:
+    SMTP_POOL_SIZE: Max concurrent SMTP connections (default: 4)
+    SMTP_MAX_MESSAGES_PER_CONNECTION: Reconnect after N messages (default: 100)
+    SMTP_POOL_IDLE_SECONDS: Drop idle pooled connections after (default: 60)
+    EMAIL_SEND_CONCURRENCY: Concurrent sends for digests/bulk (default: 16)
+    EMAIL_DIGEST_CHUNK_SIZE: Users per notification prefetch (default: 500)
+    EMAIL_TEMPLATE_AUTO_RELOAD: Re-check template files on use (default: false)
+    EMAIL_RENDER_PROCESSES: Worker processes for batch rendering (default: 0)
+    EMAIL_RENDER_PARALLEL_MIN: Min batch size to use the pool (default: 200)
+
 Dependencies:
     pip install jinja2 aiosmtplib email-validator
 """
 
 import os
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from enum import Enum
@@ -24,9 +49,16 @@ from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from sqlalchemy import select, and_
+from jinja2 import (
+    Environment,
+    FileSystemLoader,
+    Template,
+    TemplateNotFound,
+    select_autoescape,
+)
+from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.models import User
 from app.messenger.notifications import NotificationType
@@ -41,6 +73,24 @@ except ImportError:
     AIOSMTPLIB_AVAILABLE = False
     logger.warning("aiosmtplib not installed. Email sending will be disabled.")
 
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(
+    os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+)
+SMTP_POOL_IDLE_SECONDS = float(os.getenv("SMTP_POOL_IDLE_SECONDS", "60"))
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "16"))
+EMAIL_DIGEST_CHUNK_SIZE = int(os.getenv("EMAIL_DIGEST_CHUNK_SIZE", "500"))
+EMAIL_TEMPLATE_AUTO_RELOAD = (
+    os.getenv("EMAIL_TEMPLATE_AUTO_RELOAD", "false").lower() == "true"
+)
+EMAIL_RENDER_PROCESSES = int(os.getenv("EMAIL_RENDER_PROCESSES", "0"))
+EMAIL_RENDER_PARALLEL_MIN = int(os.getenv("EMAIL_RENDER_PARALLEL_MIN", "200"))
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates" / "emails"
+
+# Notifications included per digest email
+DIGEST_MAX_NOTIFICATIONS = 50
+
 
 # ============================================================================
 # ENUMS
@@ -79,6 +129,310 @@ class EmailTemplate(Enum):
     PASSWORD_RESET = "password_reset"
 
 
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+# Refill then take one token; state expires once the bucket would be full
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return allowed
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key (e.g. recipient address).
+
+    Buckets hold up to `capacity` tokens and refill continuously at
+    capacity / period. With a Redis client the buckets are shared by all
+    workers (one Lua call per check); otherwise they live in process, and
+    buckets that have refilled completely are dropped since they are
+    indistinguishable from new ones.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        period_seconds: float,
+        redis_client=None,
+        key_prefix: str = "email:ratelimit",
+        max_local_keys: int = 10000,
+    ):
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.max_local_keys = max_local_keys
+
+        self._buckets: Dict[str, tuple[float, float]] = {}
+        self._script = None
+
+    async def try_acquire(self, key: str) -> bool:
+        """Take one token for key; False if the bucket is empty."""
+        if self.redis is not None:
+            try:
+                if self._script is None:
+                    self._script = self.redis.register_script(_TOKEN_BUCKET_SCRIPT)
+                allowed = await self._script(
+                    keys=[f"{self.key_prefix}:{key}"],
+                    args=[self.capacity, self.rate, time.time()],
+                )
+                return bool(int(allowed))
+            except Exception as e:
+                logger.warning(f"Shared rate limiter unavailable, using local: {e}")
+
+        return self._try_acquire_local(key)
+
+    def _try_acquire_local(self, key: str) -> bool:
+        now = time.monotonic()
+        tokens, ts = self._buckets.get(key, (float(self.capacity), now))
+        tokens = min(self.capacity, tokens + (now - ts) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_local_keys:
+            self._prune(now)
+        return allowed
+
+    def _prune(self, now: float) -> None:
+        self._buckets = {
+            key: (tokens, ts)
+            for key, (tokens, ts) in self._buckets.items()
+            if tokens + (now - ts) * self.rate < self.capacity
+        }
+
+
+# ============================================================================
+# SMTP CONNECTION POOL
+# ============================================================================
+
+
+@dataclass
+class _PooledSMTP:
+    """An open, authenticated SMTP session."""
+
+    stack: AsyncExitStack
+    smtp: Any
+    messages_sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    async def close(self) -> None:
+        try:
+            await self.stack.aclose()
+        except Exception as e:
+            logger.debug(f"SMTP close error (ignored): {e}")
+
+
+class SMTPConnectionPool:
+    """
+    Reuses authenticated SMTP sessions across messages.
+
+    At most `size` sessions are in use at once. A session is retired after
+    `max_messages` messages or `idle_timeout` seconds unused. A pooled
+    session the server already dropped is replaced and the message retried
+    once.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        use_tls: bool,
+        username: str = "",
+        password: str = "",
+        size: int = SMTP_POOL_SIZE,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_timeout: float = SMTP_POOL_IDLE_SECONDS,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+
+        self._idle: List[_PooledSMTP] = []
+        self._slots = asyncio.Semaphore(size)
+
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    async def send_message(self, message: MIMEMultipart) -> None:
+        """Send one message on a pooled session (raises on failure)."""
+        async with self._slots:
+            conn = await self._take_idle()
+            reused = conn is not None
+            if conn is None:
+                conn = await self._open()
+
+            try:
+                try:
+                    await conn.smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # Server timed out the idle session; retry on a new one
+                    await conn.close()
+                    conn = await self._open()
+                    await conn.smtp.send_message(message)
+            except Exception:
+                await conn.close()
+                raise
+
+            conn.messages_sent += 1
+            conn.last_used = time.monotonic()
+            self.messages_sent += 1
+            await self._release(conn)
+
+    async def close(self) -> None:
+        """Close all idle sessions."""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
+
+    async def _take_idle(self) -> Optional[_PooledSMTP]:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.last_used <= self.idle_timeout:
+                return conn
+            await conn.close()
+        return None
+
+    async def _open(self) -> _PooledSMTP:
+        stack = AsyncExitStack()
+        try:
+            smtp = await stack.enter_async_context(
+                aiosmtplib.SMTP(
+                    hostname=self.hostname,
+                    port=self.port,
+                    use_tls=self.use_tls,
+                )
+            )
+            if self.username and self.password:
+                await smtp.login(self.username, self.password)
+        except Exception:
+            await stack.aclose()
+            raise
+
+        self.connections_opened += 1
+        return _PooledSMTP(stack=stack, smtp=smtp)
+
+    async def _release(self, conn: _PooledSMTP) -> None:
+        if conn.messages_sent >= self.max_messages:
+            await conn.close()
+        else:
+            self._idle.append(conn)
+
+
+# ============================================================================
+# TEMPLATE RENDERING HELPERS
+# ============================================================================
+
+
+def _template_environment(
+    template_dir: str, auto_reload: bool = EMAIL_TEMPLATE_AUTO_RELOAD
+) -> Environment:
+    """Jinja environment for email templates (no file stat per lookup)."""
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        autoescape=select_autoescape(["html", "xml"]),
+        auto_reload=auto_reload,
+        cache_size=-1,
+    )
+
+
+def _text_template_name(template_name: str) -> str:
+    return template_name.replace(".html", ".txt")
+
+
+def _text_fallback(context: Dict[str, Any]) -> str:
+    """Generate simple text version from context."""
+    lines = [
+        f"{context.get('title', 'Notification')}",
+        "",
+        f"{context.get('message', '')}",
+        "",
+        f"View in DreamSeed: {context.get('action_url', context.get('site_url', ''))}",
+        "",
+        f"---",
+        f"DreamSeed Messenger",
+        f"{context.get('support_email', '')}",
+    ]
+    return "\n".join(lines)
+
+
+def _render_pair(
+    html_template: Template,
+    text_template: Optional[Template],
+    context: Dict[str, Any],
+) -> tuple[str, str]:
+    """Render (html_body, text_body); text falls back to a generated body."""
+    html_body = html_template.render(context)
+    if text_template is not None:
+        try:
+            return html_body, text_template.render(context)
+        except Exception:
+            pass
+    return html_body, _text_fallback(context)
+
+
+def _render_many(
+    html_template: Template,
+    text_template: Optional[Template],
+    contexts: List[Dict[str, Any]],
+) -> List[Optional[tuple[str, str]]]:
+    """Render each context; None for contexts that fail to render."""
+    rendered: List[Optional[tuple[str, str]]] = []
+    for context in contexts:
+        try:
+            rendered.append(_render_pair(html_template, text_template, context))
+        except Exception as e:
+            logger.error(f"Failed to render template {html_template.name}: {e}")
+            rendered.append(None)
+    return rendered
+
+
+# Per-process state for batch rendering in a ProcessPoolExecutor
+_worker_env: Optional[Environment] = None
+
+
+def _init_render_worker(template_dir: str) -> None:
+    global _worker_env
+    _worker_env = _template_environment(template_dir, auto_reload=False)
+
+
+def _render_chunk(
+    template_name: str, contexts: List[Dict[str, Any]]
+) -> List[Optional[tuple[str, str]]]:
+    assert _worker_env is not None
+    html_template = _worker_env.get_template(template_name)
+    try:
+        text_template = _worker_env.get_template(_text_template_name(template_name))
+    except TemplateNotFound:
+        text_template = None
+    return _render_many(html_template, text_template, contexts)
+
+
 # ============================================================================
 # EMAIL SERVICE
 # ============================================================================
@@ -97,8 +451,13 @@ class EmailService:
     - Bulk sending
     """
 
-    def __init__(self):
-        """Initialize email service."""
+    def __init__(self, redis_client=None):
+        """
+        Initialize email service.
+
+        Args:
+            redis_client: Optional Redis client for the shared rate limiter
+        """
         # SMTP Configuration
         self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
@@ -123,19 +482,35 @@ class EmailService:
         provider = os.getenv("EMAIL_PROVIDER", "smtp").lower()
         self.provider = EmailProvider(provider)
 
-        # Rate Limiting
+        # Rate Limiting (per recipient, token bucket)
         self.rate_limit_per_hour = int(os.getenv("EMAIL_RATE_LIMIT", "100"))
         self.rate_limit_window = 3600  # 1 hour in seconds
-        self._rate_limit_counter: Dict[str, List[float]] = {}
+        self.redis = redis_client
+        self._rate_limiter: Optional[TokenBucketLimiter] = None
+
+        # Pooled SMTP sessions and send concurrency
+        self.smtp_pool = SMTPConnectionPool(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            use_tls=self.smtp_use_tls,
+            username=self.smtp_username,
+            password=self.smtp_password,
+        )
+        self.send_concurrency = EMAIL_SEND_CONCURRENCY
 
-        # Template Engine
-        template_dir = Path(__file__).parent.parent / "templates" / "emails"
-        template_dir.mkdir(parents=True, exist_ok=True)
+        # Template Engine (compiled templates cached; None = known missing)
+        self.template_dir = TEMPLATE_DIR
+        self.template_dir.mkdir(parents=True, exist_ok=True)
 
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(str(template_dir)),
-            autoescape=select_autoescape(["html", "xml"]),
+        self.template_auto_reload = EMAIL_TEMPLATE_AUTO_RELOAD
+        self.jinja_env = _template_environment(
+            str(self.template_dir), self.template_auto_reload
         )
+        self._templates: Dict[str, Optional[Template]] = {}
+
+        # Batch rendering across processes (0 = render in this process)
+        self.render_processes = EMAIL_RENDER_PROCESSES
+        self._render_pool: Optional[ProcessPoolExecutor] = None
 
         # Digest Configuration
         self.digest_daily_hour = int(os.getenv("DIGEST_DAILY_HOUR", "9"))  # 9 AM
@@ -170,7 +545,7 @@ class EmailService:
         """
         try:
             # Check rate limit
-            if not self._check_rate_limit(to_email):
+            if not await self._check_rate_limit(to_email):
                 logger.warning(f"Rate limit exceeded for {to_email}")
                 return False
 
@@ -203,16 +578,8 @@ class EmailService:
                 logger.error("aiosmtplib not installed. Cannot send email.")
                 return False
 
-            # Send via SMTP
-            async with aiosmtplib.SMTP(
-                hostname=self.smtp_host,
-                port=self.smtp_port,
-                use_tls=self.smtp_use_tls,
-            ) as smtp:
-                if self.smtp_username and self.smtp_password:
-                    await smtp.login(self.smtp_username, self.smtp_password)
-
-                await smtp.send_message(message)
+            # Send on a pooled, already authenticated session
+            await self.smtp_pool.send_message(message)
 
             logger.info(f"Email sent to {to_email}: {subject}")
             return True
@@ -231,7 +598,7 @@ class EmailService:
         """Send email via SendGrid API."""
         try:
             # Check rate limit
-            if not self._check_rate_limit(to_email):
+            if not await self._check_rate_limit(to_email):
                 logger.warning(f"Rate limit exceeded for {to_email}")
                 return False
 
@@ -256,7 +623,7 @@ class EmailService:
         """Send email via Amazon SES."""
         try:
             # Check rate limit
-            if not self._check_rate_limit(to_email):
+            if not await self._check_rate_limit(to_email):
                 logger.warning(f"Rate limit exceeded for {to_email}")
                 return False
 
@@ -327,48 +694,121 @@ class EmailService:
         """
         try:
             # Add common context
-            context.update(
-                {
-                    "site_name": "DreamSeed",
-                    "site_url": os.getenv("SITE_URL", "https://dreamseed.ai"),
-                    "support_email": self.reply_to,
-                    "current_year": datetime.now().year,
-                }
-            )
+            context.update(self._common_context())
 
-            # Render HTML template
-            html_template = self.jinja_env.get_template(template_name)
-            html_body = html_template.render(context)
-
-            # Render text template (fallback)
-            text_template_name = template_name.replace(".html", ".txt")
-            try:
-                text_template = self.jinja_env.get_template(text_template_name)
-                text_body = text_template.render(context)
-            except Exception:
-                # Generate simple text version from context
-                text_body = self._generate_text_fallback(context)
-
-            return html_body, text_body
+            return _render_pair(
+                self._get_template(template_name),
+                self._get_template(_text_template_name(template_name), required=False),
+                context,
+            )
 
         except Exception as e:
             logger.error(f"Failed to render template {template_name}: {e}")
             raise
 
+    def render_batch(
+        self,
+        template_name: str,
+        contexts: List[Dict[str, Any]],
+        processes: Optional[int] = None,
+    ) -> List[Optional[tuple[str, str]]]:
+        """
+        Render many contexts against one compiled template.
+
+        Args:
+            template_name: Template filename (e.g., "digest_daily.html")
+            contexts: One context per email (common context is added)
+            processes: Worker processes; used when > 1 and the batch has at
+                least EMAIL_RENDER_PARALLEL_MIN contexts (default:
+                self.render_processes)
+
+        Returns:
+            (html_body, text_body) per context, in order; None where a
+            context failed to render
+
+        Raises:
+            TemplateNotFound: If the HTML template does not exist
+        """
+        common = self._common_context()
+        merged = [{**context, **common} for context in contexts]
+
+        processes = self.render_processes if processes is None else processes
+        if processes > 1 and len(merged) >= EMAIL_RENDER_PARALLEL_MIN:
+            # Fail fast on a missing template before fanning out
+            self._get_template(template_name)
+
+            pool = self._get_render_pool(processes)
+            size = -(-len(merged) // (processes * 4))
+            chunks = [merged[i : i + size] for i in range(0, len(merged), size)]
+
+            rendered: List[Optional[tuple[str, str]]] = []
+            for part in pool.map(_render_chunk, [template_name] * len(chunks), chunks):
+                rendered.extend(part)
+            return rendered
+
+        return _render_many(
+            self._get_template(template_name),
+            self._get_template(_text_template_name(template_name), required=False),
+            merged,
+        )
+
+    async def _render_batch_async(
+        self, template_name: str, contexts: List[Dict[str, Any]]
+    ) -> List[Optional[tuple[str, str]]]:
+        """render_batch without blocking the event loop on the process pool."""
+        if self.render_processes > 1 and len(contexts) >= EMAIL_RENDER_PARALLEL_MIN:
+            return await asyncio.to_thread(self.render_batch, template_name, contexts)
+        return self.render_batch(template_name, contexts)
+
+    def _get_template(
+        self, template_name: str, required: bool = True
+    ) -> Optional[Template]:
+        """
+        Compiled template from the cache.
+
+        Missing optional templates are cached as None so later lookups do
+        not hit the loader (or raise) again.
+        """
+        if template_name in self._templates and not self.template_auto_reload:
+            template = self._templates[template_name]
+        else:
+            try:
+                template = self.jinja_env.get_template(template_name)
+            except TemplateNotFound:
+                template = None
+            self._templates[template_name] = template
+
+        if template is None and required:
+            raise TemplateNotFound(template_name)
+        return template
+
+    def _common_context(self) -> Dict[str, Any]:
+        return {
+            "site_name": "DreamSeed",
+            "site_url": os.getenv("SITE_URL", "https://dreamseed.ai"),
+            "support_email": self.reply_to,
+            "current_year": datetime.now().year,
+        }
+
+    def _get_render_pool(self, processes: int) -> ProcessPoolExecutor:
+        if self._render_pool is None:
+            self._render_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_render_worker,
+                initargs=(str(self.template_dir),),
+            )
+        return self._render_pool
+
     def _generate_text_fallback(self, context: Dict[str, Any]) -> str:
         """Generate simple text version from context."""
-        lines = [
-            f"{context.get('title', 'Notification')}",
-            "",
-            f"{context.get('message', '')}",
-            "",
-            f"View in DreamSeed: {context.get('action_url', context.get('site_url', ''))}",
-            "",
-            f"---",
-            f"DreamSeed Messenger",
-            f"{context.get('support_email', '')}",
-        ]
-        return "\n".join(lines)
+        return _text_fallback(context)
+
+    async def close(self) -> None:
+        """Close pooled SMTP sessions and the render process pool."""
+        await self.smtp_pool.close()
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=False, cancel_futures=True)
+            self._render_pool = None
 
     # ========================================================================
     # NOTIFICATION EMAILS
@@ -501,52 +941,95 @@ class EmailService:
                 return False
 
             # Get notifications for period
-            if frequency == DigestFrequency.DAILY:
-                since = datetime.utcnow() - timedelta(days=1)
-                template_name = "digest_daily.html"
-                subject = "Daily Digest - DreamSeed Messenger"
-            elif frequency == DigestFrequency.WEEKLY:
-                since = datetime.utcnow() - timedelta(days=7)
-                template_name = "digest_weekly.html"
-                subject = "Weekly Digest - DreamSeed Messenger"
-            else:
+            since = self._digest_since(frequency)
+            if since is None:
                 logger.warning(f"Invalid digest frequency: {frequency}")
                 return False
 
-            # Get unread notifications from in_app_notifications table
-            from app.models import InAppNotification
-
-            result = await db.execute(
-                select(InAppNotification)
-                .where(
-                    and_(
-                        InAppNotification.user_id == user_id,
-                        InAppNotification.created_at >= since,
-                        InAppNotification.is_read == False,
-                    )
-                )
-                .order_by(InAppNotification.created_at.desc())
-                .limit(50)
-            )
-            notifications = result.scalars().all()
+            notifications = (
+                await self._fetch_digest_notifications(db, [user_id], since)
+            ).get(user_id)
 
             if not notifications:
                 logger.info(f"No notifications for digest: user_id={user_id}")
                 return False
 
-            # Group notifications by type
-            grouped_notifications = self._group_notifications(list(notifications))
+            return await self._send_digest(
+                user_email, user.full_name, notifications, frequency
+            )
 
-            # Prepare context
-            context = {
-                "user_name": user.full_name or str(user.email),
-                "period": (
-                    "yesterday" if frequency == DigestFrequency.DAILY else "this week"
-                ),
-                "total_notifications": len(notifications),
-                "grouped_notifications": grouped_notifications,
-                "unsubscribe_url": f"{os.getenv('SITE_URL', '')}/settings/notifications?unsubscribe=digest",
-            }
+        except Exception as e:
+            logger.error(f"Failed to send digest email: {e}")
+            return False
+
+    def _digest_since(self, frequency: DigestFrequency) -> Optional[datetime]:
+        """Start of the period a digest covers (None if not a digest)."""
+        if frequency == DigestFrequency.DAILY:
+            return datetime.utcnow() - timedelta(days=1)
+        if frequency == DigestFrequency.WEEKLY:
+            return datetime.utcnow() - timedelta(days=7)
+        return None
+
+    async def _fetch_digest_notifications(
+        self,
+        db: AsyncSession,
+        user_ids: List[int],
+        since: datetime,
+    ) -> Dict[int, List[Any]]:
+        """
+        Latest unread notifications for many users in one query.
+
+        Returns:
+            {user_id: [InAppNotification, ...]} newest first, at most
+            DIGEST_MAX_NOTIFICATIONS per user
+        """
+        from app.models import InAppNotification
+
+        ranked = (
+            select(
+                InAppNotification,
+                func.row_number()
+                .over(
+                    partition_by=InAppNotification.user_id,
+                    order_by=InAppNotification.created_at.desc(),
+                )
+                .label("rank"),
+            )
+            .where(
+                and_(
+                    InAppNotification.user_id.in_(user_ids),
+                    InAppNotification.created_at >= since,
+                    InAppNotification.is_read == False,
+                )
+            )
+            .subquery()
+        )
+        notification = aliased(InAppNotification, ranked)
+
+        result = await db.execute(
+            select(notification)
+            .where(ranked.c.rank <= DIGEST_MAX_NOTIFICATIONS)
+            .order_by(ranked.c.user_id, ranked.c.rank)
+        )
+
+        by_user: Dict[int, List[Any]] = {}
+        for row in result.scalars().all():
+            by_user.setdefault(row.user_id, []).append(row)
+        return by_user
+
+    async def _send_digest(
+        self,
+        user_email: str,
+        user_name: Optional[str],
+        notifications: List[Any],
+        frequency: DigestFrequency,
+    ) -> bool:
+        """Render and send one digest from prefetched notifications."""
+        try:
+            template_name, subject = self._digest_template(frequency)
+            context = self._digest_context(
+                user_email, user_name, notifications, frequency
+            )
 
             # Render template
             html_body, text_body = self.render_template(template_name, context)
@@ -560,9 +1043,33 @@ class EmailService:
             )
 
         except Exception as e:
-            logger.error(f"Failed to send digest email: {e}")
+            logger.error(f"Failed to send digest email to {user_email}: {e}")
             return False
 
+    def _digest_template(self, frequency: DigestFrequency) -> tuple[str, str]:
+        """(template_name, subject) for a digest frequency."""
+        if frequency == DigestFrequency.DAILY:
+            return "digest_daily.html", "Daily Digest - DreamSeed Messenger"
+        return "digest_weekly.html", "Weekly Digest - DreamSeed Messenger"
+
+    def _digest_context(
+        self,
+        user_email: str,
+        user_name: Optional[str],
+        notifications: List[Any],
+        frequency: DigestFrequency,
+    ) -> Dict[str, Any]:
+        """Template context for one user's digest."""
+        return {
+            "user_name": user_name or user_email,
+            "period": (
+                "yesterday" if frequency == DigestFrequency.DAILY else "this week"
+            ),
+            "total_notifications": len(notifications),
+            "grouped_notifications": self._group_notifications(list(notifications)),
+            "unsubscribe_url": f"{os.getenv('SITE_URL', '')}/settings/notifications?unsubscribe=digest",
+        }
+
     def _group_notifications(
         self,
         notifications: List[Any],
@@ -593,23 +1100,35 @@ class EmailService:
         self,
         db: AsyncSession,
         frequency: DigestFrequency,
+        concurrency: Optional[int] = None,
     ) -> int:
         """
         Send digest emails to all users who have enabled it.
 
+        Users are processed in chunks of EMAIL_DIGEST_CHUNK_SIZE: one query
+        prefetches every notification for the chunk, then the chunk's
+        digests are rendered and sent with bounded concurrency over the
+        pooled SMTP sessions.
+
         Args:
             db: Database session
             frequency: Digest frequency
+            concurrency: Max digests in flight (default: EMAIL_SEND_CONCURRENCY)
 
         Returns:
             Number of emails sent
         """
+        since = self._digest_since(frequency)
+        if since is None:
+            logger.warning(f"Invalid digest frequency: {frequency}")
+            return 0
+
         try:
             # Get users with digest enabled
             from app.models import NotificationPreference
 
             result = await db.execute(
-                select(User)
+                select(User.id, User.email, User.full_name)
                 .join(
                     NotificationPreference,
                     NotificationPreference.user_id == User.id,
@@ -621,21 +1140,50 @@ class EmailService:
                     )
                 )
                 .distinct()
+                .order_by(User.id)
             )
-            users = result.scalars().all()
+            users = [row for row in result.all() if row.email]
+
+            template_name, subject = self._digest_template(frequency)
+            semaphore = asyncio.Semaphore(concurrency or self.send_concurrency)
+
+            async def dispatch(user_email: str, rendered) -> bool:
+                if rendered is None:
+                    return False
+                async with semaphore:
+                    return await self.send_email(
+                        to_email=user_email,
+                        subject=subject,
+                        html_body=rendered[0],
+                        text_body=rendered[1],
+                    )
 
-            # Send digest to each user
             count = 0
-            for user in users:
-                user_id = getattr(user, "id", None)
-                if user_id is None:
-                    continue
-                success = await self.send_digest_email(db, user_id, frequency)
-                if success:
-                    count += 1
+            for start in range(0, len(users), EMAIL_DIGEST_CHUNK_SIZE):
+                chunk = users[start : start + EMAIL_DIGEST_CHUNK_SIZE]
+                by_user = await self._fetch_digest_notifications(
+                    db, [user.id for user in chunk], since
+                )
+                recipients = [user for user in chunk if by_user.get(user.id)]
 
-                # Rate limiting delay
-                await asyncio.sleep(0.1)
+                # Render the whole chunk against one compiled template
+                rendered = await self._render_batch_async(
+                    template_name,
+                    [
+                        self._digest_context(
+                            user.email, user.full_name, by_user[user.id], frequency
+                        )
+                        for user in recipients
+                    ],
+                )
+
+                results = await asyncio.gather(
+                    *(
+                        dispatch(user.email, pair)
+                        for user, pair in zip(recipients, rendered)
+                    )
+                )
+                count += sum(1 for success in results if success)
 
             logger.info(f"Sent {count} {frequency.value} digest emails")
             return count
@@ -648,7 +1196,7 @@ class EmailService:
     # RATE LIMITING
     # ========================================================================
 
-    def _check_rate_limit(self, email: str) -> bool:
+    async def _check_rate_limit(self, email: str) -> bool:
         """
         Check if email is within rate limit.
 
@@ -658,26 +1206,15 @@ class EmailService:
         Returns:
             True if within rate limit
         """
-        now = datetime.utcnow().timestamp()
-
-        # Initialize counter for email
-        if email not in self._rate_limit_counter:
-            self._rate_limit_counter[email] = []
-
-        # Remove old timestamps
-        self._rate_limit_counter[email] = [
-            ts
-            for ts in self._rate_limit_counter[email]
-            if now - ts < self.rate_limit_window
-        ]
-
-        # Check limit
-        if len(self._rate_limit_counter[email]) >= self.rate_limit_per_hour:
-            return False
+        limiter = self._rate_limiter
+        if limiter is None or limiter.capacity != self.rate_limit_per_hour:
+            limiter = self._rate_limiter = TokenBucketLimiter(
+                capacity=self.rate_limit_per_hour,
+                period_seconds=self.rate_limit_window,
+                redis_client=self.redis,
+            )
 
-        # Add current timestamp
-        self._rate_limit_counter[email].append(now)
-        return True
+        return await limiter.try_acquire(email.lower())
 
     # ========================================================================
     # BULK SENDING
@@ -700,34 +1237,39 @@ class EmailService:
         Returns:
             Number of emails sent successfully
         """
-        count = 0
-
-        for recipient in recipients:
-            try:
-                # Render template
-                html_body, text_body = self.render_template(
-                    template_name,
-                    recipient["context"],
-                )
+        try:
+            # Render every recipient against one compiled template
+            rendered = await self._render_batch_async(
+                template_name, [recipient["context"] for recipient in recipients]
+            )
+        except Exception as e:
+            logger.error(f"Failed to render bulk emails ({template_name}): {e}")
+            return 0
 
-                # Send email
-                success = await self.send_email(
-                    to_email=recipient["email"],
-                    subject=subject,
-                    html_body=html_body,
-                    text_body=text_body,
-                )
+        semaphore = asyncio.Semaphore(self.send_concurrency)
 
-                if success:
-                    count += 1
+        async def send_one(recipient: Dict[str, Any], bodies) -> bool:
+            if bodies is None:
+                return False
+            async with semaphore:
+                try:
+                    return await self.send_email(
+                        to_email=recipient["email"],
+                        subject=subject,
+                        html_body=bodies[0],
+                        text_body=bodies[1],
+                    )
 
-                # Rate limiting delay
-                await asyncio.sleep(0.1)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to send bulk email to {recipient.get('email')}: {e}"
+                    )
+                    return False
 
-            except Exception as e:
-                logger.error(
-                    f"Failed to send bulk email to {recipient.get('email')}: {e}"
-                )
+        results = await asyncio.gather(
+            *(send_one(r, bodies) for r, bodies in zip(recipients, rendered))
+        )
+        count = sum(1 for success in results if success)
 
         logger.info(f"Sent {count}/{len(recipients)} bulk emails")
         return count
@@ -745,6 +1287,13 @@ def get_email_service() -> EmailService:
     global _email_service_instance
 
     if _email_service_instance is None:
-        _email_service_instance = EmailService()
+        try:
+            from app.core.redis import get_redis
+
+            redis_client = get_redis()
+        except Exception:
+            redis_client = None
+
+        _email_service_instance = EmailService(redis_client=redis_client)
 
     return _email_service_instance
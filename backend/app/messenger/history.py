@@ -0,0 +1,252 @@
+"""
+Message History Service
+
+Keyset pagination over a conversation's live (non-deleted) messages,
+ordered newest first by (created_at, id). The id tie-breaker keeps pages
+stable when several messages share a timestamp, and every page is a single
+range scan on idx_messages_conversation_live (conversation_id,
+created_at DESC, id DESC) WHERE deleted_at IS NULL, however deep the
+client has scrolled.
+
+- list_page: one page older (or newer) than an opaque cursor
+- list_around: a window centred on one message, for jump-to-message
+- count_messages: exact total, only run when a client asks for it
+
+Cursors carry the (created_at, id) of the boundary row and the direction
+to continue in; they are opaque to clients (see app.messenger.cursors).
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, column, func, literal_column, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.messenger.cursors import decode_cursor, encode_cursor
+from app.models.messenger_models import Message
+
+OLDER = "older"
+NEWER = "newer"
+
+# (messages newest first, cursor for older messages, cursor for newer messages)
+HistoryPage = tuple[list[Message], Optional[str], Optional[str]]
+
+
+def encode_history_cursor(
+    created_at: datetime, message_id: uuid.UUID, direction: str
+) -> str:
+    """Opaque cursor continuing past a message in the given direction."""
+    return encode_cursor(
+        {"t": created_at.isoformat(), "i": str(message_id), "d": direction}
+    )
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, uuid.UUID, str]:
+    """
+    Decode a history cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    payload = decode_cursor(cursor)
+    try:
+        created_at = datetime.fromisoformat(payload["t"])
+        message_id = uuid.UUID(payload["i"])
+        direction = payload["d"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid history cursor") from e
+
+    if direction not in (OLDER, NEWER):
+        raise ValueError("Invalid history cursor")
+    return created_at, message_id, direction
+
+
+def _sort_key():
+    return tuple_(Message.created_at, Message.id)
+
+
+def _live_messages(conversation_id: uuid.UUID):
+    return select(Message).where(
+        and_(
+            Message.conversation_id == conversation_id,
+            Message.deleted_at.is_(None),
+        )
+    )
+
+
+def _older(stmt, limit: int):
+    return stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+
+
+def _newer(stmt, limit: int):
+    return stmt.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+
+
+def _anchor(conversation_id: uuid.UUID, message_id: uuid.UUID):
+    """(created_at, id) of a message, as a row subquery (no extra round trip)."""
+    return (
+        select(Message.created_at, Message.id)
+        .where(
+            and_(
+                Message.id == message_id,
+                Message.conversation_id == conversation_id,
+            )
+        )
+        .scalar_subquery()
+    )
+
+
+def _cursor_after(message: Message, direction: str) -> str:
+    return encode_history_cursor(message.created_at, message.id, direction)
+
+
+class MessageHistoryService:
+    """Keyset-paginated reads of conversation message history."""
+
+    async def list_page(
+        self,
+        db: AsyncSession,
+        conversation_id: uuid.UUID,
+        limit: int,
+        cursor: Optional[str] = None,
+        before: Optional[uuid.UUID] = None,
+    ) -> HistoryPage:
+        """
+        Get one page of messages, newest first.
+
+        Without a cursor the page starts at the latest message. The cursor's
+        direction decides whether the page continues older or newer.
+
+        Args:
+            db: Database session
+            conversation_id: Conversation to read
+            limit: Page size
+            cursor: next_cursor (older) or prev_cursor (newer) of a page
+            before: Legacy message-id cursor (ignored when cursor is given);
+                an id not in the conversation yields an empty page
+
+        Returns:
+            (messages newest first, older cursor or None, newer cursor or None)
+
+        Raises:
+            ValueError: Invalid cursor
+        """
+        stmt = _live_messages(conversation_id)
+        direction = OLDER
+        position = None
+
+        if cursor:
+            created_at, message_id, direction = decode_history_cursor(cursor)
+            position = tuple_(created_at, message_id)
+        elif before:
+            position = _anchor(conversation_id, before)
+
+        if direction == NEWER:
+            stmt = _newer(stmt.where(_sort_key() > position), limit + 1)
+        else:
+            if position is not None:
+                stmt = stmt.where(_sort_key() < position)
+            stmt = _older(stmt, limit + 1)
+
+        result = await db.execute(stmt)
+        rows = list(result.scalars().all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if direction == NEWER:
+            rows.reverse()
+            older_cursor = _cursor_after(rows[-1], OLDER) if rows else None
+            newer_cursor = _cursor_after(rows[0], NEWER) if has_more else None
+        else:
+            older_cursor = _cursor_after(rows[-1], OLDER) if has_more else None
+            # Anything past the first page has newer messages to return to
+            newer_cursor = (
+                _cursor_after(rows[0], NEWER) if rows and position is not None else None
+            )
+
+        return rows, older_cursor, newer_cursor
+
+    async def list_around(
+        self,
+        db: AsyncSession,
+        conversation_id: uuid.UUID,
+        message_id: uuid.UUID,
+        limit: int,
+    ) -> HistoryPage:
+        """
+        Get a window of messages around one message, newest first.
+
+        The anchor and up to half the window of older messages come from one
+        branch, newer messages from the other, in a single UNION ALL query.
+        A deleted anchor still positions the window but is not returned.
+
+        Returns:
+            (messages newest first, older cursor or None, newer cursor or None);
+            empty if the anchor is not in the conversation
+        """
+        newer_limit = limit // 2
+        older_limit = limit - newer_limit
+        anchor = _anchor(conversation_id, message_id)
+        base = _live_messages(conversation_id)
+
+        def side(is_older: bool):
+            return base.add_columns(
+                literal_column("true" if is_older else "false").label("is_older")
+            )
+
+        stmt = select(Message, column("is_older")).from_statement(
+            union_all(
+                _older(side(True).where(_sort_key() <= anchor), older_limit + 1),
+                _newer(side(False).where(_sort_key() > anchor), newer_limit + 1),
+            )
+        )
+        result = await db.execute(stmt)
+        older: list[Message] = []
+        newer: list[Message] = []
+        for message, is_older in result.all():
+            (older if is_older else newer).append(message)
+
+        older.sort(key=lambda m: (m.created_at, m.id), reverse=True)
+        newer.sort(key=lambda m: (m.created_at, m.id))
+        rows = newer[:newer_limit][::-1] + older[:older_limit]
+        if not rows:
+            return [], None, None
+
+        older_cursor = (
+            _cursor_after(rows[-1], OLDER) if len(older) > older_limit else None
+        )
+        newer_cursor = (
+            _cursor_after(rows[0], NEWER) if len(newer) > newer_limit else None
+        )
+        return rows, older_cursor, newer_cursor
+
+    async def count_messages(
+        self, db: AsyncSession, conversation_id: uuid.UUID
+    ) -> int:
+        """Exact number of live messages in a conversation."""
+        stmt = (
+            select(func.count())
+            .select_from(Message)
+            .where(
+                and_(
+                    Message.conversation_id == conversation_id,
+                    Message.deleted_at.is_(None),
+                )
+            )
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+
+_history_service: Optional[MessageHistoryService] = None
+
+
+def get_history_service() -> MessageHistoryService:
+    """Get singleton instance of MessageHistoryService."""
+    global _history_service
+    if _history_service is None:
+        _history_service = MessageHistoryService()
+    return _history_service
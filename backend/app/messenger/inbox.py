@@ -0,0 +1,439 @@
+"""
+Per-user Inbox Service
+
+Maintains the messenger_inbox table: one row per conversation participant
+with the last message preview, unread count and last activity time. The
+message write paths call into this service inside their own transaction
+(before commit), so the inbox never disagrees with the messages table:
+
+- record_message: new message or reply (all participants, one upsert)
+- record_edit: edited message that is the current preview
+- record_delete: soft-deleted message (unread counters, preview fallback)
+- mark_read / mark_read_many: read receipts (recount unread after the
+  read watermark)
+- ensure_entries: participants added to a conversation
+
+list_inbox pages a user's conversations by (updated_at, conversation_id)
+using the idx_inbox_user_updated index.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import and_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.messenger.cursors import decode_cursor, encode_cursor
+from app.models.messenger_models import Conversation, InboxEntry, Message
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CHARS = 120
+
+
+def preview_text(message: Any) -> Optional[str]:
+    """Short inbox preview for a message (text, or a placeholder for files)."""
+    if message is None:
+        return None
+
+    content = (message.content or "").strip()
+    if not content:
+        if message.message_type == "image":
+            return "[Image]"
+        if message.message_type == "file":
+            return f"[File] {message.file_name}" if message.file_name else "[File]"
+        return None
+
+    content = " ".join(content.split())
+    if len(content) > PREVIEW_CHARS:
+        return content[: PREVIEW_CHARS - 1] + "…"
+    return content
+
+
+def encode_inbox_cursor(updated_at: datetime, conversation_id: uuid.UUID) -> str:
+    """Opaque cursor for the inbox row after which the next page starts."""
+    return encode_cursor({"u": updated_at.isoformat(), "c": str(conversation_id)})
+
+
+def decode_inbox_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decode an inbox cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    payload = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(payload["u"]), uuid.UUID(payload["c"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid inbox cursor") from e
+
+
+class InboxService:
+    """
+    Service maintaining the denormalized per-user inbox.
+
+    All write methods only execute statements; the caller commits.
+    """
+
+    # ========================================================================
+    # Write paths
+    # ========================================================================
+
+    async def record_message(self, db: AsyncSession, message: Message) -> None:
+        """
+        Apply a new message to every participant's inbox row (one upsert).
+
+        The sender's row is marked read through the message; everyone else's
+        unread_count is incremented. Out-of-order arrivals do not replace a
+        newer preview.
+
+        Args:
+            db: Database session (message must be flushed)
+            message: The new message
+        """
+        await db.execute(
+            text(
+                """
+                INSERT INTO messenger_inbox (
+                    user_id, conversation_id, last_message_id,
+                    last_message_preview, last_sender_id, last_message_at,
+                    unread_count, read_through_at, updated_at
+                )
+                SELECT
+                    p.user_id, p.conversation_id, :message_id,
+                    :preview, :sender_id, :created_at,
+                    CASE WHEN p.user_id = :sender_id THEN 0 ELSE 1 END,
+                    CASE WHEN p.user_id = :sender_id THEN :created_at END,
+                    :created_at
+                FROM conversation_participants p
+                WHERE p.conversation_id = :conversation_id
+                ON CONFLICT (user_id, conversation_id) DO UPDATE SET
+                    last_message_id = CASE
+                        WHEN messenger_inbox.last_message_at IS NULL
+                          OR EXCLUDED.last_message_at >= messenger_inbox.last_message_at
+                        THEN EXCLUDED.last_message_id
+                        ELSE messenger_inbox.last_message_id END,
+                    last_message_preview = CASE
+                        WHEN messenger_inbox.last_message_at IS NULL
+                          OR EXCLUDED.last_message_at >= messenger_inbox.last_message_at
+                        THEN EXCLUDED.last_message_preview
+                        ELSE messenger_inbox.last_message_preview END,
+                    last_sender_id = CASE
+                        WHEN messenger_inbox.last_message_at IS NULL
+                          OR EXCLUDED.last_message_at >= messenger_inbox.last_message_at
+                        THEN EXCLUDED.last_sender_id
+                        ELSE messenger_inbox.last_sender_id END,
+                    last_message_at = GREATEST(
+                        messenger_inbox.last_message_at, EXCLUDED.last_message_at
+                    ),
+                    unread_count = CASE
+                        WHEN EXCLUDED.user_id = :sender_id THEN 0
+                        ELSE messenger_inbox.unread_count + 1 END,
+                    read_through_at = CASE
+                        WHEN EXCLUDED.user_id = :sender_id
+                        THEN GREATEST(messenger_inbox.read_through_at, EXCLUDED.read_through_at)
+                        ELSE messenger_inbox.read_through_at END,
+                    updated_at = GREATEST(messenger_inbox.updated_at, EXCLUDED.updated_at)
+                """
+            ),
+            {
+                "message_id": message.id,
+                "preview": preview_text(message),
+                "sender_id": message.sender_id,
+                "created_at": message.created_at,
+                "conversation_id": message.conversation_id,
+            },
+        )
+
+    async def record_edit(self, db: AsyncSession, message: Message) -> None:
+        """Refresh the preview on rows whose last message was edited."""
+        await db.execute(
+            text(
+                """
+                UPDATE messenger_inbox
+                SET last_message_preview = :preview
+                WHERE conversation_id = :conversation_id
+                  AND last_message_id = :message_id
+                """
+            ),
+            {
+                "preview": preview_text(message),
+                "conversation_id": message.conversation_id,
+                "message_id": message.id,
+            },
+        )
+
+    async def record_delete(self, db: AsyncSession, message: Message) -> None:
+        """
+        Remove a soft-deleted message from inbox counters and previews.
+
+        Participants who had not read it get unread_count decremented; rows
+        previewing it fall back to the newest remaining live message.
+
+        Args:
+            db: Database session (deletion must be flushed)
+            message: The deleted message
+        """
+        await db.execute(
+            text(
+                """
+                UPDATE messenger_inbox
+                SET unread_count = GREATEST(unread_count - 1, 0)
+                WHERE conversation_id = :conversation_id
+                  AND user_id IS DISTINCT FROM :sender_id
+                  AND (read_through_at IS NULL OR read_through_at < :created_at)
+                  AND unread_count > 0
+                """
+            ),
+            {
+                "conversation_id": message.conversation_id,
+                "sender_id": message.sender_id,
+                "created_at": message.created_at,
+            },
+        )
+
+        latest = await self._latest_live_message(db, message.conversation_id)
+        await db.execute(
+            text(
+                """
+                UPDATE messenger_inbox
+                SET last_message_id = :last_id,
+                    last_message_preview = :preview,
+                    last_sender_id = :last_sender_id,
+                    last_message_at = :last_at
+                WHERE conversation_id = :conversation_id
+                  AND last_message_id = :message_id
+                """
+            ),
+            {
+                "last_id": latest.id if latest else None,
+                "preview": preview_text(latest),
+                "last_sender_id": latest.sender_id if latest else None,
+                "last_at": latest.created_at if latest else None,
+                "conversation_id": message.conversation_id,
+                "message_id": message.id,
+            },
+        )
+
+    async def mark_read(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        conversation_id: uuid.UUID,
+        read_through: datetime,
+    ) -> None:
+        """
+        Advance a user's read watermark and recount their unread messages.
+
+        The recount only touches messages after the watermark (index range
+        on conversation_id, created_at), so its cost is the unread backlog.
+        Reading an older message never moves the watermark back.
+
+        Args:
+            db: Database session
+            user_id: Reader
+            conversation_id: Conversation UUID
+            read_through: created_at of the message that was read
+        """
+        await db.execute(
+            text(
+                """
+                UPDATE messenger_inbox i
+                SET read_through_at = w.watermark,
+                    unread_count = (
+                        SELECT count(*)
+                        FROM messages m
+                        WHERE m.conversation_id = i.conversation_id
+                          AND m.created_at > w.watermark
+                          AND m.deleted_at IS NULL
+                          AND m.sender_id IS DISTINCT FROM i.user_id
+                    )
+                FROM (
+                    SELECT GREATEST(read_through_at, :read_through) AS watermark
+                    FROM messenger_inbox
+                    WHERE user_id = :user_id AND conversation_id = :conversation_id
+                ) w
+                WHERE i.user_id = :user_id
+                  AND i.conversation_id = :conversation_id
+                """
+            ),
+            {
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "read_through": read_through,
+            },
+        )
+
+    async def mark_read_many(
+        self,
+        db: AsyncSession,
+        reads: list[tuple[int, uuid.UUID, datetime]],
+    ) -> None:
+        """
+        Bulk mark_read: one UPDATE for many (user, conversation) watermarks.
+
+        Args:
+            db: Database session
+            reads: [(user_id, conversation_id, read_through), ...], at most
+                one entry per (user_id, conversation_id)
+        """
+        if not reads:
+            return
+
+        await db.execute(
+            text(
+                """
+                UPDATE messenger_inbox i
+                SET read_through_at = GREATEST(i.read_through_at, v.read_through),
+                    unread_count = (
+                        SELECT count(*)
+                        FROM messages m
+                        WHERE m.conversation_id = i.conversation_id
+                          AND m.created_at > GREATEST(i.read_through_at, v.read_through)
+                          AND m.deleted_at IS NULL
+                          AND m.sender_id IS DISTINCT FROM i.user_id
+                    )
+                FROM unnest(
+                    CAST(:user_ids AS integer[]),
+                    CAST(:conversation_ids AS uuid[]),
+                    CAST(:read_through AS timestamptz[])
+                ) AS v(user_id, conversation_id, read_through)
+                WHERE i.user_id = v.user_id
+                  AND i.conversation_id = v.conversation_id
+                """
+            ),
+            {
+                "user_ids": [r[0] for r in reads],
+                "conversation_ids": [r[1] for r in reads],
+                "read_through": [r[2] for r in reads],
+            },
+        )
+
+    async def ensure_entries(self, db: AsyncSession, conversation_id: uuid.UUID) -> None:
+        """
+        Create inbox rows for participants that do not have one yet.
+
+        New rows start at the conversation's newest live message with
+        nothing unread.
+
+        Args:
+            db: Database session (participants must be flushed)
+            conversation_id: Conversation UUID
+        """
+        latest = await self._latest_live_message(db, conversation_id)
+        await db.execute(
+            text(
+                """
+                INSERT INTO messenger_inbox (
+                    user_id, conversation_id, last_message_id,
+                    last_message_preview, last_sender_id, last_message_at,
+                    unread_count, read_through_at, updated_at
+                )
+                SELECT
+                    p.user_id, p.conversation_id, :last_id,
+                    :preview, :last_sender_id, :last_at,
+                    0, :last_at, COALESCE(:last_at, c.updated_at)
+                FROM conversation_participants p
+                JOIN conversations c ON c.id = p.conversation_id
+                WHERE p.conversation_id = :conversation_id
+                ON CONFLICT (user_id, conversation_id) DO NOTHING
+                """
+            ),
+            {
+                "last_id": latest.id if latest else None,
+                "preview": preview_text(latest),
+                "last_sender_id": latest.sender_id if latest else None,
+                "last_at": latest.created_at if latest else None,
+                "conversation_id": conversation_id,
+            },
+        )
+
+    # ========================================================================
+    # Read path
+    # ========================================================================
+
+    async def list_inbox(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> tuple[list[tuple[InboxEntry, Conversation]], Optional[str]]:
+        """
+        Page a user's conversations, most recent activity first.
+
+        Args:
+            db: Database session
+            user_id: Inbox owner
+            limit: Page size
+            cursor: next_cursor from the previous page
+            offset: Legacy offset (ignored when a cursor is given)
+
+        Returns:
+            ([(inbox entry, conversation), ...], next_cursor or None)
+
+        Raises:
+            ValueError: Invalid cursor
+        """
+        stmt = (
+            select(InboxEntry, Conversation)
+            .join(Conversation, Conversation.id == InboxEntry.conversation_id)
+            .where(InboxEntry.user_id == user_id)
+            .order_by(InboxEntry.updated_at.desc(), InboxEntry.conversation_id.desc())
+        )
+        if cursor:
+            updated_at, conversation_id = decode_inbox_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(InboxEntry.updated_at, InboxEntry.conversation_id)
+                < tuple_(updated_at, conversation_id)
+            )
+        elif offset:
+            stmt = stmt.offset(offset)
+
+        result = await db.execute(stmt.limit(limit + 1))
+        rows = [(row[0], row[1]) for row in result.all()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_inbox_cursor(last.updated_at, last.conversation_id)
+        return rows, next_cursor
+
+    # ========================================================================
+    # Helpers
+    # ========================================================================
+
+    async def _latest_live_message(
+        self, db: AsyncSession, conversation_id: uuid.UUID
+    ) -> Optional[Message]:
+        result = await db.execute(
+            select(Message)
+            .where(
+                and_(
+                    Message.conversation_id == conversation_id,
+                    Message.deleted_at.is_(None),
+                )
+            )
+            .order_by(Message.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+# Singleton instance
+_inbox_service: Optional[InboxService] = None
+
+
+def get_inbox_service() -> InboxService:
+    """Get singleton instance of InboxService."""
+    global _inbox_service
+    if _inbox_service is None:
+        _inbox_service = InboxService()
+    return _inbox_service
@@ -16,6 +16,12 @@ Architecture:
 - Redis Sorted Set: online:zone:{zone_id} -> user_id (score = last_activity)
 - Redis Sorted Set: online:org:{org_id} -> user_id (score = last_activity)
 - TTL: 5 minutes (auto-cleanup for disconnected users)
+- Transitions are single round trips (MULTI pipeline / Lua scripts);
+  status lists are read with one pipeline; heartbeats are coalesced
+
+Environment:
+    PRESENCE_HEARTBEAT_COALESCE: Seconds during which repeated activity
+        pings for a user skip Redis (default: 30)
 
 Usage:
     from app.messenger.presence import get_presence_manager
@@ -33,6 +39,8 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime
 from enum import Enum
 from typing import Any, Optional
@@ -42,6 +50,8 @@ from app.messenger.pubsub import get_pubsub
 
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_COALESCE_SECONDS = float(os.getenv("PRESENCE_HEARTBEAT_COALESCE", "30"))
+
 
 class PresenceStatus(str, Enum):
     """User presence status"""
@@ -51,6 +61,106 @@ class PresenceStatus(str, Enum):
     OFFLINE = "offline"
 
 
+# Presence transitions run server-side so each is one atomic round trip.
+# Every key a script touches is passed in KEYS: the caller supplies the
+# zone/org it expects (ARGV) along with the matching online-set keys, and
+# the script returns -1 without writing if the hash disagrees, so the
+# caller can re-read the location and retry.
+
+# KEYS: presence hash, online:global, [online:zone:{zone}], [online:org:{org}]
+# ARGV: user_id, timestamp, ttl, zone_id ('' = none), org_id ('' = none)
+_TOUCH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local loc = redis.call('HMGET', KEYS[1], 'zone_id', 'org_id')
+if (loc[1] or '') ~= ARGV[4] or (loc[2] or '') ~= ARGV[5] then
+    return -1
+end
+redis.call('HSET', KEYS[1], 'last_activity', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+local i = 3
+if ARGV[4] ~= '' then
+    redis.call('ZADD', KEYS[i], ARGV[2], ARGV[1])
+    i = i + 1
+end
+if ARGV[5] ~= '' then
+    redis.call('ZADD', KEYS[i], ARGV[2], ARGV[1])
+end
+return 1
+"""
+
+# KEYS[1] presence hash
+# ARGV: updated_at, channel, payload
+_AWAY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'away', 'updated_at', ARGV[1])
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return 1
+"""
+
+# KEYS: presence hash, online:global, [online:zone:{zone}], [online:org:{org}]
+# ARGV: user_id, now (updated_at/last_seen), ttl, channel, payload,
+#       zone_id ('' = none), org_id ('' = none)
+_OFFLINE_SCRIPT = """
+local loc = redis.call('HMGET', KEYS[1], 'zone_id', 'org_id')
+if (loc[1] or '') ~= ARGV[6] or (loc[2] or '') ~= ARGV[7] then
+    return -1
+end
+redis.call('HSET', KEYS[1], 'status', 'offline', 'updated_at', ARGV[2], 'last_seen', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZREM', KEYS[2], ARGV[1])
+local i = 3
+if ARGV[6] ~= '' then
+    redis.call('ZREM', KEYS[i], ARGV[1])
+    i = i + 1
+end
+if ARGV[7] ~= '' then
+    redis.call('ZREM', KEYS[i], ARGV[1])
+end
+redis.call('PUBLISH', ARGV[4], ARGV[5])
+return 1
+"""
+
+# Script result when the caller's zone/org does not match the hash
+_STALE_LOCATION = -1
+
+
+def _text(value: Any) -> Optional[str]:
+    """Redis value as str (clients may or may not decode responses)."""
+    if value is None:
+        return None
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _parse_presence(user_id: int, presence_data: dict) -> Optional[dict[str, Any]]:
+    """Presence hash -> status dict (None if the hash is empty)."""
+    if not presence_data:
+        return None
+
+    data = {_text(k): _text(v) for k, v in presence_data.items()}
+    result: dict[str, Any] = {
+        "user_id": user_id,
+        "status": data.get("status", ""),
+        "last_activity": data.get("last_activity", ""),
+        "updated_at": data.get("updated_at", ""),
+    }
+
+    if data.get("zone_id"):
+        result["zone_id"] = int(data["zone_id"])
+
+    if data.get("org_id"):
+        result["org_id"] = int(data["org_id"])
+
+    if "last_seen" in data:
+        result["last_seen"] = data["last_seen"]
+
+    return result
+
+
 class PresenceManager:
     """
     Manages user presence and activity status.
@@ -60,6 +170,13 @@ class PresenceManager:
     - online:zone:{zone_id} -> ZSET {user_id: last_activity_timestamp}
     - online:org:{org_id} -> ZSET {user_id: last_activity_timestamp}
     - online:global -> ZSET {user_id: last_activity_timestamp}
+
+    Every transition is a single round trip: set_online is a MULTI
+    pipeline, set_away / set_offline / update_activity are Lua scripts.
+    The scripts receive every key they write; the user's zone/org is
+    cached from set_online (or read once with HMGET) and verified
+    server-side. Heartbeats for the same user within
+    heartbeat_coalesce_seconds are answered locally.
     """
 
     def __init__(self):
@@ -73,6 +190,94 @@ class PresenceManager:
         # Presence TTL (cleanup after 5 minutes)
         self.presence_ttl_seconds = 300
 
+        # Offline hashes are kept for last_seen (30 days)
+        self.offline_ttl_seconds = 86400 * 30
+
+        # Heartbeat coalescing: user_id -> monotonic time of last Redis write
+        self.heartbeat_coalesce_seconds = HEARTBEAT_COALESCE_SECONDS
+        self._last_touch: dict[int, float] = {}
+        self._last_touch_max = 100_000
+
+        # Registered Lua scripts: name -> (client, script)
+        self._scripts: dict[str, tuple[Any, Any]] = {}
+
+        # Last known (zone_id, org_id) per user, '' for none; used to name
+        # the online-set keys passed to the Lua scripts
+        self._locations: dict[int, tuple[str, str]] = {}
+
+        self.heartbeats_coalesced = 0
+
+    # ========================================================================
+    # Internals
+    # ========================================================================
+
+    def _script(self, name: str, source: str):
+        """Script registered on the current client (EVALSHA, EVAL fallback)."""
+        cached = self._scripts.get(name)
+        if cached is None or cached[0] is not self.redis:
+            cached = (self.redis, self.redis.register_script(source))
+            self._scripts[name] = cached
+        return cached[1]
+
+    def _status_payload(
+        self, user_id: int, status: str, metadata: dict[str, Any]
+    ) -> tuple[str, str]:
+        """(channel, payload) for a status broadcast published from Redis."""
+        return (
+            self.pubsub.online_status_channel(),
+            self.pubsub.online_status_payload(user_id, status, metadata),
+        )
+
+    async def _location(self, user_id: int, refresh: bool = False) -> tuple[str, str]:
+        """(zone_id, org_id) of a user, read from the presence hash on a miss."""
+        location = None if refresh else self._locations.get(user_id)
+        if location is None:
+            zone_id, org_id = await self.redis.hmget(
+                f"presence:{user_id}", ["zone_id", "org_id"]
+            )
+            location = (_text(zone_id) or "", _text(org_id) or "")
+            self._remember_location(user_id, location)
+        return location
+
+    def _remember_location(self, user_id: int, location: tuple[str, str]) -> None:
+        if len(self._locations) >= self._last_touch_max:
+            self._locations.clear()
+        self._locations[user_id] = location
+
+    async def _run_located(
+        self, name: str, source: str, user_id: int, args: list[Any]
+    ) -> Any:
+        """
+        Run a script that updates the user's online sets.
+
+        KEYS are derived from the cached zone/org; if the script reports a
+        stale location, the hash is re-read and the script retried once.
+        """
+        location = await self._location(user_id)
+        result = None
+        for _ in range(2):
+            zone_id, org_id = location
+            keys = [f"presence:{user_id}", "online:global"]
+            if zone_id:
+                keys.append(f"online:zone:{zone_id}")
+            if org_id:
+                keys.append(f"online:org:{org_id}")
+            result = await self._script(name, source)(
+                keys=keys, args=[*args, zone_id, org_id]
+            )
+            if result != _STALE_LOCATION:
+                break
+            location = await self._location(user_id, refresh=True)
+        return result
+
+    def _mark_touched(self, user_id: int, now: float) -> None:
+        if len(self._last_touch) >= self._last_touch_max:
+            cutoff = now - self.heartbeat_coalesce_seconds
+            self._last_touch = {
+                uid: ts for uid, ts in self._last_touch.items() if ts >= cutoff
+            }
+        self._last_touch[user_id] = now
+
     # ========================================================================
     # Status Management
     # ========================================================================
@@ -114,32 +319,37 @@ class PresenceManager:
             if metadata:
                 presence_data["metadata"] = str(metadata)
 
-            # Update presence hash
-            await self.redis.hset(presence_key, mapping=presence_data)  # type: ignore
-            await self.redis.expire(presence_key, self.presence_ttl_seconds)
-
-            # Add to online sorted sets
-            await self.redis.zadd("online:global", {str(user_id): timestamp})
-
-            if zone_id is not None:
-                await self.redis.zadd(
-                    f"online:zone:{zone_id}", {str(user_id): timestamp}
-                )
-
-            if org_id is not None:
-                await self.redis.zadd(f"online:org:{org_id}", {str(user_id): timestamp})
-
-            # Broadcast online status
-            await self.pubsub.publish_online_status(
+            channel, payload = self._status_payload(
                 user_id,
                 PresenceStatus.ONLINE.value,
-                metadata={
+                {
                     "zone_id": zone_id,
                     "org_id": org_id,
                     "timestamp": now.isoformat(),
                 },
             )
 
+            # Hash, online sets and broadcast in one MULTI/EXEC
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(presence_key, mapping=presence_data)
+            pipe.expire(presence_key, self.presence_ttl_seconds)
+            pipe.zadd("online:global", {str(user_id): timestamp})
+            if zone_id is not None:
+                pipe.zadd(f"online:zone:{zone_id}", {str(user_id): timestamp})
+            if org_id is not None:
+                pipe.zadd(f"online:org:{org_id}", {str(user_id): timestamp})
+            pipe.publish(channel, payload)
+            await pipe.execute()
+
+            self._mark_touched(user_id, time.monotonic())
+            self._remember_location(
+                user_id,
+                (
+                    "" if zone_id is None else str(zone_id),
+                    "" if org_id is None else str(org_id),
+                ),
+            )
+
             logger.info(f"User {user_id} set to online")
             return True
 
@@ -163,32 +373,21 @@ class PresenceManager:
             True if status updated successfully
         """
         try:
-            presence_key = f"presence:{user_id}"
-
-            # Check if user exists
-            exists = await self.redis.exists(presence_key)
-            if not exists:
-                logger.warning(f"Cannot set away for non-existent user {user_id}")
-                return False
-
             now = datetime.utcnow()
-
-            # Update status only
-            await self.redis.hset(  # type: ignore
-                presence_key,
-                mapping={
-                    "status": PresenceStatus.AWAY.value,
-                    "updated_at": now.isoformat(),
-                },
-            )
-
-            # Broadcast away status
-            await self.pubsub.publish_online_status(
+            channel, payload = self._status_payload(
                 user_id,
                 PresenceStatus.AWAY.value,
-                metadata={"timestamp": now.isoformat(), **(metadata or {})},
+                {"timestamp": now.isoformat(), **(metadata or {})},
             )
 
+            updated = await self._script("away", _AWAY_SCRIPT)(
+                keys=[f"presence:{user_id}"],
+                args=[now.isoformat(), channel, payload],
+            )
+            if not updated:
+                logger.warning(f"Cannot set away for non-existent user {user_id}")
+                return False
+
             logger.info(f"User {user_id} set to away")
             return True
 
@@ -212,52 +411,24 @@ class PresenceManager:
             True if status updated successfully
         """
         try:
-            presence_key = f"presence:{user_id}"
-
-            # Get zone/org before deletion
-            presence_data = await self.redis.hgetall(presence_key)  # type: ignore
-            zone_id = presence_data.get(b"zone_id") if presence_data else None
-            org_id = presence_data.get(b"org_id") if presence_data else None
-
-            if zone_id:
-                zone_id = int(zone_id)
-            if org_id:
-                org_id = int(org_id)
-
-            now = datetime.utcnow()
-
-            # Update status to offline (keep for last_seen)
-            await self.redis.hset(  # type: ignore
-                presence_key,
-                mapping={
-                    "status": PresenceStatus.OFFLINE.value,
-                    "updated_at": now.isoformat(),
-                    "last_seen": now.isoformat(),
-                },
+            now = datetime.utcnow().isoformat()
+            channel, payload = self._status_payload(
+                user_id,
+                PresenceStatus.OFFLINE.value,
+                {"timestamp": now, "last_seen": now, **(metadata or {})},
             )
 
-            # Set shorter TTL for offline users (30 days for last_seen)
-            await self.redis.expire(presence_key, 86400 * 30)
-
-            # Remove from online sorted sets
-            await self.redis.zrem("online:global", str(user_id))
-
-            if zone_id:
-                await self.redis.zrem(f"online:zone:{zone_id}", str(user_id))
-
-            if org_id:
-                await self.redis.zrem(f"online:org:{org_id}", str(user_id))
-
-            # Broadcast offline status
-            await self.pubsub.publish_online_status(
+            updated = await self._run_located(
+                "offline",
+                _OFFLINE_SCRIPT,
                 user_id,
-                PresenceStatus.OFFLINE.value,
-                metadata={
-                    "timestamp": now.isoformat(),
-                    "last_seen": now.isoformat(),
-                    **(metadata or {}),
-                },
+                [str(user_id), now, self.offline_ttl_seconds, channel, payload],
             )
+            self._last_touch.pop(user_id, None)
+            self._locations.pop(user_id, None)
+            if updated == _STALE_LOCATION:
+                logger.warning(f"Presence location for user {user_id} kept changing")
+                return False
 
             logger.info(f"User {user_id} set to offline")
             return True
@@ -273,59 +444,41 @@ class PresenceManager:
         """
         Update user's last activity timestamp (heartbeat).
 
+        Heartbeats within heartbeat_coalesce_seconds of the last write for
+        this user are coalesced (no Redis call); the window is far below
+        the presence TTL and the auto-away threshold.
+
         Args:
             user_id: User ID
 
         Returns:
             True if activity updated successfully
         """
+        mono_now = time.monotonic()
+        last = self._last_touch.get(user_id)
+        if last is not None and mono_now - last < self.heartbeat_coalesce_seconds:
+            self.heartbeats_coalesced += 1
+            return True
+
         try:
-            presence_key = f"presence:{user_id}"
+            timestamp = int(datetime.utcnow().timestamp())
 
-            # Check if user exists
-            exists = await self.redis.exists(presence_key)
-            if not exists:
+            updated = await self._run_located(
+                "touch",
+                _TOUCH_SCRIPT,
+                user_id,
+                [str(user_id), timestamp, self.presence_ttl_seconds],
+            )
+            if updated == _STALE_LOCATION:
+                logger.warning(f"Presence location for user {user_id} kept changing")
+                return False
+            if not updated:
                 logger.warning(
                     f"Cannot update activity for non-existent user {user_id}"
                 )
                 return False
 
-            now = datetime.utcnow()
-            timestamp = int(now.timestamp())
-
-            # Update last_activity
-            await self.redis.hset(  # type: ignore
-                presence_key,
-                "last_activity",
-                str(timestamp),
-            )
-
-            # Update TTL
-            await self.redis.expire(presence_key, self.presence_ttl_seconds)
-
-            # Update in sorted sets
-            presence_data = await self.redis.hgetall(presence_key)  # type: ignore
-            zone_id = presence_data.get(b"zone_id")
-            org_id = presence_data.get(b"org_id")
-
-            await self.redis.zadd("online:global", {str(user_id): timestamp})
-
-            if zone_id:
-                await self.redis.zadd(
-                    f"online:zone:{zone_id.decode()}", {str(user_id): timestamp}
-                )
-
-            if org_id:
-                await self.redis.zadd(
-                    f"online:org:{org_id.decode()}", {str(user_id): timestamp}
-                )
-
-            # Check if user should be auto-away
-            current_status = presence_data.get(b"status", b"").decode()
-            if current_status == PresenceStatus.ONLINE.value:
-                # No need to set away if we just updated activity
-                pass
-
+            self._mark_touched(user_id, mono_now)
             return True
 
         except Exception as e:
@@ -353,31 +506,71 @@ class PresenceManager:
         try:
             presence_key = f"presence:{user_id}"
             presence_data = await self.redis.hgetall(presence_key)  # type: ignore
+            return _parse_presence(user_id, presence_data)
 
-            if not presence_data:
-                return None
+        except Exception as e:
+            logger.error(f"Failed to get status for user {user_id}: {e}")
+            return None
 
-            result = {
-                "user_id": user_id,
-                "status": presence_data.get(b"status", b"").decode(),
-                "last_activity": presence_data.get(b"last_activity", b"").decode(),
-                "updated_at": presence_data.get(b"updated_at", b"").decode(),
-            }
+    async def get_status_many(
+        self,
+        user_ids: list[int],
+    ) -> dict[int, Optional[dict[str, Any]]]:
+        """
+        Get full presence for many users in one pipelined round trip.
 
-            if b"zone_id" in presence_data:
-                result["zone_id"] = int(presence_data[b"zone_id"])
+        Args:
+            user_ids: User IDs
 
-            if b"org_id" in presence_data:
-                result["org_id"] = int(presence_data[b"org_id"])
+        Returns:
+            Dict user_id -> status dict (as get_status), None if not found
+        """
+        if not user_ids:
+            return {}
 
-            if b"last_seen" in presence_data:
-                result["last_seen"] = presence_data[b"last_seen"].decode()
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hgetall(f"presence:{user_id}")
+            rows = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to get presence for {len(user_ids)} users: {e}")
+            return {user_id: None for user_id in user_ids}
+
+        return {
+            user_id: _parse_presence(user_id, data)
+            for user_id, data in zip(user_ids, rows)
+        }
+
+    async def get_statuses(
+        self,
+        user_ids: list[int],
+    ) -> dict[int, Optional[str]]:
+        """
+        Get the status of many users in one pipelined round trip.
+
+        Args:
+            user_ids: User IDs
 
-            return result
+        Returns:
+            Dict user_id -> status string (None if no presence record or
+            on Redis error)
+        """
+        if not user_ids:
+            return {}
 
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hget(f"presence:{user_id}", "status")
+            values = await pipe.execute()
         except Exception as e:
-            logger.error(f"Failed to get status for user {user_id}: {e}")
-            return None
+            logger.error(f"Failed to get statuses for {len(user_ids)} users: {e}")
+            return {user_id: None for user_id in user_ids}
+
+        return {
+            user_id: _text(value) for user_id, value in zip(user_ids, values)
+        }
 
     async def get_online_users(
         self,
@@ -406,17 +599,12 @@ class PresenceManager:
                 key = "online:global"
 
             # Get users sorted by last activity (most recent first)
-            user_ids = await self.redis.zrevrange(key, 0, limit - 1, withscores=True)
-
-            result = []
-            for user_id_bytes, _score in user_ids:
-                user_id = int(user_id_bytes.decode())
-                status = await self.get_status(user_id)
-
-                if status:
-                    result.append(status)
+            members = await self.redis.zrevrange(key, 0, limit - 1, withscores=True)
+            user_ids = [int(_text(member)) for member, _score in members]
 
-            return result
+            # One pipelined read for all statuses (ordering preserved)
+            statuses = await self.get_status_many(user_ids)
+            return [statuses[uid] for uid in user_ids if statuses.get(uid)]
 
         except Exception as e:
             logger.error(f"Failed to get online users: {e}")
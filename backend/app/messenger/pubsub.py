@@ -187,6 +187,23 @@ class MessengerPubSub:
             logger.error(f"Failed to publish announcement to {channel}: {e}")
             raise
 
+    @staticmethod
+    def online_status_payload(
+        user_id: int,
+        status: str,
+        metadata: Optional[dict[str, Any]] = None,
+    ) -> str:
+        """Serialized status update (also published from presence Lua scripts)"""
+        return json.dumps(
+            {
+                "user_id": user_id,
+                "status": status,
+                "timestamp": None,  # Will be serialized as ISO string
+                **(metadata or {}),
+            },
+            default=str,
+        )
+
     async def publish_online_status(
         self,
         user_id: int,
@@ -212,15 +229,7 @@ class MessengerPubSub:
             )
         """
         channel = self.online_status_channel()
-        payload = json.dumps(
-            {
-                "user_id": user_id,
-                "status": status,
-                "timestamp": None,  # Will be serialized as ISO string
-                **(metadata or {}),
-            },
-            default=str,
-        )
+        payload = self.online_status_payload(user_id, status, metadata)
 
         try:
             num_subscribers = await self.redis_client.publish(channel, payload)
@@ -13,6 +13,16 @@ Features:
 - Delivery tracking and analytics
 - Background worker for async delivery
 - Retry logic with exponential backoff
+- Batched conversation fan-out: one query for recipients/settings/devices,
+  one pipelined presence lookup, provider sends grouped into batches (FCM
+  multicast, concurrent APNs/Web Push) with bounded concurrency
+
+Provider delivery goes through PushTransport objects (service.transports),
+which can be replaced, e.g. with StubPushTransport for offline load tests.
+
+Environment:
+    PUSH_FANOUT_CONCURRENCY: Max provider batches in flight per fan-out
+        (default: 16)
 """
 
 from __future__ import annotations
@@ -20,15 +30,20 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import and_, delete, func, select
+from sqlalchemy import and_, delete, func, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+FANOUT_CONCURRENCY = int(os.getenv("PUSH_FANOUT_CONCURRENCY", "16"))
+
 
 class DevicePlatform(str, Enum):
     """Device platform types"""
@@ -54,6 +69,175 @@ class PushProvider(str, Enum):
     WEB_PUSH = "web_push"  # Web Push API
 
 
+@dataclass(frozen=True)
+class PushPayload:
+    """Notification content shared by every device in a fan-out."""
+
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    priority: NotificationPriority = NotificationPriority.NORMAL
+
+
+class PushTransport(ABC):
+    """
+    Delivers one payload to a batch of device tokens of a single provider.
+
+    Subclasses set max_batch_size (tokens per send_batch call) and return
+    one success flag per token, in order.
+    """
+
+    max_batch_size: int = 1
+
+    @abstractmethod
+    async def send_batch(self, tokens: list[str], payload: PushPayload) -> list[bool]:
+        """Send payload to every token; one success flag per token."""
+
+
+class FCMTransport(PushTransport):
+    """FCM multicast (up to 500 registration ids per request)."""
+
+    max_batch_size = 500
+
+    def __init__(self, service: "PushNotificationService"):
+        self.service = service
+
+    async def send_batch(self, tokens: list[str], payload: PushPayload) -> list[bool]:
+        client = self.service.fcm_client
+        if not client:
+            logger.warning("FCM client not initialized")
+            return [False] * len(tokens)
+
+        data_message = dict(payload.data)
+        data_message["timestamp"] = datetime.utcnow().isoformat()
+
+        try:
+            # pyfcm is blocking: keep it off the event loop
+            result = await asyncio.to_thread(
+                client.notify_multiple_devices,
+                registration_ids=tokens,
+                message_title=payload.title,
+                message_body=payload.body,
+                data_message=data_message,
+                time_to_live=86400,  # 24 hours
+                priority=(
+                    "high" if payload.priority == NotificationPriority.HIGH else "normal"
+                ),
+            )
+        except Exception as e:
+            logger.error(f"FCM multicast error: {e}")
+            return [False] * len(tokens)
+
+        per_token = result.get("results") if isinstance(result, dict) else None
+        if isinstance(per_token, list) and len(per_token) == len(tokens):
+            return [not (r or {}).get("error") for r in per_token]
+
+        success = isinstance(result, dict) and result.get("failure", 1) == 0
+        if not success:
+            logger.error(f"FCM multicast failed: {result}")
+        return [success] * len(tokens)
+
+
+class APNsTransport(PushTransport):
+    """APNs: one request per token, sent concurrently over the HTTP/2 client."""
+
+    max_batch_size = 100
+
+    def __init__(self, service: "PushNotificationService"):
+        self.service = service
+
+    async def send_batch(self, tokens: list[str], payload: PushPayload) -> list[bool]:
+        return list(
+            await asyncio.gather(
+                *(
+                    self.service._send_apns(
+                        token,
+                        payload.title,
+                        payload.body,
+                        dict(payload.data),
+                        payload.priority,
+                    )
+                    for token in tokens
+                )
+            )
+        )
+
+
+class WebPushTransport(PushTransport):
+    """Web Push: one blocking pywebpush call per subscription, run in threads."""
+
+    max_batch_size = 50
+
+    def __init__(self, service: "PushNotificationService"):
+        self.service = service
+
+    async def send_batch(self, tokens: list[str], payload: PushPayload) -> list[bool]:
+        if not getattr(self.service, "webpush", None):
+            logger.warning("Web Push not initialized")
+            return [False] * len(tokens)
+
+        body = json.dumps(
+            {
+                "title": payload.title,
+                "body": payload.body,
+                "icon": "/icon-192x192.png",
+                "badge": "/badge-72x72.png",
+                "data": payload.data,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+        )
+        return list(
+            await asyncio.gather(*(self._send_one(token, body) for token in tokens))
+        )
+
+    async def _send_one(self, subscription_info: str, body: str) -> bool:
+        try:
+            await asyncio.to_thread(
+                self.service.webpush,
+                subscription_info=json.loads(subscription_info),
+                data=body,
+                vapid_private_key=self.service.web_push_private_key,
+                vapid_claims=self.service.web_push_claims,
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Web Push send error: {e}")
+            return False
+
+
+class StubPushTransport(PushTransport):
+    """
+    In-memory transport for tests and offline load testing.
+
+    Records every batch, optionally sleeps latency seconds per batch and
+    fails the tokens listed in fail_tokens.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 500,
+        latency: float = 0.0,
+        fail_tokens: Optional[set[str]] = None,
+    ):
+        self.max_batch_size = max_batch_size
+        self.latency = latency
+        self.fail_tokens = fail_tokens or set()
+        self.batches: list[tuple[list[str], PushPayload]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_batch(self, tokens: list[str], payload: PushPayload) -> list[bool]:
+        self.batches.append((list(tokens), payload))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return [token not in self.fail_tokens for token in tokens]
+
+
 class PushNotificationService:
     """
     Push notification service for messenger.
@@ -74,6 +258,8 @@ class PushNotificationService:
         apns_team_id: Optional[str] = None,
         web_push_private_key: Optional[str] = None,
         web_push_claims: Optional[dict] = None,
+        transports: Optional[dict[str, PushTransport]] = None,
+        fanout_concurrency: int = FANOUT_CONCURRENCY,
     ):
         """
         Initialize push notification service.
@@ -85,6 +271,8 @@ class PushNotificationService:
             apns_team_id: Apple Team ID
             web_push_private_key: VAPID private key for Web Push
             web_push_claims: VAPID claims (mailto: or https:)
+            transports: Provider -> PushTransport overrides (fan-out sends)
+            fanout_concurrency: Max provider batches in flight per fan-out
         """
         self.fcm_server_key = fcm_server_key
         self.apns_key_path = apns_key_path
@@ -98,6 +286,15 @@ class PushNotificationService:
         self._init_apns()
         self._init_web_push()
 
+        self.transports: dict[str, PushTransport] = {
+            PushProvider.FCM.value: FCMTransport(self),
+            PushProvider.APNS.value: APNsTransport(self),
+            PushProvider.WEB_PUSH.value: WebPushTransport(self),
+        }
+        if transports:
+            self.transports.update(transports)
+        self.fanout_concurrency = fanout_concurrency
+
     def _init_fcm(self):
         """Initialize Firebase Cloud Messaging client"""
         if not self.fcm_server_key:
@@ -441,6 +638,124 @@ class PushNotificationService:
             "results": results,
         }
 
+    async def send_message_fanout(
+        self,
+        db: AsyncSession,
+        conversation_id: Any,
+        sender_id: int,
+        payload: PushPayload,
+        presence_manager: Any = None,
+    ) -> dict:
+        """
+        Push one message to the devices of all offline, unmuted participants.
+
+        Batched replacement for calling send_push_notification per
+        participant:
+        1. One query joins participants (minus the sender), notification
+           settings and active device tokens
+        2. One pipelined presence lookup drops users who are online
+        3. Tokens are grouped per provider into transport batches, sent with
+           at most fanout_concurrency batches in flight
+        4. last_used_at is bumped for delivered devices in one UPDATE
+
+        Args:
+            db: Database session
+            conversation_id: Conversation UUID
+            sender_id: Message sender (never notified)
+            payload: Notification content
+            presence_manager: PresenceManager override (default: singleton)
+
+        Returns:
+            dict with recipients, skipped_online, devices, success_count, batches
+        """
+        from app.models.messenger_models import DeviceToken
+
+        result = await db.execute(
+            text(
+                """
+                SELECT p.user_id, d.id, d.token, d.provider
+                FROM conversation_participants p
+                JOIN device_tokens d
+                  ON d.user_id = p.user_id AND d.is_active
+                LEFT JOIN notification_settings ns
+                  ON ns.user_id = p.user_id
+                 AND ns.conversation_id = p.conversation_id
+                WHERE p.conversation_id = :conversation_id
+                  AND p.user_id <> :sender_id
+                  AND NOT COALESCE(ns.muted, false)
+                  AND COALESCE(ns.push_enabled, true)
+                """
+            ),
+            {"conversation_id": conversation_id, "sender_id": sender_id},
+        )
+        rows = result.all()
+        if not rows:
+            return {
+                "status": "no_devices",
+                "recipients": 0,
+                "skipped_online": 0,
+                "devices": 0,
+                "success_count": 0,
+                "batches": 0,
+            }
+
+        user_ids = list(dict.fromkeys(row[0] for row in rows))
+        if presence_manager is None:
+            from app.messenger.presence import get_presence_manager
+
+            presence_manager = get_presence_manager()
+        statuses = await presence_manager.get_statuses(user_ids)
+        online = {uid for uid, status in statuses.items() if status == "online"}
+
+        # provider -> [(device_id, token), ...] for offline recipients
+        by_provider: dict[str, list[tuple[int, str]]] = {}
+        for user_id, device_id, token, provider in rows:
+            if user_id not in online:
+                by_provider.setdefault(provider, []).append((device_id, token))
+
+        batches: list[tuple[PushTransport, list[tuple[int, str]]]] = []
+        for provider, devices in by_provider.items():
+            transport = self.transports.get(provider)
+            if transport is None:
+                logger.warning(f"Unknown provider: {provider}")
+                continue
+            size = max(1, transport.max_batch_size)
+            for i in range(0, len(devices), size):
+                batches.append((transport, devices[i : i + size]))
+
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+
+        async def send(transport: PushTransport, devices: list[tuple[int, str]]):
+            async with semaphore:
+                try:
+                    flags = await transport.send_batch(
+                        [token for _, token in devices], payload
+                    )
+                except Exception as e:
+                    logger.error(f"Push batch error ({len(devices)} devices): {e}")
+                    flags = [False] * len(devices)
+            return [device_id for (device_id, _), ok in zip(devices, flags) if ok]
+
+        sent = await asyncio.gather(*(send(t, devices) for t, devices in batches))
+        delivered = [device_id for ids in sent for device_id in ids]
+
+        if delivered:
+            await db.execute(
+                update(DeviceToken)
+                .where(DeviceToken.id.in_(delivered))
+                .values(last_used_at=func.now())
+            )
+            await db.commit()
+
+        return {
+            "status": "sent",
+            "recipients": len(user_ids) - len(online),
+            "skipped_online": len(online),
+            "devices": sum(len(devices) for _, devices in batches),
+            "success_count": len(delivered),
+            "batches": len(batches),
+        }
+
     async def _send_fcm(
         self,
         token: str,
@@ -3,13 +3,24 @@ Message Reactions Service
 
 This module handles emoji reactions on messages for the messenger system.
 Supports adding, removing, and querying emoji reactions with Unicode support.
+
+Reaction summaries (emoji -> count per message) are cached in Redis hashes
+(reactions:summary:{message_id}). Reads fill missing summaries from one
+grouped query; add/remove/toggle adjust cached counts incrementally after
+their commit. A summary filled concurrently with a write may be stale
+until it expires.
+
+Environment:
+    REACTION_SUMMARY_TTL: Seconds a cached summary lives (default: 3600)
 """
 
 import logging
-from typing import Dict, List, Optional
+import os
+from typing import Any, Dict, Iterable, List, Optional
 from uuid import UUID
 
 from sqlalchemy import and_, desc, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.messenger_models import (
@@ -20,6 +31,31 @@ from app.models.messenger_models import (
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_KEY_PREFIX = "reactions:summary:"
+SUMMARY_TTL_SECONDS = int(os.getenv("REACTION_SUMMARY_TTL", "3600"))
+
+# Messages per bulk reactions request (one chat page)
+MAX_BULK_MESSAGES = 100
+
+# Present in every filled summary hash, so messages without reactions are
+# cached too
+_FILLED_FIELD = ""
+
+# KEYS[1] = summary hash; ARGV = emoji, delta, ttl.
+# Only adjusts summaries that are already cached: a partial hash would
+# otherwise pass for the full summary.
+_SUMMARY_INCR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local count = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if count <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
 
 # Popular emoji mappings (shortcode -> unicode)
 EMOJI_MAP = {
@@ -130,6 +166,118 @@ EMOJI_MAP = {
 }
 
 
+class ReactionSummaryCache:
+    """
+    Write-through cache of per-message reaction counts.
+
+    Redis Data Structures:
+    - reactions:summary:{message_id} -> HASH {emoji: count, "": 1}
+
+    Cache errors are logged and treated as misses; the database stays the
+    source of truth.
+    """
+
+    def __init__(self, redis_client=None, ttl_seconds: int = SUMMARY_TTL_SECONDS):
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._script: Optional[Any] = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.core.redis import get_redis
+
+            self._redis = get_redis()
+        return self._redis
+
+    @staticmethod
+    def _key(message_id: UUID) -> str:
+        return f"{SUMMARY_KEY_PREFIX}{message_id}"
+
+    async def get_many(self, message_ids: List[UUID]) -> Dict[UUID, Dict[str, int]]:
+        """
+        Cached summaries for the given messages (one pipelined round trip).
+
+        Returns:
+            {message_id: {emoji: count}} for cached messages only
+        """
+        if not message_ids:
+            return {}
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for message_id in message_ids:
+                pipe.hgetall(self._key(message_id))
+            results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Reaction summary cache read failed: {e}")
+            return {}
+
+        cached: Dict[UUID, Dict[str, int]] = {}
+        for message_id, fields in zip(message_ids, results):
+            if not fields or _FILLED_FIELD not in fields:
+                continue
+            cached[message_id] = {
+                emoji: int(count)
+                for emoji, count in fields.items()
+                if emoji != _FILLED_FIELD
+            }
+        return cached
+
+    async def set_many(self, summaries: Dict[UUID, Dict[str, int]]) -> None:
+        """Store full summaries (including empty ones) with the cache TTL."""
+        if not summaries:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for message_id, counts in summaries.items():
+                key = self._key(message_id)
+                pipe.delete(key)
+                pipe.hset(key, mapping={_FILLED_FIELD: 1, **counts})
+                pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Reaction summary cache write failed: {e}")
+
+    async def incr(self, message_id: UUID, emoji: str, delta: int) -> None:
+        """Adjust one emoji count of a cached summary (no-op if not cached)."""
+        try:
+            if self._script is None:
+                self._script = self.redis.register_script(_SUMMARY_INCR_SCRIPT)
+            await self._script(
+                keys=[self._key(message_id)], args=[emoji, delta, self.ttl_seconds]
+            )
+        except Exception as e:
+            logger.warning(f"Reaction summary cache update failed: {e}")
+            await self.invalidate(message_id)
+
+    async def invalidate(self, message_id: UUID) -> None:
+        """Drop a cached summary (next read refills it)."""
+        try:
+            await self.redis.delete(self._key(message_id))
+        except Exception as e:
+            logger.warning(f"Reaction summary cache invalidate failed: {e}")
+
+
+_summary_cache: Optional[ReactionSummaryCache] = None
+
+
+def get_reaction_summary_cache() -> ReactionSummaryCache:
+    """Get singleton instance of ReactionSummaryCache."""
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = ReactionSummaryCache()
+    return _summary_cache
+
+
+def _summary_entry(emoji: str, count: int, user_reacted: bool) -> Dict:
+    return {
+        "emoji": emoji,
+        "emoji_unicode": EMOJI_MAP.get(emoji, emoji),
+        "count": count,
+        "user_reacted": user_reacted,
+    }
+
+
 class ReactionsService:
     """
     Service for managing message reactions.
@@ -216,6 +364,7 @@ class ReactionsService:
         db.add(reaction)
         await db.commit()
         await db.refresh(reaction)
+        await get_reaction_summary_cache().incr(message_id, emoji, 1)
 
         logger.info(f"Added reaction {emoji} to message {message_id} by user {user_id}")
 
@@ -257,6 +406,7 @@ class ReactionsService:
 
         await db.delete(reaction)
         await db.commit()
+        await get_reaction_summary_cache().incr(message_id, emoji, -1)
 
         logger.info(
             f"Removed reaction {emoji} from message {message_id} by user {user_id}"
@@ -299,6 +449,7 @@ class ReactionsService:
             # Remove
             await db.delete(existing)
             await db.commit()
+            await get_reaction_summary_cache().incr(message_id, emoji, -1)
 
             return {
                 "action": "removed",
@@ -345,60 +496,198 @@ class ReactionsService:
         Raises:
             ValueError: If user is not a participant
         """
-        # Verify message exists
-        message_result = await db.execute(
-            select(Message).where(Message.id == message_id)
-        )
-        message = message_result.scalar_one_or_none()
-
-        if not message:
-            raise ValueError(f"Message {message_id} not found")
-
-        # Verify user is participant
-        participant_result = await db.execute(
-            select(ConversationParticipant).where(
+        # Message and the caller's participation in one round trip
+        access_result = await db.execute(
+            select(
+                Message.id,
+                ConversationParticipant.user_id.label("participant_id"),
+            )
+            .outerjoin(
+                ConversationParticipant,
                 and_(
-                    ConversationParticipant.conversation_id == message.conversation_id,
+                    ConversationParticipant.conversation_id == Message.conversation_id,
                     ConversationParticipant.user_id == user_id,
-                )
+                ),
             )
+            .where(Message.id == message_id)
         )
-        if not participant_result.scalar_one_or_none():
+        access = access_result.first()
+
+        if access is None:
+            raise ValueError(f"Message {message_id} not found")
+        if access.participant_id is None:
             raise ValueError("User is not a participant")
 
-        # Get all reactions
+        # Group by emoji in the database (first used emoji first)
+        first_reacted_at = func.min(MessageReaction.created_at)
         reactions_result = await db.execute(
-            select(MessageReaction)
+            select(
+                MessageReaction.emoji,
+                func.max(MessageReaction.emoji_unicode).label("emoji_unicode"),
+                func.count(MessageReaction.id).label("reactions"),
+                func.array_agg(
+                    aggregate_order_by(
+                        MessageReaction.user_id, MessageReaction.created_at
+                    )
+                ).label("users"),
+            )
             .where(MessageReaction.message_id == message_id)
-            .order_by(MessageReaction.created_at)
+            .group_by(MessageReaction.emoji)
+            .order_by(first_reacted_at)
         )
-        reactions = reactions_result.scalars().all()
-
-        # Group by emoji
-        grouped: Dict[str, Dict] = {}
-
-        for reaction in reactions:
-            if reaction.emoji not in grouped:
-                grouped[reaction.emoji] = {
-                    "emoji": reaction.emoji,
-                    "emoji_unicode": reaction.emoji_unicode,
-                    "count": 0,
-                    "users": [],
-                    "user_reacted": False,
-                }
+        rows = reactions_result.all()
 
-            grouped[reaction.emoji]["count"] += 1
-            grouped[reaction.emoji]["users"].append(reaction.user_id)
+        await get_reaction_summary_cache().set_many(
+            {message_id: {row.emoji: row.reactions for row in rows}}
+        )
 
-            if reaction.user_id == user_id:
-                grouped[reaction.emoji]["user_reacted"] = True
+        grouped = [
+            {
+                "emoji": row.emoji,
+                "emoji_unicode": row.emoji_unicode,
+                "count": row.reactions,
+                "users": list(row.users),
+                "user_reacted": user_id in row.users,
+            }
+            for row in rows
+        ]
 
         return {
             "message_id": str(message_id),
-            "total_reactions": len(reactions),
-            "reactions": list(grouped.values()),
+            "total_reactions": sum(row.reactions for row in rows),
+            "reactions": grouped,
         }
 
+    @staticmethod
+    async def get_reactions_for_messages(
+        db: AsyncSession,
+        conversation_id: UUID,
+        message_ids: Iterable[UUID],
+        user_id: int,
+    ) -> Dict[str, Dict]:
+        """
+        Get reaction summaries for many messages of one conversation.
+
+        Counts come from the summary cache; messages missing from it are
+        counted with one grouped query (which also yields user_reacted) and
+        cached. For cached messages the caller's own reactions are read in
+        one indexed query.
+
+        Args:
+            db: Database session
+            conversation_id: Conversation the messages belong to
+            message_ids: Message IDs (at most MAX_BULK_MESSAGES)
+            user_id: ID of the requesting user
+
+        Returns:
+            {message_id: {message_id, total_reactions, reactions: [{emoji,
+            emoji_unicode, count, user_reacted}]}}; message IDs outside the
+            conversation are omitted
+
+        Raises:
+            ValueError: Too many messages, or user is not a participant
+        """
+        message_ids = list(dict.fromkeys(message_ids))
+        if len(message_ids) > MAX_BULK_MESSAGES:
+            raise ValueError(
+                f"At most {MAX_BULK_MESSAGES} messages per reactions request"
+            )
+        if not message_ids:
+            return {}
+
+        participant_result = await db.execute(
+            select(ConversationParticipant.user_id).where(
+                and_(
+                    ConversationParticipant.conversation_id == conversation_id,
+                    ConversationParticipant.user_id == user_id,
+                )
+            )
+        )
+        if participant_result.scalar_one_or_none() is None:
+            raise ValueError("User is not a participant")
+
+        cache = get_reaction_summary_cache()
+        cached = await cache.get_many(message_ids)
+        misses = [m for m in message_ids if m not in cached]
+        hits = [m for m in message_ids if m in cached]
+
+        # message_id -> {emoji: count}, only for messages in the conversation
+        counts: Dict[UUID, Dict[str, int]] = {}
+        reacted: Dict[UUID, set] = {}
+
+        if misses:
+            # Outer join: messages without reactions still yield a row
+            result = await db.execute(
+                select(
+                    Message.id,
+                    MessageReaction.emoji,
+                    func.count(MessageReaction.id).label("reactions"),
+                    func.bool_or(MessageReaction.user_id == user_id).label(
+                        "user_reacted"
+                    ),
+                )
+                .select_from(Message)
+                .outerjoin(MessageReaction, MessageReaction.message_id == Message.id)
+                .where(
+                    and_(
+                        Message.id.in_(misses),
+                        Message.conversation_id == conversation_id,
+                    )
+                )
+                .group_by(Message.id, MessageReaction.emoji)
+            )
+            for row in result.all():
+                message_counts = counts.setdefault(row.id, {})
+                if row.emoji is None:
+                    continue
+                message_counts[row.emoji] = row.reactions
+                if row.user_reacted:
+                    reacted.setdefault(row.id, set()).add(row.emoji)
+
+            await cache.set_many(counts)
+
+        if hits:
+            # Scope check and the caller's own reactions for cached messages
+            result = await db.execute(
+                select(Message.id, MessageReaction.emoji)
+                .select_from(Message)
+                .outerjoin(
+                    MessageReaction,
+                    and_(
+                        MessageReaction.message_id == Message.id,
+                        MessageReaction.user_id == user_id,
+                    ),
+                )
+                .where(
+                    and_(
+                        Message.id.in_(hits),
+                        Message.conversation_id == conversation_id,
+                    )
+                )
+            )
+            for row in result.all():
+                counts[row.id] = cached[row.id]
+                if row.emoji is not None:
+                    reacted.setdefault(row.id, set()).add(row.emoji)
+
+        summaries: Dict[str, Dict] = {}
+        for message_id in message_ids:
+            if message_id not in counts:
+                continue
+            message_counts = counts[message_id]
+            own = reacted.get(message_id, set())
+            summaries[str(message_id)] = {
+                "message_id": str(message_id),
+                "total_reactions": sum(message_counts.values()),
+                "reactions": [
+                    _summary_entry(emoji, count, emoji in own)
+                    for emoji, count in sorted(
+                        message_counts.items(), key=lambda item: (-item[1], item[0])
+                    )
+                ],
+            }
+        return summaries
+
     @staticmethod
     async def get_user_reactions(
         db: AsyncSession,
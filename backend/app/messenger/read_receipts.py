@@ -0,0 +1,383 @@
+"""
+Write-coalescing read receipt aggregator
+
+message.read events arrive at scroll speed (dozens per second per active
+reader). Writing each one (three SELECTs, an INSERT and a commit in a fresh
+session) made receipts a larger write load than messages themselves.
+
+The aggregator buffers (user_id, message_id) pairs in memory and flushes
+them on an interval. Each flush:
+
+1. Resolves the buffered message ids in one query, dropping unknown or
+   deleted messages and users who are not participants, and keeps only the
+   newest message per (user, conversation): the "read up to" high-water mark
+2. Upserts one ReadReceipt per high-water mark (single statement)
+3. Advances ConversationParticipant.last_read_at (single UPDATE ... FROM
+   unnest) and the inbox watermarks/unread counts (InboxService.mark_read_many)
+4. Commits once, then broadcasts one coalesced message.read event per
+   (user, conversation)
+
+Environment:
+    READ_RECEIPT_FLUSH_INTERVAL: Seconds between flushes (default: 1.0)
+    READ_RECEIPT_MAX_PENDING: Buffered events that trigger an early flush;
+        also the most events kept while flushes fail (default: 5000)
+
+Usage:
+    from app.messenger.read_receipts import get_read_receipt_aggregator
+
+    await get_read_receipt_aggregator().record(user_id, message_id)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.messenger.inbox import get_inbox_service
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = float(os.getenv("READ_RECEIPT_FLUSH_INTERVAL", "1.0"))
+MAX_PENDING = int(os.getenv("READ_RECEIPT_MAX_PENDING", "5000"))
+
+
+@dataclass(frozen=True)
+class ReadMark:
+    """Coalesced "read up to" position of one user in one conversation."""
+
+    user_id: int
+    conversation_id: uuid.UUID
+    message_id: uuid.UUID
+    created_at: datetime
+
+
+class ReadReceiptAggregator:
+    """
+    Buffers read receipts and writes them in coalesced batches.
+
+    record() is O(1) and never touches the database; a background task
+    calls flush() every flush_interval seconds (or sooner once max_pending
+    events are buffered).
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Any]] = None,
+        pubsub: Any = None,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING,
+    ):
+        self._session_factory = session_factory
+        self._pubsub = pubsub
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # user_id -> message ids read since the last flush (insertion ordered)
+        self._pending: dict[int, dict[uuid.UUID, None]] = {}
+        self._pending_count = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Stats
+        self.events_received = 0
+        self.marks_written = 0
+        self.flushes = 0
+        self.events_dropped = 0
+
+    # ========================================================================
+    # Public API
+    # ========================================================================
+
+    async def record(self, user_id: int, message_id: uuid.UUID) -> None:
+        """
+        Buffer a message.read event.
+
+        Validation (message exists, user is a participant) happens at flush;
+        invalid events are dropped there.
+        """
+        self._ensure_running()
+
+        messages = self._pending.setdefault(user_id, {})
+        if message_id not in messages:
+            messages[message_id] = None
+            self._pending_count += 1
+        self.events_received += 1
+
+        if self._pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> list[ReadMark]:
+        """
+        Write all buffered receipts now.
+
+        Returns:
+            The coalesced read marks that were written
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return []
+
+            batch, self._pending = self._pending, {}
+            self._pending_count = 0
+
+            try:
+                marks = await self._write(batch)
+            except Exception as e:
+                logger.error(f"Read receipt flush failed, requeueing: {e}")
+                self._requeue(batch)
+                return []
+
+            self.flushes += 1
+            self.marks_written += len(marks)
+
+        await self._broadcast(marks)
+        return marks
+
+    async def start(self) -> None:
+        """Start the background flush loop (idempotent)."""
+        self._ensure_running()
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task is not None:
+            # Signalled rather than cancelled: wait_for() can swallow a
+            # cancel that races with the wakeup event
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+    def get_stats(self) -> dict[str, int]:
+        """Aggregator counters (for monitoring)."""
+        return {
+            "pending_events": self._pending_count,
+            "events_received": self.events_received,
+            "marks_written": self.marks_written,
+            "flushes": self.flushes,
+            "events_dropped": self.events_dropped,
+        }
+
+    # ========================================================================
+    # Flush internals
+    # ========================================================================
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in read receipt flush loop: {e}")
+
+    def _requeue(self, batch: dict[int, dict[uuid.UUID, None]]) -> None:
+        """
+        Put a failed batch back ahead of newer events.
+
+        At most max_pending events are kept; the oldest are dropped so a
+        long database outage cannot grow the buffer without bound.
+        """
+        merged = batch
+        for user_id, messages in self._pending.items():
+            merged.setdefault(user_id, {}).update(messages)
+        count = sum(len(messages) for messages in merged.values())
+
+        overflow = count - self.max_pending
+        dropped = 0
+        for user_id in list(merged):
+            if dropped >= overflow:
+                break
+            messages = merged[user_id]
+            while messages and dropped < overflow:
+                del messages[next(iter(messages))]
+                dropped += 1
+            if not messages:
+                del merged[user_id]
+
+        self._pending = merged
+        self._pending_count = count - dropped
+        if dropped:
+            self.events_dropped += dropped
+            logger.warning(
+                f"Read receipt buffer full, dropped {dropped} oldest events "
+                f"({self.events_dropped} total)"
+            )
+
+    async def _write(self, batch: dict[int, dict[uuid.UUID, None]]) -> list[ReadMark]:
+        user_ids: list[int] = []
+        message_ids: list[uuid.UUID] = []
+        for user_id, messages in batch.items():
+            for message_id in messages:
+                user_ids.append(user_id)
+                message_ids.append(message_id)
+
+        async with self._new_session() as db:
+            marks = await self._resolve_marks(db, user_ids, message_ids)
+            if not marks:
+                return []
+
+            await self._write_marks(db, marks)
+            await db.commit()
+        return marks
+
+    async def _resolve_marks(
+        self,
+        db: AsyncSession,
+        user_ids: list[int],
+        message_ids: list[uuid.UUID],
+    ) -> list[ReadMark]:
+        """Validate buffered events and reduce them to one mark per (user, conversation)."""
+        result = await db.execute(
+            text(
+                """
+                SELECT DISTINCT ON (r.user_id, m.conversation_id)
+                    r.user_id, m.conversation_id, m.id, m.created_at
+                FROM unnest(
+                    CAST(:user_ids AS integer[]),
+                    CAST(:message_ids AS uuid[])
+                ) AS r(user_id, message_id)
+                JOIN messages m
+                  ON m.id = r.message_id AND m.deleted_at IS NULL
+                JOIN conversation_participants p
+                  ON p.conversation_id = m.conversation_id
+                 AND p.user_id = r.user_id
+                ORDER BY r.user_id, m.conversation_id, m.created_at DESC, m.id DESC
+                """
+            ),
+            {"user_ids": user_ids, "message_ids": message_ids},
+        )
+        return [
+            ReadMark(
+                user_id=row[0],
+                conversation_id=row[1],
+                message_id=row[2],
+                created_at=row[3],
+            )
+            for row in result.all()
+        ]
+
+    async def _write_marks(self, db: AsyncSession, marks: list[ReadMark]) -> None:
+        now = datetime.now(timezone.utc)
+        user_ids = [m.user_id for m in marks]
+
+        await db.execute(
+            text(
+                """
+                INSERT INTO read_receipts (id, message_id, user_id, read_at)
+                SELECT v.id, v.message_id, v.user_id, :read_at
+                FROM unnest(
+                    CAST(:ids AS uuid[]),
+                    CAST(:message_ids AS uuid[]),
+                    CAST(:user_ids AS integer[])
+                ) AS v(id, message_id, user_id)
+                ON CONFLICT (message_id, user_id) DO NOTHING
+                """
+            ),
+            {
+                "ids": [uuid.uuid4() for _ in marks],
+                "message_ids": [m.message_id for m in marks],
+                "user_ids": user_ids,
+                "read_at": now,
+            },
+        )
+
+        # last_read_at is the created_at of the newest read message
+        await db.execute(
+            text(
+                """
+                UPDATE conversation_participants p
+                SET last_read_at = GREATEST(p.last_read_at, v.read_through)
+                FROM unnest(
+                    CAST(:user_ids AS integer[]),
+                    CAST(:conversation_ids AS uuid[]),
+                    CAST(:read_through AS timestamptz[])
+                ) AS v(user_id, conversation_id, read_through)
+                WHERE p.user_id = v.user_id
+                  AND p.conversation_id = v.conversation_id
+                """
+            ),
+            {
+                "user_ids": user_ids,
+                "conversation_ids": [m.conversation_id for m in marks],
+                "read_through": [m.created_at for m in marks],
+            },
+        )
+
+        await get_inbox_service().mark_read_many(
+            db, [(m.user_id, m.conversation_id, m.created_at) for m in marks]
+        )
+
+    async def _broadcast(self, marks: list[ReadMark]) -> None:
+        if not marks:
+            return
+
+        from app.messenger.analytics import AnalyticsEventType, get_analytics_service
+
+        pubsub = self._pubsub
+        if pubsub is None:
+            from app.messenger.pubsub import get_pubsub
+
+            pubsub = get_pubsub()
+        analytics = get_analytics_service()
+
+        for mark in marks:
+            try:
+                await pubsub.publish_message(
+                    conversation_id=mark.conversation_id,
+                    message_data={
+                        "type": "message.read",
+                        "message_id": str(mark.message_id),
+                        "user_id": mark.user_id,
+                        "conversation_id": str(mark.conversation_id),
+                        "read_through": mark.created_at.isoformat(),
+                    },
+                )
+                await analytics.track_event(
+                    event_type=AnalyticsEventType.MESSAGE_READ,
+                    user_id=mark.user_id,
+                    conversation_id=str(mark.conversation_id),
+                    metadata={"message_id": str(mark.message_id)},
+                )
+            except Exception as e:
+                logger.error(f"Failed to broadcast read receipt: {e}")
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+
+# Singleton instance
+_read_receipt_aggregator: Optional[ReadReceiptAggregator] = None
+
+
+def get_read_receipt_aggregator() -> ReadReceiptAggregator:
+    """Get singleton instance of ReadReceiptAggregator."""
+    global _read_receipt_aggregator
+    if _read_receipt_aggregator is None:
+        _read_receipt_aggregator = ReadReceiptAggregator()
+    return _read_receipt_aggregator
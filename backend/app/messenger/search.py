@@ -10,10 +10,13 @@ Provides full-text search and filtering capabilities:
 - PostgreSQL full-text search with tsvector
 
 Features:
-- Full-text search with stemming and ranking
+- Full-text search with stemming and ranking over the stored, GIN-indexed
+  messages.content_tsv column (generated from content, so it stays in sync
+  on insert and edit)
 - Filter by conversation, user, date range, message type
-- Search result pagination
-- Highlight search terms in results
+- Keyset pagination with opaque cursors on (rank, created_at, id)
+- Capped total counts (counting stops at SEARCH_COUNT_CAP)
+- Bounded-cost highlighted snippets
 - Sort by relevance or date
 - Autocomplete suggestions
 """
@@ -21,15 +24,70 @@ Features:
 from __future__ import annotations
 
 import logging
+import re
+import uuid
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import and_, func, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.messenger.cursors import decode_cursor, encode_cursor
+
 logger = logging.getLogger(__name__)
 
+# Counting stops after this many matches (reported as total_count_capped)
+SEARCH_COUNT_CAP = 1000
+
+# Snippet generation bounds
+SNIPPET_CHARS = 200
+SNIPPET_SCAN_CHARS = 10_000
+MAX_HIGHLIGHT_TERMS = 8
+
+# Stored tsvector maintained by the database (migration 007_fulltext_search)
+CONTENT_TSV = literal_column("messages.content_tsv", type_=TSVECTOR)
+
+
+def encode_search_cursor(
+    sort_by: "SortOrder", rank: Optional[float], created_at: datetime, message_id: Any
+) -> str:
+    """Opaque cursor for the row after which the next page starts."""
+    return encode_cursor(
+        {
+            "s": sort_by.value,
+            "r": rank,
+            "t": created_at.isoformat(),
+            "i": str(message_id),
+        }
+    )
+
+
+def decode_search_cursor(cursor: str, sort_by: "SortOrder") -> dict:
+    """
+    Decode an opaque search cursor.
+
+    Raises:
+        ValueError: Malformed cursor or cursor issued for a different sort order
+    """
+    payload = decode_cursor(cursor)
+    try:
+        decoded = {
+            "sort_by": payload["s"],
+            "rank": float(payload["r"]) if payload["r"] is not None else None,
+            "created_at": datetime.fromisoformat(payload["t"]),
+            "id": uuid.UUID(payload["i"]),
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid search cursor") from e
+
+    if decoded["sort_by"] != sort_by.value:
+        raise ValueError("Search cursor does not match sort order")
+    if sort_by == SortOrder.RELEVANCE and decoded["rank"] is None:
+        raise ValueError("Invalid search cursor")
+    return decoded
+
 
 class SearchType(str, Enum):
     """Search type"""
@@ -89,10 +147,17 @@ class SearchService:
         sort_by: SortOrder = SortOrder.RELEVANCE,
         limit: int = 50,
         offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> dict:
         """
         Search messages with full-text search and filters.
 
+        Matches against the stored content_tsv column (GIN index) and pages
+        with a keyset on (rank, created_at, id) for relevance or
+        (created_at, id) for date sorts. Pass the returned next_cursor to
+        fetch the following page; offset is kept for older clients and is
+        ignored when a cursor is given.
+
         Args:
             db: Database session
             query: Search query string
@@ -104,10 +169,15 @@ class SearchService:
             end_date: Optional end date filter
             sort_by: Sort order (relevance, date_desc, date_asc)
             limit: Maximum results to return
-            offset: Pagination offset
+            offset: Pagination offset (deprecated, use cursor)
+            cursor: Opaque cursor from a previous page's next_cursor
 
         Returns:
-            dict with search results and metadata
+            dict with search results and metadata; total_count stops at
+            SEARCH_COUNT_CAP (total_count_capped is then True)
+
+        Raises:
+            ValueError: Invalid cursor
         """
         from app.models.messenger_models import (
             Conversation,
@@ -117,19 +187,33 @@ class SearchService:
         from app.models.user import User
         import uuid
 
-        # Build base query
-        # Use PostgreSQL full-text search with ts_rank for relevance
-        search_query = func.to_tsquery(
-            "english", func.plainto_tsquery("english", query)
-        )
-        search_vector = func.to_tsvector("english", Message.content)
+        after = decode_search_cursor(cursor, sort_by) if cursor else None
+
+        # Rank against the stored tsvector instead of re-parsing content per row
+        search_query = func.plainto_tsquery("english", query)
+        rank = func.ts_rank(CONTENT_TSV, search_query).label("rank")
+
+        filters = [
+            CONTENT_TSV.op("@@")(search_query),
+            Message.deleted_at.is_(None),
+        ]
+        if conversation_id:
+            filters.append(Message.conversation_id == uuid.UUID(conversation_id))
+        if sender_id:
+            filters.append(Message.sender_id == sender_id)
+        if message_type:
+            filters.append(Message.message_type == message_type.value)
+        if start_date:
+            filters.append(Message.created_at >= start_date)
+        if end_date:
+            filters.append(Message.created_at <= end_date)
 
         base_query = (
             select(
                 Message,
-                User.username.label("sender_username"),
+                User.full_name.label("sender_username"),
                 Conversation.title.label("conversation_title"),
-                func.ts_rank(search_vector, search_query).label("rank"),
+                rank,
             )
             .join(User, Message.sender_id == User.id, isouter=True)
             .join(Conversation, Message.conversation_id == Conversation.id)
@@ -140,57 +224,63 @@ class SearchService:
                     ConversationParticipant.user_id == user_id,
                 ),
             )
-            .where(
-                and_(
-                    search_vector.op("@@")(search_query),
-                    Message.deleted_at.is_(None),
-                )
-            )
+            .where(and_(*filters))
         )
 
-        # Apply filters
-        if conversation_id:
-            base_query = base_query.where(
-                Message.conversation_id == uuid.UUID(conversation_id)
-            )
-
-        if sender_id:
-            base_query = base_query.where(Message.sender_id == sender_id)
-
-        if message_type:
-            base_query = base_query.where(Message.message_type == message_type.value)
-
-        if start_date:
-            base_query = base_query.where(Message.created_at >= start_date)
-
-        if end_date:
-            base_query = base_query.where(Message.created_at <= end_date)
+        # Capped count: stop scanning after SEARCH_COUNT_CAP + 1 matches
+        count_query = select(func.count()).select_from(
+            base_query.with_only_columns(Message.id)
+            .limit(SEARCH_COUNT_CAP + 1)
+            .subquery()
+        )
+        count_result = await db.execute(count_query)
+        matched = count_result.scalar() or 0
+        total_count = min(matched, SEARCH_COUNT_CAP)
 
-        # Apply sorting
+        # Keyset ordering and seek predicate
         if sort_by == SortOrder.RELEVANCE:
-            base_query = base_query.order_by(
-                func.ts_rank(search_vector, search_query).desc()
+            page_query = base_query.order_by(
+                rank.desc(), Message.created_at.desc(), Message.id.desc()
             )
+            if after:
+                page_query = page_query.where(
+                    tuple_(
+                        func.ts_rank(CONTENT_TSV, search_query),
+                        Message.created_at,
+                        Message.id,
+                    )
+                    < tuple_(
+                        after["rank"], after["created_at"], after["id"]
+                    )
+                )
         elif sort_by == SortOrder.DATE_DESC:
-            base_query = base_query.order_by(Message.created_at.desc())
+            page_query = base_query.order_by(
+                Message.created_at.desc(), Message.id.desc()
+            )
+            if after:
+                page_query = page_query.where(
+                    tuple_(Message.created_at, Message.id)
+                    < tuple_(after["created_at"], after["id"])
+                )
         else:  # DATE_ASC
-            base_query = base_query.order_by(Message.created_at.asc())
-
-        # Get total count (without pagination)
-        count_query = select(func.count()).select_from(
-            base_query.with_only_columns(Message.id).subquery()
-        )
-        count_result = await db.execute(count_query)
-        total_count = count_result.scalar() or 0
+            page_query = base_query.order_by(Message.created_at.asc(), Message.id.asc())
+            if after:
+                page_query = page_query.where(
+                    tuple_(Message.created_at, Message.id)
+                    > tuple_(after["created_at"], after["id"])
+                )
 
-        # Apply pagination
-        paginated_query = base_query.limit(limit).offset(offset)
+        if not after and offset:
+            page_query = page_query.offset(offset)
 
-        # Execute query
-        result = await db.execute(paginated_query)
+        # Fetch one extra row to learn whether another page exists
+        result = await db.execute(page_query.limit(limit + 1))
         rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
         # Format results
+        terms_pattern = self._terms_pattern(query)
         messages = []
         for row in rows:
             message = row.Message
@@ -212,19 +302,31 @@ class SearchService:
                     "relevance": (
                         float(row.rank) if sort_by == SortOrder.RELEVANCE else None
                     ),
-                    "highlighted_content": self._highlight_terms(
-                        message.content, query
+                    "highlighted_content": self._build_snippet(
+                        message.content, terms_pattern
                     ),
                 }
             )
 
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = encode_search_cursor(
+                sort_by,
+                float(last.rank) if sort_by == SortOrder.RELEVANCE else None,
+                last.Message.created_at,
+                last.Message.id,
+            )
+
         return {
             "query": query,
             "total_count": total_count,
+            "total_count_capped": matched > SEARCH_COUNT_CAP,
             "results": messages,
             "limit": limit,
             "offset": offset,
-            "has_more": offset + len(messages) < total_count,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
         }
 
     async def search_messages_simple(
@@ -281,6 +383,7 @@ class SearchService:
 
         result = await db.execute(messages_query)
         messages = result.scalars().all()
+        terms_pattern = self._terms_pattern(query)
 
         return [
             {
@@ -288,7 +391,7 @@ class SearchService:
                 "content": msg.content,
                 "sender_id": msg.sender_id,
                 "created_at": msg.created_at.isoformat(),
-                "highlighted_content": self._highlight_terms(msg.content or "", query),
+                "highlighted_content": self._build_snippet(msg.content, terms_pattern),
             }
             for msg in messages
         ]
@@ -672,6 +775,28 @@ class SearchService:
     # Helper Methods
     # ========================================================================
 
+    def _terms_pattern(self, query: str) -> Optional[re.Pattern]:
+        """
+        Compile query terms into one alternation (longest first).
+
+        At most MAX_HIGHLIGHT_TERMS distinct terms of 2+ characters are used,
+        so matching cost does not grow with the query.
+        """
+        if not query:
+            return None
+
+        terms: list[str] = []
+        for word in query.lower().split():
+            if len(word) >= 2 and word not in terms:  # Skip very short words
+                terms.append(word)
+            if len(terms) == MAX_HIGHLIGHT_TERMS:
+                break
+        if not terms:
+            return None
+
+        terms.sort(key=len, reverse=True)
+        return re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+
     def _highlight_terms(self, text: str, query: str) -> str:
         """
         Highlight search terms in text.
@@ -686,24 +811,51 @@ class SearchService:
         if not text or not query:
             return text
 
-        # Simple case-insensitive highlighting
-        # Split query into words
-        words = query.lower().split()
+        pattern = self._terms_pattern(query)
+        if pattern is None:
+            return text
+
+        # Single pass over the text for all terms
+        return pattern.sub(lambda m: f"<mark>{m.group()}</mark>", text)
+
+    def _build_snippet(
+        self,
+        text: Optional[str],
+        pattern: Optional[re.Pattern],
+        max_chars: int = SNIPPET_CHARS,
+    ) -> Optional[str]:
+        """
+        Highlighted window of at most max_chars around the first match.
 
-        highlighted = text
-        for word in words:
-            if len(word) < 2:  # Skip very short words
-                continue
+        Only the first SNIPPET_SCAN_CHARS characters are searched and only
+        the window is highlighted, so cost is bounded regardless of message
+        length. Truncation is marked with an ellipsis.
 
-            # Find and replace (case-insensitive)
-            import re
+        Args:
+            text: Message content
+            pattern: Compiled terms from _terms_pattern
+            max_chars: Window size in characters
 
-            pattern = re.compile(re.escape(word), re.IGNORECASE)
-            highlighted = pattern.sub(
-                lambda m: f"<mark>{m.group()}</mark>", highlighted
-            )
+        Returns:
+            Snippet with <mark> tags, or the text itself if empty
+        """
+        if not text:
+            return text
+
+        match = pattern.search(text, 0, SNIPPET_SCAN_CHARS) if pattern else None
+        if match is None:
+            start = 0
+        else:
+            # Center the window on the first match
+            start = max(0, match.start() - (max_chars - len(match.group())) // 2)
+        start = max(0, min(start, len(text) - max_chars))
+        end = min(len(text), start + max_chars)
+
+        window = text[start:end]
+        if pattern is not None:
+            window = pattern.sub(lambda m: f"<mark>{m.group()}</mark>", window)
 
-        return highlighted
+        return f"{'…' if start > 0 else ''}{window}{'…' if end < len(text) else ''}"
 
 
 # Singleton instance
@@ -15,21 +15,39 @@ Features:
 - Video thumbnail extraction (ffmpeg)
 - CDN URL generation
 - File cleanup (orphaned files)
+
+Upload pipeline:
+- Uploads are streamed in chunks to a temp file while being hashed and
+  size-checked; the whole file is never held in memory
+- Storage is content-addressed by SHA-256 (blobs/ab/<sha256>.ext), so
+  re-uploading the same bytes skips the write; a clean virus scan is
+  recorded as a marker (scans/<sha256>.clean), and a re-upload is only
+  scanned or thumbnailed when that marker or the thumbnail is missing
+- Virus scanning and thumbnail/video-frame generation run off the event
+  loop (default thread pool, or a process pool with STORAGE_PROCESS_WORKERS)
+
+Environment:
+    STORAGE_UPLOAD_CHUNK_SIZE: Bytes per streamed read (default: 1048576)
+    STORAGE_PROCESS_WORKERS: Process pool size for scan/thumbnails
+        (default: 0 = thread pool)
 """
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import inspect
 import io
 import logging
 import mimetypes
 import os
 import subprocess
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import BinaryIO, Optional
-from uuid import uuid4
+from typing import Any, BinaryIO, Callable, Optional
 
 from PIL import Image
 
@@ -70,6 +88,10 @@ ALLOWED_DOCUMENTS = {".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
 THUMBNAIL_SIZE = (300, 300)
 THUMBNAIL_QUALITY = 85
 
+# Upload streaming / processing
+UPLOAD_CHUNK_SIZE = int(os.getenv("STORAGE_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+PROCESS_WORKERS = int(os.getenv("STORAGE_PROCESS_WORKERS", "0"))
+
 
 class FileUploadError(Exception):
     """Base exception for file upload errors"""
@@ -183,6 +205,16 @@ def validate_file(
     return file_type
 
 
+def max_file_size(file_type: FileType) -> int:
+    """Size limit in bytes for a file type."""
+    return {
+        FileType.IMAGE: MAX_IMAGE_SIZE,
+        FileType.VIDEO: MAX_VIDEO_SIZE,
+        FileType.AUDIO: MAX_AUDIO_SIZE,
+        FileType.DOCUMENT: MAX_DOCUMENT_SIZE,
+    }.get(file_type, MAX_FILE_SIZE)
+
+
 def scan_file_for_virus(file_path: Path) -> bool:
     """
     Scan file for viruses using ClamAV.
@@ -262,32 +294,61 @@ def generate_thumbnail(
         Exception: If thumbnail generation fails
     """
     try:
-        # Open image
-        image = Image.open(io.BytesIO(image_data))
-
-        # Convert RGBA to RGB (for JPEG)
-        if image.mode in ("RGBA", "LA", "P"):
-            background = Image.new("RGB", image.size, (255, 255, 255))
-            background.paste(
-                image, mask=image.split()[-1] if image.mode == "RGBA" else None
-            )
-            image = background
+        return _thumbnail_bytes(Image.open(io.BytesIO(image_data)), size, quality)
 
-        # Generate thumbnail
-        image.thumbnail(size, Image.Resampling.LANCZOS)
+    except Exception as e:
+        logger.error(f"Thumbnail generation failed: {e}")
+        raise
 
-        # Save to bytes
-        output = io.BytesIO()
-        image.save(output, format="JPEG", quality=quality, optimize=True)
-        output.seek(0)
 
-        return output.read()
+def generate_thumbnail_from_file(
+    image_path: Path,
+    size: tuple[int, int] = THUMBNAIL_SIZE,
+    quality: int = THUMBNAIL_QUALITY,
+) -> bytes:
+    """
+    Generate thumbnail from an image file (decoded lazily from disk).
+
+    Args:
+        image_path: Path to original image
+        size: Thumbnail dimensions (width, height)
+        quality: JPEG quality (1-100)
+
+    Returns:
+        Thumbnail image bytes (JPEG)
+    """
+    try:
+        with Image.open(image_path) as image:
+            # Let JPEG decode at reduced scale when it can
+            image.draft("RGB", size)
+            return _thumbnail_bytes(image, size, quality)
 
     except Exception as e:
         logger.error(f"Thumbnail generation failed: {e}")
         raise
 
 
+def _thumbnail_bytes(image: Image.Image, size: tuple[int, int], quality: int) -> bytes:
+    """Resize an opened image and encode it as JPEG."""
+    # Convert RGBA to RGB (for JPEG)
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(
+            image, mask=image.split()[-1] if image.mode == "RGBA" else None
+        )
+        image = background
+
+    # Generate thumbnail
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+
+    # Save to bytes
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    output.seek(0)
+
+    return output.read()
+
+
 def generate_video_thumbnail(
     video_path: Path,
     output_path: Path,
@@ -364,6 +425,35 @@ def compute_file_hash(file_data: bytes) -> str:
     return hashlib.sha256(file_data).hexdigest()
 
 
+def _spool_sync(
+    source: BinaryIO,
+    target: BinaryIO,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> tuple[int, str]:
+    """
+    Copy a file object in chunks while hashing it.
+
+    Returns:
+        (size in bytes, hex SHA-256)
+
+    Raises:
+        FileSizeError: As soon as more than max_size bytes are read
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise FileSizeError(f"File too large: over {max_size} bytes")
+        hasher.update(chunk)
+        target.write(chunk)
+    return size, hasher.hexdigest()
+
+
 class FileStorage:
     """
     File storage manager - handles local and S3 storage.
@@ -374,6 +464,10 @@ class FileStorage:
     - Virus scanning
     - CDN URL generation
     - File cleanup
+
+    Files are stored by content hash, so identical uploads share one blob
+    (and one thumbnail). Deleting a blob is the caller's decision once no
+    message references it.
     """
 
     def __init__(
@@ -383,6 +477,8 @@ class FileStorage:
         s3_bucket: Optional[str] = None,
         s3_region: Optional[str] = None,
         cdn_base_url: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
     ):
         """
         Initialize storage backend.
@@ -393,17 +489,23 @@ class FileStorage:
             s3_bucket: S3 bucket name (required if backend=s3)
             s3_region: S3 region (required if backend=s3)
             cdn_base_url: CDN base URL (optional)
+            executor: Executor for scanning/thumbnails (default: thread pool)
+            chunk_size: Bytes per streamed read
         """
         self.backend = backend
         self.local_path = Path(local_path)
         self.s3_bucket = s3_bucket
         self.s3_region = s3_region
         self.cdn_base_url = cdn_base_url
+        self.executor = executor
+        self.chunk_size = chunk_size
 
-        # Initialize local storage
+        # Initialize local storage (tmp/ on the same filesystem so finished
+        # uploads move into place with an atomic rename)
         if backend == StorageBackend.LOCAL:
             self.local_path.mkdir(parents=True, exist_ok=True)
             (self.local_path / "thumbnails").mkdir(exist_ok=True)
+            (self.local_path / "tmp").mkdir(exist_ok=True)
 
         # Initialize S3 client
         if backend == StorageBackend.S3:
@@ -429,8 +531,15 @@ class FileStorage:
         """
         Upload file with validation, virus scan, and thumbnail generation.
 
+        The upload is streamed to disk in chunks and stored under its
+        SHA-256; if that content is already stored the write is skipped,
+        and so are the scan and thumbnail when the blob already has a clean
+        scan marker and a thumbnail (missing ones are produced from the
+        upload before the existing URLs are returned).
+
         Args:
-            file: File-like object (opened file or UploadFile.file)
+            file: File-like object (opened file, UploadFile.file, or an
+                object with an async read() such as UploadFile)
             filename: Original filename
             user_id: Uploader user ID
             conversation_id: Optional conversation ID
@@ -440,14 +549,15 @@ class FileStorage:
         Returns:
             dict with file metadata:
             {
-                "file_id": "uuid",
+                "file_id": "sha256...",
                 "file_name": "original.jpg",
                 "file_size": 12345,
                 "file_type": "image",
-                "file_url": "https://cdn.../uuid.jpg",
-                "thumbnail_url": "https://cdn.../uuid_thumb.jpg",
+                "file_url": "https://cdn.../messenger/blobs/ab/sha256....jpg",
+                "thumbnail_url": "https://cdn.../messenger/thumbnails/sha256..._thumb.jpg",
                 "content_type": "image/jpeg",
                 "file_hash": "sha256...",
+                "deduplicated": False,
                 "uploaded_by": 1,
                 "uploaded_at": "2024-11-26T10:30:00Z",
             }
@@ -457,124 +567,209 @@ class FileStorage:
             FileTypeError: File type not allowed
             VirusScanError: Virus detected
         """
-        # Read file data
-        file_data = file.read()
-        file_size = len(file_data)
-
-        # Validate file
+        # Reject disallowed types before reading anything
         content_type = mimetypes.guess_type(filename)[0]
-        file_type = validate_file(file_size, filename, content_type)
-
-        # Generate unique file ID
-        file_id = str(uuid4())
+        file_type = validate_file(0, filename, content_type)
         ext = Path(filename).suffix.lower()
-        stored_filename = f"{file_id}{ext}"
 
-        # Compute file hash (for deduplication)
-        file_hash = compute_file_hash(file_data)
+        # Stream to a temp file, hashing and size-checking as we go
+        temp_path, file_size, file_hash = await self._spool_upload(
+            file, ext, max_file_size(file_type)
+        )
 
-        # Save to temporary location for virus scan
-        if self.backend == StorageBackend.LOCAL:
-            temp_path = self.local_path / stored_filename
-            temp_path.write_bytes(file_data)
-        else:
-            # For S3, write to temp file
-            import tempfile
+        try:
+            validate_file(file_size, filename, content_type)
 
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-            temp_path = Path(temp_file.name)
-            temp_path.write_bytes(file_data)
+            blob_key = f"blobs/{file_hash[:2]}/{file_hash}{ext}"
+            thumb_key = f"thumbnails/{file_hash}_thumb.jpg"
+
+            scan_key = f"scans/{file_hash}.clean"
+
+            # Same bytes already stored: reuse them, but never an unscanned blob
+            deduplicated = await self._exists(blob_key)
 
-        try:
             # Virus scan
-            if scan_virus:
-                scan_file_for_virus(temp_path)
+            if scan_virus and not (deduplicated and await self._exists(scan_key)):
+                await self._run_blocking(scan_file_for_virus, temp_path)
+                scanned = True
+            else:
+                scanned = False
 
             # Generate thumbnail
             thumbnail_url = None
-            if generate_thumb:
-                if file_type == FileType.IMAGE:
-                    thumbnail_data = generate_thumbnail(file_data)
-                    thumbnail_filename = f"{file_id}_thumb.jpg"
-
-                    if self.backend == StorageBackend.LOCAL:
-                        thumb_path = self.local_path / "thumbnails" / thumbnail_filename
-                        thumb_path.write_bytes(thumbnail_data)
-                        thumbnail_url = f"/uploads/thumbnails/{thumbnail_filename}"
-                    else:
-                        # Upload thumbnail to S3
-                        thumb_key = f"thumbnails/{thumbnail_filename}"
-                        self.s3_client.put_object(
-                            Bucket=self.s3_bucket,
-                            Key=thumb_key,
-                            Body=thumbnail_data,
-                            ContentType="image/jpeg",
-                        )
-                        thumbnail_url = self._get_s3_url(thumb_key)
-
-                elif file_type == FileType.VIDEO:
-                    # Video thumbnail
-                    thumbnail_filename = f"{file_id}_thumb.jpg"
-                    thumb_path = self.local_path / "thumbnails" / thumbnail_filename
-
-                    if generate_video_thumbnail(temp_path, thumb_path):
-                        if self.backend == StorageBackend.S3:
-                            thumb_key = f"thumbnails/{thumbnail_filename}"
-                            self.s3_client.upload_file(
-                                str(thumb_path),
-                                self.s3_bucket,
-                                thumb_key,
-                                ExtraArgs={"ContentType": "image/jpeg"},
-                            )
-                            thumbnail_url = self._get_s3_url(thumb_key)
-                            thumb_path.unlink()  # Cleanup local temp
-                        else:
-                            thumbnail_url = f"/uploads/thumbnails/{thumbnail_filename}"
-
-            # Upload to final destination
-            if self.backend == StorageBackend.S3:
-                # Upload to S3
-                file_key = f"messenger/{user_id}/{stored_filename}"
-                self.s3_client.put_object(
-                    Bucket=self.s3_bucket,
-                    Key=file_key,
-                    Body=file_data,
-                    ContentType=content_type or "application/octet-stream",
-                    Metadata={
+            if generate_thumb and file_type in (FileType.IMAGE, FileType.VIDEO):
+                if deduplicated and await self._exists(thumb_key):
+                    thumbnail_url = self._url_for(thumb_key)
+                else:
+                    thumbnail_url = await self._store_thumbnail(
+                        temp_path, file_type, thumb_key
+                    )
+
+            if not deduplicated:
+                await self._store_blob(
+                    temp_path,
+                    blob_key,
+                    content_type,
+                    metadata={
                         "user_id": str(user_id),
                         "conversation_id": conversation_id or "",
                         "original_filename": filename,
                     },
                 )
-
-                file_url = self._get_s3_url(file_key)
-
-                # Cleanup temp file
-                temp_path.unlink()
-            else:
-                # Local storage - already saved
-                file_url = f"/uploads/{stored_filename}"
+            if scanned:
+                await self._put_bytes(scan_key, b"", "text/plain")
 
             # Return metadata
             return {
-                "file_id": file_id,
+                "file_id": file_hash,
                 "file_name": filename,
                 "file_size": file_size,
                 "file_type": file_type.value,
-                "file_url": file_url,
+                "file_url": self._url_for(blob_key),
                 "thumbnail_url": thumbnail_url,
                 "content_type": content_type,
                 "file_hash": file_hash,
+                "deduplicated": deduplicated,
                 "uploaded_by": user_id,
                 "uploaded_at": datetime.utcnow().isoformat(),
             }
 
-        except Exception:
-            # Cleanup on error
+        finally:
+            # Stored blobs were moved away; anything left is scratch
             if temp_path.exists():
                 temp_path.unlink()
+
+    async def _spool_upload(
+        self, file: Any, ext: str, max_size: int
+    ) -> tuple[Path, int, str]:
+        """
+        Stream an upload into a temp file.
+
+        Accepts a sync file object (read off the event loop) or an object
+        with an async read() such as Starlette's UploadFile.
+
+        Returns:
+            (temp path, size, hex SHA-256)
+        """
+        temp_dir = (
+            self.local_path / "tmp" if self.backend == StorageBackend.LOCAL else None
+        )
+        temp = tempfile.NamedTemporaryFile(delete=False, suffix=ext, dir=temp_dir)
+        temp_path = Path(temp.name)
+
+        try:
+            with temp:
+                if inspect.iscoroutinefunction(getattr(file, "read", None)):
+                    hasher = hashlib.sha256()
+                    size = 0
+                    while chunk := await file.read(self.chunk_size):
+                        size += len(chunk)
+                        if size > max_size:
+                            raise FileSizeError(
+                                f"File too large: over {max_size} bytes"
+                            )
+                        hasher.update(chunk)
+                        await asyncio.to_thread(temp.write, chunk)
+                    return temp_path, size, hasher.hexdigest()
+
+                size, digest = await asyncio.to_thread(
+                    _spool_sync, file, temp, max_size, self.chunk_size
+                )
+                return temp_path, size, digest
+
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
             raise
 
+    async def _run_blocking(self, func: Callable, *args: Any) -> Any:
+        """Run blocking work (scan, thumbnails, S3 I/O) off the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _exists(self, key: str) -> bool:
+        """Whether an object is already stored under key."""
+        if self.backend == StorageBackend.LOCAL:
+            return (self.local_path / key).is_file()
+
+        def head() -> bool:
+            try:
+                self.s3_client.head_object(
+                    Bucket=self.s3_bucket, Key=f"messenger/{key}"
+                )
+                return True
+            except Exception:
+                return False
+
+        return await asyncio.to_thread(head)
+
+    async def _store_blob(
+        self,
+        temp_path: Path,
+        key: str,
+        content_type: Optional[str],
+        metadata: dict,
+    ) -> None:
+        """Move a spooled upload to its content-addressed location."""
+        if self.backend == StorageBackend.LOCAL:
+            target = self.local_path / key
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, target)
+            return
+
+        # upload_file streams from disk (multipart for large files)
+        await asyncio.to_thread(
+            self.s3_client.upload_file,
+            str(temp_path),
+            self.s3_bucket,
+            f"messenger/{key}",
+            ExtraArgs={
+                "ContentType": content_type or "application/octet-stream",
+                "Metadata": metadata,
+            },
+        )
+
+    async def _store_thumbnail(
+        self, source_path: Path, file_type: FileType, key: str
+    ) -> Optional[str]:
+        """Generate and store a thumbnail; returns its URL (None if skipped)."""
+        if file_type == FileType.IMAGE:
+            thumbnail_data = await self._run_blocking(
+                generate_thumbnail_from_file, source_path
+            )
+        else:
+            frame = source_path.with_name(f"{source_path.stem}_thumb.jpg")
+            try:
+                if not await self._run_blocking(
+                    generate_video_thumbnail, source_path, frame
+                ):
+                    return None
+                thumbnail_data = await asyncio.to_thread(frame.read_bytes)
+            finally:
+                frame.unlink(missing_ok=True)
+
+        await self._put_bytes(key, thumbnail_data, "image/jpeg")
+        return self._url_for(key)
+
+    async def _put_bytes(self, key: str, data: bytes, content_type: str) -> None:
+        """Store a small object (thumbnail, scan marker) under key."""
+        if self.backend == StorageBackend.LOCAL:
+            target = self.local_path / key
+            target.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(target.write_bytes, data)
+        else:
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.s3_bucket,
+                Key=f"messenger/{key}",
+                Body=data,
+                ContentType=content_type,
+            )
+
+    def _url_for(self, key: str) -> str:
+        if self.backend == StorageBackend.LOCAL:
+            return f"/uploads/{key}"
+        return self._get_s3_url(f"messenger/{key}")
+
     def _get_s3_url(self, key: str) -> str:
         """
         Generate S3 URL (CDN or direct).
@@ -602,17 +797,39 @@ class FileStorage:
         """
         try:
             if self.backend == StorageBackend.LOCAL:
-                # Extract filename from URL
-                filename = Path(file_url).name
-                file_path = self.local_path / filename
-                if file_path.exists():
+                # Map /uploads/<relative path> under local_path (no escaping)
+                relative = file_url.split("/uploads/", 1)[-1].lstrip("/")
+                root = self.local_path.resolve()
+                file_path = (root / relative).resolve()
+                if root not in file_path.parents:
+                    return False
+                if file_path.is_file():
                     file_path.unlink()
+
+                # Content-addressed blobs own a hash-named thumbnail and scan marker
+                if relative.startswith("blobs/"):
+                    digest = Path(relative).stem
+                    (root / "thumbnails" / f"{digest}_thumb.jpg").unlink(
+                        missing_ok=True
+                    )
+                    (root / "scans" / f"{digest}.clean").unlink(missing_ok=True)
                 return True
             else:
                 # Delete from S3
-                # Extract key from URL
-                key = file_url.split(f"{self.s3_bucket}/")[-1]
+                # Extract key from URL (CDN/virtual-host URLs keep the messenger/ prefix)
+                if "/messenger/" in file_url:
+                    key = "messenger/" + file_url.split("/messenger/", 1)[-1]
+                else:
+                    key = file_url.split(f"{self.s3_bucket}/")[-1]
                 self.s3_client.delete_object(Bucket=self.s3_bucket, Key=key)
+
+                if key.startswith("messenger/blobs/"):
+                    digest = Path(key).stem
+                    for owned in (
+                        f"messenger/thumbnails/{digest}_thumb.jpg",
+                        f"messenger/scans/{digest}.clean",
+                    ):
+                        self.s3_client.delete_object(Bucket=self.s3_bucket, Key=owned)
                 return True
 
         except Exception:
@@ -633,6 +850,8 @@ def get_file_storage() -> FileStorage:
     - STORAGE_S3_BUCKET: S3 bucket name
     - STORAGE_S3_REGION: S3 region (default: ap-northeast-2)
     - STORAGE_CDN_URL: CDN base URL (optional)
+    - STORAGE_PROCESS_WORKERS: Process pool size for scan/thumbnails
+      (default: 0 = default thread pool)
 
     Returns:
         FileStorage singleton instance
@@ -649,6 +868,11 @@ def get_file_storage() -> FileStorage:
             s3_bucket=os.getenv("STORAGE_S3_BUCKET"),
             s3_region=os.getenv("STORAGE_S3_REGION", "ap-northeast-2"),
             cdn_base_url=os.getenv("STORAGE_CDN_URL"),
+            executor=(
+                ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+                if PROCESS_WORKERS > 0
+                else None
+            ),
         )
 
     return _file_storage_instance
@@ -13,6 +13,7 @@ from uuid import UUID
 from sqlalchemy import and_, desc, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.messenger.inbox import get_inbox_service
 from app.models.messenger_models import (
     ConversationParticipant,
     Message,
@@ -125,6 +126,10 @@ class ThreadingService:
                 root_message.reply_count += 1
                 root_message.last_reply_at = datetime.utcnow()
 
+        # Replies are conversation messages: update participants' inboxes
+        await db.flush()
+        await get_inbox_service().record_message(db, reply)
+
         await db.commit()
         await db.refresh(reply)
 
@@ -9,6 +9,14 @@ Features:
 - User presence tracking (online/offline status)
 - Message delivery to connected clients
 - Automatic cleanup on disconnect
+- Conversation-indexed fan-out: conversation_id -> live sockets, payload
+  encoded once per broadcast
+- Bounded per-socket send queue drained by a writer task; slow consumers
+  (full queue or stalled send) are evicted
+
+Environment:
+    WS_SEND_QUEUE_SIZE: Max queued frames per socket (default: 256)
+    WS_SEND_TIMEOUT: Seconds a single send may take before eviction (default: 10)
 
 Usage:
     from app.messenger.websocket import manager
@@ -26,7 +34,10 @@ Usage:
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import os
 from collections import defaultdict
 from datetime import datetime
 from typing import Any, Optional
@@ -39,6 +50,49 @@ from app.messenger.presence import get_presence_manager
 
 logger = logging.getLogger(__name__)
 
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+# Close code for evicted slow consumers ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def encode_message(message: dict[str, Any]) -> str:
+    """Encode a message frame once (same format as WebSocket.send_json)."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _SocketSender:
+    """
+    Per-socket outbound queue drained by a single writer task.
+
+    Frames are pre-encoded text. enqueue() never blocks: when the queue is
+    full the socket is a slow consumer and the manager evicts it.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, max_queue: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def enqueue(self, frame: str) -> bool:
+        """Queue a frame; False if the socket is closed or its queue is full."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        """Stop the writer task (unless called from it)."""
+        self.closed = True
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+
 
 class WebSocketConnectionManager:
     """
@@ -52,7 +106,11 @@ class WebSocketConnectionManager:
     Supports multiple connections per user (web + mobile).
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_queue: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT,
+    ):
         """Initialize connection manager"""
         # Map user_id -> list of WebSocket connections
         self.active_connections: dict[int, list[WebSocket]] = defaultdict(list)
@@ -60,6 +118,17 @@ class WebSocketConnectionManager:
         # Map user_id -> set of conversation_ids they're subscribed to
         self.user_subscriptions: dict[int, set[UUID]] = defaultdict(set)
 
+        # Reverse index: conversation_id -> live sockets of subscribed users
+        self.conversation_sockets: dict[UUID, set[WebSocket]] = defaultdict(set)
+
+        # Map WebSocket -> outbound queue and writer task
+        self.senders: dict[WebSocket, _SocketSender] = {}
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.evicted_connections = 0
+        # Evictions scheduled by _fan_out (referenced until they finish)
+        self._evictions: set[asyncio.Task] = set()
+
         # Map user_id -> last seen timestamp
         self.user_last_seen: dict[int, datetime] = {}
 
@@ -96,13 +165,20 @@ class WebSocketConnectionManager:
         """
         await websocket.accept()
 
-        # Add connection to active list
+        # Add connection to active list and start its writer
         self.active_connections[user_id].append(websocket)
+        sender = _SocketSender(websocket, user_id, self.max_queue)
+        sender.task = asyncio.create_task(self._writer(sender))
+        self.senders[websocket] = sender
 
         # Subscribe to conversations if provided
         if conversations:
             self.user_subscriptions[user_id].update(conversations)
 
+        # Index the new socket under all of the user's conversations
+        for conversation_id in self.user_subscriptions.get(user_id, ()):
+            self.conversation_sockets[conversation_id].add(websocket)
+
         # Update online status
         is_first_connection = len(self.active_connections[user_id]) == 1
         if is_first_connection:
@@ -148,13 +224,20 @@ class WebSocketConnectionManager:
         Example:
             await manager.disconnect(websocket, user_id=1)
         """
+        # Stop the writer and drop the socket from the conversation index
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            sender.close()
+        for conversation_id in self.user_subscriptions.get(user_id, ()):
+            self._unindex(conversation_id, websocket)
+
         # Remove connection from active list
         if user_id in self.active_connections:
             try:
                 self.active_connections[user_id].remove(websocket)
             except ValueError:
                 # Connection not in list (already removed or never added)
-                pass
+                return
 
             # Clean up if no more connections
             if not self.active_connections[user_id]:
@@ -207,20 +290,9 @@ class WebSocketConnectionManager:
             logger.debug(f"User {user_id} not connected, skipping message")
             return
 
-        # Send to all connections for this user
-        disconnected: list[WebSocket] = []
-        for connection in self.active_connections[user_id]:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id}: {e}")
-                disconnected.append(connection)
-
-        # Clean up disconnected connections
-        for connection in disconnected:
-            await self.disconnect(connection, user_id)
+        await self._fan_out(
+            list(self.active_connections[user_id]), encode_message(message)
+        )
 
     async def broadcast_to_conversation(
         self,
@@ -231,6 +303,9 @@ class WebSocketConnectionManager:
         """
         Broadcast message to all participants of a conversation.
 
+        Looks up the conversation's live sockets in the reverse index and
+        encodes the payload once, so cost is O(conversation sockets).
+
         Args:
             conversation_id: Conversation UUID
             message: Message data
@@ -243,10 +318,17 @@ class WebSocketConnectionManager:
                 exclude_user=1  # Don't send back to sender
             )
         """
-        # Find all users subscribed to this conversation
-        for user_id, conversations in self.user_subscriptions.items():
-            if conversation_id in conversations and user_id != exclude_user:
-                await self.send_personal_message(user_id, message)
+        sockets = self.conversation_sockets.get(conversation_id)
+        if not sockets:
+            return
+
+        targets = [
+            ws
+            for ws in sockets
+            if exclude_user is None
+            or (ws in self.senders and self.senders[ws].user_id != exclude_user)
+        ]
+        await self._fan_out(targets, encode_message(message))
 
     async def broadcast_to_all(self, message: dict[str, Any]):
         """
@@ -261,8 +343,61 @@ class WebSocketConnectionManager:
                 "message": "Server maintenance in 5 minutes"
             })
         """
-        for user_id in list(self.active_connections.keys()):
-            await self.send_personal_message(user_id, message)
+        await self._fan_out(list(self.senders), encode_message(message))
+
+    async def _fan_out(self, sockets: list[WebSocket], frame: str):
+        """
+        Queue an encoded frame on each socket without awaiting any send.
+
+        Sockets whose queue is full are slow consumers; their eviction
+        (unregister + close) runs in a background task so a stuck close
+        never delays the broadcast.
+        """
+        for ws in sockets:
+            sender = self.senders.get(ws)
+            if sender is not None and not sender.closed and not sender.enqueue(frame):
+                task = asyncio.create_task(
+                    self._evict(sender, reason="send queue full")
+                )
+                self._evictions.add(task)
+                task.add_done_callback(self._evictions.discard)
+
+    async def _writer(self, sender: _SocketSender):
+        """Drain one socket's queue; evict it if a send stalls or fails."""
+        websocket = sender.websocket
+        try:
+            while True:
+                frame = await sender.queue.get()
+                await asyncio.wait_for(
+                    websocket.send_text(frame), timeout=self.send_timeout
+                )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            await self._evict(sender, reason="send timed out")
+        except WebSocketDisconnect:
+            await self.disconnect(websocket, sender.user_id)
+        except Exception as e:
+            logger.error(f"Error sending message to user {sender.user_id}: {e}")
+            await self.disconnect(websocket, sender.user_id)
+
+    async def _evict(self, sender: _SocketSender, reason: str):
+        """Close a slow consumer's socket and unregister it."""
+        if sender.closed:
+            return
+        self.evicted_connections += 1
+        logger.warning(
+            f"Evicting slow WebSocket consumer for user {sender.user_id}: {reason}"
+        )
+        await self.disconnect(sender.websocket, sender.user_id)
+        try:
+            await asyncio.wait_for(
+                sender.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE),
+                timeout=self.send_timeout,
+            )
+        except Exception:
+            # Socket already closed by the peer
+            pass
 
     # ========================================================================
     # Subscription Management
@@ -281,6 +416,8 @@ class WebSocketConnectionManager:
             conversation_id: Conversation UUID
         """
         self.user_subscriptions[user_id].add(conversation_id)
+        for websocket in self.active_connections.get(user_id, ()):
+            self.conversation_sockets[conversation_id].add(websocket)
         logger.debug(f"User {user_id} subscribed to conversation {conversation_id}")
 
     async def unsubscribe_from_conversation(
@@ -297,10 +434,20 @@ class WebSocketConnectionManager:
         """
         if user_id in self.user_subscriptions:
             self.user_subscriptions[user_id].discard(conversation_id)
+            for websocket in self.active_connections.get(user_id, ()):
+                self._unindex(conversation_id, websocket)
             logger.debug(
                 f"User {user_id} unsubscribed from conversation {conversation_id}"
             )
 
+    def _unindex(self, conversation_id: UUID, websocket: WebSocket):
+        """Remove a socket from a conversation's index entry."""
+        sockets = self.conversation_sockets.get(conversation_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.conversation_sockets[conversation_id]
+
     # ========================================================================
     # Status & Monitoring
     # ========================================================================
@@ -338,6 +485,9 @@ class WebSocketConnectionManager:
             "active_conversations": sum(
                 len(subs) for subs in self.user_subscriptions.values()
             ),
+            "live_conversations": len(self.conversation_sockets),
+            "queued_messages": sum(s.queue.qsize() for s in self.senders.values()),
+            "evicted_connections": self.evicted_connections,
         }
 
 
@@ -45,12 +45,14 @@ from .messenger_models import (
     ConversationParticipant,
     Message,
     ReadReceipt,
+    InboxEntry,
     NotificationSetting,
     InAppNotification,
     NotificationPreference,
     MessageReaction,
     Call,
     CallParticipant,
+    AnalyticsRollup,
 )
 from .assignment_models import (
     Assignment,
@@ -101,12 +103,14 @@ __all__ = [
     "ConversationParticipant",
     "Message",
     "ReadReceipt",
+    "InboxEntry",
     "NotificationSetting",
     "InAppNotification",
     "NotificationPreference",
     "MessageReaction",
     "Call",
     "CallParticipant",
+    "AnalyticsRollup",
     # Assignment system
     "Assignment",
     "AssignmentStudent",
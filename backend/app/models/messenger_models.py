@@ -13,10 +13,12 @@ from datetime import datetime
 from typing import Optional
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     CheckConstraint,
     DateTime,
     ForeignKey,
+    ForeignKeyConstraint,
     Index,
     Integer,
     String,
@@ -290,6 +292,64 @@ class ReadReceipt(Base):
         return f"<ReadReceipt(message_id={self.message_id}, user_id={self.user_id}, read_at={self.read_at})>"
 
 
+class InboxEntry(Base):
+    """
+    Materialized inbox row: one per conversation participant.
+
+    Kept up to date by the message write paths (send, reply, edit, delete,
+    read receipt) via app.messenger.inbox so the conversation list is a
+    single index range scan on (user_id, updated_at).
+
+    Attributes:
+        last_message_id: Most recent live message (null if none)
+        last_message_preview: Truncated preview of that message
+        unread_count: Messages from others after read_through_at
+        read_through_at: created_at of the newest message the user has read
+        updated_at: Last activity; inbox sort key
+    """
+
+    __tablename__ = "messenger_inbox"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["conversation_id", "user_id"],
+            [
+                "conversation_participants.conversation_id",
+                "conversation_participants.user_id",
+            ],
+            ondelete="CASCADE",
+            name="fk_inbox_participant",
+        ),
+        Index("idx_inbox_user_updated", "user_id", "updated_at", "conversation_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    last_message_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("messages.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    last_message_preview: Mapped[Optional[str]] = mapped_column(
+        String(200), nullable=True
+    )
+    last_sender_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    read_through_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<InboxEntry(user_id={self.user_id}, conv_id={self.conversation_id}, unread={self.unread_count})>"
+
+
 class NotificationSetting(Base):
     """
     Notification settings for a user in a conversation.
@@ -659,3 +719,65 @@ class CallParticipant(Base):
 
     def __repr__(self) -> str:
         return f"<CallParticipant(id={self.id}, call_id={self.call_id}, user_id={self.user_id}, answered={self.answered})>"
+
+
+class AnalyticsRollup(Base):
+    """
+    Pre-aggregated messenger analytics counts.
+
+    Maintained by the analytics stream consumer (app.messenger.analytics_rollups)
+    from events tracked via AnalyticsService.track_event; the analytics
+    dashboard reads these instead of scanning messages.
+
+    Dimensions that do not apply to an event are stored as neutral values
+    (nil UUID conversation, user 0, empty message_type) so the natural key
+    can be the primary key.
+
+    Attributes:
+        granularity: Bucket size - 'minute', 'hour' or 'day'
+        bucket_start: Bucket start (UTC)
+        event_type: AnalyticsEventType value (e.g. 'message.sent')
+        message_type: Message type for message events ('text', 'image', ...)
+        count: Number of events in the bucket
+        content_chars: Total message content length (for averages)
+    """
+
+    __tablename__ = "messenger_analytics_rollups"
+    __table_args__ = (
+        CheckConstraint(
+            "granularity IN ('minute', 'hour', 'day')",
+            name="ck_analytics_rollups_granularity",
+        ),
+        Index(
+            "idx_analytics_rollups_event_bucket",
+            "event_type",
+            "granularity",
+            "bucket_start",
+        ),
+        Index(
+            "idx_analytics_rollups_conversation",
+            "conversation_id",
+            "event_type",
+            "granularity",
+            "bucket_start",
+        ),
+    )
+
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    event_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    message_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    content_chars: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<AnalyticsRollup({self.granularity} {self.bucket_start} "
+            f"{self.event_type} count={self.count})>"
+        )
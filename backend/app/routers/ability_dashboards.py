@@ -29,15 +29,14 @@ from app.schemas.ability_schemas import (
 from app.services.ability_analytics import (
     assess_risk_level,
     classify_theta_band,
-    compute_delta_theta,
     compute_empirical_percentile,
     compute_priority_score,
     compute_student_flags,
-    count_recent_sessions,
     generate_recommended_action,
     generate_student_status_label,
     generate_tutor_recommended_focus,
-    get_last_activity,
+    load_latest_abilities,
+    load_session_activity,
     theta_to_percentile,
 )
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -69,14 +68,10 @@ async def get_student_ability_summary(
     Authorization:
         Requires student role (self-view only)
     """
-    # Query all abilities for this student
-    stmt = (
-        select(IRTStudentAbility)
-        .where(IRTStudentAbility.user_id == str(current_user.id))
-        .order_by(IRTStudentAbility.subject, IRTStudentAbility.calibrated_at.desc())
+    # Latest ability and 7-day delta per subject in one query
+    abilities = await load_latest_abilities(
+        db=db, delta_days=7, user_ids=[str(current_user.id)]
     )
-    result = await db.execute(stmt)
-    abilities = result.scalars().all()
 
     if not abilities:
         raise HTTPException(
@@ -84,24 +79,12 @@ async def get_student_ability_summary(
             detail="No ability data found. Complete at least one exam to get your ability estimate.",
         )
 
-    # Group by subject, take most recent per subject
-    subject_map = {}
-    for ability in abilities:
-        if ability.subject not in subject_map:
-            subject_map[ability.subject] = ability
-
     # Build summary for each subject
     subject_summaries = []
-    latest_calibration = max(a.calibrated_at for a in abilities)
+    latest_calibration = max(a.calibrated_at for a in abilities.values())
 
-    for subject, ability in subject_map.items():
-        # Compute delta theta (7 days)
-        delta_theta_7d = await compute_delta_theta(
-            db=db,
-            user_id=str(current_user.id),
-            subject=subject,
-            days=7,
-        )
+    for (_, subject), ability in sorted(abilities.items()):
+        delta_theta_7d = ability.delta_theta
 
         # Classify
         theta_band = classify_theta_band(ability.theta)
@@ -235,32 +218,26 @@ async def get_tutor_priority_list(
     # if current_user.role not in ["tutor", "teacher"]:
     #     raise HTTPException(status_code=403, detail="Requires tutor or teacher role")
 
-    # Get all students' latest abilities in this subject
+    # Latest ability and delta per student, then their session activity:
+    # two set-based queries for the whole list
     # TODO: Filter by tutor's assigned students when relationship exists
-    stmt = (
-        select(IRTStudentAbility)
-        .where(IRTStudentAbility.subject == subject)
-        .order_by(IRTStudentAbility.user_id, IRTStudentAbility.calibrated_at.desc())
+    abilities = await load_latest_abilities(
+        db=db, delta_days=window_days, subject=subject
+    )
+    activity = await load_session_activity(
+        db=db, user_ids=[user_id for user_id, _ in abilities], days=7
     )
-    result = await db.execute(stmt)
-    abilities = result.scalars().all()
-
-    # Group by user_id, take most recent
-    user_ability_map = {}
-    for ability in abilities:
-        if ability.user_id not in user_ability_map:
-            user_ability_map[ability.user_id] = ability
 
     # Build priority list
     priority_students = []
 
-    for user_id, ability in user_ability_map.items():
-        # Compute metrics
-        delta_theta_14d = await compute_delta_theta(
-            db=db, user_id=user_id, subject=subject, days=window_days
+    for (user_id, _), ability in abilities.items():
+        delta_theta_14d = ability.delta_theta
+        student_activity = activity.get(user_id)
+        sessions_last_7d = student_activity.sessions_recent if student_activity else 0
+        last_activity_at = (
+            student_activity.last_activity_at if student_activity else None
         )
-        sessions_last_7d = await count_recent_sessions(db=db, user_id=user_id, days=7)
-        last_activity_at = await get_last_activity(db=db, user_id=user_id)
 
         # Classify
         theta_band = classify_theta_band(ability.theta)
@@ -307,7 +284,7 @@ async def get_tutor_priority_list(
         )
 
     # Sort by priority_score (desc) and limit
-    priority_students.sort(key=lambda s: s.priorityScore, reverse=True)
+    priority_students.sort(key=lambda s: s.priority_score, reverse=True)
     priority_students = priority_students[:limit]
 
     return TutorPriorityListResponse(
@@ -43,16 +43,20 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi import status as status_lib
-from sqlalchemy import and_, delete, desc, func, select, update
+from sqlalchemy import and_, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_session
 from app.core.security import get_current_user
+from app.messenger.history import get_history_service
+from app.messenger.inbox import get_inbox_service
 from app.messenger.pubsub import get_pubsub
+from app.messenger.read_receipts import get_read_receipt_aggregator
 from app.messenger.websocket import manager
 from app.models.messenger_models import (
     Conversation,
     ConversationParticipant,
+    InboxEntry,
     Message,
     NotificationSetting,
 )
@@ -153,51 +157,62 @@ async def is_conversation_admin(
 
 @router.get("/conversations", response_model=ConversationListResponse)
 async def list_conversations(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (ignored with cursor)"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the previous page's next_cursor"
+    ),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
     List all conversations for the current user.
 
-    Returns conversations ordered by last activity (most recent first).
-    Includes unread message count for each conversation.
+    Returns conversations ordered by last activity (most recent first),
+    with unread count and last message preview, read from the user's
+    materialized inbox (one index range scan per page). Pass next_cursor
+    back as cursor for the following page; total is only computed for the
+    first page.
     """
-    # Get conversation IDs where user is a participant
-    participant_stmt = select(ConversationParticipant.conversation_id).where(
-        ConversationParticipant.user_id == user.id
-    )
-
-    # Count total conversations
-    count_stmt = (
-        select(func.count())
-        .select_from(Conversation)
-        .where(Conversation.id.in_(participant_stmt))
-    )
-    result = await db.execute(count_stmt)
-    total = result.scalar_one()
-
-    # Fetch paginated conversations
-    offset = (page - 1) * page_size
-    stmt = (
-        select(Conversation)
-        .where(Conversation.id.in_(participant_stmt))
-        .order_by(desc(Conversation.updated_at))
-        .offset(offset)
-        .limit(page_size)
-    )
-    result = await db.execute(stmt)
-    conversations = result.scalars().all()
-
-    # TODO: Add unread count, last message preview
-    # This requires additional queries or CTE for optimization
+    inbox = get_inbox_service()
+    try:
+        rows, next_cursor = await inbox.list_inbox(
+            db,
+            user_id=int(user.id),  # type: ignore
+            limit=page_size,
+            cursor=cursor,
+            offset=0 if cursor else (page - 1) * page_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status_lib.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    total = None
+    if not cursor and page == 1:
+        count_stmt = (
+            select(func.count())
+            .select_from(InboxEntry)
+            .where(InboxEntry.user_id == user.id)
+        )
+        result = await db.execute(count_stmt)
+        total = result.scalar_one()
+
+    conversations = [
+        ConversationResponse.model_validate(conversation).model_copy(
+            update={
+                "last_message_preview": entry.last_message_preview,
+                "last_message_at": entry.last_message_at,
+                "unread_count": entry.unread_count,
+            }
+        )
+        for entry, conversation in rows
+    ]
 
     return ConversationListResponse(
-        conversations=[ConversationResponse.model_validate(c) for c in conversations],
+        conversations=conversations,
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -262,6 +277,9 @@ async def create_conversation(
             )
             db.add(participant)
 
+    await db.flush()
+    await get_inbox_service().ensure_entries(db, conversation.id)
+
     await db.commit()
     await db.refresh(conversation)
 
@@ -319,10 +337,19 @@ async def leave_conversation(
 )
 async def list_messages(
     conversation_id: uuid.UUID,
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (echoed back; use cursor)"),
     page_size: int = Query(50, ge=1, le=100, description="Messages per page"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque next_cursor or prev_cursor from a previous page"
+    ),
     before: Optional[uuid.UUID] = Query(
-        None, description="Get messages before this message ID (for infinite scroll)"
+        None, description="Get messages before this message ID (legacy, use cursor)"
+    ),
+    around: Optional[uuid.UUID] = Query(
+        None, description="Get a window of messages centred on this message ID"
+    ),
+    include_total: bool = Query(
+        False, description="Also count all messages in the conversation"
     ),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
@@ -330,55 +357,47 @@ async def list_messages(
     """
     Get message history for a conversation.
 
-    Returns messages in reverse chronological order (newest first).
-    Supports cursor-based pagination with 'before' parameter.
-    Only returns non-deleted messages.
+    Returns messages in reverse chronological order (newest first), paged
+    by (created_at, id) keyset cursors: pass next_cursor back as cursor for
+    older messages and prev_cursor for newer ones. around returns a window
+    centred on one message (jump-to-message) with cursors for both
+    directions. Only returns non-deleted messages; total is only counted
+    when include_total is set.
     """
     # Verify user is a participant
     await get_conversation_or_404(conversation_id, user, db)
 
-    # Base query: non-deleted messages in this conversation
-    base_stmt = select(Message).where(
-        and_(
-            Message.conversation_id == conversation_id,
-            Message.deleted_at.is_(None),
+    history = get_history_service()
+    if around:
+        messages, next_cursor, prev_cursor = await history.list_around(
+            db, conversation_id, around, limit=page_size
         )
-    )
-
-    # Add cursor pagination if 'before' provided
-    if before:
-        # Get timestamp of the 'before' message
-        before_stmt = select(Message.created_at).where(Message.id == before)
-        result = await db.execute(before_stmt)
-        before_time = result.scalar_one_or_none()
-        if before_time:
-            base_stmt = base_stmt.where(Message.created_at < before_time)
-
-    # Count total (for pagination metadata)
-    count_stmt = (
-        select(func.count())
-        .select_from(Message)
-        .where(
-            and_(
-                Message.conversation_id == conversation_id,
-                Message.deleted_at.is_(None),
+        if not messages:
+            raise HTTPException(
+                status_code=status_lib.HTTP_404_NOT_FOUND, detail="Message not found"
+            )
+    else:
+        try:
+            messages, next_cursor, prev_cursor = await history.list_page(
+                db, conversation_id, limit=page_size, cursor=cursor, before=before
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status_lib.HTTP_400_BAD_REQUEST, detail=str(e)
             )
-        )
-    )
-    result = await db.execute(count_stmt)
-    total = result.scalar_one()
 
-    # Fetch messages
-    stmt = base_stmt.order_by(desc(Message.created_at)).limit(page_size)
-    result = await db.execute(stmt)
-    messages = result.scalars().all()
+    total = None
+    if include_total:
+        total = await history.count_messages(db, conversation_id)
 
     return MessageListResponse(
         messages=[MessageResponse.model_validate(m) for m in messages],
         total=total,
         page=page,
         page_size=page_size,
-        has_more=len(messages) == page_size,
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
 
 
@@ -425,6 +444,10 @@ async def send_message(
     )
     await db.execute(stmt)
 
+    # Update every participant's inbox row in the same transaction
+    await db.flush()
+    await get_inbox_service().record_message(db, message)
+
     await db.commit()
     await db.refresh(message)
 
@@ -435,6 +458,11 @@ async def send_message(
         message_data=MessageResponse.model_validate(message).model_dump(mode="json"),
     )
 
+    # Track analytics event (feeds the dashboard rollups)
+    from app.messenger.analytics import get_analytics_service
+
+    await get_analytics_service().track_message_sent(message)
+
     return MessageResponse.model_validate(message)
 
 
@@ -479,6 +507,7 @@ async def edit_message(
     # Update message
     message.content = data.content
     message.edited_at = func.now()
+    await get_inbox_service().record_edit(db, message)
     await db.commit()
     await db.refresh(message)
 
@@ -530,6 +559,8 @@ async def delete_message(
 
     # Soft delete
     message.deleted_at = func.now()
+    await db.flush()
+    await get_inbox_service().record_delete(db, message)
     await db.commit()
 
     # Broadcast delete event via Redis Pub/Sub
@@ -868,6 +899,59 @@ async def get_reaction_summary(
         )
 
 
+@router.get("/conversations/{conversation_id}/reactions")
+async def get_conversation_message_reactions(
+    conversation_id: uuid.UUID,
+    message_ids: list[uuid.UUID] = Query(
+        ..., description="Message IDs to summarize (repeat the parameter, max 100)"
+    ),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get reaction summaries for a page of messages in one request.
+
+    Returns per-emoji counts and whether the current user reacted, keyed
+    by message ID. Use this when rendering a message list instead of one
+    reactions request per message.
+
+    Args:
+        conversation_id: ID of the conversation
+        message_ids: Messages of that conversation (1-100)
+
+    Returns:
+        Reaction summaries keyed by message ID
+
+    Raises:
+        HTTPException 400: Too many message IDs
+        HTTPException 403: User not a participant
+    """
+    from app.messenger.reactions import get_reactions_service
+
+    try:
+        user_id = int(user.id)  # type: ignore
+        service = get_reactions_service()
+        summaries = await service.get_reactions_for_messages(
+            db=db,
+            conversation_id=conversation_id,
+            message_ids=message_ids,
+            user_id=user_id,
+        )
+
+        return {"conversation_id": str(conversation_id), "messages": summaries}
+
+    except ValueError as e:
+        if "not a participant" in str(e):
+            raise HTTPException(
+                status_code=status_lib.HTTP_403_FORBIDDEN,
+                detail=str(e),
+            )
+        raise HTTPException(
+            status_code=status_lib.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @router.get("/conversations/{conversation_id}/reactions/popular")
 async def get_popular_reactions(
     conversation_id: uuid.UUID,
@@ -1493,6 +1577,9 @@ async def add_participants(
             )
             db.add(participant)
 
+    await db.flush()
+    await get_inbox_service().ensure_entries(db, conversation_id)
+
     await db.commit()
 
     # TODO: Send notification to new participants
@@ -1859,10 +1946,30 @@ async def delete_file(
     from app.messenger.storage import get_file_storage
 
     try:
-        # Find message with this file
-        stmt = select(Message).where(Message.file_url.contains(file_id))
+        user_id = int(user.id)  # type: ignore
+
+        # Uploads are content-addressed, so several messages (including
+        # soft-deleted ones) may point at the same file; resolve a live one
+        # in the caller's conversations, preferring their own
+        stmt = (
+            select(Message)
+            .join(
+                ConversationParticipant,
+                and_(
+                    ConversationParticipant.conversation_id
+                    == Message.conversation_id,
+                    ConversationParticipant.user_id == user_id,
+                ),
+            )
+            .where(
+                Message.file_url.contains(file_id),
+                Message.deleted_at.is_(None),
+            )
+            .order_by((Message.sender_id == user_id).desc(), Message.created_at.desc())
+            .limit(1)
+        )
         result = await db.execute(stmt)
-        message = result.scalar_one_or_none()
+        message = result.scalars().first()
 
         if not message:
             raise HTTPException(
@@ -1871,7 +1978,6 @@ async def delete_file(
             )
 
         # Check permissions (sender or admin)
-        user_id = int(user.id)  # type: ignore
         is_sender = message.sender_id == user_id
 
         stmt_participant = select(ConversationParticipant).where(
@@ -1890,16 +1996,25 @@ async def delete_file(
                 detail="Only sender or admin can delete files",
             )
 
-        # Delete from storage
+        # Delete from storage. Uploads are content-addressed, so other
+        # messages may share the blob; only the last reference removes it.
         storage = get_file_storage()
+        shared = False
         if message.file_url:
-            await storage.delete_file(message.file_url)
+            shared_result = await db.execute(
+                select(func.count(Message.id)).where(
+                    and_(
+                        Message.file_url == message.file_url,
+                        Message.id != message.id,
+                        Message.deleted_at.is_(None),
+                    )
+                )
+            )
+            shared = (shared_result.scalar() or 0) > 0
 
-        # Delete thumbnail if exists
-        if message.file_url:
-            # Assuming thumbnail URL pattern
-            thumb_url = message.file_url.replace(file_id, f"{file_id}_thumb")
-            await storage.delete_file(thumb_url)
+        # Removes the blob's thumbnail too
+        if message.file_url and not shared:
+            await storage.delete_file(message.file_url)
 
         # Mark message as deleted (soft delete)
         message.deleted_at = func.now()
@@ -1985,6 +2100,8 @@ async def handle_message_send(
             )
 
             db.add(new_message)
+            await db.flush()
+            await get_inbox_service().record_message(db, new_message)
             await db.commit()
             await db.refresh(new_message)
 
@@ -2016,21 +2133,9 @@ async def handle_message_send(
             logger.info(f"Message sent via WebSocket: {new_message.id}")
 
             # Track analytics event
-            from app.messenger.analytics import (
-                AnalyticsEventType,
-                get_analytics_service,
-            )
+            from app.messenger.analytics import get_analytics_service
 
-            analytics = get_analytics_service()
-            await analytics.track_event(
-                event_type=AnalyticsEventType.MESSAGE_SENT,
-                user_id=user_id,
-                conversation_id=str(conversation_id),
-                metadata={
-                    "message_id": str(new_message.id),
-                    "message_type": new_message.message_type,
-                },
-            )
+            await get_analytics_service().track_message_sent(new_message)
 
             # Send push notifications to offline participants (async)
             asyncio.create_task(
@@ -2132,23 +2237,13 @@ async def handle_message_reply(
             )
 
             # Track analytics event
-            from app.messenger.analytics import (
-                AnalyticsEventType,
-                get_analytics_service,
-            )
+            from app.messenger.analytics import get_analytics_service
 
-            analytics = get_analytics_service()
-            await analytics.track_event(
-                event_type=AnalyticsEventType.MESSAGE_SENT,
-                user_id=user_id,
-                conversation_id=str(conversation_id),
-                metadata={
-                    "message_id": str(reply.id),
-                    "message_type": reply.message_type,
-                    "parent_id": str(parent_message_id),
-                    "thread_id": str(reply.thread_id),
-                    "is_reply": True,
-                },
+            await get_analytics_service().track_message_sent(
+                reply,
+                parent_id=str(parent_message_id),
+                thread_id=str(reply.thread_id),
+                is_reply=True,
             )
 
             # Send push notifications to thread participants (async)
@@ -2210,6 +2305,7 @@ async def handle_message_edit(
             if new_content:
                 msg.content = new_content
                 msg.edited_at = func.now()
+                await get_inbox_service().record_edit(db, msg)
 
                 await db.commit()
                 await db.refresh(msg)
@@ -2309,6 +2405,8 @@ async def handle_message_delete(
 
             # Soft delete
             msg.deleted_at = func.now()
+            await db.flush()
+            await get_inbox_service().record_delete(db, msg)
             await db.commit()
 
             # Update user activity in presence system
@@ -2361,100 +2459,20 @@ async def handle_read_receipt(
     """
     Handle message.read event from WebSocket.
 
-    Creates read receipt and updates last_read_at.
+    Buffers the receipt in the read receipt aggregator, which writes
+    ReadReceipt / last_read_at / inbox watermarks in coalesced batches and
+    broadcasts one "read up to" event per (user, conversation).
     """
     try:
-        from app.core.database import AsyncSessionLocal
-        from app.models.messenger_models import ReadReceipt
-
-        async with AsyncSessionLocal() as db:
-            # Fetch message
-            stmt = select(Message).where(Message.id == message_id)
-            result = await db.execute(stmt)
-            msg = result.scalar_one_or_none()
-
-            if not msg:
-                await websocket.send_json(
-                    {"type": "error", "message": "Message not found"}
-                )
-                return
-
-            # Verify participant
-            stmt_participant = select(ConversationParticipant).where(
-                and_(
-                    ConversationParticipant.conversation_id == msg.conversation_id,
-                    ConversationParticipant.user_id == user_id,
-                )
-            )
-            result_participant = await db.execute(stmt_participant)
-            participant = result_participant.scalar_one_or_none()
-
-            if not participant:
-                await websocket.send_json(
-                    {"type": "error", "message": "Not a participant"}
-                )
-                return
-
-            # Create or update read receipt
-            stmt_receipt = select(ReadReceipt).where(
-                and_(
-                    ReadReceipt.message_id == message_id,
-                    ReadReceipt.user_id == user_id,
-                )
-            )
-            result_receipt = await db.execute(stmt_receipt)
-            receipt = result_receipt.scalar_one_or_none()
-
-            if not receipt:
-                receipt = ReadReceipt(
-                    message_id=message_id,
-                    user_id=user_id,
-                    conversation_id=msg.conversation_id,
-                )
-                db.add(receipt)
-
-            # Update last_read_at in participant
-            participant.last_read_at = func.now()
-
-            await db.commit()
-
-            # Update user activity in presence system
-            await update_user_activity(user_id)
-
-            # Broadcast read receipt (optional - for read indicators)
-            pubsub = get_pubsub()
-            await pubsub.publish_message(
-                conversation_id=msg.conversation_id,
-                message_data={
-                    "type": "message.read",
-                    "message_id": str(message_id),
-                    "user_id": user_id,
-                    "conversation_id": str(msg.conversation_id),
-                },
-            )
-
-            # Send acknowledgment
-            await websocket.send_json(
-                {"type": "read.confirmed", "message_id": str(message_id)}
-            )
-
-            logger.info(
-                f"Read receipt created via WebSocket: message={message_id}, user={user_id}"
-            )
+        await get_read_receipt_aggregator().record(user_id, message_id)
 
-            # Track analytics event
-            from app.messenger.analytics import (
-                AnalyticsEventType,
-                get_analytics_service,
-            )
+        # Update user activity in presence system
+        await update_user_activity(user_id)
 
-            analytics = get_analytics_service()
-            await analytics.track_event(
-                event_type=AnalyticsEventType.MESSAGE_READ,
-                user_id=user_id,
-                conversation_id=str(msg.conversation_id),
-                metadata={"message_id": str(message_id)},
-            )
+        # Acknowledge receipt (persisted on the next aggregator flush)
+        await websocket.send_json(
+            {"type": "read.confirmed", "message_id": str(message_id)}
+        )
 
     except Exception as e:
         logger.error(f"Error in handle_read_receipt: {e}")
@@ -3233,6 +3251,8 @@ async def send_push_notifications_for_message(
     Send push notifications to offline participants in a conversation.
 
     This runs as a background task and doesn't block the WebSocket handler.
+    Recipients, settings and devices are resolved in one query and sent in
+    provider batches (see PushNotificationService.send_message_fanout).
 
     Args:
         db_session: AsyncSessionLocal class (not instance)
@@ -3242,75 +3262,43 @@ async def send_push_notifications_for_message(
         message_id: Message UUID
     """
     try:
-        from app.messenger.push_notifications import get_push_service
-        from app.messenger.presence import get_presence_manager
+        from app.messenger.push_notifications import PushPayload, get_push_service
 
         async with db_session() as db:
-            # Get all participants except sender
-            stmt = select(ConversationParticipant).where(
-                and_(
-                    ConversationParticipant.conversation_id == conversation_id,
-                    ConversationParticipant.user_id != sender_id,
-                )
+            # Sender name and conversation title for the notification
+            result = await db.execute(
+                select(Conversation.title, User.full_name)
+                .select_from(Conversation)
+                .outerjoin(User, User.id == sender_id)
+                .where(Conversation.id == conversation_id)
             )
-            result = await db.execute(stmt)
-            participants = result.scalars().all()
-
-            # Get sender info for notification
-            sender_stmt = select(User).where(User.id == sender_id)
-            sender_result = await db.execute(sender_stmt)
-            sender = sender_result.scalar_one_or_none()
-            sender_name = sender.username if sender else f"User {sender_id}"
-
-            # Get conversation title
-            conv_stmt = select(Conversation).where(Conversation.id == conversation_id)
-            conv_result = await db.execute(conv_stmt)
-            conversation = conv_result.scalar_one_or_none()
-            conv_title = (
-                conversation.title
-                if conversation and conversation.title
-                else "New message"
+            row = result.one_or_none()
+            conv_title = row[0] if row and row[0] else "New message"
+            sender_name = row[1] if row and row[1] else f"User {sender_id}"
+
+            payload = PushPayload(
+                title=f"{sender_name} • {conv_title}",
+                body=message_content[:100],  # Truncate to 100 chars
+                data={
+                    "conversation_id": str(conversation_id),
+                    "message_id": str(message_id),
+                    "sender_id": sender_id,
+                    "type": "message.new",
+                },
             )
 
-            presence_manager = get_presence_manager()
-            push_service = get_push_service()
-
-            # Send push to each offline participant
-            for participant in participants:
-                try:
-                    # Check if user is online
-                    status = await presence_manager.get_status(participant.user_id)
-
-                    # Only send push if user is offline
-                    is_online = status and status.get("status") == "online"
-                    if not is_online:
-                        # Prepare notification
-                        title = f"{sender_name} • {conv_title}"
-                        body = message_content[:100]  # Truncate to 100 chars
-
-                        # Send push notification
-                        await push_service.send_push_notification(
-                            db=db,
-                            user_id=participant.user_id,
-                            title=title,
-                            body=body,
-                            data={
-                                "conversation_id": str(conversation_id),
-                                "message_id": str(message_id),
-                                "sender_id": sender_id,
-                                "type": "message.new",
-                            },
-                            conversation_id=str(conversation_id),
-                        )
-
-                        logger.info(
-                            f"Push notification sent: user={participant.user_id}, conv={conversation_id}"
-                        )
+            stats = await get_push_service().send_message_fanout(
+                db,
+                conversation_id=conversation_id,
+                sender_id=sender_id,
+                payload=payload,
+            )
 
-                except Exception as e:
-                    logger.error(
-                        f"Failed to send push to user {participant.user_id}: {e}"
-                    )
+            logger.info(
+                f"Push fan-out: conv={conversation_id}, "
+                f"recipients={stats['recipients']}, devices={stats['devices']}, "
+                f"delivered={stats['success_count']}, batches={stats['batches']}"
+            )
 
     except Exception as e:
         logger.error(f"Error in send_push_notifications_for_message: {e}")
@@ -4156,7 +4144,12 @@ async def search_messages(
         description="Sort order: relevance, date_desc, date_asc",
     ),
     limit: int = Query(50, ge=1, le=100, description="Results per page"),
-    offset: int = Query(0, ge=0, description="Result offset for pagination"),
+    offset: int = Query(
+        0, ge=0, description="Result offset (deprecated, use cursor)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the previous page's next_cursor"
+    ),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -4174,16 +4167,19 @@ async def search_messages(
         - end_date: Filter messages before date (optional)
         - sort_by: Sort order (relevance/date_desc/date_asc, default: relevance)
         - limit: Results per page (1-100, default: 50)
-        - offset: Pagination offset (default: 0)
+        - offset: Pagination offset (deprecated, default: 0)
+        - cursor: next_cursor from the previous page (optional)
 
     Returns:
         Search results with:
         - query: Original search query
-        - total_count: Total matching results
+        - total_count: Total matching results (capped)
+        - total_count_capped: Whether counting stopped at the cap
         - results: List of message results with relevance ranking
         - limit: Results per page
         - offset: Current offset
         - has_more: Whether more results are available
+        - next_cursor: Cursor for the next page (null on the last page)
 
     Features:
         - Full-text search with relevance ranking (ts_rank)
@@ -4217,19 +4213,23 @@ async def search_messages(
 
     search_service = get_search_service()
 
-    results = await search_service.search_messages(
-        db=db,
-        query=query,
-        user_id=int(user.id),  # type: ignore
-        conversation_id=conversation_id,
-        sender_id=sender_id,
-        message_type=parsed_type,
-        start_date=start_date,
-        end_date=end_date,
-        sort_by=sort_order,
-        limit=limit,
-        offset=offset,
-    )
+    try:
+        results = await search_service.search_messages(
+            db=db,
+            query=query,
+            user_id=int(user.id),  # type: ignore
+            conversation_id=conversation_id,
+            sender_id=sender_id,
+            message_type=parsed_type,
+            start_date=start_date,
+            end_date=end_date,
+            sort_by=sort_order,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return results
 
@@ -5606,6 +5606,15 @@ async def create_reply(
             },
         )
 
+        from app.messenger.analytics import get_analytics_service
+
+        await get_analytics_service().track_message_sent(
+            reply,
+            parent_id=str(message_id),
+            thread_id=str(reply.thread_id),
+            is_reply=True,
+        )
+
         return MessageResponse(
             id=reply.id,
             conversation_id=reply.conversation_id,
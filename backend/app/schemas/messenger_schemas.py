@@ -115,9 +115,10 @@ class ConversationListResponse(BaseModel):
     """Paginated conversation list"""
 
     conversations: list[ConversationResponse]
-    total: int
+    total: Optional[int] = None  # First page only
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 # ============================================================================
@@ -211,10 +212,12 @@ class MessageListResponse(BaseModel):
     """Paginated message list"""
 
     messages: list[MessageResponse]
-    total: int
+    total: Optional[int] = None  # Only with include_total
     page: int
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = None  # Older messages
+    prev_cursor: Optional[str] = None  # Newer messages
 
 
 # ============================================================================
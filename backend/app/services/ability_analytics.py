@@ -7,16 +7,19 @@ Provides computational logic for:
 - Priority scoring (tutor)
 - Percentile calculation
 - Delta theta computation
+- Batch loaders for dashboards (latest ability + delta, session activity)
 """
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.exam_models import IRTStudentAbility, ExamSession
 from app.schemas.ability_schemas import RiskLevel, StudentFlag, ThetaBand
+from app.services.theta_distribution import get_theta_distribution
 
 
 # ============================================================================
@@ -125,39 +128,20 @@ async def compute_empirical_percentile(
     Compute empirical percentile rank within subject cohort.
 
     This is more accurate than using theoretical N(0,1) distribution,
-    especially after calibration drift.
+    especially after calibration drift. Reads the process-wide sorted theta
+    snapshot (see theta_distribution), so repeated calls are in-memory
+    binary searches rather than count queries.
 
     Args:
-        db: Database session
+        db: Database session (used only to load the snapshot)
         subject: Subject name (e.g., 'math')
         theta: Student's theta value
 
     Returns:
         Empirical percentile rank (0-100)
     """
-    # Count students with lower theta in this subject
-    stmt = (
-        select(func.count())
-        .select_from(IRTStudentAbility)
-        .where(
-            IRTStudentAbility.subject == subject,
-            IRTStudentAbility.theta < theta,
-        )
-    )
-    result = await db.execute(stmt)
-    lower_count = result.scalar() or 0
-
-    # Total students in this subject
-    stmt_total = (
-        select(func.count())
-        .select_from(IRTStudentAbility)
-        .where(IRTStudentAbility.subject == subject)
-    )
-    result_total = await db.execute(stmt_total)
-    total_count = result_total.scalar() or 1  # Avoid division by zero
-
-    percentile = (lower_count / total_count) * 100
-    return max(0, min(100, int(round(percentile))))
+    distribution = await get_theta_distribution(db)
+    return distribution.percentile(subject, theta)
 
 
 # ============================================================================
@@ -498,7 +482,7 @@ async def count_recent_sessions(
         .select_from(ExamSession)
         .where(
             ExamSession.user_id == user_id,
-            ExamSession.created_at >= cutoff,
+            ExamSession.started_at >= cutoff,
         )
     )
     result = await db.execute(stmt)
@@ -520,10 +504,158 @@ async def get_last_activity(
         Last activity timestamp, or None if never active
     """
     stmt = (
-        select(ExamSession.created_at)
+        select(ExamSession.last_activity_at)
         .where(ExamSession.user_id == user_id)
-        .order_by(ExamSession.created_at.desc())
+        .order_by(ExamSession.last_activity_at.desc())
         .limit(1)
     )
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
+
+
+# ============================================================================
+# Batch Loaders (Dashboards)
+# ============================================================================
+
+
+@dataclass
+class AbilitySnapshot:
+    """Latest calibration of one (student, subject) with its windowed delta."""
+    user_id: str
+    subject: str
+    theta: float
+    theta_se: float
+    calibrated_at: datetime
+    delta_theta: Optional[float]  # None if no calibration near the cutoff
+
+
+@dataclass
+class SessionActivity:
+    """Exam session activity of one student."""
+    sessions_recent: int
+    last_activity_at: Optional[datetime]
+
+
+async def load_latest_abilities(
+    db: AsyncSession,
+    delta_days: int,
+    subject: Optional[str] = None,
+    user_ids: Optional[Iterable[str]] = None,
+) -> Dict[Tuple[str, str], AbilitySnapshot]:
+    """
+    Latest ability and delta theta for many (user, subject) pairs at once.
+
+    Batch form of compute_delta_theta: a single window-function query ranks
+    each pair's calibrations twice, by recency overall and by recency within
+    ±2 days of ``now - delta_days``, and keeps the top row of each.
+
+    Args:
+        db: Database session
+        delta_days: Lookback window for delta theta (e.g., 7, 14, 30)
+        subject: Optional subject filter
+        user_ids: Optional student filter
+
+    Returns:
+        {(user_id, subject): AbilitySnapshot}
+    """
+    cutoff = datetime.utcnow() - timedelta(days=delta_days)
+    in_window = IRTStudentAbility.calibrated_at.between(
+        cutoff - timedelta(days=2), cutoff + timedelta(days=2)
+    )
+    pair = (IRTStudentAbility.user_id, IRTStudentAbility.subject)
+    newest_first = IRTStudentAbility.calibrated_at.desc()
+
+    ranked = select(
+        IRTStudentAbility.user_id,
+        IRTStudentAbility.subject,
+        IRTStudentAbility.theta,
+        IRTStudentAbility.theta_se,
+        IRTStudentAbility.calibrated_at,
+        in_window.label("in_window"),
+        func.row_number()
+        .over(partition_by=pair, order_by=newest_first)
+        .label("recent_rank"),
+        func.row_number()
+        .over(partition_by=(*pair, in_window), order_by=newest_first)
+        .label("window_rank"),
+    ).where(IRTStudentAbility.subject.is_not(None))
+    if subject is not None:
+        ranked = ranked.where(IRTStudentAbility.subject == subject)
+    if user_ids is not None:
+        ranked = ranked.where(IRTStudentAbility.user_id.in_(list(user_ids)))
+    ranked = ranked.subquery("ranked")
+
+    latest = ranked.c.recent_rank == 1
+    near_cutoff = and_(ranked.c.in_window, ranked.c.window_rank == 1)
+    stmt = select(
+        ranked.c.user_id,
+        ranked.c.subject,
+        func.max(ranked.c.theta).filter(latest).label("theta"),
+        func.max(ranked.c.theta_se).filter(latest).label("theta_se"),
+        func.max(ranked.c.calibrated_at).label("calibrated_at"),
+        func.max(ranked.c.theta).filter(near_cutoff).label("window_theta"),
+    ).group_by(ranked.c.user_id, ranked.c.subject)
+
+    result = await db.execute(stmt)
+
+    snapshots: Dict[Tuple[str, str], AbilitySnapshot] = {}
+    for row in result.all():
+        user_id = str(row.user_id)
+        delta = None
+        if row.window_theta is not None:
+            delta = row.theta - row.window_theta
+        snapshots[(user_id, row.subject)] = AbilitySnapshot(
+            user_id=user_id,
+            subject=row.subject,
+            theta=row.theta,
+            theta_se=row.theta_se,
+            calibrated_at=row.calibrated_at,
+            delta_theta=delta,
+        )
+    return snapshots
+
+
+async def load_session_activity(
+    db: AsyncSession,
+    user_ids: Iterable[str],
+    days: int,
+) -> Dict[str, SessionActivity]:
+    """
+    Recent session counts and last activity for many students at once.
+
+    Batch form of count_recent_sessions + get_last_activity: one grouped
+    query over exam_sessions. Students without sessions are absent.
+
+    Args:
+        db: Database session
+        user_ids: Student UUIDs
+        days: Lookback window for the session count
+
+    Returns:
+        {user_id: SessionActivity}
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    stmt = (
+        select(
+            ExamSession.user_id,
+            func.count()
+            .filter(ExamSession.started_at >= cutoff)
+            .label("sessions_recent"),
+            func.max(ExamSession.last_activity_at).label("last_activity_at"),
+        )
+        .where(ExamSession.user_id.in_(user_ids))
+        .group_by(ExamSession.user_id)
+    )
+    result = await db.execute(stmt)
+
+    return {
+        str(row.user_id): SessionActivity(
+            sessions_recent=row.sessions_recent,
+            last_activity_at=row.last_activity_at,
+        )
+        for row in result.all()
+    }
@@ -10,62 +10,275 @@ Architecture:
  - Redis stores serialized engine state (theta, item history, responses)
  - TTL prevents memory leaks (default: 1 hour)
  - Fallback to DB reconstruction if Redis state is lost
+ - Active sessions are tracked in a sorted set (score = expiry time),
+   so listing them never scans the keyspace
+ - Multi-session load/save/extend_ttl run as single pipelines
 
 Key Format:
-    adaptive_engine:{exam_session_id}
+    adaptive_engine:{exam_session_id}     engine state
+    adaptive_engine_index:active          ZSET of session IDs by expiry
 
-Value Format (JSON):
+Value Format (packed binary, little-endian):
+    header      58 bytes   magic "AE", format version, method, max_items,
+                           n_items, theta, se, posterior grid spec
+    responses   bitset     one bit per response (capacity from max_items)
+    posterior   n × f64    EAP log-posterior vector (EAP engines only)
+    records     n × 32 B   appended per attempt: item_id i64, a/b/c f64
+
+The header, bitset and posterior are fixed-width, so recording an attempt
+(append_attempt) is SETRANGE + SETBIT + APPEND in one pipeline instead of
+re-encoding the whole state.
+
+The packed format needs a client with decode_responses=False
+(app.core.redis.get_redis_binary). With a decoding client the store keeps
+using the legacy JSON value format:
     {
       "theta": float,
       "standard_error": float,
       "item_params_list": [{"a": 1.5, "b": 0.2, "c": 0.2}, ...],
       "responses": [true, false, true, ...],
-      "max_items": int
+      "max_items": int,
+      "estimation_method": "mle" | "eap",
+      "eap_posterior": {...} | null   # EAPPosterior.to_dict() for EAP engines
     }
+Both formats are readable by load_engine.
+
+EAP engines persist their log-posterior vector, so a resumed session
+continues from it instead of replaying the response history.
 
 Usage:
-    from app.core.redis import get_redis
+    from app.core.redis import get_redis_binary
     from app.services.adaptive_state_store import AdaptiveEngineStateStore
-    
-    redis_client = get_redis()
+
+    redis_client = get_redis_binary()
     store = AdaptiveEngineStateStore(redis_client)
-    
+
     # Save engine state
     engine = AdaptiveEngine(initial_theta=0.5)
     await store.save_engine(exam_session_id=123, engine=engine)
-    
+
+    # Record an attempt without rewriting the stored state
+    engine.record_attempt(item_id=42, params=params, correct=True)
+    await store.append_attempt(exam_session_id=123, engine=engine)
+
     # Load engine state
     engine = await store.load_engine(exam_session_id=123)
-    
+
     # Delete when exam completes
     await store.delete_engine(exam_session_id=123)
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 import json
 import logging
+import math
+import struct
+import time
 
+import numpy as np
 import redis.asyncio as redis
 
 from app.services.exam_engine import AdaptiveEngine
+from app.services.irt_eap_estimator import EAPPosterior, IRTResponse
 
 
 logger = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# Packed binary format
+# ---------------------------------------------------------------------------
+
+MAGIC = b"AE"
+FORMAT_VERSION = 1
+
+# magic, version, method, max_items, n_items, theta, se,
+# posterior n_points, grid_min, grid_max, prior_mean, prior_sd
+_HEADER = struct.Struct("<2sBBHHddHdddd")
+_RECORD = struct.Struct("<qddd")  # item_id, a, b, c
+
+_METHODS = {"mle": 0, "eap": 1}
+_METHOD_NAMES = {code: name for name, code in _METHODS.items()}
+
+
+def _bitset_bytes(max_items: int) -> int:
+    """Response bitset size for an engine (at least 64 responses)."""
+    return max(8, (max_items + 7) // 8)
+
+
+def _posterior_points(engine: AdaptiveEngine) -> int:
+    return int(engine.posterior.grid.size) if engine.posterior is not None else 0
+
+
+def _records_offset(engine: AdaptiveEngine) -> int:
+    """Byte offset of the first attempt record."""
+    return (
+        _HEADER.size
+        + _bitset_bytes(engine.max_items)
+        + 8 * _posterior_points(engine)
+    )
+
+
+def _pack_header(engine: AdaptiveEngine) -> bytes:
+    se = engine.current_standard_error()
+    posterior = engine.posterior
+    return _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        _METHODS.get(engine.estimation_method, 0),
+        engine.max_items,
+        len(engine.responses),
+        engine.theta,
+        se if se is not None else math.nan,
+        _posterior_points(engine),
+        posterior.grid_min if posterior is not None else 0.0,
+        posterior.grid_max if posterior is not None else 0.0,
+        posterior.prior_mean if posterior is not None else 0.0,
+        posterior.prior_sd if posterior is not None else 0.0,
+    )
+
+
+def _pack_posterior(engine: AdaptiveEngine) -> bytes:
+    if engine.posterior is None:
+        return b""
+    return engine.posterior.log_posterior.astype("<f8").tobytes()
+
+
+def _pack_record(engine: AdaptiveEngine, index: int) -> bytes:
+    params = engine.item_params_list[index]
+    item_id = engine.item_ids[index] if index < len(engine.item_ids) else None
+    return _RECORD.pack(
+        item_id if item_id is not None else -1,
+        params["a"],
+        params["b"],
+        params.get("c") or 0.0,
+    )
+
+
+def pack_engine_state(engine: AdaptiveEngine) -> bytes:
+    """
+    Encode an engine in the packed binary format.
+
+    Args:
+        engine: AdaptiveEngine to encode
+
+    Returns:
+        bytes: header + response bitset + posterior + attempt records
+
+    Raises:
+        ValueError: If the engine has more responses than its bitset holds
+    """
+    n = len(engine.responses)
+    capacity = _bitset_bytes(engine.max_items)
+    if n > capacity * 8:
+        raise ValueError(
+            f"{n} responses exceed bitset capacity {capacity * 8} "
+            f"for max_items={engine.max_items}"
+        )
+
+    bits = np.zeros(capacity * 8, dtype=np.uint8)
+    bits[:n] = np.asarray(engine.responses, dtype=bool)
+
+    return b"".join([
+        _pack_header(engine),
+        np.packbits(bits).tobytes(),
+        _pack_posterior(engine),
+        b"".join(_pack_record(engine, i) for i in range(n)),
+    ])
+
+
+def unpack_header(raw: bytes) -> Dict[str, Any]:
+    """
+    Decode the fixed-size header of a packed engine state.
+
+    Raises:
+        ValueError: If raw is not a packed engine state
+    """
+    if len(raw) < _HEADER.size or raw[:2] != MAGIC:
+        raise ValueError("Not a packed engine state")
+    (
+        _magic, version, method, max_items, n_items, theta, se,
+        n_points, grid_min, grid_max, prior_mean, prior_sd,
+    ) = _HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported engine state version {version}")
+    return {
+        "estimation_method": _METHOD_NAMES.get(method, "mle"),
+        "max_items": max_items,
+        "items_completed": n_items,
+        "theta": theta,
+        "standard_error": None if math.isnan(se) else se,
+        "n_points": n_points,
+        "grid_min": grid_min,
+        "grid_max": grid_max,
+        "prior_mean": prior_mean,
+        "prior_sd": prior_sd,
+    }
+
+
+def unpack_engine_state(raw: bytes) -> AdaptiveEngine:
+    """
+    Rebuild an AdaptiveEngine from the packed binary format.
+
+    Raises:
+        ValueError: If raw is not a valid packed engine state
+    """
+    header = unpack_header(raw)
+    n = header["items_completed"]
+
+    engine = AdaptiveEngine(
+        initial_theta=header["theta"],
+        estimation_method=header["estimation_method"],
+        max_items=header["max_items"],
+    )
+
+    offset = _HEADER.size
+    capacity = _bitset_bytes(header["max_items"])
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, count=capacity, offset=offset))
+    engine.responses = [bool(b) for b in bits[:n]]
+    offset += capacity
+
+    n_points = header["n_points"]
+    if n_points:
+        log_posterior = np.frombuffer(raw, dtype="<f8", count=n_points, offset=offset)
+        engine.posterior = EAPPosterior(
+            prior_mean=header["prior_mean"],
+            prior_sd=header["prior_sd"],
+            grid_min=header["grid_min"],
+            grid_max=header["grid_max"],
+            n_points=n_points,
+            log_posterior=log_posterior,
+            n_responses=n,
+        )
+        offset += 8 * n_points
+
+    if len(raw) != offset + n * _RECORD.size:
+        raise ValueError(
+            f"Engine state has {len(raw)} bytes, expected {offset + n * _RECORD.size}"
+        )
+    records = list(_RECORD.iter_unpack(raw[offset:]))
+    engine.item_ids = [item_id for item_id, _, _, _ in records]
+    engine.item_params_list = [{"a": a, "b": b, "c": c} for _, a, b, c in records]
+    engine.theta = header["theta"]
+    return engine
+
+
 class AdaptiveEngineStateStore:
     """
     Redis-based state storage for AdaptiveEngine instances.
-    
+
     Manages serialization/deserialization of engine state to Redis,
     with automatic TTL and fallback handling.
-    
+
     Attributes:
         redis: Async Redis client
         default_ttl: Default TTL for engine state (seconds)
+        binary: True if states are stored in the packed binary format
     """
 
+    index_key = "adaptive_engine_index:active"
+
     def __init__(
         self,
         redis_client: redis.Redis,
@@ -73,26 +286,99 @@ class AdaptiveEngineStateStore:
     ):
         """
         Initialize state store.
-        
+
         Args:
-            redis_client: Async Redis client
+            redis_client: Async Redis client. Use a client with
+                decode_responses=False for the packed binary format.
             default_ttl: Default TTL in seconds (default: 1 hour)
         """
         self.redis = redis_client
         self.default_ttl = default_ttl
+        pool_kwargs = getattr(
+            getattr(redis_client, "connection_pool", None), "connection_kwargs", {}
+        )
+        self.binary = not pool_kwargs.get("decode_responses", False)
 
     def _key(self, exam_session_id: int) -> str:
         """
         Generate Redis key for exam session.
-        
+
         Args:
             exam_session_id: ID of exam session
-        
+
         Returns:
             Redis key string
         """
         return f"adaptive_engine:{exam_session_id}"
 
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def _encode(self, engine: AdaptiveEngine) -> Any:
+        """Encode engine state in the store's value format."""
+        if self.binary:
+            try:
+                return pack_engine_state(engine)
+            except ValueError as e:
+                logger.warning(f"Falling back to JSON engine state: {e}")
+
+        return json.dumps({
+            "theta": engine.theta,
+            "standard_error": engine.current_standard_error(),
+            "item_params_list": engine.item_params_list,
+            "responses": engine.responses,
+            "max_items": engine.max_items,
+            "items_completed": len(engine.responses),
+            "item_ids": engine.item_ids,
+            "estimation_method": engine.estimation_method,
+            "eap_posterior": (
+                engine.posterior.to_dict()
+                if engine.posterior is not None
+                else None
+            ),
+        })
+
+    @staticmethod
+    def _decode(
+        raw: Any,
+        initial_theta: float,
+        max_items: int
+    ) -> AdaptiveEngine:
+        """Decode a stored value in either format."""
+        if isinstance(raw, bytes) and raw[:2] == MAGIC:
+            return unpack_engine_state(raw)
+
+        data = json.loads(raw)
+
+        # Reconstruct engine from saved state
+        engine = AdaptiveEngine(
+            initial_theta=data.get("theta", initial_theta),
+            estimation_method=data.get("estimation_method", "mle"),
+            max_items=data.get("max_items", max_items)
+        )
+
+        # Restore history
+        engine.item_params_list = data.get("item_params_list", [])
+        engine.responses = data.get("responses", [])
+        engine.item_ids = data.get("item_ids", [])
+
+        # Restore EAP posterior (replay history only for old payloads)
+        if engine.posterior is not None:
+            if data.get("eap_posterior"):
+                engine.posterior = EAPPosterior.from_dict(data["eap_posterior"])
+            elif engine.responses:
+                engine.posterior.extend([
+                    IRTResponse(a=p["a"], b=p["b"], c=p["c"], u=int(r))
+                    for p, r in zip(engine.item_params_list, engine.responses)
+                ])
+
+        return engine
+
+    # ------------------------------------------------------------------
+    # Load / save
+    # ------------------------------------------------------------------
+
     async def load_engine(
         self,
         exam_session_id: int,
@@ -101,18 +387,18 @@ class AdaptiveEngineStateStore:
     ) -> AdaptiveEngine:
         """
         Load AdaptiveEngine state from Redis.
-        
+
         If state doesn't exist or is corrupted, creates new engine
         with provided initial values.
-        
+
         Args:
             exam_session_id: ID of exam session
             initial_theta: Initial theta if creating new engine
             max_items: Max items if creating new engine
-        
+
         Returns:
             AdaptiveEngine: Loaded or newly created engine
-        
+
         Example:
             engine = await store.load_engine(
                 exam_session_id=123,
@@ -120,58 +406,87 @@ class AdaptiveEngineStateStore:
             )
         """
         key = self._key(exam_session_id)
-        
+
         try:
             raw = await self.redis.get(key)
-            if not raw:
-                logger.info(
-                    f"No engine state found for session {exam_session_id}, "
-                    f"creating new engine with theta={initial_theta}"
-                )
-                return AdaptiveEngine(
-                    initial_theta=initial_theta,
-                    max_items=max_items
-                )
-
-            data = json.loads(raw)
-            
-            # Reconstruct engine from saved state
-            engine = AdaptiveEngine(
-                initial_theta=data.get("theta", initial_theta),
-                max_items=data.get("max_items", max_items)
-            )
-            
-            # Restore history
-            engine.item_params_list = data.get("item_params_list", [])
-            engine.responses = data.get("responses", [])
-            
-            logger.debug(
-                f"Loaded engine for session {exam_session_id}: "
-                f"theta={engine.theta:.3f}, items={len(engine.responses)}"
+        except Exception as e:
+            logger.error(
+                f"Error loading engine for session {exam_session_id}: {e}"
             )
-            
-            return engine
+            raw = None
 
-        except json.JSONDecodeError as e:
-            logger.error(
-                f"Failed to decode engine state for session {exam_session_id}: {e}"
+        return self._engine_from_raw(exam_session_id, raw, initial_theta, max_items)
+
+    async def load_engines(
+        self,
+        exam_session_ids: Iterable[int],
+        initial_theta: float = 0.0,
+        max_items: int = 20
+    ) -> Dict[int, AdaptiveEngine]:
+        """
+        Load several engines with a single MGET.
+
+        Missing or corrupted states yield new engines, as in load_engine.
+
+        Args:
+            exam_session_ids: IDs of exam sessions
+            initial_theta: Initial theta for new engines
+            max_items: Max items for new engines
+
+        Returns:
+            Dict mapping exam_session_id to AdaptiveEngine
+        """
+        ids = list(exam_session_ids)
+        if not ids:
+            return {}
+
+        try:
+            raws = await self.redis.mget([self._key(i) for i in ids])
+        except Exception as e:
+            logger.error(f"Error loading engines for {len(ids)} sessions: {e}")
+            raws = [None] * len(ids)
+
+        return {
+            session_id: self._engine_from_raw(session_id, raw, initial_theta, max_items)
+            for session_id, raw in zip(ids, raws)
+        }
+
+    def _engine_from_raw(
+        self,
+        exam_session_id: int,
+        raw: Any,
+        initial_theta: float,
+        max_items: int
+    ) -> AdaptiveEngine:
+        """Decode a loaded value, falling back to a fresh engine."""
+        if not raw:
+            logger.info(
+                f"No engine state found for session {exam_session_id}, "
+                f"creating new engine with theta={initial_theta}"
             )
-            # Return fresh engine on corruption
             return AdaptiveEngine(
                 initial_theta=initial_theta,
                 max_items=max_items
             )
-        
-        except Exception as e:
+
+        try:
+            engine = self._decode(raw, initial_theta, max_items)
+        except (ValueError, KeyError, TypeError, struct.error) as e:
             logger.error(
-                f"Error loading engine for session {exam_session_id}: {e}"
+                f"Failed to decode engine state for session {exam_session_id}: {e}"
             )
-            # Fallback to new engine
+            # Return fresh engine on corruption
             return AdaptiveEngine(
                 initial_theta=initial_theta,
                 max_items=max_items
             )
 
+        logger.debug(
+            f"Loaded engine for session {exam_session_id}: "
+            f"theta={engine.theta:.3f}, items={len(engine.responses)}"
+        )
+        return engine
+
     async def save_engine(
         self,
         exam_session_id: int,
@@ -180,18 +495,19 @@ class AdaptiveEngineStateStore:
     ) -> bool:
         """
         Save AdaptiveEngine state to Redis.
-        
-        Serializes engine to JSON and stores with TTL to prevent
-        memory leaks from abandoned exams.
-        
+
+        Serializes the full engine state and stores it with TTL to prevent
+        memory leaks from abandoned exams. Use append_attempt to record a
+        single new attempt without rewriting the state.
+
         Args:
             exam_session_id: ID of exam session
             engine: AdaptiveEngine instance to save
             ttl_sec: TTL in seconds (default: use default_ttl)
-        
+
         Returns:
             bool: True if save succeeded, False otherwise
-        
+
         Example:
             success = await store.save_engine(
                 exam_session_id=123,
@@ -199,61 +515,140 @@ class AdaptiveEngineStateStore:
                 ttl_sec=7200  # 2 hours
             )
         """
-        key = self._key(exam_session_id)
+        return await self.save_engines({exam_session_id: engine}, ttl_sec=ttl_sec)
+
+    async def save_engines(
+        self,
+        engines: Dict[int, AdaptiveEngine],
+        ttl_sec: Optional[int] = None
+    ) -> bool:
+        """
+        Save several engines and update the active index in one pipeline.
+
+        Args:
+            engines: Dict mapping exam_session_id to AdaptiveEngine
+            ttl_sec: TTL in seconds (default: use default_ttl)
+
+        Returns:
+            bool: True if save succeeded, False otherwise
+        """
+        if not engines:
+            return True
         ttl = ttl_sec or self.default_ttl
-        
+
         try:
-            # Serialize engine state
-            payload = {
-                "theta": engine.theta,
-                "standard_error": engine.get_session_summary()["standard_error"],
-                "item_params_list": engine.item_params_list,
-                "responses": engine.responses,
-                "max_items": engine.max_items,
-                "items_completed": len(engine.responses)
-            }
-            
-            raw = json.dumps(payload)
-            await self.redis.set(key, raw, ex=ttl)
-            
+            pipe = self.redis.pipeline(transaction=False)
+            for session_id, engine in engines.items():
+                pipe.set(self._key(session_id), self._encode(engine), ex=ttl)
+            pipe.zadd(
+                self.index_key,
+                {str(session_id): time.time() + ttl for session_id in engines},
+            )
+            await pipe.execute()
+
             logger.debug(
-                f"Saved engine for session {exam_session_id}: "
-                f"theta={engine.theta:.3f}, items={len(engine.responses)}, ttl={ttl}s"
+                f"Saved {len(engines)} engine(s): sessions={list(engines)}, ttl={ttl}s"
             )
-            
+
             return True
 
         except Exception as e:
             logger.error(
-                f"Failed to save engine for session {exam_session_id}: {e}"
+                f"Failed to save engines for sessions {list(engines)}: {e}"
+            )
+            return False
+
+    async def append_attempt(
+        self,
+        exam_session_id: int,
+        engine: AdaptiveEngine,
+        ttl_sec: Optional[int] = None
+    ) -> bool:
+        """
+        Persist the engine's latest attempt without rewriting its state.
+
+        Call after engine.record_attempt() on an engine whose previous state
+        is stored. Overwrites the fixed-width header and posterior, sets one
+        response bit and appends one attempt record, all in one pipeline.
+        If the stored state turns out not to match (expired key, other
+        writer), the full state is saved instead.
+
+        With a decoding (JSON) client this is equivalent to save_engine.
+
+        Args:
+            exam_session_id: ID of exam session
+            engine: AdaptiveEngine that has just recorded an attempt
+            ttl_sec: TTL in seconds (default: use default_ttl)
+
+        Returns:
+            bool: True if save succeeded, False otherwise
+        """
+        n = len(engine.responses)
+        capacity = _bitset_bytes(engine.max_items) * 8
+        if not self.binary or n == 0 or n > capacity:
+            return await self.save_engine(exam_session_id, engine, ttl_sec)
+
+        key = self._key(exam_session_id)
+        ttl = ttl_sec or self.default_ttl
+        expected_len = _records_offset(engine) + n * _RECORD.size
+
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.setrange(key, 0, _pack_header(engine))
+            if engine.posterior is not None:
+                pipe.setrange(
+                    key,
+                    _HEADER.size + _bitset_bytes(engine.max_items),
+                    _pack_posterior(engine),
+                )
+            pipe.setbit(key, _HEADER.size * 8 + (n - 1), int(engine.responses[-1]))
+            pipe.append(key, _pack_record(engine, n - 1))
+            pipe.expire(key, ttl)
+            pipe.zadd(self.index_key, {str(exam_session_id): time.time() + ttl})
+            results = await pipe.execute()
+        except Exception as e:
+            logger.error(
+                f"Failed to append attempt for session {exam_session_id}: {e}"
             )
             return False
 
+        new_len = results[3 if engine.posterior is not None else 2]
+        if new_len != expected_len:
+            logger.warning(
+                f"Engine state for session {exam_session_id} out of sync "
+                f"({new_len} != {expected_len} bytes), rewriting"
+            )
+            return await self.save_engine(exam_session_id, engine, ttl_sec)
+        return True
+
     async def delete_engine(self, exam_session_id: int) -> bool:
         """
         Delete engine state from Redis.
-        
+
         Call this when exam is completed to free memory.
-        
+
         Args:
             exam_session_id: ID of exam session
-        
+
         Returns:
             bool: True if deleted, False if key didn't exist
-        
+
         Example:
             await store.delete_engine(exam_session_id=123)
         """
         key = self._key(exam_session_id)
-        
+
         try:
-            result = await self.redis.delete(key)
-            
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(key)
+            pipe.zrem(self.index_key, str(exam_session_id))
+            result, _ = await pipe.execute()
+
             if result:
                 logger.info(f"Deleted engine state for session {exam_session_id}")
             else:
                 logger.debug(f"No engine state to delete for session {exam_session_id}")
-            
+
             return bool(result)
 
         except Exception as e:
@@ -265,10 +660,10 @@ class AdaptiveEngineStateStore:
     async def exists(self, exam_session_id: int) -> bool:
         """
         Check if engine state exists in Redis.
-        
+
         Args:
             exam_session_id: ID of exam session
-        
+
         Returns:
             bool: True if state exists, False otherwise
         """
@@ -278,10 +673,10 @@ class AdaptiveEngineStateStore:
     async def get_ttl(self, exam_session_id: int) -> int:
         """
         Get remaining TTL for engine state.
-        
+
         Args:
             exam_session_id: ID of exam session
-        
+
         Returns:
             int: Remaining TTL in seconds (-2 if key doesn't exist, -1 if no TTL)
         """
@@ -295,89 +690,139 @@ class AdaptiveEngineStateStore:
     ) -> bool:
         """
         Extend TTL for engine state.
-        
+
         Useful for long exams to prevent expiration.
-        
+
         Args:
             exam_session_id: ID of exam session
             additional_seconds: Seconds to add to current TTL
-        
+
         Returns:
             bool: True if extended, False otherwise
         """
-        key = self._key(exam_session_id)
-        
+        extended = await self.extend_ttls([exam_session_id], additional_seconds)
+        return extended.get(exam_session_id, False)
+
+    async def extend_ttls(
+        self,
+        exam_session_ids: Iterable[int],
+        additional_seconds: int
+    ) -> Dict[int, bool]:
+        """
+        Extend TTL for several engines with two pipelined round trips.
+
+        Args:
+            exam_session_ids: IDs of exam sessions
+            additional_seconds: Seconds to add to each current TTL
+
+        Returns:
+            Dict mapping exam_session_id to True if extended
+        """
+        ids = list(exam_session_ids)
+        if not ids:
+            return {}
+
         try:
-            current_ttl = await self.redis.ttl(key)
-            if current_ttl > 0:
-                new_ttl = current_ttl + additional_seconds
-                await self.redis.expire(key, new_ttl)
-                logger.debug(
-                    f"Extended TTL for session {exam_session_id} by {additional_seconds}s"
-                )
-                return True
-            return False
+            pipe = self.redis.pipeline(transaction=False)
+            for session_id in ids:
+                pipe.ttl(self._key(session_id))
+            current_ttls = await pipe.execute()
+
+            now = time.time()
+            extended = {}
+            pipe = self.redis.pipeline(transaction=False)
+            for session_id, current_ttl in zip(ids, current_ttls):
+                extended[session_id] = current_ttl > 0
+                if current_ttl > 0:
+                    new_ttl = current_ttl + additional_seconds
+                    pipe.expire(self._key(session_id), new_ttl)
+                    pipe.zadd(self.index_key, {str(session_id): now + new_ttl})
+            if any(extended.values()):
+                await pipe.execute()
+
+            logger.debug(
+                f"Extended TTL by {additional_seconds}s for "
+                f"{sum(extended.values())}/{len(ids)} sessions"
+            )
+            return extended
 
         except Exception as e:
             logger.error(
-                f"Failed to extend TTL for session {exam_session_id}: {e}"
+                f"Failed to extend TTL for sessions {ids}: {e}"
             )
-            return False
+            return {session_id: False for session_id in ids}
 
     async def get_all_active_sessions(self) -> List[int]:
         """
         Get all active exam session IDs from Redis.
-        
+
+        Reads the active-session sorted set; entries whose TTL has passed
+        are pruned in the same pipeline.
+
         Returns:
             List[int]: List of exam session IDs with stored state
-        
+
         Example:
             active_sessions = await store.get_all_active_sessions()
             print(f"Active exams: {len(active_sessions)}")
         """
-        pattern = "adaptive_engine:*"
-        keys = await self.redis.keys(pattern)
-        
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zremrangebyscore(self.index_key, "-inf", time.time())
+        pipe.zrange(self.index_key, 0, -1)
+        _, members = await pipe.execute()
+
         session_ids = []
-        for key in keys:
+        for member in members:
             try:
-                # Extract session ID from key
-                session_id = int(key.split(":")[-1])
-                session_ids.append(session_id)
-            except (ValueError, IndexError):
-                logger.warning(f"Invalid engine key format: {key}")
-        
+                session_ids.append(int(member))
+            except (ValueError, TypeError):
+                logger.warning(f"Invalid active session entry: {member!r}")
+
         return session_ids
 
     async def get_engine_summary(self, exam_session_id: int) -> Optional[Dict[str, Any]]:
         """
         Get summary of engine state without loading full engine.
-        
+
+        For packed states only the fixed-size header is read (GETRANGE).
+
         Args:
             exam_session_id: ID of exam session
-        
+
         Returns:
             Dict with summary info, or None if not found
-        
+
         Example:
             summary = await store.get_engine_summary(123)
             print(f"Theta: {summary['theta']}, Items: {summary['items_completed']}")
         """
         key = self._key(exam_session_id)
-        
+
         try:
-            raw = await self.redis.get(key)
+            pipe = self.redis.pipeline(transaction=False)
+            if self.binary:
+                pipe.getrange(key, 0, _HEADER.size - 1)
+            else:
+                pipe.get(key)
+            pipe.ttl(key)
+            raw, ttl = await pipe.execute()
             if not raw:
                 return None
-            
-            data = json.loads(raw)
-            
+
+            if isinstance(raw, bytes) and raw[:2] == MAGIC:
+                data = unpack_header(raw)
+            else:
+                if self.binary:
+                    raw = await self.redis.get(key)
+                data = json.loads(raw)
+
+            se = data.get("standard_error")
             return {
                 "theta": data.get("theta", 0.0),
-                "standard_error": data.get("standard_error", 999.0),
+                "standard_error": se if se is not None else 999.0,
                 "items_completed": data.get("items_completed", 0),
                 "max_items": data.get("max_items", 20),
-                "ttl": await self.get_ttl(exam_session_id)
+                "ttl": ttl
             }
 
         except Exception as e:
@@ -20,6 +20,8 @@ from __future__ import annotations
 from typing import Optional, List, Dict, Any
 import math
 
+from app.services.irt_eap_estimator import EAPPosterior
+
 
 # ---------------------------------------------------------------------------
 # 1. IRT Utility Functions (3PL Model)
@@ -230,7 +232,8 @@ def select_next_item(
     content_constraints: Optional[Dict[str, int]] = None,
     exposure_control: bool = False,
     exposure_rates: Optional[Dict[int, float]] = None,
-    max_exposure_rate: float = 0.3
+    max_exposure_rate: float = 0.3,
+    info_index: Optional[Any] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Select item that maximizes information at current theta.
@@ -244,6 +247,10 @@ def select_next_item(
         exposure_control: whether to apply exposure control (default False)
         exposure_rates: dict of {item_id: exposure_rate} (optional)
         max_exposure_rate: maximum allowed exposure rate (default 0.3)
+        info_index: optional theta-grid index for the current calibration
+            (shared.irt.info_index.ThetaGridInfoIndex or ItemBankSnapshot);
+            used only when it covers every available item (default None =
+            full scan)
     
     Returns:
         Selected item dict, or None if no items available
@@ -251,7 +258,8 @@ def select_next_item(
     Selection Strategy:
         1. Filter items by content constraints
         2. Filter items by exposure control
-        3. Select item with maximum information
+        3. Select item with maximum information (grid index lookup when
+           info_index is given, otherwise a scan over available_items)
     """
     if not available_items:
         return None
@@ -268,6 +276,14 @@ def select_next_item(
             if exposure_rates.get(item["id"], 0.0) < max_exposure_rate
         ]
     
+    # Grid index lookup (full scan unless every available item is indexed)
+    if info_index is not None and available_items:
+        by_id = {item["id"]: item for item in available_items}
+        if info_index.covers(by_id):
+            hit = info_index.select(theta, allowed_ids=by_id.keys())
+            if hit is not None:
+                return by_id[hit[0]]
+
     # Select item with maximum information
     best_item = None
     best_info = -1
@@ -376,7 +392,8 @@ class AdaptiveEngine:
         initial_theta: float = 0.0,
         estimation_method: str = "mle",
         max_items: int = 20,
-        target_se: float = 0.3
+        target_se: float = 0.3,
+        info_index: Optional[Any] = None,
     ):
         """
         Initialize adaptive engine.
@@ -386,15 +403,28 @@ class AdaptiveEngine:
             estimation_method: "mle" or "eap" (default "mle")
             max_items: maximum test length (default 20)
             target_se: target standard error (default 0.3)
+            info_index: optional theta-grid information index used by
+                pick_item (see select_next_item)
+        
+        Notes:
+            With estimation_method="eap" the engine keeps an incremental
+            EAPPosterior on the same 40-point grid as update_theta_eap, so
+            each attempt costs O(grid) instead of replaying all responses.
         """
         self.theta = initial_theta
         self.estimation_method = estimation_method
         self.max_items = max_items
         self.target_se = target_se
+        self.info_index = info_index
         
         self.responses: List[bool] = []
         self.item_params_list: List[Dict[str, float]] = []
         self.item_ids: List[int] = []
+        self.posterior: Optional[EAPPosterior] = (
+            EAPPosterior(grid_min=-4.0, grid_max=4.0, n_points=40)
+            if estimation_method == "eap"
+            else None
+        )
 
     def record_attempt(
         self, 
@@ -417,16 +447,36 @@ class AdaptiveEngine:
         self.item_params_list.append(params)
         self.responses.append(correct)
 
-        updated = update_session_after_attempt(
-            self.theta, 
-            self.item_params_list, 
-            self.responses,
-            method=self.estimation_method
-        )
+        if self.posterior is not None:
+            result = self.posterior.update(
+                params["a"], params["b"], params["c"], int(correct)
+            )
+            updated = {"theta": result.theta, "standard_error": result.se}
+        else:
+            updated = update_session_after_attempt(
+                self.theta, 
+                self.item_params_list, 
+                self.responses,
+                method=self.estimation_method
+            )
 
         self.theta = updated["theta"]
         return updated
 
+    def current_standard_error(self) -> Optional[float]:
+        """
+        Standard error of the current theta estimate.
+        
+        Returns:
+            Posterior SD for EAP engines, Fisher-information SE otherwise;
+            None before the first attempt
+        """
+        if not self.responses:
+            return None
+        if self.posterior is not None:
+            return self.posterior.se
+        return compute_standard_error(self.item_params_list, self.theta)
+
     def pick_item(
         self, 
         available_items: List[Dict[str, Any]],
@@ -448,7 +498,9 @@ class AdaptiveEngine:
                 if item["id"] not in self.item_ids
             ]
         
-        return select_next_item(self.theta, available_items)
+        return select_next_item(
+            self.theta, available_items, info_index=self.info_index
+        )
 
     def should_stop(self) -> bool:
         """
@@ -457,7 +509,7 @@ class AdaptiveEngine:
         Returns:
             True if termination criteria met
         """
-        se = compute_standard_error(self.item_params_list, self.theta)
+        se = self.current_standard_error()
         return should_terminate(se, len(self.responses), self.max_items, self.target_se)
 
     def get_final_score(self, scale_mean: float = 500, scale_sd: float = 100) -> int:
@@ -480,7 +532,7 @@ class AdaptiveEngine:
         Returns:
             Dict with session statistics
         """
-        se = compute_standard_error(self.item_params_list, self.theta)
+        se = self.current_standard_error()
         
         return {
             "theta": self.theta,
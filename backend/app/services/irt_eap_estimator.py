@@ -12,17 +12,24 @@ Key features:
 - Standard error calculation
 - Compatible with mirt calibration results
 
+- Incremental log-space posterior (EAPPosterior) for live CAT sessions
+
 Usage in production CAT:
     from app.services.irt_eap_estimator import IRTResponse, EAPResult, estimate_theta_eap
     
     responses = [IRTResponse(a=1.2, b=-0.5, c=0.2, u=1), ...]
     result = estimate_theta_eap(responses)
     print(f"θ = {result.theta:.3f}, SE = {result.se:.3f}")
+
+Incremental (one grid-sized update per response):
+    posterior = EAPPosterior()
+    result = posterior.update(a=1.2, b=-0.5, c=0.2, u=1)
+    state = posterior.to_dict()  # persist; EAPPosterior.from_dict(state) resumes
 """
 
 import math
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Any, Dict, Optional, Sequence
 
 import numpy as np
 
@@ -97,6 +104,130 @@ def irt_information_3pl(theta: float, a: float, b: float, c: float) -> float:
     return float(numerator / denominator)
 
 
+class EAPPosterior:
+    """
+    Incremental EAP posterior over a fixed quadrature grid.
+    
+    Holds the log-posterior (log prior + Σ log-likelihood) at each grid
+    point. Each response adds one log-likelihood row, so a response costs
+    O(grid) regardless of how many items were answered before, and working
+    in log space avoids the underflow of long likelihood products.
+    
+    θ and SE are computed once per update and read off as attributes.
+    
+    Example:
+        >>> posterior = EAPPosterior(prior_mean=0.0, prior_sd=1.0)
+        >>> posterior.update(a=1.2, b=-0.5, c=0.2, u=1)
+        >>> posterior.update(a=1.5, b=0.0, c=0.2, u=0)
+        >>> print(f"θ̂ = {posterior.theta:.3f}, SE = {posterior.se:.3f}")
+    """
+    
+    def __init__(
+        self,
+        prior_mean: float = 0.0,
+        prior_sd: float = 1.0,
+        grid_min: float = -4.0,
+        grid_max: float = 4.0,
+        n_points: int = 81,
+        log_posterior: Optional[Sequence[float]] = None,
+        n_responses: int = 0,
+    ):
+        """
+        Args:
+            prior_mean: Mean of N(μ, σ²) prior
+            prior_sd: SD of prior
+            grid_min: Lowest quadrature point
+            grid_max: Highest quadrature point
+            n_points: Number of equally spaced quadrature points
+            log_posterior: Saved log-posterior vector (resume a session)
+            n_responses: Number of responses already folded in
+        """
+        self.prior_mean = prior_mean
+        self.prior_sd = prior_sd
+        self.grid_min = grid_min
+        self.grid_max = grid_max
+        self.grid = np.linspace(grid_min, grid_max, n_points)
+        self.n_responses = n_responses
+        
+        if log_posterior is None:
+            # Normalizing constant is irrelevant for EAP
+            self.log_posterior = -0.5 * ((self.grid - prior_mean) / prior_sd) ** 2
+        else:
+            self.log_posterior = np.array(log_posterior, dtype=np.float64)
+            if self.log_posterior.shape != self.grid.shape:
+                raise ValueError(
+                    f"log_posterior has {self.log_posterior.size} points, "
+                    f"grid has {n_points}"
+                )
+        
+        self._refresh()
+    
+    def _refresh(self) -> None:
+        """Recompute θ and SE from the current log-posterior."""
+        # Shift by max before exponentiating (log-sum-exp)
+        weights = np.exp(self.log_posterior - np.max(self.log_posterior))
+        weights /= np.sum(weights)
+        
+        self.theta = float(np.sum(self.grid * weights))
+        theta2 = float(np.sum(self.grid**2 * weights))
+        self.se = math.sqrt(max(theta2 - self.theta**2, 1e-6))
+    
+    def update(self, a: float, b: float, c: float, u: int) -> EAPResult:
+        """
+        Fold one response into the posterior.
+        
+        Args:
+            a, b, c: 3PL item parameters
+            u: Response (1 = correct, 0 = incorrect)
+        
+        Returns:
+            EAPResult after this response
+        """
+        P = irt_prob_3pl(self.grid, a, b, c)
+        self.log_posterior += np.log(P if u else 1.0 - P)
+        self.n_responses += 1
+        self._refresh()
+        return self.result()
+    
+    def extend(self, responses: Sequence[IRTResponse]) -> EAPResult:
+        """Fold a sequence of responses into the posterior."""
+        for r in responses:
+            P = irt_prob_3pl(self.grid, r.a, r.b, r.c)
+            self.log_posterior += np.log(P if r.u == 1 else 1.0 - P)
+        self.n_responses += len(responses)
+        self._refresh()
+        return self.result()
+    
+    def result(self) -> EAPResult:
+        """Current estimate as EAPResult."""
+        return EAPResult(theta=self.theta, se=self.se)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize grid spec and log-posterior vector (JSON-compatible)."""
+        return {
+            "prior_mean": self.prior_mean,
+            "prior_sd": self.prior_sd,
+            "grid_min": self.grid_min,
+            "grid_max": self.grid_max,
+            "n_points": int(self.grid.size),
+            "log_posterior": self.log_posterior.tolist(),
+            "n_responses": self.n_responses,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EAPPosterior":
+        """Restore a posterior saved with to_dict()."""
+        return cls(
+            prior_mean=data["prior_mean"],
+            prior_sd=data["prior_sd"],
+            grid_min=data["grid_min"],
+            grid_max=data["grid_max"],
+            n_points=data["n_points"],
+            log_posterior=data["log_posterior"],
+            n_responses=data.get("n_responses", 0),
+        )
+
+
 def estimate_theta_eap(
     responses: Sequence[IRTResponse],
     prior_mean: float = 0.0,
@@ -146,17 +277,18 @@ def estimate_theta_eap(
         -0.5 * ((theta_grid - prior_mean) / prior_sd) ** 2
     )
     
-    # 3. Likelihood for all responses
-    likelihood = np.ones_like(theta_grid)
+    # 3. Log-likelihood for all responses (sums instead of products so
+    #    long tests don't underflow)
+    log_likelihood = np.zeros_like(theta_grid)
     
     for r in responses:
         # Vectorized probability calculation
         P = irt_prob_3pl(theta_grid, r.a, r.b, r.c)
-        # Multiply likelihood by P(u) for each response
-        likelihood *= (P if r.u == 1 else (1.0 - P))
+        # Add log P(u) for each response
+        log_likelihood += np.log(P if r.u == 1 else (1.0 - P))
         
-    # 4. Posterior = prior × likelihood (unnormalized)
-    posterior_unnorm = prior * likelihood
+    # 4. Posterior = prior × likelihood (unnormalized, rescaled by max)
+    posterior_unnorm = prior * np.exp(log_likelihood - np.max(log_likelihood))
     
     # Normalize
     Z = np.sum(posterior_unnorm)
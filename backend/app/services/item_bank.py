@@ -11,8 +11,9 @@ This module provides:
  - Hooks for exposure control & content balancing
 
 Integrated with:
- - app.models.core_models_expanded.Item
+ - app.models.item.Item
  - app.services.exam_engine.AdaptiveEngine (uses item_information function)
+ - app.services.item_bank_snapshot.ItemBankSnapshot (optional array-backed fast path)
 
 Usage:
     bank = ItemBankService(db_session)
@@ -27,11 +28,14 @@ Usage:
 
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
 
-from app.models.core_models_expanded import Item, Attempt
+from app.models.item import Item
+from app.models.core_entities import Attempt
 from app.services.exam_engine import item_information
+from app.services.item_bank_snapshot import ItemBankSnapshot
 
 
 class ItemBankService:
@@ -44,6 +48,7 @@ class ItemBankService:
      - Subject/topic filtering
      - Information-based ranking
      - Exposure control (optional)
+     - Array-backed selection via ItemBankSnapshot (optional)
     
     Usage:
         bank = ItemBankService(db)
@@ -52,16 +57,27 @@ class ItemBankService:
             theta=0.5
         )
         next_item = bank.pick_best_item(candidates)
+
+        # Fast path: no ORM hydration, vectorized ranking
+        bank = ItemBankService(db, snapshot=await get_item_bank_snapshot(db))
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        snapshot: Optional[ItemBankSnapshot] = None,
+    ):
         """
         Initialize ItemBank service.
         
         Args:
             session: SQLAlchemy async session
+            snapshot: Optional in-process item bank snapshot. When given,
+                get_candidate_items ranks items from its arrays instead of
+                loading Item rows on every call.
         """
         self.session = session
+        self.snapshot = snapshot
 
     # ------------------------------------------------------------------
     # 1. Load unattempted items
@@ -220,7 +236,9 @@ class ItemBankService:
         """
         Complete pipeline: Load unattempted items → difficulty filter → info rank.
         
-        This is the main method for adaptive item selection.
+        This is the main method for adaptive item selection. When the
+        service was created with a snapshot, ranking runs on the snapshot's
+        arrays (same filtering and fallback rules, no Item rows loaded).
         
         Args:
             exam_session_id: ID of the exam session
@@ -246,6 +264,17 @@ class ItemBankService:
             #   ...
             # ]
         """
+        if self.snapshot is not None:
+            attempted = await self._session_attempted_mask(exam_session_id)
+            return self.snapshot.select_candidates(
+                theta=theta,
+                attempted=attempted,
+                subject=subject,
+                topic=topic,
+                difficulty_window=difficulty_window,
+                max_candidates=max_candidates,
+            )
+
         # Step 1: Load unattempted items
         raw_items = await self.load_unattempted_items(
             exam_session_id=exam_session_id,
@@ -285,6 +314,24 @@ class ItemBankService:
 
         return ranked
 
+    # ------------------------------------------------------------------
+    # 4b. Snapshot session state
+    # ------------------------------------------------------------------
+    async def _session_attempted_mask(self, exam_session_id: int) -> np.ndarray:
+        """
+        Return the snapshot's attempted bitmask for a session.
+
+        Built from the Attempt table (item IDs only) on every call, so
+        attempts written by other workers are always excluded.
+        """
+        stmt = select(Attempt.item_id).where(
+            Attempt.exam_session_id == exam_session_id
+        )
+        result = await self.session.execute(stmt)
+        return self.snapshot.attempted_mask(
+            row[0] for row in result.all() if row[0] is not None
+        )
+
     # ------------------------------------------------------------------
     # 5. Pick the best item
     # ------------------------------------------------------------------
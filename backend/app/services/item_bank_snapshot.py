@@ -0,0 +1,543 @@
+"""
+item_bank_snapshot.py
+
+DreamSeedAI – Array-backed ItemBank snapshot for CAT item selection
+
+This module provides:
+ - An in-process, NumPy-backed copy of the calibrated item bank
+   (contiguous a/b/c arrays plus categorical topic/subject codes)
+ - An "attempted" bitmask per request, built from the session's Attempt item IDs
+ - Vectorized 3PL Fisher information over the whole bank
+ - A theta-grid information index (items pre-sorted by information on the
+   same 81-point grid as shared.irt.info_index) for top-k lookups
+
+It replaces the per-request ORM hydration done by
+ItemBankService.get_candidate_items: the bank is loaded once with a
+column-only query and every next-item call is pure array math.
+
+The process-wide snapshot carries a version stamp (item count and latest
+items.updated_at) that is re-checked at most once a minute, so parameters
+written by a calibration run are picked up without a restart.
+
+Usage:
+    snapshot = await get_item_bank_snapshot(db_session)
+    bank = ItemBankService(db_session, snapshot=snapshot)
+    candidates = await bank.get_candidate_items(
+        exam_session_id=1,
+        theta=0.5,
+        subject="mathematics",
+        max_candidates=10,
+    )
+    best_item = bank.pick_best_item(candidates)
+"""
+
+from __future__ import annotations
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.item import Item
+
+# Theta grid for the information index (matches shared.irt.info_index)
+GRID_THETAS = np.linspace(-4.0, 4.0, 81)
+
+# Extra candidates taken from each bracketing grid cell before refinement
+GRID_REFINE = 8
+
+# Items scanned per step when walking a cell's sorted list
+_GRID_SCAN_CHUNK = 64
+
+
+# ----------------------------------------------------------------------
+# Vectorized IRT math
+# ----------------------------------------------------------------------
+
+def item_information_vec(
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    theta: float,
+) -> np.ndarray:
+    """
+    Vectorized 3PL Fisher information at a single theta.
+
+    Same formula as exam_engine.item_information, evaluated for every
+    item in one pass:
+
+        I(theta) = (a^2) * ((P-c)^2) / ((1-c)^2 * P * (1-P))
+
+    Items whose probability saturates at 0 or 1 get information 0.0.
+
+    Args:
+        a: Discrimination parameters
+        b: Difficulty parameters
+        c: Guessing parameters
+        theta: Ability estimate
+
+    Returns:
+        Array of information values aligned with the inputs
+    """
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        p = c + (1.0 - c) / (1.0 + np.exp(-a * (theta - b)))
+        info = (a ** 2) * ((p - c) ** 2) / (((1.0 - c) ** 2) * p * (1.0 - p))
+    valid = (p > 0.0) & (p < 1.0) & np.isfinite(info)
+    return np.where(valid, info, 0.0)
+
+
+def _encode_labels(
+    labels: Sequence[Optional[str]],
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Encode string labels as int32 codes (-1 for missing)."""
+    vocab: Dict[str, int] = {}
+    codes = np.empty(len(labels), dtype=np.int32)
+    for i, label in enumerate(labels):
+        if label is None:
+            codes[i] = -1
+        else:
+            codes[i] = vocab.setdefault(label, len(vocab))
+    return codes, vocab
+
+
+def _field(item: Any, key: str) -> Any:
+    """Read a field from an item dict or ORM object."""
+    if isinstance(item, dict):
+        return item.get(key)
+    return getattr(item, key, None)
+
+
+# ----------------------------------------------------------------------
+# Snapshot
+# ----------------------------------------------------------------------
+
+class ItemBankSnapshot:
+    """
+    Array-backed view of the item bank.
+
+    Item parameters are stored as read-only, contiguous float64 arrays so that
+    information for the whole bank is a single vectorized expression.
+    Topic and subject are stored as int32 category codes.
+
+    The snapshot holds no per-session state: attempted masks are built
+    from the item IDs a caller passes in (one request's view of the
+    Attempt table), so every worker sees attempts written by the others.
+
+    Usage:
+        snapshot = ItemBankSnapshot.from_items(items)
+        ranked = snapshot.select_candidates(
+            theta=0.5,
+            attempted=snapshot.attempted_mask([3, 7]),
+            max_candidates=5,
+        )
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        a: Sequence[float],
+        b: Sequence[float],
+        c: Sequence[float],
+        topics: Optional[Sequence[Optional[str]]] = None,
+        subjects: Optional[Sequence[Optional[str]]] = None,
+        version: Hashable = None,
+    ):
+        """
+        Build a snapshot from parallel parameter sequences.
+
+        Args:
+            ids: Item IDs
+            a: Discrimination parameters
+            b: Difficulty parameters
+            c: Guessing parameters
+            topics: Optional topic label per item
+            subjects: Optional subject label per item (from item.meta)
+            version: Item bank version stamp the snapshot was built from
+        """
+        n = len(ids)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.a = np.array(a, dtype=np.float64)
+        self.b = np.array(b, dtype=np.float64)
+        self.c = np.array(c, dtype=np.float64)
+        for arr in (self.ids, self.a, self.b, self.c):
+            arr.flags.writeable = False
+        if not (len(self.a) == len(self.b) == len(self.c) == n):
+            raise ValueError("ids, a, b and c must have the same length")
+
+        self.topic_codes, self.topic_vocab = _encode_labels(topics or [None] * n)
+        self.subject_codes, self.subject_vocab = _encode_labels(
+            subjects or [None] * n
+        )
+        self.topic_labels: List[str] = list(self.topic_vocab)
+        self.version = version
+
+        self._position: Dict[int, int] = {
+            int(item_id): pos for pos, item_id in enumerate(self.ids)
+        }
+        self._grid_order: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def covers(self, item_ids: Iterable[int]) -> bool:
+        """True if every given item ID is in the snapshot."""
+        return all(int(item_id) in self._position for item_id in item_ids)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_items(cls, items: Iterable[Any]) -> "ItemBankSnapshot":
+        """
+        Build a snapshot from Item ORM objects or item dicts.
+
+        Dicts may carry a ``subject`` key directly; ORM objects are read
+        from ``item.meta['subject']``.
+
+        Args:
+            items: Iterable of Item objects or dicts with id/a/b/c/topic
+
+        Returns:
+            ItemBankSnapshot
+        """
+        ids, a, b, c, topics, subjects = [], [], [], [], [], []
+        for it in items:
+            meta = _field(it, "meta") or {}
+            ids.append(int(_field(it, "id")))
+            a.append(float(_field(it, "a")))
+            b.append(float(_field(it, "b")))
+            c.append(float(_field(it, "c") or 0.0))
+            topics.append(_field(it, "topic"))
+            subjects.append(_field(it, "subject") or meta.get("subject"))
+        return cls(ids, a, b, c, topics=topics, subjects=subjects)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[Any], version: Hashable = None
+    ) -> "ItemBankSnapshot":
+        """Build a snapshot from rows of _bank_query()."""
+        return cls(
+            ids=[row[0] for row in rows],
+            a=[float(row[1]) for row in rows],
+            b=[float(row[2]) for row in rows],
+            c=[float(row[3]) for row in rows],
+            topics=[row[4] for row in rows],
+            subjects=[row[5] for row in rows],
+            version=version,
+        )
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "ItemBankSnapshot":
+        """
+        Load the full item bank with a single column-only query.
+
+        Only id, a, b, c, topic and meta['subject'] are fetched; no ORM
+        objects are hydrated.
+
+        Args:
+            session: SQLAlchemy async session
+
+        Returns:
+            ItemBankSnapshot
+        """
+        version = tuple((await session.execute(_version_query())).one())
+        result = await session.execute(_bank_query())
+        return cls.from_rows(result.all(), version=version)
+
+    @classmethod
+    def load_sync(cls, session: Session) -> "ItemBankSnapshot":
+        """Synchronous variant of load() for routers using a sync Session."""
+        version = tuple(session.execute(_version_query()).one())
+        return cls.from_rows(session.execute(_bank_query()).all(), version=version)
+
+    # ------------------------------------------------------------------
+    # Attempted bitmask
+    # ------------------------------------------------------------------
+    def attempted_mask(self, item_ids: Iterable[int]) -> np.ndarray:
+        """
+        Boolean mask with the given items marked as attempted.
+
+        Unknown item IDs (not in this snapshot) are ignored.
+
+        Args:
+            item_ids: Item IDs administered in the session
+
+        Returns:
+            Boolean array of length len(self)
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        positions = [
+            self._position[item_id]
+            for item_id in map(int, item_ids)
+            if item_id in self._position
+        ]
+        if positions:
+            mask[positions] = True
+        return mask
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+    def information(self, theta: float) -> np.ndarray:
+        """Fisher information of every item in the bank at theta."""
+        return item_information_vec(self.a, self.b, self.c, theta)
+
+    def eligible_mask(
+        self,
+        attempted: Optional[np.ndarray] = None,
+        subject: Optional[str] = None,
+        topic: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Boolean mask of items that are unattempted and match the filters.
+
+        An unknown subject or topic matches nothing.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if attempted is not None:
+            mask &= ~attempted
+        if subject:
+            mask &= self.subject_codes == self.subject_vocab.get(subject, -2)
+        if topic:
+            mask &= self.topic_codes == self.topic_vocab.get(topic, -2)
+        return mask
+
+    def select_candidates(
+        self,
+        theta: float,
+        attempted: Optional[np.ndarray] = None,
+        subject: Optional[str] = None,
+        topic: Optional[str] = None,
+        difficulty_window: Optional[float] = 1.0,
+        max_candidates: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank eligible items by information at theta.
+
+        Mirrors ItemBankService.get_candidate_items: items within
+        ``|b - theta| <= difficulty_window`` are preferred, falling back to
+        all eligible items when the window is empty. With max_candidates
+        the candidates come from the theta-grid index: the best eligible
+        items of the two grid cells bracketing theta are re-scored at theta,
+        so only a few dozen items are evaluated instead of the whole bank.
+
+        Args:
+            theta: Current ability estimate
+            attempted: Boolean attempted mask (see attempted_mask)
+            subject: Optional subject filter
+            topic: Optional topic filter
+            difficulty_window: Window for difficulty filtering, None to skip
+            max_candidates: Optional limit on number of candidates returned
+
+        Returns:
+            List of item dicts (id, a, b, c, topic, info), highest info first
+        """
+        eligible = self.eligible_mask(attempted, subject=subject, topic=topic)
+        if not eligible.any():
+            return []
+
+        if difficulty_window is not None:
+            in_window = eligible & (np.abs(self.b - theta) <= difficulty_window)
+            if in_window.any():
+                eligible = in_window
+
+        if max_candidates and np.count_nonzero(eligible) > max_candidates:
+            idx = self._grid_candidates(theta, eligible, max_candidates + GRID_REFINE)
+        else:
+            idx = np.flatnonzero(eligible)
+
+        info = item_information_vec(self.a[idx], self.b[idx], self.c[idx], theta)
+        order = np.argsort(-info, kind="stable")[:max_candidates or None]
+
+        labels = self.topic_labels
+        ranked = []
+        for pos in order:
+            item_pos = idx[pos]
+            code = self.topic_codes[item_pos]
+            ranked.append({
+                "id": int(self.ids[item_pos]),
+                "a": float(self.a[item_pos]),
+                "b": float(self.b[item_pos]),
+                "c": float(self.c[item_pos]),
+                "topic": labels[code] if code >= 0 else None,
+                "info": float(info[pos]),
+            })
+        return ranked
+
+    # ------------------------------------------------------------------
+    # Theta-grid information index
+    # ------------------------------------------------------------------
+    @property
+    def grid_order(self) -> np.ndarray:
+        """
+        Item positions sorted by descending information per grid cell.
+
+        Shape (len(GRID_THETAS), len(self)); built on first use, once per
+        snapshot (i.e. once per calibration version).
+        """
+        if self._grid_order is None:
+            info = item_information_vec(
+                self.a[:, None], self.b[:, None], self.c[:, None], GRID_THETAS
+            )
+            self._grid_order = np.ascontiguousarray(
+                np.argsort(-info, axis=0, kind="stable").T.astype(np.int32)
+            )
+        return self._grid_order
+
+    def _top_in_cell(self, cell: int, eligible: np.ndarray, k: int) -> np.ndarray:
+        """First k eligible item positions in a grid cell's sorted list."""
+        row = self.grid_order[cell]
+        found: List[np.ndarray] = []
+        n_found = 0
+        for start in range(0, len(row), _GRID_SCAN_CHUNK):
+            chunk = row[start:start + _GRID_SCAN_CHUNK]
+            hits = chunk[eligible[chunk]]
+            found.append(hits)
+            n_found += len(hits)
+            if n_found >= k:
+                break
+        return np.concatenate(found)[:k] if found else row[:0]
+
+    def _grid_candidates(
+        self, theta: float, eligible: np.ndarray, k: int
+    ) -> np.ndarray:
+        """
+        Sorted positions of the top-k eligible items around theta.
+
+        Outside the grid every eligible item is returned (exact scoring).
+        """
+        if not GRID_THETAS[0] <= theta <= GRID_THETAS[-1]:
+            return np.flatnonzero(eligible)
+        last = len(GRID_THETAS) - 1
+        hi = min(int(np.searchsorted(GRID_THETAS, theta)), last)
+        lo = max(hi - 1, 0)
+        pos = self._top_in_cell(lo, eligible, k)
+        if hi != lo:
+            pos = np.union1d(pos, self._top_in_cell(hi, eligible, k))
+        return np.sort(pos)
+
+    def select(
+        self,
+        theta: float,
+        exclude_ids: Optional[Iterable[int]] = None,
+        allowed_ids: Optional[Iterable[int]] = None,
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Maximum-information item at theta via the theta-grid index.
+
+        Same contract as shared.irt.info_index.ThetaGridInfoIndex.select,
+        so a snapshot can be passed as exam_engine's info_index.
+
+        Returns:
+            (item_id, info) or None if no eligible item is in the snapshot
+        """
+        if allowed_ids is not None:
+            eligible = self.attempted_mask(allowed_ids)
+        else:
+            eligible = np.ones(len(self), dtype=bool)
+        if exclude_ids:
+            eligible &= ~self.attempted_mask(exclude_ids)
+        if not eligible.any():
+            return None
+
+        idx = self._grid_candidates(theta, eligible, GRID_REFINE)
+        info = item_information_vec(self.a[idx], self.b[idx], self.c[idx], theta)
+        best = int(np.argmax(info))
+        return int(self.ids[idx[best]]), float(info[best])
+
+
+# ----------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------
+
+def _bank_query():
+    """Column-only query for every item in the bank."""
+    return select(
+        Item.id,
+        Item.a,
+        Item.b,
+        Item.c,
+        Item.topic,
+        Item.meta["subject"].as_string(),
+    ).order_by(Item.id)
+
+
+def _version_query():
+    """
+    Item bank version stamp: (item count, latest updated_at).
+
+    Writing new a/b/c parameters bumps updated_at (onupdate=now()), so the
+    stamp changes whenever a calibration run updates the bank.
+    """
+    return select(func.count(Item.id), func.max(Item.updated_at))
+
+
+# ----------------------------------------------------------------------
+# Process-wide snapshot
+# ----------------------------------------------------------------------
+
+_snapshot: Optional[ItemBankSnapshot] = None
+_last_version_check = 0.0
+
+
+def _is_fresh(max_age_seconds: float) -> bool:
+    """True if the cached snapshot was version-checked recently enough."""
+    return (
+        _snapshot is not None
+        and time.monotonic() - _last_version_check < max_age_seconds
+    )
+
+
+async def get_item_bank_snapshot(
+    session: AsyncSession,
+    refresh: bool = False,
+    max_age_seconds: float = 60.0,
+) -> ItemBankSnapshot:
+    """
+    Return the process-wide item bank snapshot, loading it on first use.
+
+    The version stamp is re-checked at most every max_age_seconds and the
+    snapshot is reloaded when it changed (e.g. after item calibration).
+
+    Args:
+        session: SQLAlchemy async session used for loading
+        refresh: Force a reload
+        max_age_seconds: Minimum interval between version checks
+
+    Returns:
+        ItemBankSnapshot
+    """
+    global _snapshot, _last_version_check
+    if not refresh and _is_fresh(max_age_seconds):
+        return _snapshot
+
+    version = tuple((await session.execute(_version_query())).one())
+    _last_version_check = time.monotonic()
+    if refresh or _snapshot is None or _snapshot.version != version:
+        _snapshot = await ItemBankSnapshot.load(session)
+    return _snapshot
+
+
+def get_item_bank_snapshot_sync(
+    session: Session,
+    refresh: bool = False,
+    max_age_seconds: float = 60.0,
+) -> ItemBankSnapshot:
+    """Synchronous variant of get_item_bank_snapshot() (same cache)."""
+    global _snapshot, _last_version_check
+    if not refresh and _is_fresh(max_age_seconds):
+        return _snapshot
+
+    version = tuple(session.execute(_version_query()).one())
+    _last_version_check = time.monotonic()
+    if refresh or _snapshot is None or _snapshot.version != version:
+        _snapshot = ItemBankSnapshot.load_sync(session)
+    return _snapshot
+
+
+def invalidate_item_bank_snapshot() -> None:
+    """Drop the process-wide snapshot so the next call reloads it."""
+    global _snapshot
+    _snapshot = None
@@ -0,0 +1,264 @@
+"""
+theta_distribution.py
+
+DreamSeedAI – Per-subject theta distribution snapshot for empirical percentiles
+
+This module provides:
+ - An in-process copy of every calibrated theta in irt_student_abilities,
+   one sorted float64 array per subject, loaded with a single query
+ - Percentile lookup by binary search (np.searchsorted) instead of two
+   count(*) queries per student and subject
+ - Incremental inserts for abilities written by this process, kept in a
+   small sorted side buffer and merged into the array in batches
+
+Lookups are exact for the snapshot: the percentile is the share of
+snapshot thetas strictly below the given theta, as in the original
+count-based query. The only error is staleness: the snapshot carries a
+version stamp (row count, latest calibrated_at) that is re-checked every
+max_age_seconds, so rows imported by the offline calibration pipeline in
+another process trigger a reload within that interval.
+
+Usage:
+    distribution = await get_theta_distribution(db_session)
+    percentile = distribution.percentile("math", theta=0.4)
+
+    # After committing an ability written in this process
+    record_ability("math", 0.4)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.exam_models import IRTStudentAbility
+
+
+# Pending inserts per subject before they are merged into the sorted array
+MERGE_THRESHOLD = 256
+
+# Interval between version checks; bounds staleness from other processes
+DEFAULT_MAX_AGE_SECONDS = 60.0
+
+
+class ThetaDistributionSnapshot:
+    """
+    Sorted theta arrays per subject.
+
+    Each subject holds a read-only sorted float64 array plus a sorted list
+    of thetas added since the last merge, so ``percentile`` is two binary
+    searches and ``add`` is O(log n) amortized.
+
+    Usage:
+        snapshot = ThetaDistributionSnapshot.from_rows([("math", 0.1), ...])
+        snapshot.percentile("math", 0.4)
+        snapshot.add("math", 0.4)
+    """
+
+    def __init__(
+        self,
+        thetas_by_subject: Dict[str, Iterable[float]],
+        loaded_at: Optional[float] = None,
+        version: Hashable = None,
+    ):
+        """
+        Build a snapshot from theta values grouped by subject.
+
+        Args:
+            thetas_by_subject: Subject -> theta values (any order)
+            loaded_at: time.monotonic() of the load (defaults to now)
+            version: Table version stamp the snapshot was built from
+        """
+        self._sorted: Dict[str, np.ndarray] = {}
+        for subject, thetas in thetas_by_subject.items():
+            arr = np.sort(np.asarray(list(thetas), dtype=np.float64))
+            arr.flags.writeable = False
+            self._sorted[subject] = arr
+        self._pending: Dict[str, List[float]] = {}
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        self.version = version
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Tuple[Optional[str], float]],
+        version: Hashable = None,
+    ) -> "ThetaDistributionSnapshot":
+        """
+        Build a snapshot from (subject, theta) rows.
+
+        Rows without a subject are skipped.
+        """
+        grouped: Dict[str, List[float]] = {}
+        for subject, theta in rows:
+            if subject is None or theta is None:
+                continue
+            grouped.setdefault(subject, []).append(float(theta))
+        return cls(grouped, version=version)
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "ThetaDistributionSnapshot":
+        """
+        Load every (subject, theta) with a single column-only query.
+
+        Args:
+            session: SQLAlchemy async session
+
+        Returns:
+            ThetaDistributionSnapshot
+        """
+        version = await _fetch_version(session)
+        stmt = select(IRTStudentAbility.subject, IRTStudentAbility.theta).where(
+            IRTStudentAbility.subject.is_not(None)
+        )
+        result = await session.execute(stmt)
+        return cls.from_rows(result.all(), version=version)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def subjects(self) -> List[str]:
+        """Subjects with at least one theta."""
+        return sorted(set(self._sorted) | set(self._pending))
+
+    def count(self, subject: str) -> int:
+        """Number of thetas recorded for a subject."""
+        arr = self._sorted.get(subject)
+        base = 0 if arr is None else len(arr)
+        return base + len(self._pending.get(subject, ()))
+
+    def count_below(self, subject: str, theta: float) -> int:
+        """Number of thetas strictly below theta in a subject."""
+        arr = self._sorted.get(subject)
+        below = 0 if arr is None else int(np.searchsorted(arr, theta, side="left"))
+        pending = self._pending.get(subject)
+        if pending:
+            below += bisect.bisect_left(pending, theta)
+        return below
+
+    def percentile(self, subject: str, theta: float) -> int:
+        """
+        Empirical percentile rank (0-100) of theta within a subject.
+
+        Same definition as the count-based query: thetas strictly below
+        divided by all thetas in the subject; 0 for an unknown subject.
+        """
+        total = self.count(subject)
+        if total == 0:
+            return 0
+        percentile = self.count_below(subject, theta) / total * 100
+        return max(0, min(100, int(round(percentile))))
+
+    def age_seconds(self) -> float:
+        """Seconds since the snapshot was loaded."""
+        return time.monotonic() - self.loaded_at
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def add(self, subject: Optional[str], theta: float) -> None:
+        """
+        Record a newly written ability.
+
+        Inserts go to a sorted side buffer, merged into the subject's array
+        once it holds MERGE_THRESHOLD values.
+        """
+        if subject is None:
+            return
+        pending = self._pending.setdefault(subject, [])
+        bisect.insort(pending, float(theta))
+        if len(pending) >= MERGE_THRESHOLD:
+            self._merge(subject)
+
+    def _merge(self, subject: str) -> None:
+        pending = self._pending.pop(subject, [])
+        if not pending:
+            return
+        arr = self._sorted.get(subject)
+        extra = np.asarray(pending, dtype=np.float64)
+        merged = extra if arr is None else np.concatenate([arr, extra])
+        merged.sort(kind="mergesort")
+        merged.flags.writeable = False
+        self._sorted[subject] = merged
+
+
+# ----------------------------------------------------------------------
+# Process-wide snapshot
+# ----------------------------------------------------------------------
+
+_snapshot: Optional[ThetaDistributionSnapshot] = None
+_load_lock = asyncio.Lock()
+
+
+async def _fetch_version(session: AsyncSession) -> Tuple:
+    """Version stamp of irt_student_abilities: (row count, latest calibrated_at)."""
+    stmt = select(
+        func.count(IRTStudentAbility.id), func.max(IRTStudentAbility.calibrated_at)
+    )
+    return tuple((await session.execute(stmt)).one())
+
+
+async def get_theta_distribution(
+    session: AsyncSession,
+    refresh: bool = False,
+    max_age_seconds: Optional[float] = DEFAULT_MAX_AGE_SECONDS,
+) -> ThetaDistributionSnapshot:
+    """
+    Return the process-wide theta distribution, loading it when needed.
+
+    Once the snapshot is older than max_age_seconds its version stamp is
+    compared with the table's; it is reloaded only if they differ.
+
+    Args:
+        session: SQLAlchemy async session used for loading
+        refresh: Force a reload
+        max_age_seconds: Version-check snapshots older than this (None: never)
+
+    Returns:
+        ThetaDistributionSnapshot
+    """
+    global _snapshot
+
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and not refresh
+        and (max_age_seconds is None or snapshot.age_seconds() <= max_age_seconds)
+    ):
+        return snapshot
+
+    async with _load_lock:
+        # Another request may have reloaded while this one waited
+        if _snapshot is not snapshot:
+            return _snapshot
+        if snapshot is not None and not refresh:
+            if await _fetch_version(session) == snapshot.version:
+                snapshot.loaded_at = time.monotonic()
+                return snapshot
+        _snapshot = await ThetaDistributionSnapshot.load(session)
+        return _snapshot
+
+
+def record_ability(subject: Optional[str], theta: float) -> None:
+    """
+    Add a freshly written ability to the loaded snapshot (if any).
+
+    Call after committing a new irt_student_abilities row in this process.
+    """
+    if _snapshot is not None:
+        _snapshot.add(subject, theta)
+
+
+def invalidate_theta_distribution() -> None:
+    """Drop the process-wide snapshot so the next call reloads it."""
+    global _snapshot
+    _snapshot = None
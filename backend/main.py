@@ -27,6 +27,11 @@ from app.routers.messenger import router as messenger_router
 from app.routers.assignments import router as assignments_router
 from app.messenger.broadcaster import start_broadcaster, stop_broadcaster
 from app.messenger.presence import presence_cleanup_task
+from app.messenger.read_receipts import get_read_receipt_aggregator
+from app.messenger.analytics_rollups import (
+    start_analytics_rollups,
+    stop_analytics_rollups,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -99,16 +104,36 @@ async def startup():
     except Exception as e:
         logger.error(f"Failed to start presence cleanup task: {e}")
 
+    try:
+        # Fold analytics:stream into the rollups the dashboards read
+        start_analytics_rollups()
+        logger.info("Analytics rollup consumer started successfully")
+    except Exception as e:
+        logger.error(f"Failed to start analytics rollup consumer: {e}")
+
 
 @app.on_event("shutdown")
 async def shutdown():
-    """Application shutdown event - cleanup messenger broadcaster"""
+    """Application shutdown event - cleanup messenger broadcaster and background tasks"""
+    try:
+        # Write buffered receipts while the broadcaster can still fan them out
+        await get_read_receipt_aggregator().stop()
+        logger.info("Read receipt aggregator stopped successfully")
+    except Exception as e:
+        logger.error(f"Failed to stop read receipt aggregator: {e}")
+
     try:
         await stop_broadcaster()
         logger.info("Messenger broadcaster stopped successfully")
     except Exception as e:
         logger.error(f"Failed to stop messenger broadcaster: {e}")
 
+    try:
+        await stop_analytics_rollups()
+        logger.info("Analytics rollup consumer stopped successfully")
+    except Exception as e:
+        logger.error(f"Failed to stop analytics rollup consumer: {e}")
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,145 @@
+"""
+Test suite for the set-based ability dashboard loaders
+
+Checks that the latest-ability/delta loader is a single window-function
+query with the same delta definition as compute_delta_theta, that session
+activity is one grouped query, and that the tutor priority list is built
+from those two statements regardless of class size.
+"""
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+from app.routers.ability_dashboards import get_tutor_priority_list
+from app.services.ability_analytics import (
+    load_latest_abilities,
+    load_session_activity,
+)
+
+
+# ============================================================================
+# Fixtures
+# ============================================================================
+
+class QueuedSession:
+    """Async session answering statements in order from prepared rows"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        result = MagicMock()
+        result.all.return_value = self.answers.pop(0)
+        return result
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+NOW = datetime.utcnow()
+U1, U2 = uuid.uuid4(), uuid.uuid4()
+
+
+def ability_row(user_id, theta, window_theta, subject="math"):
+    return SimpleNamespace(
+        user_id=user_id,
+        subject=subject,
+        theta=theta,
+        theta_se=0.3,
+        calibrated_at=NOW,
+        window_theta=window_theta,
+    )
+
+
+# ============================================================================
+# Loaders
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_latest_abilities_single_window_query():
+    db = QueuedSession([ability_row(U1, 0.5, 0.2), ability_row(U2, -1.2, None)])
+
+    abilities = await load_latest_abilities(db, delta_days=14, subject="math")
+
+    assert len(db.statements) == 1
+    sql = _sql(db.statements[0])
+    assert (
+        "row_number() OVER (PARTITION BY irt_student_abilities.user_id, "
+        "irt_student_abilities.subject ORDER BY irt_student_abilities.calibrated_at DESC)"
+    ) in sql
+    assert "max(ranked.theta) FILTER (WHERE ranked.recent_rank = " in sql
+    assert "GROUP BY ranked.user_id, ranked.subject" in sql
+
+    params = db.statements[0].compile(dialect=postgresql.dialect()).params
+    lo, hi = params["calibrated_at_1"], params["calibrated_at_2"]
+    assert hi - lo == timedelta(days=4)
+    assert abs((lo + timedelta(days=2)) - (NOW - timedelta(days=14))) < timedelta(
+        minutes=1
+    )
+
+    first = abilities[(str(U1), "math")]
+    assert first.delta_theta == pytest.approx(0.3)
+    assert first.theta_se == 0.3
+    assert abilities[(str(U2), "math")].delta_theta is None
+
+
+@pytest.mark.asyncio
+async def test_session_activity_grouped_query():
+    last = NOW - timedelta(days=1)
+    db = QueuedSession(
+        [SimpleNamespace(user_id=U1, sessions_recent=3, last_activity_at=last)]
+    )
+
+    activity = await load_session_activity(db, [str(U1), str(U2)], days=7)
+
+    sql = _sql(db.statements[0])
+    assert "count(*) FILTER (WHERE exam_sessions.started_at >= " in sql
+    assert "max(exam_sessions.last_activity_at)" in sql
+    assert "GROUP BY exam_sessions.user_id" in sql
+    assert activity[str(U1)].sessions_recent == 3
+    assert activity[str(U1)].last_activity_at == last
+    assert str(U2) not in activity
+
+    assert await load_session_activity(QueuedSession(), [], days=7) == {}
+
+
+# ============================================================================
+# Tutor dashboard
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_tutor_priorities_use_two_statements():
+    students = [uuid.uuid4() for _ in range(50)]
+    abilities = [ability_row(u, -1.5 + i * 0.05, -1.0) for i, u in enumerate(students)]
+    activity = [
+        SimpleNamespace(user_id=u, sessions_recent=2, last_activity_at=NOW)
+        for u in students[::2]
+    ]
+    db = QueuedSession(abilities, activity)
+
+    response = await get_tutor_priority_list(
+        subject="math",
+        window_days=14,
+        limit=10,
+        current_user=SimpleNamespace(id=1),
+        db=db,
+    )
+
+    assert len(db.statements) == 2
+    assert len(response.students) == 10
+    scores = [s.priority_score for s in response.students]
+    assert scores == sorted(scores, reverse=True)
+    # Inactive, declining, lowest-ability student ranks first
+    top = response.students[0]
+    assert top.student_id == str(students[1])
+    assert top.sessions_last_7d == 0
+    assert top.last_activity_at is None
+    assert top.delta_theta_14d == pytest.approx(-0.45)
@@ -0,0 +1,172 @@
+"""
+Test suite for the packed AdaptiveEngineStateStore format
+
+Checks binary round-trips, in-place attempt appends, the active-session
+index and the batched load/save/extend_ttl helpers.
+"""
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis as fakeredis
+
+from app.services.adaptive_state_store import (
+    AdaptiveEngineStateStore,
+    pack_engine_state,
+    unpack_engine_state,
+)
+from app.services.exam_engine import AdaptiveEngine
+
+
+ITEMS = [
+    (101, {"a": 1.2, "b": -0.5, "c": 0.2}, True),
+    (102, {"a": 1.5, "b": 0.0, "c": 0.15}, False),
+    (103, {"a": 0.9, "b": 0.7, "c": 0.25}, True),
+    (104, {"a": 2.0, "b": 0.3, "c": 0.1}, True),
+]
+
+
+def make_engine(method: str = "mle", n: int = len(ITEMS)) -> AdaptiveEngine:
+    engine = AdaptiveEngine(initial_theta=0.2, estimation_method=method)
+    for item_id, params, correct in ITEMS[:n]:
+        engine.record_attempt(item_id, params, correct)
+    return engine
+
+
+def assert_same_engine(loaded: AdaptiveEngine, engine: AdaptiveEngine):
+    assert loaded.theta == pytest.approx(engine.theta)
+    assert loaded.responses == engine.responses
+    assert loaded.item_ids == engine.item_ids
+    assert loaded.item_params_list == engine.item_params_list
+    assert loaded.estimation_method == engine.estimation_method
+    assert loaded.current_standard_error() == pytest.approx(
+        engine.current_standard_error()
+    )
+
+
+# ============================================================================
+# Fixtures
+# ============================================================================
+
+@pytest_asyncio.fixture
+async def binary_store():
+    client = fakeredis.FakeRedis(decode_responses=False)
+    yield AdaptiveEngineStateStore(client)
+    await client.flushall()
+    await client.aclose()
+
+
+@pytest_asyncio.fixture
+async def json_store():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    yield AdaptiveEngineStateStore(client)
+    await client.flushall()
+    await client.aclose()
+
+
+# ============================================================================
+# 1. Packed format
+# ============================================================================
+
+@pytest.mark.parametrize("method", ["mle", "eap"])
+def test_pack_roundtrip(method):
+    """Packed state restores the same engine"""
+    engine = make_engine(method)
+    assert_same_engine(unpack_engine_state(pack_engine_state(engine)), engine)
+
+
+def test_pack_is_compact():
+    """Packed MLE state is header + bitset + 32 bytes per attempt"""
+    engine = make_engine("mle")
+    assert len(pack_engine_state(engine)) < 200
+
+
+# ============================================================================
+# 2. Store
+# ============================================================================
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["mle", "eap"])
+async def test_append_attempt_matches_full_save(binary_store, method):
+    """Appending attempts produces the same bytes as a full save"""
+    engine = make_engine(method, n=1)
+    await binary_store.save_engine(1, engine)
+    for item_id, params, correct in ITEMS[1:]:
+        engine.record_attempt(item_id, params, correct)
+        assert await binary_store.append_attempt(1, engine)
+
+    raw = await binary_store.redis.get(binary_store._key(1))
+    assert raw == pack_engine_state(engine)
+    assert_same_engine(await binary_store.load_engine(1), engine)
+
+
+@pytest.mark.asyncio
+async def test_append_attempt_rewrites_missing_state(binary_store):
+    """append_attempt falls back to a full save when the key is gone"""
+    engine = make_engine("eap")
+    assert await binary_store.append_attempt(7, engine)
+    assert_same_engine(await binary_store.load_engine(7), engine)
+
+
+@pytest.mark.asyncio
+async def test_json_client_keeps_json_format(json_store):
+    """Decoding clients store and load the JSON value format"""
+    engine = make_engine("eap")
+    await json_store.save_engine(1, engine)
+    assert (await json_store.redis.get(json_store._key(1))).startswith("{")
+    assert_same_engine(await json_store.load_engine(1), engine)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("decode_responses", [False, True])
+async def test_engine_summary(decode_responses):
+    """Summary reads theta and progress in both formats"""
+    store = AdaptiveEngineStateStore(
+        fakeredis.FakeRedis(decode_responses=decode_responses)
+    )
+    engine = make_engine("mle")
+    await store.save_engine(3, engine, ttl_sec=120)
+
+    summary = await store.get_engine_summary(3)
+    assert summary["theta"] == pytest.approx(engine.theta)
+    assert summary["items_completed"] == len(ITEMS)
+    assert summary["max_items"] == engine.max_items
+    assert 0 < summary["ttl"] <= 120
+    assert await store.get_engine_summary(4) is None
+    await store.redis.aclose()
+
+
+# ============================================================================
+# 3. Active index and batches
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_active_sessions_index(binary_store):
+    """Active sessions come from the index and drop on delete"""
+    await binary_store.save_engines({i: make_engine() for i in (1, 2, 3)})
+    assert sorted(await binary_store.get_all_active_sessions()) == [1, 2, 3]
+
+    await binary_store.delete_engine(2)
+    assert sorted(await binary_store.get_all_active_sessions()) == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_active_sessions_prunes_expired(binary_store):
+    """Index entries past their expiry are pruned"""
+    await binary_store.save_engine(1, make_engine())
+    await binary_store.redis.zadd(binary_store.index_key, {"9": 0})
+    assert await binary_store.get_all_active_sessions() == [1]
+
+
+@pytest.mark.asyncio
+async def test_batch_load_and_extend(binary_store):
+    """load_engines and extend_ttls handle many sessions at once"""
+    engines = {1: make_engine("mle"), 2: make_engine("eap", n=2)}
+    await binary_store.save_engines(engines, ttl_sec=100)
+
+    loaded = await binary_store.load_engines([1, 2, 5], initial_theta=0.7)
+    assert_same_engine(loaded[1], engines[1])
+    assert_same_engine(loaded[2], engines[2])
+    assert loaded[5].theta == 0.7 and loaded[5].responses == []
+
+    extended = await binary_store.extend_ttls([1, 2, 5], 500)
+    assert extended == {1: True, 2: True, 5: False}
+    assert await binary_store.get_ttl(1) > 500
@@ -0,0 +1,110 @@
+"""
+Test suite for the incremental EAP posterior
+
+Checks that EAPPosterior matches the batch estimators, stays stable on
+long tests, and survives a round trip through AdaptiveEngineStateStore.
+"""
+import random
+
+import numpy as np
+import pytest
+from fakeredis import aioredis as fakeredis
+
+from app.services.adaptive_state_store import AdaptiveEngineStateStore
+from app.services.exam_engine import AdaptiveEngine, update_theta_eap
+from app.services.irt_eap_estimator import (
+    EAPPosterior,
+    IRTResponse,
+    estimate_theta_eap,
+)
+
+
+@pytest.fixture
+def responses():
+    """Simulated 40-item response pattern"""
+    rng = random.Random(3)
+    return [
+        IRTResponse(
+            a=rng.uniform(0.8, 2.0),
+            b=rng.uniform(-2.0, 2.0),
+            c=rng.uniform(0.1, 0.25),
+            u=int(rng.random() < 0.6),
+        )
+        for _ in range(40)
+    ]
+
+
+# ============================================================================
+# 1. Parity with batch estimators
+# ============================================================================
+
+def test_incremental_matches_batch(responses):
+    """Per-response updates equal a full recomputation at every step"""
+    posterior = EAPPosterior()
+    for n, r in enumerate(responses, start=1):
+        result = posterior.update(r.a, r.b, r.c, r.u)
+        batch = estimate_theta_eap(responses[:n])
+        assert result.theta == pytest.approx(batch.theta, abs=1e-9)
+        assert result.se == pytest.approx(batch.se, abs=1e-9)
+    assert posterior.n_responses == len(responses)
+
+
+def test_engine_eap_matches_update_theta_eap(responses):
+    """AdaptiveEngine EAP path matches exam_engine.update_theta_eap"""
+    engine = AdaptiveEngine(estimation_method="eap")
+    params, correct = [], []
+    for i, r in enumerate(responses[:15]):
+        p = {"a": r.a, "b": r.b, "c": r.c}
+        engine.record_attempt(item_id=i, params=p, correct=bool(r.u))
+        params.append(p)
+        correct.append(bool(r.u))
+        assert engine.theta == pytest.approx(update_theta_eap(params, correct), abs=1e-9)
+
+
+def test_long_test_does_not_underflow():
+    """Hundreds of responses keep a finite, informative estimate"""
+    posterior = EAPPosterior()
+    for _ in range(400):
+        posterior.update(a=2.0, b=1.0, c=0.2, u=1)
+    assert np.isfinite(posterior.theta)
+    assert posterior.theta > 1.0
+    assert posterior.se < 0.5
+
+
+# ============================================================================
+# 2. Persistence
+# ============================================================================
+
+def test_posterior_dict_round_trip(responses):
+    """to_dict/from_dict restores the same estimate"""
+    posterior = EAPPosterior(prior_mean=0.5, prior_sd=1.2)
+    posterior.extend(responses[:10])
+    restored = EAPPosterior.from_dict(posterior.to_dict())
+
+    assert restored.theta == posterior.theta
+    assert restored.se == posterior.se
+    assert restored.n_responses == 10
+
+
+@pytest.mark.asyncio
+async def test_state_store_resumes_eap_without_replay(responses):
+    """State store persists the log-posterior and restores it on load"""
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    store = AdaptiveEngineStateStore(redis_client)
+
+    engine = AdaptiveEngine(estimation_method="eap")
+    for i, r in enumerate(responses[:5]):
+        engine.record_attempt(i, {"a": r.a, "b": r.b, "c": r.c}, bool(r.u))
+    assert await store.save_engine(exam_session_id=7, engine=engine)
+
+    loaded = await store.load_engine(exam_session_id=7)
+    assert loaded.estimation_method == "eap"
+    assert loaded.item_ids == engine.item_ids
+    np.testing.assert_array_equal(
+        loaded.posterior.log_posterior, engine.posterior.log_posterior
+    )
+
+    r = responses[5]
+    expected = engine.record_attempt(5, {"a": r.a, "b": r.b, "c": r.c}, bool(r.u))
+    resumed = loaded.record_attempt(5, {"a": r.a, "b": r.b, "c": r.c}, bool(r.u))
+    assert resumed["theta"] == pytest.approx(expected["theta"])
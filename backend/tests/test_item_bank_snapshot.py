@@ -0,0 +1,279 @@
+"""
+Test suite for the array-backed ItemBank snapshot
+
+Checks that vectorized selection matches the scalar ItemBankService
+pipeline and that per-session attempted bitmasks exclude items.
+"""
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.exam_engine import item_information
+from app.services.item_bank import ItemBankService
+from app.services.item_bank_snapshot import ItemBankSnapshot, item_information_vec
+
+
+# ============================================================================
+# Fixtures
+# ============================================================================
+
+@pytest.fixture
+def bank_items():
+    """Random item bank with two subjects and three topics"""
+    rng = random.Random(7)
+    topics = ["algebra", "geometry", "statistics"]
+    return [
+        {
+            "id": i,
+            "a": round(rng.uniform(0.5, 2.5), 3),
+            "b": round(rng.uniform(-3.0, 3.0), 3),
+            "c": round(rng.uniform(0.0, 0.3), 3),
+            "topic": topics[i % 3],
+            "subject": "math" if i % 2 else "science",
+        }
+        for i in range(1, 501)
+    ]
+
+
+@pytest.fixture
+def snapshot(bank_items):
+    return ItemBankSnapshot.from_items(bank_items)
+
+
+# ============================================================================
+# 1. Vectorized information
+# ============================================================================
+
+def test_item_information_vec_matches_scalar(bank_items):
+    """Vectorized information equals exam_engine.item_information"""
+    a = np.array([it["a"] for it in bank_items])
+    b = np.array([it["b"] for it in bank_items])
+    c = np.array([it["c"] for it in bank_items])
+
+    for theta in (-2.5, 0.0, 1.3):
+        vec = item_information_vec(a, b, c, theta)
+        scalar = [item_information(it["a"], it["b"], it["c"], theta) for it in bank_items]
+        np.testing.assert_allclose(vec, scalar, rtol=1e-12)
+
+
+def test_item_information_vec_saturated_is_zero():
+    """Saturated probabilities give zero information instead of NaN"""
+    info = item_information_vec(
+        np.array([50.0]), np.array([-3.0]), np.array([0.0]), theta=3.0
+    )
+    assert info[0] == 0.0
+
+
+# ============================================================================
+# 2. Candidate selection
+# ============================================================================
+
+def test_select_candidates_matches_rank_by_information(snapshot, bank_items):
+    """Snapshot ranking matches the scalar difficulty-window + rank pipeline"""
+    service = ItemBankService(MagicMock())
+    theta = 0.4
+
+    in_window = [
+        {k: it[k] for k in ("id", "a", "b", "c", "topic")}
+        for it in bank_items
+        if abs(it["b"] - theta) <= 1.0
+    ]
+    expected = service.rank_by_information(theta, in_window)
+    ranked = snapshot.select_candidates(theta=theta)
+
+    assert [it["id"] for it in ranked] == [it["id"] for it in expected]
+    assert ranked[0]["info"] == pytest.approx(expected[0]["info"])
+
+
+def test_select_candidates_top_k(snapshot):
+    """max_candidates returns the same head as a full sort"""
+    full = snapshot.select_candidates(theta=-1.0)
+    top = snapshot.select_candidates(theta=-1.0, max_candidates=10)
+
+    assert [it["id"] for it in top] == [it["id"] for it in full[:10]]
+
+
+def test_select_candidates_filters(snapshot):
+    """Subject and topic filters restrict candidates"""
+    ranked = snapshot.select_candidates(theta=0.0, subject="math", topic="geometry")
+
+    assert ranked
+    assert all(it["topic"] == "geometry" for it in ranked)
+    assert all(it["id"] % 2 == 1 for it in ranked)
+    assert snapshot.select_candidates(theta=0.0, topic="unknown") == []
+
+
+def test_select_candidates_window_fallback():
+    """Falls back to all eligible items when the window is empty"""
+    snap = ItemBankSnapshot.from_items([
+        {"id": 1, "a": 1.0, "b": 3.0, "c": 0.2},
+        {"id": 2, "a": 1.5, "b": 2.5, "c": 0.2},
+    ])
+    ranked = snap.select_candidates(theta=-2.0, difficulty_window=0.5)
+
+    assert {it["id"] for it in ranked} == {1, 2}
+
+
+# ============================================================================
+# 3. Attempted bitmask
+# ============================================================================
+
+def test_attempted_mask_excludes_items(snapshot):
+    """Marked items never appear in candidates"""
+    best = snapshot.select_candidates(theta=0.0, max_candidates=3)
+    used = [it["id"] for it in best]
+
+    attempted = snapshot.attempted_mask(used + [99999])
+    ranked = snapshot.select_candidates(
+        theta=0.0, attempted=attempted, max_candidates=3
+    )
+
+    assert not set(used) & {it["id"] for it in ranked}
+    assert attempted.sum() == 3
+    assert snapshot.attempted_mask([]).sum() == 0
+
+
+@pytest.mark.asyncio
+async def test_service_reads_attempts_on_every_call(snapshot):
+    """Attempts written by another worker are excluded on the next call"""
+    attempts = [(1,), (2,)]
+    db = MagicMock()
+
+    async def execute(stmt):
+        result = MagicMock()
+        result.all.return_value = list(attempts)
+        return result
+
+    db.execute = AsyncMock(side_effect=execute)
+
+    bank = ItemBankService(db, snapshot=snapshot)
+    first = await bank.get_candidate_items(exam_session_id=5, theta=0.0)
+    attempts.append((first[0]["id"],))  # persisted elsewhere
+    second = await bank.get_candidate_items(exam_session_id=5, theta=0.0)
+
+    assert db.execute.await_count == 2
+    assert not {1, 2} & {it["id"] for it in first}
+    assert not {1, 2, first[0]["id"]} & {it["id"] for it in second}
+
+
+# ============================================================================
+# 4. Theta-grid information index
+# ============================================================================
+
+@pytest.mark.parametrize("theta", [-4.7, -2.05, 0.0, 0.33, 1.96, 4.2])
+def test_grid_top_k_matches_full_sort(snapshot, theta):
+    """Grid lookup returns the same head as scoring every eligible item"""
+    attempted = snapshot.attempted_mask(range(1, 40))
+    full = snapshot.select_candidates(theta=theta, attempted=attempted)
+    top = snapshot.select_candidates(
+        theta=theta, attempted=attempted, max_candidates=10
+    )
+
+    assert [it["id"] for it in top] == [it["id"] for it in full[:10]]
+
+
+def test_snapshot_as_engine_info_index(snapshot, bank_items):
+    """exam_engine.select_next_item uses the snapshot's grid lookup"""
+    from app.services.exam_engine import select_next_item
+
+    pool = bank_items[50:450]
+    for theta in (-1.5, 0.2, 2.4):
+        expected = select_next_item(theta, pool)
+        assert select_next_item(theta, pool, info_index=snapshot) == expected
+
+    hit = snapshot.select(0.2, exclude_ids=[it["id"] for it in pool])
+    assert hit is not None and hit[0] not in {it["id"] for it in pool}
+    assert snapshot.select(0.2, allowed_ids=[99999]) is None
+
+
+def test_engine_scans_items_missing_from_index(snapshot):
+    """Items outside the snapshot force the full scan"""
+    from app.services.exam_engine import select_next_item
+
+    pool = [
+        {"id": 1, "a": 0.5, "b": 3.0, "c": 0.2},
+        {"id": 99999, "a": 2.5, "b": 0.0, "c": 0.0},
+    ]
+    assert select_next_item(0.0, pool, info_index=snapshot)["id"] == 99999
+
+
+# ============================================================================
+# 5. Sync (core) service and process-wide snapshot
+# ============================================================================
+
+def test_core_service_uses_snapshot(snapshot):
+    """Core ItemBankService ranks from the snapshot and excludes attempts"""
+    from app.core.services.item_bank import ItemBankService as CoreItemBankService
+
+    db = MagicMock()
+    db.query.return_value.filter.return_value.filter.return_value.all.return_value = [
+        (1,), (2,)
+    ]
+
+    bank = CoreItemBankService(db, snapshot=snapshot)
+    ranked = bank.get_candidate_items(exam_session_id=5, theta=0.3, window=2.0)
+    expected = snapshot.select_candidates(
+        theta=0.3, attempted=snapshot.attempted_mask([1, 2]), difficulty_window=2.0
+    )
+
+    assert [it["id"] for it in ranked] == [it["id"] for it in expected]
+    assert not {1, 2} & {it["id"] for it in ranked}
+
+    top = bank.get_candidate_items(
+        exam_session_id=5, theta=0.3, window=2.0, max_candidates=10
+    )
+    assert [it["id"] for it in top] == [it["id"] for it in expected[:10]]
+
+
+@pytest.fixture
+def item_db():
+    """In-memory SQLite session with only the items table"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import app.models.parent_models  # noqa: F401 (resolves User relationships)
+    from app.models.item import Item
+    from app.services import item_bank_snapshot
+
+    engine = create_engine("sqlite://")
+    Item.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.execute(Item.__table__.insert(), [
+        {"id": 1, "topic": "algebra", "a": 1.2, "b": 0.0, "c": 0.2,
+         "question_text": "q1", "meta": {"subject": "math"}},
+        {"id": 2, "topic": "geometry", "a": 0.8, "b": 1.0, "c": 0.1,
+         "question_text": "q2", "meta": {"subject": "math"}},
+    ])
+    session.commit()
+    item_bank_snapshot.invalidate_item_bank_snapshot()
+    yield session
+    item_bank_snapshot.invalidate_item_bank_snapshot()
+    session.close()
+
+
+def test_get_item_bank_snapshot_sync_reloads_on_calibration(item_db):
+    """A new version stamp (updated parameters) triggers a reload"""
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.item import Item
+    from app.services.item_bank_snapshot import get_item_bank_snapshot_sync
+
+    first = get_item_bank_snapshot_sync(item_db)
+    assert list(first.ids) == [1, 2]
+    assert first.subject_vocab == {"math": 0}
+    assert get_item_bank_snapshot_sync(item_db) is first  # cached
+
+    item_db.execute(
+        Item.__table__.update()
+        .where(Item.__table__.c.id == 2)
+        .values(a=2.0, updated_at=datetime.now(timezone.utc) + timedelta(minutes=1))
+    )
+    item_db.commit()
+
+    assert get_item_bank_snapshot_sync(item_db) is first  # within max_age
+    second = get_item_bank_snapshot_sync(item_db, max_age_seconds=0)
+    assert second is not first
+    assert second.a[1] == pytest.approx(2.0)
+    assert get_item_bank_snapshot_sync(item_db, max_age_seconds=0) is second
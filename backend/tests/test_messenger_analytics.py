@@ -17,6 +17,7 @@ Test Coverage:
 
 from __future__ import annotations
 
+import json
 import uuid
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock
@@ -38,8 +39,7 @@ def mock_redis():
     redis = AsyncMock()
     redis.get = AsyncMock(return_value=None)
     redis.setex = AsyncMock()
-    redis.lpush = AsyncMock()
-    redis.ltrim = AsyncMock()
+    redis.xadd = AsyncMock()
     return redis
 
 
@@ -168,6 +168,30 @@ async def test_messages(db_session: AsyncSession, test_conversation, test_users)
 
     await db_session.commit()
 
+    # Dashboards read rollups; fold the messages in as the stream consumer would
+    from app.messenger.analytics_rollups import aggregate_events, write_rollups
+
+    events = [
+        (
+            str(msg.id),
+            {
+                "event_type": AnalyticsEventType.MESSAGE_SENT.value,
+                "timestamp": msg.created_at.isoformat(),
+                "user_id": str(msg.sender_id),
+                "conversation_id": str(msg.conversation_id),
+                "metadata": json.dumps(
+                    {
+                        "message_type": msg.message_type,
+                        "content_length": len(msg.content or ""),
+                    }
+                ),
+            },
+        )
+        for msg in messages
+    ]
+    await write_rollups(db_session, aggregate_events(events))
+    await db_session.commit()
+
     return messages
 
 
@@ -516,9 +540,14 @@ async def test_track_event(
         metadata={"message_type": "text"},
     )
 
-    # Verify Redis was called
-    mock_redis.lpush.assert_called_once()
-    mock_redis.ltrim.assert_called_once()
+    # Verify the event was appended to the capped stream
+    mock_redis.xadd.assert_called_once()
+    stream, fields = mock_redis.xadd.call_args.args
+    assert stream == "analytics:stream"
+    assert fields["event_type"] == "message.sent"
+    assert fields["user_id"] == "123"
+    assert json.loads(fields["metadata"]) == {"message_type": "text"}
+    assert mock_redis.xadd.call_args.kwargs["approximate"] is True
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,247 @@
+"""
+Tests for the analytics event stream and rollups (no database).
+
+- track_event appends to a capped Redis Stream
+- The consumer group reads a batch, upserts rollups once, then XACKs
+- Events fold into minute/hour/day buckets per conversation/user/type
+- Dashboard queries read rollups at a granularity fitting the range
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+from app.messenger.analytics import AnalyticsEventType, AnalyticsService, TimeInterval
+from app.messenger.analytics_rollups import (
+    NIL_UUID,
+    ROLLUP_GROUP,
+    STREAM_KEY,
+    AnalyticsRollupConsumer,
+    aggregate_events,
+    bucket_floor,
+    rollup_granularity,
+    start_analytics_rollups,
+    stop_analytics_rollups,
+)
+
+CONV = uuid.uuid4()
+
+
+class FakeSession:
+    """Async session stand-in recording executed statements."""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.calls: list[tuple] = []
+        self.commit = AsyncMock()
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+        result = MagicMock()
+        result.first.return_value = self.rows[0] if self.rows else None
+        result.all.return_value = self.rows
+        result.scalar.return_value = 0
+        return result
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _event(ts: datetime, user_id=7, conversation_id=CONV, message_type="text", chars=5):
+    return {
+        "event_type": "message.sent",
+        "timestamp": ts.isoformat(),
+        "user_id": str(user_id),
+        "conversation_id": str(conversation_id) if conversation_id else "",
+        "metadata": json.dumps(
+            {"message_type": message_type, "content_length": chars}
+        ),
+    }
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_aggregate_events_folds_every_granularity():
+    ts = datetime(2025, 12, 4, 10, 15, 30)
+    entries = [
+        ("1-0", _event(ts)),
+        ("2-0", _event(ts + timedelta(seconds=20), chars=7)),
+        ("3-0", _event(ts + timedelta(minutes=5), message_type="image", chars=0)),
+        # Non-message event without conversation/user, bytes from a raw client
+        (
+            "4-0",
+            {b"event_type": b"user.online", b"timestamp": ts.isoformat().encode()},
+        ),
+        ("5-0", {"event_type": "message.sent", "timestamp": "not a date"}),
+    ]
+
+    rollups = aggregate_events(entries)
+
+    minute = bucket_floor(ts, "minute")
+    hour = bucket_floor(ts, "hour")
+    day = bucket_floor(ts, "day")
+    assert rollups[("minute", minute, "message.sent", CONV, 7, "text")] == [2, 12]
+    assert rollups[("hour", hour, "message.sent", CONV, 7, "text")] == [2, 12]
+    assert rollups[("day", day, "message.sent", CONV, 7, "image")] == [1, 0]
+    assert rollups[("day", day, "user.online", NIL_UUID, 0, "")] == [1, 0]
+    assert hour.tzinfo == timezone.utc
+    # text, image and online keys, each at 3 granularities
+    assert len(rollups) == 9
+
+
+def test_rollup_granularity_by_range():
+    now = datetime(2025, 12, 4, 12, 0)
+    assert rollup_granularity(now - timedelta(hours=1), now=now) == "minute"
+    assert rollup_granularity(now - timedelta(hours=24), now=now) == "hour"
+    assert rollup_granularity(now - timedelta(days=30), now=now) == "day"
+    assert rollup_granularity(None, now=now) == "day"
+    # Short range outside minute retention
+    old = now - timedelta(days=10)
+    assert rollup_granularity(old, old + timedelta(hours=1), now=now) == "hour"
+
+
+@pytest.mark.asyncio
+async def test_track_event_then_consume_writes_one_upsert_and_acks():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    service = AnalyticsService(redis_client=redis)
+
+    for user_id in (1, 1, 2):
+        await service.track_event(
+            AnalyticsEventType.MESSAGE_SENT,
+            user_id=user_id,
+            conversation_id=str(CONV),
+            metadata={"message_type": "text", "content_length": 3},
+        )
+    assert await redis.xlen(STREAM_KEY) == 3
+
+    db = FakeSession()
+    consumer = AnalyticsRollupConsumer(
+        redis, session_factory=lambda: db, consumer_name="c1", block_ms=10
+    )
+
+    assert await consumer.consume_once() == 3
+    assert len(db.calls) == 1
+    stmt, params = db.calls[0]
+    assert "ON CONFLICT" in str(stmt)
+    assert "count = messenger_analytics_rollups.count + EXCLUDED.count" in str(stmt)
+    # users 1 and 2, three granularities each
+    assert len(params["granularity"]) == 6
+    assert sum(params["count"]) == 9
+    assert params["granularity"] == sorted(params["granularity"])
+    db.commit.assert_awaited_once()
+
+    pending = await redis.xpending(STREAM_KEY, ROLLUP_GROUP)
+    assert pending["pending"] == 0
+
+    # Nothing new: no database round trip
+    assert await consumer.consume_once() == 0
+    assert len(db.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_write_leaves_batch_pending():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    await redis.xadd(STREAM_KEY, _event(datetime.utcnow()))
+
+    db = FakeSession()
+    db.commit = AsyncMock(side_effect=RuntimeError("db down"))
+    consumer = AnalyticsRollupConsumer(
+        redis, session_factory=lambda: db, consumer_name="c1", block_ms=10
+    )
+
+    with pytest.raises(RuntimeError):
+        await consumer.consume_once()
+
+    pending = await redis.xpending(STREAM_KEY, ROLLUP_GROUP)
+    assert pending["pending"] == 1
+
+
+@pytest.mark.asyncio
+async def test_background_consumer_started_at_startup_writes_rollups(monkeypatch):
+    import asyncio
+
+    import app.messenger.analytics as analytics_module
+
+    # The consumer blocks on its own connection; check through another one
+    server = fakeredis.FakeServer()
+    redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    observer = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    service = AnalyticsService(redis_client=redis)
+    monkeypatch.setattr(analytics_module, "_analytics_service_instance", service)
+
+    await service.track_event(
+        AnalyticsEventType.MESSAGE_SENT,
+        user_id=1,
+        conversation_id=str(CONV),
+        metadata={"message_type": "text", "content_length": 3},
+    )
+
+    db = FakeSession()
+    task = start_analytics_rollups(session_factory=lambda: db, block_ms=50)
+    assert start_analytics_rollups() is task  # idempotent
+
+    for _ in range(100):
+        if db.calls:
+            break
+        await asyncio.sleep(0.05)
+
+    assert db.calls and "ON CONFLICT" in str(db.calls[0][0])
+    await stop_analytics_rollups()
+    assert task.done() and not task.cancelled()
+    pending = await observer.xpending(STREAM_KEY, ROLLUP_GROUP)
+    assert pending["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dashboard_queries_read_rollups():
+    service = AnalyticsService(redis_client=None)
+    row = MagicMock(
+        total_messages=10,
+        text_messages=8,
+        image_messages=2,
+        file_messages=None,
+        system_messages=None,
+        unique_senders=3,
+        avg_message_length=4.5,
+    )
+    db = FakeSession(rows=[row])
+
+    stats = await service.get_message_stats(
+        db, conversation_id=str(CONV), start_date=datetime.utcnow() - timedelta(days=7)
+    )
+    assert stats["total_messages"] == 10
+    assert stats["message_type_distribution"]["image"] == 20.0
+
+    sql = _sql(db.calls[0][0])
+    assert "messenger_analytics_rollups" in sql
+    assert "FROM messages" not in sql
+    assert "FILTER (WHERE messenger_analytics_rollups.message_type" in sql
+    params = db.calls[0][0].compile(dialect=postgresql.dialect()).params
+    assert params["granularity_1"] == "hour"
+    assert params["event_type_1"] == "message.sent"
+
+    db = FakeSession()
+    await service.get_message_timeline(db, interval=TimeInterval.WEEKLY, days=90)
+    sql = _sql(db.calls[0][0])
+    assert "date_trunc(%(date_trunc_1)s, messenger_analytics_rollups.bucket_start)" in sql
+    params = db.calls[0][0].compile(dialect=postgresql.dialect()).params
+    assert params["granularity_1"] == "day"
+
+    db = FakeSession()
+    await service.get_top_senders(db, limit=5)
+    sql = _sql(db.calls[0][0])
+    assert "JOIN users ON messenger_analytics_rollups.user_id = users.id" in sql
+    assert "FROM messages" not in sql
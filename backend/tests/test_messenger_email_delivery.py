@@ -0,0 +1,291 @@
+"""
+Tests for pooled SMTP delivery, token-bucket limiting and digest dispatch
+(no SMTP server or database).
+
+- Authenticated SMTP sessions are reused across messages
+- Stale pooled sessions are replaced and the message retried once
+- Per-recipient token buckets (local and Redis-shared)
+- Digests prefetch notifications per chunk and send concurrently
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiosmtplib
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.messenger.email_service as email_module
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+from app.messenger.email_service import (
+    DigestFrequency,
+    EmailService,
+    SMTPConnectionPool,
+    TokenBucketLimiter,
+)
+
+
+def _smtp_factory():
+    """Patched aiosmtplib.SMTP returning a fresh AsyncMock session per call."""
+    sessions: list[AsyncMock] = []
+
+    def factory(**kwargs):
+        session = AsyncMock()
+        sessions.append(session)
+        cm = MagicMock()
+        cm.__aenter__ = AsyncMock(return_value=session)
+        cm.__aexit__ = AsyncMock(return_value=False)
+        return cm
+
+    return MagicMock(side_effect=factory), sessions
+
+
+def _pool(**kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        "smtp.test", 587, True, username="u", password="p", **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_authenticated_session():
+    smtp, sessions = _smtp_factory()
+    pool = _pool(size=2)
+
+    with patch("aiosmtplib.SMTP", smtp):
+        for _ in range(5):
+            await pool.send_message(MagicMock())
+
+    assert pool.connections_opened == 1
+    assert pool.messages_sent == 5
+    sessions[0].login.assert_awaited_once_with("u", "p")
+    assert sessions[0].send_message.await_count == 5
+
+
+@pytest.mark.asyncio
+async def test_pool_concurrency_and_retirement():
+    smtp, sessions = _smtp_factory()
+    pool = _pool(size=2, max_messages=3)
+    in_flight = 0
+    peak = 0
+
+    async def slow_send(message):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    with patch("aiosmtplib.SMTP", smtp):
+        await pool.send_message(MagicMock())
+        sessions[0].send_message.side_effect = slow_send
+        await asyncio.gather(*(pool.send_message(MagicMock()) for _ in range(6)))
+
+    assert peak <= 2
+    assert pool.messages_sent == 7
+    # No session carries more than 3 messages
+    assert all(s.send_message.await_count <= 3 for s in sessions)
+    assert pool.connections_opened == len(sessions) >= 3
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_stale_session_once():
+    smtp, sessions = _smtp_factory()
+    pool = _pool()
+
+    with patch("aiosmtplib.SMTP", smtp):
+        await pool.send_message(MagicMock())
+        sessions[0].send_message.side_effect = aiosmtplib.SMTPServerDisconnected(
+            "timed out"
+        )
+        await pool.send_message(MagicMock())
+
+        assert pool.connections_opened == 2
+        sessions[1].send_message.assert_awaited_once()
+
+        # A fresh session failing is not retried
+        sessions[1].send_message.side_effect = RuntimeError("rejected")
+        with pytest.raises(RuntimeError):
+            await pool.send_message(MagicMock())
+    assert pool.connections_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_local_refills_and_prunes():
+    limiter = TokenBucketLimiter(capacity=2, period_seconds=0.05, max_local_keys=2)
+
+    assert await limiter.try_acquire("a@x")
+    assert await limiter.try_acquire("a@x")
+    assert not await limiter.try_acquire("a@x")
+
+    await asyncio.sleep(0.05)
+    assert await limiter.try_acquire("a@x")
+
+    # Refilled buckets are dropped once over the key limit
+    await limiter.try_acquire("b@x")
+    await asyncio.sleep(0.06)
+    await limiter.try_acquire("c@x")
+    assert set(limiter._buckets) == {"c@x"}
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_shared_via_redis_with_local_fallback():
+    script = AsyncMock(side_effect=[1, 0, ConnectionError("down")])
+    redis = MagicMock()
+    redis.register_script = MagicMock(return_value=script)
+    limiter = TokenBucketLimiter(capacity=1, period_seconds=3600, redis_client=redis)
+
+    assert await limiter.try_acquire("a@x")
+    assert not await limiter.try_acquire("a@x")
+    assert script.await_args.kwargs["keys"] == ["email:ratelimit:a@x"]
+    # Redis unavailable: fall back to the in-process bucket
+    assert await limiter.try_acquire("a@x")
+    redis.register_script.assert_called_once()
+
+
+class DigestSession:
+    """First query returns users; later ones return prefetched notifications."""
+
+    def __init__(self, users, notifications):
+        self.users = users
+        self.notifications = notifications
+        self.statements: list = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        result = MagicMock()
+        if len(self.statements) == 1:
+            result.all.return_value = self.users
+        else:
+            ids = stmt.compile().params
+            wanted = next(v for k, v in ids.items() if k.startswith("user_id"))
+            result.scalars.return_value.all.return_value = [
+                n for n in self.notifications if n.user_id in wanted
+            ]
+        return result
+
+
+def _notification(user_id: int, n: int):
+    return SimpleNamespace(
+        id=n,
+        user_id=user_id,
+        type="new_message",
+        title=f"Message {n}",
+        message="hello",
+        data={},
+        action_url="/m",
+        created_at=datetime.utcnow(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_digest_batch_prefetches_per_chunk_and_sends_concurrently(monkeypatch):
+    monkeypatch.setattr(email_module, "EMAIL_DIGEST_CHUNK_SIZE", 2)
+    users = [
+        SimpleNamespace(id=i, email=f"user{i}@x.com", full_name=f"User {i}")
+        for i in range(1, 6)
+    ]
+    users.append(SimpleNamespace(id=6, email=None, full_name="No Email"))
+    # user 3 has nothing unread
+    notifications = [
+        _notification(uid, n) for n, uid in enumerate([1, 1, 2, 4, 5, 6])
+    ]
+    db = DigestSession(users, notifications)
+
+    service = EmailService()
+    in_flight = 0
+    peak = 0
+
+    async def fake_send(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    with patch.object(service, "send_email", side_effect=fake_send) as send:
+        sent = await service.send_digest_emails_batch(
+            db, DigestFrequency.DAILY, concurrency=2
+        )
+
+    assert sent == 4
+    assert {c.kwargs["to_email"] for c in send.call_args_list} == {
+        "user1@x.com",
+        "user2@x.com",
+        "user4@x.com",
+        "user5@x.com",
+    }
+    assert peak == 2
+    # users query + one notification prefetch per chunk of 2 users
+    assert len(db.statements) == 1 + 3
+
+    sql = str(db.statements[1].compile(dialect=postgresql.dialect()))
+    assert "row_number() OVER (PARTITION BY in_app_notifications.user_id" in sql
+    assert "rank <=" in sql
+
+
+def _digest_contexts(n: int) -> list[dict]:
+    return [
+        {
+            "user_name": f"User {i}",
+            "period": "yesterday",
+            "total_notifications": 1,
+            "grouped_notifications": {
+                "new_message": [
+                    {
+                        "title": f"Hi {i}",
+                        "message": "m",
+                        "created_at": datetime(2025, 1, 1),
+                    }
+                ]
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def test_templates_compiled_once_and_missing_text_cached():
+    service = EmailService()
+    with patch.object(
+        service.jinja_env, "get_template", wraps=service.jinja_env.get_template
+    ) as get_template:
+        for context in _digest_contexts(3):
+            html, text = service.render_template(
+                "digest_daily.html", {**context, "title": "T"}
+            )
+
+    assert "<html" in html.lower()
+    assert text.startswith("T")  # generated fallback, no digest_daily.txt
+    looked_up = [c.args[0] for c in get_template.call_args_list]
+    assert looked_up == ["digest_daily.html", "digest_daily.txt"]
+
+
+def test_render_batch_matches_single_render_and_isolates_failures():
+    service = EmailService()
+    contexts = _digest_contexts(3)
+    contexts[1]["grouped_notifications"] = 5  # not a mapping: fails to render
+
+    rendered = service.render_batch("digest_daily.html", contexts)
+
+    assert rendered[1] is None
+    assert rendered[0] == service.render_template("digest_daily.html", contexts[0])
+    assert "User 2" in rendered[2][0]
+
+
+@pytest.mark.asyncio
+async def test_render_batch_across_processes(monkeypatch):
+    monkeypatch.setattr(email_module, "EMAIL_RENDER_PARALLEL_MIN", 2)
+    service = EmailService()
+    contexts = _digest_contexts(10)
+
+    try:
+        parallel = service.render_batch("digest_daily.html", contexts, processes=2)
+        assert service._render_pool is not None
+    finally:
+        await service.close()
+
+    assert parallel == service.render_batch("digest_daily.html", contexts, processes=0)
@@ -0,0 +1,153 @@
+"""
+Tests for the materialized per-user inbox (no database required).
+
+Statements are compiled for PostgreSQL and inspected:
+- A new message updates every participant row with a single upsert
+- Inbox pages seek on (updated_at, conversation_id) instead of OFFSET
+- Read receipts never move the watermark backwards
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models.parent_models  # noqa: F401  (User.children relationship target)
+from app.messenger.inbox import (
+    PREVIEW_CHARS,
+    InboxService,
+    decode_inbox_cursor,
+    encode_inbox_cursor,
+    preview_text,
+)
+
+
+class FakeSession:
+    """Records compiled SQL and parameters; returns canned rows."""
+
+    def __init__(self, rows: list | None = None, scalar=None):
+        self.rows = rows or []
+        self.scalar = scalar
+        self.statements: list[tuple[str, dict]] = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(
+            (str(stmt.compile(dialect=postgresql.dialect())), params or {})
+        )
+        result = MagicMock()
+        result.all.return_value = self.rows
+        result.scalar_one_or_none.return_value = self.scalar
+        return result
+
+
+def _message(**overrides):
+    values = dict(
+        id=uuid.uuid4(),
+        conversation_id=uuid.uuid4(),
+        sender_id=7,
+        content="hello there",
+        message_type="text",
+        file_name=None,
+        created_at=datetime(2025, 11, 1, 12, 0),
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_preview_text():
+    assert preview_text(None) is None
+    assert preview_text(_message(content="  hi \n  all ")) == "hi all"
+    assert preview_text(_message(content="", message_type="image")) == "[Image]"
+    assert (
+        preview_text(_message(content=None, message_type="file", file_name="a.pdf"))
+        == "[File] a.pdf"
+    )
+
+    long_preview = preview_text(_message(content="x" * 500))
+    assert len(long_preview) == PREVIEW_CHARS
+    assert long_preview.endswith("…")
+
+
+@pytest.mark.asyncio
+async def test_record_message_is_one_upsert_for_all_participants():
+    db = FakeSession()
+    message = _message()
+
+    await InboxService().record_message(db, message)
+
+    assert len(db.statements) == 1
+    sql, params = db.statements[0]
+    assert "FROM conversation_participants p" in sql
+    assert "ON CONFLICT (user_id, conversation_id) DO UPDATE" in sql
+    assert "messenger_inbox.unread_count + 1" in sql
+    assert params["sender_id"] == 7
+    assert params["preview"] == "hello there"
+    assert params["conversation_id"] == message.conversation_id
+
+
+@pytest.mark.asyncio
+async def test_list_inbox_seeks_past_cursor():
+    base = datetime(2025, 11, 1, 12, 0)
+    rows = [
+        (
+            SimpleNamespace(
+                updated_at=base - timedelta(minutes=i), conversation_id=uuid.uuid4()
+            ),
+            SimpleNamespace(id=uuid.uuid4()),
+        )
+        for i in range(3)
+    ]
+    db = FakeSession(rows=rows)
+    cursor = encode_inbox_cursor(base + timedelta(minutes=1), uuid.uuid4())
+
+    page, next_cursor = await InboxService().list_inbox(
+        db, user_id=1, limit=2, cursor=cursor
+    )
+
+    sql, _ = db.statements[0]
+    assert "messenger_inbox.updated_at, messenger_inbox.conversation_id) <" in sql
+    assert "OFFSET" not in sql
+    assert "count(" not in sql.lower()
+    assert len(page) == 2
+    assert decode_inbox_cursor(next_cursor) == (
+        rows[1][0].updated_at,
+        rows[1][0].conversation_id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_inbox_last_page_has_no_cursor():
+    db = FakeSession(rows=[])
+
+    page, next_cursor = await InboxService().list_inbox(db, user_id=1, limit=20)
+
+    assert page == []
+    assert next_cursor is None
+
+
+def test_inbox_cursor_validation():
+    with pytest.raises(ValueError):
+        decode_inbox_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_inbox_cursor(encode_inbox_cursor(datetime.now(), uuid.uuid4())[:-4])
+
+
+@pytest.mark.asyncio
+async def test_mark_read_keeps_watermark_monotonic():
+    db = FakeSession()
+    conversation_id = uuid.uuid4()
+    read_through = datetime(2025, 11, 1, 12, 0)
+
+    await InboxService().mark_read(db, 3, conversation_id, read_through)
+
+    sql, params = db.statements[0]
+    assert "GREATEST(read_through_at, %(read_through)s)" in sql
+    assert "m.created_at > w.watermark" in sql
+    assert params == {
+        "user_id": 3,
+        "conversation_id": conversation_id,
+        "read_through": read_through,
+    }
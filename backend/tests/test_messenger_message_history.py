@@ -0,0 +1,186 @@
+"""
+Tests for keyset-paginated message history (no database required).
+
+- Pages seek on (created_at, id) with an id tie-breaker, no OFFSET or COUNT
+- Cursors page older and back newer without duplicates or gaps
+- The legacy before= id resolves inside the page query
+- around= returns a window centred on a message in one UNION ALL query
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+from app.messenger.history import (
+    MessageHistoryService,
+    decode_history_cursor,
+    encode_history_cursor,
+)
+
+CONV = uuid.uuid4()
+BASE = datetime(2025, 12, 1, 9, 0)
+
+
+def _messages(n: int) -> list:
+    """Live messages oldest first; pairs of messages share a timestamp."""
+    return [
+        SimpleNamespace(
+            id=uuid.UUID(int=i + 1), created_at=BASE + timedelta(seconds=i // 2)
+        )
+        for i in range(n)
+    ]
+
+
+def _key(m):
+    return (m.created_at, m.id)
+
+
+class HistorySession:
+    """
+    Evaluates history queries against an in-memory message list.
+
+    Keyset bounds are read from the compiled parameters, so the test
+    checks the SQL shape while the returned rows follow its semantics.
+    """
+
+    def __init__(self, messages: list):
+        self.messages = messages
+        self.statements: list = []
+
+    def _window(self, bound, op, descending, limit):
+        rows = [m for m in self.messages if bound is None or op(_key(m), bound)]
+        rows.sort(key=_key, reverse=descending)
+        return rows[:limit]
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        params = compiled.params
+        result = MagicMock()
+
+        if "UNION ALL" in sql:
+            anchor = next(m for m in self.messages if m.id == params["id_1"])
+            older = self._window(
+                _key(anchor), lambda a, b: a <= b, True, params["param_1"]
+            )
+            newer = self._window(
+                _key(anchor), lambda a, b: a > b, False, params["param_2"]
+            )
+            result.all.return_value = [(m, True) for m in older] + [
+                (m, False) for m in newer
+            ]
+            return result
+
+        # LIMIT is the last bound parameter
+        limit = params[f"param_{sum(k.startswith('param_') for k in params)}"]
+        bound = None
+        if isinstance(params.get("param_1"), datetime):
+            bound = (params["param_1"], params["param_2"])
+        elif "id_1" in params:
+            before = next(m for m in self.messages if m.id == params["id_1"])
+            bound = _key(before)
+
+        if ", messages.id) >" in sql:
+            rows = self._window(bound, lambda a, b: a > b, False, limit)
+        else:
+            rows = self._window(bound, lambda a, b: a < b, True, limit)
+        result.scalars.return_value.all.return_value = rows
+        return result
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = encode_history_cursor(BASE, uuid.UUID(int=7), "older")
+    assert decode_history_cursor(cursor) == (BASE, uuid.UUID(int=7), "older")
+
+    with pytest.raises(ValueError):
+        decode_history_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_history_cursor(encode_history_cursor(BASE, uuid.UUID(int=7), "up"))
+
+
+@pytest.mark.asyncio
+async def test_pages_walk_history_without_gaps_or_count():
+    messages = _messages(11)
+    db = HistorySession(messages)
+    service = MessageHistoryService()
+
+    seen = []
+    rows, older, newer = await service.list_page(db, CONV, limit=4)
+    assert newer is None
+    pages = [rows]
+    while older:
+        rows, older, newer = await service.list_page(db, CONV, limit=4, cursor=older)
+        assert newer is not None
+        pages.append(rows)
+    for page in pages:
+        seen.extend(page)
+
+    # Newest first, every message exactly once despite shared timestamps
+    assert [m.id for m in seen] == [m.id for m in reversed(messages)]
+    assert [len(p) for p in pages] == [4, 4, 3]
+
+    sql = _sql(db.statements[1])
+    assert "(messages.created_at, messages.id) < (" in sql
+    assert "ORDER BY messages.created_at DESC, messages.id DESC" in sql
+    assert "OFFSET" not in sql
+    assert all("count(" not in _sql(s) for s in db.statements)
+
+    # Scrolling back down from the oldest page returns the previous page
+    rows, older, newer = await service.list_page(db, CONV, limit=4, cursor=newer)
+    assert rows == pages[1]
+    assert "ORDER BY messages.created_at ASC, messages.id ASC" in _sql(
+        db.statements[-1]
+    )
+
+
+@pytest.mark.asyncio
+async def test_legacy_before_resolves_in_page_query():
+    messages = _messages(6)
+    db = HistorySession(messages)
+
+    rows, older, _ = await MessageHistoryService().list_page(
+        db, CONV, limit=10, before=messages[3].id
+    )
+
+    assert [m.id for m in rows] == [m.id for m in reversed(messages[:3])]
+    assert older is None
+    assert len(db.statements) == 1
+    assert "< (SELECT messages.created_at, messages.id" in _sql(db.statements[0])
+
+
+@pytest.mark.asyncio
+async def test_around_returns_centred_window_in_one_query():
+    messages = _messages(20)
+    db = HistorySession(messages)
+    service = MessageHistoryService()
+    anchor = messages[10]
+
+    rows, older, newer = await service.list_around(db, CONV, anchor.id, limit=6)
+
+    assert [m.id for m in rows] == [m.id for m in reversed(messages[8:14])]
+    assert len(db.statements) == 1
+    assert "UNION ALL" in _sql(db.statements[0])
+
+    # Both directions continue from the window edges
+    up, _, _ = await service.list_page(db, CONV, limit=3, cursor=newer)
+    down, _, _ = await service.list_page(db, CONV, limit=3, cursor=older)
+    assert [m.id for m in up] == [m.id for m in reversed(messages[14:17])]
+    assert [m.id for m in down] == [m.id for m in reversed(messages[5:8])]
+
+    # Near the newest message there is nothing newer to page to
+    rows, older, newer = await service.list_around(
+        db, CONV, messages[-1].id, limit=6
+    )
+    assert rows[0] is messages[-1]
+    assert len(rows) == 3
+    assert newer is None and older is not None
@@ -0,0 +1,198 @@
+"""
+Tests for single-round-trip presence transitions.
+
+- set_online is one MULTI pipeline (checked against fakeredis)
+- get_online_users reads all statuses with one pipeline, in score order
+- set_away / set_offline / update_activity run one Lua script each
+- Repeated heartbeats inside the coalescing window skip Redis
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+
+try:
+    import lupa  # noqa: F401 (fakeredis needs it to run Lua)
+
+    HAS_LUA = True
+except ImportError:
+    HAS_LUA = False
+
+from app.messenger.presence import PresenceManager
+
+
+def _manager(redis) -> PresenceManager:
+    manager = PresenceManager()
+    manager.redis = redis
+    manager.pubsub = MagicMock()
+    manager.pubsub.online_status_channel = MagicMock(return_value="online:status")
+    manager.pubsub.online_status_payload = MagicMock(
+        side_effect=lambda user_id, status, metadata=None: json.dumps(
+            {"user_id": user_id, "status": status, **(metadata or {})}, default=str
+        )
+    )
+    manager.heartbeat_coalesce_seconds = 30
+    return manager
+
+
+def _script_redis(result=1):
+    """Mock client whose registered scripts are AsyncMocks keyed by source."""
+    redis = MagicMock()
+    scripts: dict[str, AsyncMock] = {}
+
+    def register_script(source):
+        scripts[source] = AsyncMock(return_value=result)
+        return scripts[source]
+
+    redis.register_script = MagicMock(side_effect=register_script)
+    redis.hmget = AsyncMock(return_value=[None, None])
+    return redis, scripts
+
+
+@pytest.mark.asyncio
+async def test_set_online_then_list_uses_pipelines():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    manager = _manager(redis)
+
+    assert await manager.set_online(1, zone_id=10, org_id=100)
+    assert await manager.set_online(2, zone_id=10)
+
+    status = await manager.get_status(1)
+    assert status["status"] == "online"
+    assert status["zone_id"] == 10
+    assert status["org_id"] == 100
+    assert await redis.ttl("presence:1") > 0
+    assert await redis.zscore("online:org:100", "1") is not None
+
+    users = await manager.get_online_users(zone_id=10)
+    assert {u["user_id"] for u in users} == {1, 2}
+
+    many = await manager.get_status_many([2, 99])
+    assert many[2]["status"] == "online"
+    assert many[99] is None
+
+
+@pytest.mark.asyncio
+async def test_set_online_is_single_transaction():
+    redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis.pipeline = MagicMock(return_value=pipe)
+    manager = _manager(redis)
+
+    await manager.set_online(1, zone_id=10, org_id=100)
+
+    redis.pipeline.assert_called_once_with(transaction=True)
+    pipe.execute.assert_awaited_once()
+    assert pipe.zadd.call_count == 3  # global, zone, org
+    channel, payload = pipe.publish.call_args[0]
+    assert channel == "online:status"
+    assert json.loads(payload)["status"] == "online"
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_are_coalesced_within_window():
+    redis, scripts = _script_redis()
+    manager = _manager(redis)
+
+    for _ in range(5):
+        assert await manager.update_activity(7)
+
+    (touch,) = scripts.values()
+    touch.assert_awaited_once()
+    assert touch.await_args.kwargs["keys"] == ["presence:7", "online:global"]
+    assert manager.heartbeats_coalesced == 4
+
+    manager.heartbeat_coalesce_seconds = 0
+    await manager.update_activity(7)
+    assert touch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_update_activity_unknown_user_is_not_cached():
+    redis, scripts = _script_redis(result=0)
+    manager = _manager(redis)
+
+    assert await manager.update_activity(7) is False
+    assert await manager.update_activity(7) is False
+    (touch,) = scripts.values()
+    assert touch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_set_offline_and_away_are_one_script_call():
+    redis, scripts = _script_redis()
+    manager = _manager(redis)
+    manager._last_touch[3] = 0.0
+
+    assert await manager.set_offline(3, metadata={"reason": "disconnect"})
+    (offline,) = scripts.values()
+    args = offline.await_args.kwargs["args"]
+    assert args[0] == "3"
+    assert args[3] == "online:status"
+    assert json.loads(args[4])["status"] == "offline"
+    assert 3 not in manager._last_touch
+
+    redis_missing, _ = _script_redis(result=0)
+    manager.redis = redis_missing
+    assert await manager.set_away(3) is False
+
+
+@pytest.mark.asyncio
+async def test_scripts_receive_every_online_set_key():
+    redis, scripts = _script_redis()
+    redis.hmget = AsyncMock(return_value=[b"10", b"100"])
+    manager = _manager(redis)
+
+    assert await manager.update_activity(7)
+    assert await manager.set_offline(7)
+
+    touch, offline = scripts.values()
+    expected = ["presence:7", "online:global", "online:zone:10", "online:org:100"]
+    assert touch.await_args.kwargs["keys"] == expected
+    assert touch.await_args.kwargs["args"][-2:] == ["10", "100"]
+    assert offline.await_args.kwargs["keys"] == expected
+    redis.hmget.assert_awaited_once()  # location cached after the first read
+
+
+@pytest.mark.asyncio
+async def test_stale_location_is_reread_and_retried():
+    redis, _ = _script_redis()
+    redis.hmget = AsyncMock(return_value=[b"11", None])
+    manager = _manager(redis)
+    manager._locations[7] = ("10", "")
+    touch = AsyncMock(side_effect=[-1, 1])
+    redis.register_script = MagicMock(return_value=touch)
+
+    assert await manager.update_activity(7)
+    assert [c.kwargs["keys"][-1] for c in touch.await_args_list] == [
+        "online:zone:10",
+        "online:zone:11",
+    ]
+    assert manager._locations[7] == ("11", "")
+
+
+@pytest.mark.skipif(not HAS_LUA, reason="lupa is required to run Lua scripts")
+@pytest.mark.asyncio
+async def test_scripts_against_lua_capable_redis():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    manager = _manager(redis)
+    other = _manager(redis)  # another worker
+
+    assert await manager.set_online(1, zone_id=10, org_id=100)
+    manager.heartbeat_coalesce_seconds = 0
+    assert await manager.update_activity(1)
+    assert await redis.zscore("online:zone:10", "1") is not None
+
+    # Moved to zone 11 by another worker: the cached location is stale
+    assert await other.set_online(1, zone_id=11)
+    assert await manager.update_activity(1)
+    assert await redis.zscore("online:zone:11", "1") is not None
+
+    assert await manager.set_offline(1)
+    assert await redis.zscore("online:global", "1") is None
+    assert await redis.zscore("online:zone:11", "1") is None
+    assert (await manager.get_status(1))["status"] == "offline"
+    assert await manager.update_activity(99) is False
@@ -0,0 +1,156 @@
+"""
+Tests for batched conversation push fan-out (no database or providers).
+
+- Recipients/settings/devices come from one query
+- Presence is looked up once for all recipients; online users are skipped
+- Tokens are grouped per provider into transport batches with bounded
+  concurrency
+- Only delivered devices get last_used_at bumped
+"""
+
+from __future__ import annotations
+
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.messenger.presence import PresenceManager
+from app.messenger.push_notifications import (
+    FCMTransport,
+    PushNotificationService,
+    PushPayload,
+    PushProvider,
+    PushTransport,
+    StubPushTransport,
+)
+
+
+class FakeSession:
+    """Returns device rows for the first query and records the rest."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.statements: list = []
+        self.commit = AsyncMock()
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        result = MagicMock()
+        result.all.return_value = self.rows if len(self.statements) == 1 else []
+        return result
+
+
+def _presence(statuses: dict[int, str]):
+    presence = MagicMock()
+    presence.get_statuses = AsyncMock(
+        side_effect=lambda user_ids: {u: statuses.get(u) for u in user_ids}
+    )
+    return presence
+
+
+def _service(**transports) -> PushNotificationService:
+    return PushNotificationService(transports=transports, fanout_concurrency=2)
+
+
+PAYLOAD = PushPayload(title="Ann • Class 3A", body="hello", data={"type": "message.new"})
+
+
+@pytest.mark.asyncio
+async def test_fanout_batches_per_provider_and_skips_online_users():
+    fcm = StubPushTransport(max_batch_size=2, latency=0.01)
+    apns = StubPushTransport(max_batch_size=100, fail_tokens={"apns-4"})
+    service = _service(fcm=fcm, apns=apns)
+
+    rows = [
+        (2, 20, "fcm-2", "fcm"),
+        (3, 30, "fcm-3", "fcm"),
+        (3, 31, "apns-3", "apns"),
+        (4, 40, "apns-4", "apns"),
+        (5, 50, "fcm-5", "fcm"),
+        (6, 60, "fcm-6", "fcm"),
+        (7, 70, "fcm-7", "fcm"),
+    ]
+    db = FakeSession(rows)
+    presence = _presence({6: "online", 7: "away"})
+
+    stats = await service.send_message_fanout(
+        db, uuid.uuid4(), sender_id=1, payload=PAYLOAD, presence_manager=presence
+    )
+
+    presence.get_statuses.assert_awaited_once_with([2, 3, 4, 5, 6, 7])
+    assert stats["recipients"] == 5
+    assert stats["skipped_online"] == 1
+    assert stats["devices"] == 6
+    assert stats["batches"] == 3  # fcm: 2 tokens x 2, apns: 1
+    assert stats["success_count"] == 5
+
+    fcm_tokens = sorted(t for tokens, _ in fcm.batches for t in tokens)
+    assert fcm_tokens == ["fcm-2", "fcm-3", "fcm-5", "fcm-7"]
+    assert all(len(tokens) <= 2 for tokens, _ in fcm.batches)
+    assert fcm.max_in_flight <= 2
+
+    # device query + one last_used_at update, committed once
+    assert len(db.statements) == 2
+    update_sql = str(db.statements[1])
+    assert "UPDATE device_tokens SET last_used_at" in update_sql
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_fanout_without_devices_skips_presence():
+    service = _service(fcm=StubPushTransport())
+    presence = _presence({})
+
+    stats = await service.send_message_fanout(
+        FakeSession([]), uuid.uuid4(), 1, PAYLOAD, presence_manager=presence
+    )
+
+    assert stats["status"] == "no_devices"
+    presence.get_statuses.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_fcm_transport_maps_multicast_results():
+    service = PushNotificationService()
+    service.fcm_client = MagicMock()
+    service.fcm_client.notify_multiple_devices = MagicMock(
+        return_value={
+            "success": 1,
+            "failure": 1,
+            "results": [{"message_id": "1"}, {"error": "NotRegistered"}],
+        }
+    )
+
+    flags = await FCMTransport(service).send_batch(["a", "b"], PAYLOAD)
+
+    assert flags == [True, False]
+    kwargs = service.fcm_client.notify_multiple_devices.call_args.kwargs
+    assert kwargs["registration_ids"] == ["a", "b"]
+    assert kwargs["message_title"] == PAYLOAD.title
+    assert service.transports[PushProvider.FCM.value].max_batch_size == 500
+
+
+def test_transport_must_implement_send_batch():
+    class NoSend(PushTransport):
+        max_batch_size = 10
+
+    with pytest.raises(TypeError):
+        NoSend()
+    with pytest.raises(TypeError):
+        PushTransport()
+
+
+@pytest.mark.asyncio
+async def test_presence_get_statuses_uses_one_pipeline():
+    presence = PresenceManager.__new__(PresenceManager)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[b"online", None, b"away"])
+    presence.redis = MagicMock()
+    presence.redis.pipeline = MagicMock(return_value=pipe)
+
+    statuses = await presence.get_statuses([1, 2, 3])
+
+    assert statuses == {1: "online", 2: None, 3: "away"}
+    assert pipe.hget.call_count == 3
+    pipe.execute.assert_awaited_once()
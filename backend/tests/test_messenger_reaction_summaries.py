@@ -0,0 +1,157 @@
+"""
+Tests for bulk reaction summaries and the summary cache (no database).
+
+- Summaries for a page of messages come from one grouped query
+- Filled summaries (including empty ones) are cached per message
+- Cached messages only need the caller's own reactions
+- add/remove adjust cached counts incrementally after commit
+"""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.messenger.reactions as reactions_module
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+from app.messenger.reactions import (
+    MAX_BULK_MESSAGES,
+    ReactionSummaryCache,
+    ReactionsService,
+)
+
+CONV = uuid.uuid4()
+M1, M2, M3 = (uuid.UUID(int=i) for i in (1, 2, 3))
+
+
+class QueuedSession:
+    """Answers executed statements in order from prepared row lists."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.statements: list = []
+        self.commit = AsyncMock()
+        self.delete = AsyncMock()
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        answer = self.answers.pop(0)
+        result = MagicMock()
+        result.all.return_value = answer
+        result.scalar_one_or_none.return_value = answer
+        return result
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ReactionSummaryCache(
+        redis_client=fakeredis.aioredis.FakeRedis(decode_responses=True)
+    )
+    monkeypatch.setattr(reactions_module, "_summary_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_bulk_summaries_use_one_grouped_query_then_cache(cache):
+    grouped = [
+        SimpleNamespace(id=M1, emoji="thumbs_up", reactions=3, user_reacted=True),
+        SimpleNamespace(id=M1, emoji="fire", reactions=5, user_reacted=False),
+        SimpleNamespace(id=M2, emoji=None, reactions=0, user_reacted=None),
+    ]
+    db = QueuedSession(7, grouped)
+
+    summaries = await ReactionsService.get_reactions_for_messages(
+        db, CONV, [M1, M2, M3, M1], user_id=7
+    )
+
+    # M3 is not in the conversation
+    assert list(summaries) == [str(M1), str(M2)]
+    assert summaries[str(M1)]["total_reactions"] == 8
+    assert summaries[str(M1)]["reactions"] == [
+        {"emoji": "fire", "emoji_unicode": "🔥", "count": 5, "user_reacted": False},
+        {"emoji": "thumbs_up", "emoji_unicode": "👍", "count": 3, "user_reacted": True},
+    ]
+    assert summaries[str(M2)]["reactions"] == []
+
+    participant_sql, grouped_sql = (_sql(s) for s in db.statements)
+    assert "conversation_participants" in participant_sql
+    assert "LEFT OUTER JOIN message_reactions" in grouped_sql
+    assert "bool_or(message_reactions.user_id = " in grouped_sql
+    assert "GROUP BY messages.id, message_reactions.emoji" in grouped_sql
+
+    assert await cache.get_many([M1, M2, M3]) == {
+        M1: {"thumbs_up": 3, "fire": 5},
+        M2: {},
+    }
+
+
+@pytest.mark.asyncio
+async def test_cached_messages_only_read_own_reactions(cache):
+    await cache.set_many({M1: {"fire": 2, "heart": 1}, M2: {}})
+    own = [
+        SimpleNamespace(id=M1, emoji="heart"),
+        SimpleNamespace(id=M2, emoji=None),
+    ]
+    db = QueuedSession(7, own)
+
+    summaries = await ReactionsService.get_reactions_for_messages(
+        db, CONV, [M1, M2], user_id=7
+    )
+
+    assert summaries[str(M1)]["reactions"] == [
+        {"emoji": "fire", "emoji_unicode": "🔥", "count": 2, "user_reacted": False},
+        {"emoji": "heart", "emoji_unicode": "❤️", "count": 1, "user_reacted": True},
+    ]
+    assert summaries[str(M2)]["total_reactions"] == 0
+
+    own_sql = _sql(db.statements[1])
+    assert "count(" not in own_sql
+    assert "message_reactions.user_id = %(user_id_1)s" in own_sql
+
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_non_participant_and_oversized_pages(cache):
+    with pytest.raises(ValueError, match="not a participant"):
+        await ReactionsService.get_reactions_for_messages(
+            QueuedSession(None), CONV, [M1], user_id=7
+        )
+
+    too_many = [uuid.uuid4() for _ in range(MAX_BULK_MESSAGES + 1)]
+    with pytest.raises(ValueError, match="At most"):
+        await ReactionsService.get_reactions_for_messages(
+            QueuedSession(), CONV, too_many, user_id=7
+        )
+
+
+@pytest.mark.asyncio
+async def test_remove_and_toggle_adjust_cached_counts(monkeypatch):
+    script = AsyncMock(side_effect=[1, ConnectionError("down")])
+    redis = MagicMock()
+    redis.register_script = MagicMock(return_value=script)
+    redis.delete = AsyncMock()
+    cache = ReactionSummaryCache(redis_client=redis, ttl_seconds=60)
+    monkeypatch.setattr(reactions_module, "_summary_cache", cache)
+
+    reaction = SimpleNamespace(message_id=M1, user_id=7, emoji="fire")
+    db = QueuedSession(reaction)
+    assert await ReactionsService.remove_reaction(db, M1, 7, "fire") is True
+
+    db.commit.assert_awaited_once()
+    script.assert_awaited_once_with(
+        keys=[f"reactions:summary:{M1}"], args=["fire", -1, 60]
+    )
+
+    # A failed update drops the summary instead of leaving it stale
+    result = await ReactionsService.toggle_reaction(
+        QueuedSession(reaction), M1, 7, "fire"
+    )
+    assert result["action"] == "removed"
+    redis.delete.assert_awaited_once_with(f"reactions:summary:{M1}")
+    redis.register_script.assert_called_once()
@@ -0,0 +1,165 @@
+"""
+Tests for the write-coalescing read receipt aggregator (no database required).
+
+- record() buffers without touching the database
+- A flush resolves all buffered events in one query and writes the
+  coalesced marks with a fixed number of statements and one commit
+- One message.read event is broadcast per (user, conversation)
+- Failed flushes requeue their events, keeping at most max_pending
+"""
+
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+
+from app.messenger.read_receipts import ReadReceiptAggregator
+
+
+class FakeSession:
+    """Async-context session recording SQL; the first query returns marks."""
+
+    def __init__(self, resolved_rows: list, fail: bool = False):
+        self.resolved_rows = resolved_rows
+        self.fail = fail
+        self.statements: list[tuple[str, dict]] = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.statements.append((str(stmt), params or {}))
+        result = MagicMock()
+        result.all.return_value = self.resolved_rows if len(self.statements) == 1 else []
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def conversation_id():
+    return uuid.uuid4()
+
+
+@pytest_asyncio.fixture
+async def make_aggregator():
+    created = []
+
+    def factory(session, **kwargs):
+        pubsub = MagicMock()
+        pubsub.publish_message = AsyncMock(return_value=1)
+        aggregator = ReadReceiptAggregator(
+            session_factory=lambda: session,
+            pubsub=pubsub,
+            flush_interval=3600,
+            **kwargs,
+        )
+        created.append(aggregator)
+        return aggregator
+
+    yield factory
+
+    for aggregator in created:
+        await aggregator.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_to_high_water_mark(make_aggregator, conversation_id):
+    newest = uuid.uuid4()
+    read_through = datetime(2025, 11, 1, 12, 0, tzinfo=timezone.utc)
+    session = FakeSession(resolved_rows=[(1, conversation_id, newest, read_through)])
+    aggregator = make_aggregator(session)
+
+    for _ in range(3):
+        for message_id in (uuid.uuid4(), uuid.uuid4(), newest):
+            await aggregator.record(1, message_id)
+
+    assert session.statements == []  # nothing written before the flush
+
+    marks = await aggregator.flush()
+
+    resolve_sql, resolve_params = session.statements[0]
+    assert "DISTINCT ON (r.user_id, m.conversation_id)" in resolve_sql
+    assert len(resolve_params["message_ids"]) == 7  # duplicates collapsed on record
+
+    # resolve + receipts upsert + last_read_at + inbox, one commit
+    assert len(session.statements) == 4
+    assert "ON CONFLICT (message_id, user_id) DO NOTHING" in session.statements[1][0]
+    assert session.statements[2][1]["read_through"] == [read_through]
+    assert session.commits == 1
+
+    assert [(m.user_id, m.message_id) for m in marks] == [(1, newest)]
+    aggregator._pubsub.publish_message.assert_awaited_once()
+    payload = aggregator._pubsub.publish_message.await_args.kwargs["message_data"]
+    assert payload["type"] == "message.read"
+    assert payload["message_id"] == str(newest)
+    assert payload["read_through"] == read_through.isoformat()
+    assert aggregator.get_stats()["pending_events"] == 0
+
+
+@pytest.mark.asyncio
+async def test_invalid_events_are_dropped_without_writes(make_aggregator):
+    session = FakeSession(resolved_rows=[])
+    aggregator = make_aggregator(session)
+
+    await aggregator.record(5, uuid.uuid4())
+    marks = await aggregator.flush()
+
+    assert marks == []
+    assert len(session.statements) == 1
+    assert session.commits == 0
+    aggregator._pubsub.publish_message.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_events(make_aggregator):
+    session = FakeSession(resolved_rows=[], fail=True)
+    aggregator = make_aggregator(session)
+
+    await aggregator.record(1, uuid.uuid4())
+    await aggregator.record(2, uuid.uuid4())
+
+    assert await aggregator.flush() == []
+    assert aggregator.get_stats()["pending_events"] == 2
+
+
+@pytest.mark.asyncio
+async def test_requeue_drops_oldest_events_beyond_cap(make_aggregator):
+    old = [uuid.uuid4() for _ in range(3)]
+    new = [uuid.uuid4() for _ in range(2)]
+    new_arrivals = list(new)
+
+    class OutageSession(FakeSession):
+        async def execute(self, stmt, params=None):
+            while new_arrivals:  # arrive while the flush is failing
+                await aggregator.record(2, new_arrivals.pop(0))
+            raise RuntimeError("database unavailable")
+
+    aggregator = make_aggregator(OutageSession(resolved_rows=[]), max_pending=3)
+    for message_id in old:
+        await aggregator.record(1, message_id)
+
+    assert await aggregator.flush() == []
+
+    assert aggregator._pending == {1: {old[2]: None}, 2: dict.fromkeys(new)}
+    stats = aggregator.get_stats()
+    assert stats["pending_events"] == 3
+    assert stats["events_dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_empty_flush_is_noop(make_aggregator):
+    session = FakeSession(resolved_rows=[])
+    aggregator = make_aggregator(session)
+
+    assert await aggregator.flush() == []
+    assert session.statements == []
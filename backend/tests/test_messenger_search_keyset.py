@@ -0,0 +1,133 @@
+"""
+Tests for keyset-paginated message search (no database required).
+
+Statements are compiled for PostgreSQL and inspected:
+- Matching uses the stored content_tsv column, not to_tsvector(content)
+- The total count is capped with a LIMIT
+- Cursors seek on (rank, created_at, id) instead of OFFSET
+- Snippets are bounded in size
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models.parent_models  # noqa: F401  (User.children relationship target)
+from app.messenger.search import (
+    SEARCH_COUNT_CAP,
+    SNIPPET_CHARS,
+    SearchService,
+    SortOrder,
+    decode_search_cursor,
+    encode_search_cursor,
+)
+
+
+class FakeSession:
+    """Records compiled SQL; answers the count query, then the page query."""
+
+    def __init__(self, count: int, rows: list):
+        self.count = count
+        self.rows = rows
+        self.statements: list[str] = []
+
+    async def execute(self, stmt):
+        self.statements.append(
+            str(stmt.compile(dialect=postgresql.dialect()))
+        )
+        result = MagicMock()
+        result.scalar.return_value = self.count
+        result.all.return_value = self.rows
+        return result
+
+
+def _rows(n: int):
+    base = datetime(2025, 11, 1, 12, 0)
+    return [
+        SimpleNamespace(
+            Message=SimpleNamespace(
+                id=uuid.uuid4(),
+                conversation_id=uuid.uuid4(),
+                sender_id=1,
+                content=f"budget item {i}",
+                message_type="text",
+                file_url=None,
+                file_name=None,
+                created_at=base - timedelta(minutes=i),
+                edited_at=None,
+            ),
+            sender_username="alice",
+            conversation_title="Budget",
+            rank=0.5 - i * 0.01,
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_first_page_uses_stored_vector_and_capped_count():
+    db = FakeSession(count=SEARCH_COUNT_CAP + 1, rows=_rows(3))
+
+    result = await SearchService().search_messages(db, "budget", user_id=1, limit=2)
+
+    count_sql, page_sql = db.statements
+    assert "to_tsvector" not in count_sql + page_sql
+    assert "messages.content_tsv @@ plainto_tsquery" in page_sql
+    assert "LIMIT" in count_sql
+    assert "OFFSET" not in page_sql
+
+    assert result["total_count"] == SEARCH_COUNT_CAP
+    assert result["total_count_capped"] is True
+    assert result["has_more"] is True
+    assert len(result["results"]) == 2
+    assert result["next_cursor"]
+
+
+@pytest.mark.asyncio
+async def test_next_page_seeks_past_cursor():
+    rows = _rows(2)
+    db = FakeSession(count=2, rows=rows)
+    cursor = encode_search_cursor(
+        SortOrder.RELEVANCE, 0.5, rows[0].Message.created_at, rows[0].Message.id
+    )
+
+    result = await SearchService().search_messages(
+        db, "budget", user_id=1, limit=5, cursor=cursor
+    )
+
+    page_sql = db.statements[-1]
+    assert "(ts_rank(messages.content_tsv" in page_sql
+    assert "messages.created_at, messages.id) <" in page_sql
+    assert result["has_more"] is False
+    assert result["next_cursor"] is None
+
+
+def test_cursor_roundtrip_and_validation():
+    message_id = uuid.uuid4()
+    created = datetime(2025, 11, 1, 8, 30)
+    cursor = encode_search_cursor(SortOrder.DATE_DESC, None, created, message_id)
+
+    decoded = decode_search_cursor(cursor, SortOrder.DATE_DESC)
+    assert decoded["created_at"] == created
+    assert decoded["id"] == message_id
+
+    with pytest.raises(ValueError):
+        decode_search_cursor(cursor, SortOrder.RELEVANCE)
+    with pytest.raises(ValueError):
+        decode_search_cursor("not-a-cursor", SortOrder.DATE_DESC)
+
+
+def test_snippet_is_bounded_and_centered_on_match():
+    service = SearchService()
+    pattern = service._terms_pattern("budget")
+    text = "x" * 5000 + " budget " + "y" * 5000
+
+    snippet = service._build_snippet(text, pattern)
+
+    assert "<mark>budget</mark>" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert len(snippet.replace("<mark>", "").replace("</mark>", "")) <= SNIPPET_CHARS + 2
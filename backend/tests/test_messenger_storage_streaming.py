@@ -0,0 +1,283 @@
+"""
+Tests for streaming, content-addressed uploads in FileStorage.
+
+- Uploads are read in chunks (sync or async readers) and hashed on the way
+- Identical content is stored once; re-uploads skip scan and thumbnail
+  unless the stored blob lacks a clean scan marker or a thumbnail
+- Oversized uploads stop reading as soon as the limit is crossed
+- Scanning/thumbnails run on the configured executor
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from app.messenger.storage import (
+    MAX_IMAGE_SIZE,
+    FileSizeError,
+    FileStorage,
+    StorageBackend,
+    VirusScanError,
+    compute_file_hash,
+)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileStorage(
+        backend=StorageBackend.LOCAL,
+        local_path=str(tmp_path / "uploads"),
+        chunk_size=1024,
+    )
+
+
+@pytest.fixture
+def sample_image():
+    img = Image.new("RGB", (800, 600), color="blue")
+    output = io.BytesIO()
+    img.save(output, format="JPEG")
+    return output.getvalue()
+
+
+class CountingReader(io.BytesIO):
+    """BytesIO recording the size of every read."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads: list[int] = []
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+class AsyncReader:
+    """Minimal UploadFile-like object with an async read()."""
+
+    def __init__(self, data: bytes):
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+def _local(storage: FileStorage, url: str) -> Path:
+    return storage.local_path / url.split("/uploads/", 1)[1]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_reuses_blob_and_skips_processing(
+    storage, sample_image
+):
+    with patch(
+        "app.messenger.storage.scan_file_for_virus", return_value=True
+    ) as scan, patch(
+        "app.messenger.storage.generate_thumbnail_from_file",
+        return_value=b"thumb",
+    ) as thumb:
+        first = await storage.upload_file(
+            CountingReader(sample_image), "worksheet.jpg", user_id=1
+        )
+        second = await storage.upload_file(
+            AsyncReader(sample_image), "copy.jpg", user_id=2
+        )
+
+    digest = compute_file_hash(sample_image)
+    assert first["file_hash"] == second["file_hash"] == first["file_id"] == digest
+    assert first["deduplicated"] is False
+    assert second["deduplicated"] is True
+    assert second["file_url"] == first["file_url"]
+    assert second["thumbnail_url"] == first["thumbnail_url"]
+    assert second["file_name"] == "copy.jpg"
+    assert second["uploaded_by"] == 2
+
+    scan.assert_called_once()
+    thumb.assert_called_once()
+
+    blob = _local(storage, first["file_url"])
+    assert blob.read_bytes() == sample_image
+    assert blob.relative_to(storage.local_path).parts[:2] == ("blobs", digest[:2])
+    assert list((storage.local_path / "tmp").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_duplicate_of_unscanned_blob_is_scanned_and_thumbnailed(
+    storage, sample_image
+):
+    first = await storage.upload_file(
+        io.BytesIO(sample_image),
+        "worksheet.jpg",
+        user_id=1,
+        scan_virus=False,
+        generate_thumb=False,
+    )
+    digest = first["file_hash"]
+    marker = storage.local_path / "scans" / f"{digest}.clean"
+    assert first["thumbnail_url"] is None
+    assert not marker.exists()
+
+    with patch(
+        "app.messenger.storage.scan_file_for_virus",
+        side_effect=VirusScanError("Virus detected in uploaded file"),
+    ):
+        with pytest.raises(VirusScanError):
+            await storage.upload_file(io.BytesIO(sample_image), "copy.jpg", user_id=2)
+    assert not marker.exists()
+
+    with patch(
+        "app.messenger.storage.scan_file_for_virus", return_value=True
+    ) as scan:
+        second = await storage.upload_file(
+            io.BytesIO(sample_image), "copy.jpg", user_id=2
+        )
+        third = await storage.upload_file(
+            io.BytesIO(sample_image), "again.jpg", user_id=3
+        )
+
+    assert second["deduplicated"] is third["deduplicated"] is True
+    scan.assert_called_once()
+    assert marker.exists()
+    assert third["thumbnail_url"] == second["thumbnail_url"]
+    assert Image.open(_local(storage, second["thumbnail_url"])).width <= 300
+
+
+@pytest.mark.asyncio
+async def test_upload_is_read_in_chunks(storage):
+    data = b"x" * 5000
+    reader = CountingReader(data)
+
+    result = await storage.upload_file(
+        reader, "notes.txt", user_id=1, scan_virus=False
+    )
+
+    assert max(reader.reads) == 1024
+    assert result["file_size"] == 5000
+    assert _local(storage, result["file_url"]).read_bytes() == data
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_stops_reading_early(storage):
+    reader = CountingReader(b"x" * (MAX_IMAGE_SIZE + 10 * 1024 * 1024))
+
+    with pytest.raises(FileSizeError):
+        await storage.upload_file(reader, "huge.png", user_id=1, scan_virus=False)
+
+    assert sum(reader.reads) <= MAX_IMAGE_SIZE + 1024
+    assert list((storage.local_path / "tmp").iterdir()) == []
+    assert not (storage.local_path / "blobs").exists()
+
+
+@pytest.mark.asyncio
+async def test_processing_runs_on_configured_executor(tmp_path, sample_image):
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit = MagicMock(wraps=executor.submit)
+    storage = FileStorage(local_path=str(tmp_path / "uploads"), executor=executor)
+
+    try:
+        with patch("app.messenger.storage.scan_file_for_virus", return_value=True):
+            result = await storage.upload_file(
+                io.BytesIO(sample_image), "photo.jpg", user_id=1
+            )
+    finally:
+        executor.shutdown()
+
+    # scan + thumbnail
+    assert executor.submit.call_count == 2
+    thumb = _local(storage, result["thumbnail_url"])
+    assert Image.open(thumb).width <= 300
+
+
+@pytest.mark.asyncio
+async def test_delete_blob_removes_thumbnail_and_rejects_escape(
+    storage, sample_image
+):
+    with patch("app.messenger.storage.scan_file_for_virus", return_value=True):
+        result = await storage.upload_file(
+            io.BytesIO(sample_image), "photo.jpg", user_id=1
+        )
+
+    outside = storage.local_path.parent / "secret.txt"
+    outside.write_text("keep")
+    assert await storage.delete_file("/uploads/../secret.txt") is False
+    assert outside.exists()
+
+    assert await storage.delete_file(result["file_url"]) is True
+    assert not _local(storage, result["file_url"]).exists()
+    assert not _local(storage, result["thumbnail_url"]).exists()
+    assert not (storage.local_path / "scans" / f"{result['file_hash']}.clean").exists()
+
+
+class FileDeleteSession:
+    """Answers delete_file's lookups from in-memory messages."""
+
+    def __init__(self, messages, user_id):
+        self.messages = messages
+        self.user_id = user_id
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        sql = str(stmt)
+        live = [m for m in self.messages if m.deleted_at is None]
+        result = MagicMock()
+        if "count(" in sql:
+            current = next(m for m in live if m.sender_id == self.user_id)
+            result.scalar.return_value = sum(
+                m.file_url == current.file_url and m is not current for m in live
+            )
+        elif "FROM conversation_participants" in sql and "messages" not in sql:
+            result.scalar_one_or_none.return_value = MagicMock(role="member")
+        else:
+            own = [m for m in live if m.sender_id == self.user_id]
+            result.scalars.return_value.first.return_value = own[0] if own else None
+        return result
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_delete_shared_blob_keeps_file_until_last_reference(monkeypatch):
+    import app.models.parent_models  # noqa: F401  (User mapper relationships)
+    from types import SimpleNamespace
+
+    from app.routers import messenger as messenger_router
+    from app.messenger import storage as storage_module
+
+    file_url = "/uploads/blobs/ab/abc123.jpg"
+    messages = [
+        SimpleNamespace(
+            id=i, sender_id=i, conversation_id=1, file_url=file_url, deleted_at=None
+        )
+        for i in (1, 2)
+    ]
+    # A soft-deleted earlier copy of the same blob
+    messages.append(
+        SimpleNamespace(
+            id=3, sender_id=1, conversation_id=1, file_url=file_url, deleted_at="x"
+        )
+    )
+    fake_storage = MagicMock()
+    fake_storage.delete_file = AsyncMock(return_value=True)
+    monkeypatch.setattr(storage_module, "get_file_storage", lambda: fake_storage)
+
+    db = FileDeleteSession(messages, user_id=1)
+    assert await messenger_router.delete_file(
+        "abc123", user=SimpleNamespace(id=1), db=db
+    ) == {"deleted": True}
+    lookup = str(db.statements[0])
+    assert "messages.deleted_at IS NULL" in lookup
+    assert "JOIN conversation_participants" in lookup
+    # User 2's message still references the blob
+    fake_storage.delete_file.assert_not_awaited()
+
+    db = FileDeleteSession(messages, user_id=2)
+    assert await messenger_router.delete_file(
+        "abc123", user=SimpleNamespace(id=2), db=db
+    ) == {"deleted": True}
+    fake_storage.delete_file.assert_awaited_once_with(file_url)
@@ -101,6 +101,8 @@ async def test_create_reply_success(
         AsyncMock(scalar_one_or_none=lambda: sample_parent_message),
         # Participant lookup
         AsyncMock(scalar_one_or_none=lambda: sample_participant),
+        # Inbox upsert
+        MagicMock(),
     ]
 
     service = ThreadingService()
@@ -160,6 +162,8 @@ async def test_create_reply_nested(
         AsyncMock(scalar_one_or_none=lambda: sample_participant),
         # Root message lookup
         AsyncMock(scalar_one_or_none=lambda: sample_parent_message),
+        # Inbox upsert
+        MagicMock(),
     ]
 
     service = ThreadingService()
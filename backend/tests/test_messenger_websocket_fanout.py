@@ -0,0 +1,172 @@
+"""
+Tests for WebSocketConnectionManager fan-out
+
+Uses fake sockets (no HTTP server):
+- Conversation reverse index kept in sync by subscribe/unsubscribe/disconnect
+- Broadcast encodes once and skips the excluded sender
+- Slow consumers (full queue or stalled send) are evicted without
+  delaying other sockets
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+
+from app.messenger.websocket import WebSocketConnectionManager
+
+
+class FakeWebSocket:
+    """Records frames; optionally blocks on send to simulate a slow client."""
+
+    def __init__(self, stall: bool = False, stall_close: bool = False):
+        self.frames: list[str] = []
+        self.stall = stall
+        self.stall_close = stall_close
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.frames.append(frame)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        if self.stall_close:
+            await asyncio.sleep(3600)
+
+    def messages(self) -> list[dict]:
+        return [json.loads(f) for f in self.frames]
+
+
+@pytest_asyncio.fixture
+async def ws_manager():
+    with patch("app.messenger.websocket.get_pubsub"), patch(
+        "app.messenger.websocket.get_presence_manager"
+    ):
+        mgr = WebSocketConnectionManager(max_queue=4, send_timeout=0.05)
+    mgr.pubsub = MagicMock(publish_online_status=AsyncMock())
+    mgr.presence = MagicMock(
+        set_online=AsyncMock(),
+        set_offline=AsyncMock(),
+        update_activity=AsyncMock(),
+        get_status=AsyncMock(return_value={"status": "online"}),
+    )
+    yield mgr
+
+    # Stop remaining writer tasks before the loop closes
+    for ws, sender in list(mgr.senders.items()):
+        await mgr.disconnect(ws, sender.user_id)
+    await _drain()
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_index_follows_subscriptions(ws_manager):
+    conv = uuid4()
+    web, mobile = FakeWebSocket(), FakeWebSocket()
+
+    await ws_manager.connect(web, 1)
+    await ws_manager.subscribe_to_conversation(1, conv)
+    await ws_manager.connect(mobile, 1)  # new device inherits subscriptions
+    assert ws_manager.conversation_sockets[conv] == {web, mobile}
+
+    await ws_manager.disconnect(web, 1)
+    assert ws_manager.conversation_sockets[conv] == {mobile}
+
+    await ws_manager.unsubscribe_from_conversation(1, conv)
+    assert conv not in ws_manager.conversation_sockets
+    await ws_manager.disconnect(mobile, 1)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_only_members_except_sender(ws_manager):
+    conv = uuid4()
+    sockets = {uid: FakeWebSocket() for uid in range(1, 5)}
+    for uid, ws in sockets.items():
+        await ws_manager.connect(ws, uid)
+        if uid != 4:
+            await ws_manager.subscribe_to_conversation(uid, conv)
+    await _drain()
+
+    with patch(
+        "app.messenger.websocket.encode_message", wraps=json.dumps
+    ) as encode:
+        await ws_manager.broadcast_to_conversation(
+            conv, {"type": "message", "content": "hi"}, exclude_user=1
+        )
+    await _drain()
+
+    assert encode.call_count == 1
+    received = {uid for uid, ws in sockets.items() if ws.messages()[-1]["type"] == "message"}
+    assert received == {2, 3}
+
+
+@pytest.mark.asyncio
+async def test_slow_consumers_are_evicted(ws_manager):
+    conv = uuid4()
+    fast, stalled = FakeWebSocket(), FakeWebSocket(stall=True)
+    await ws_manager.connect(fast, 1)
+    await ws_manager.connect(stalled, 2)
+    for uid in (1, 2):
+        await ws_manager.subscribe_to_conversation(uid, conv)
+
+    # The stalled socket's writer is blocked; its queue fills and it is evicted
+    for i in range(6):
+        await ws_manager.broadcast_to_conversation(conv, {"type": "message", "n": i})
+        await _drain()
+
+    assert stalled.closed_with == 1013
+    assert ws_manager.conversation_sockets[conv] == {fast}
+    assert not ws_manager.is_user_online(2)
+    assert [m["n"] for m in fast.messages() if m["type"] == "message"] == list(range(6))
+    assert (await ws_manager.get_stats())["evicted_connections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stuck_close_does_not_delay_broadcast(ws_manager):
+    conv = uuid4()
+    fast = FakeWebSocket()
+    stuck = FakeWebSocket(stall=True, stall_close=True)
+    ws_manager.send_timeout = 3600
+    await ws_manager.connect(fast, 1)
+    await ws_manager.connect(stuck, 2)
+    for uid in (1, 2):
+        await ws_manager.subscribe_to_conversation(uid, conv)
+    await _drain()
+
+    for i in range(6):
+        await asyncio.wait_for(
+            ws_manager.broadcast_to_conversation(conv, {"type": "message", "n": i}),
+            timeout=1,
+        )
+    await _drain()
+
+    assert stuck.closed_with == 1013  # close started, still pending
+    assert ws_manager.conversation_sockets[conv] == {fast}
+    assert len(ws_manager._evictions) == 1
+    for task in list(ws_manager._evictions):
+        task.cancel()
+    await _drain()
+    assert not ws_manager._evictions
+
+
+@pytest.mark.asyncio
+async def test_stalled_send_times_out(ws_manager):
+    stalled = FakeWebSocket(stall=True)
+    await ws_manager.connect(stalled, 7)
+
+    await asyncio.sleep(0.2)
+
+    assert stalled.closed_with == 1013
+    assert not ws_manager.is_user_online(7)
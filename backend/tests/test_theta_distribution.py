@@ -0,0 +1,158 @@
+"""
+Test suite for the per-subject theta distribution snapshot
+
+Checks that binary-search percentiles match the count-based definition,
+that incremental inserts are visible before and after merging, and that
+compute_empirical_percentile loads the snapshot once instead of counting
+per call.
+"""
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.models.parent_models  # noqa: F401  (User mapper relationships)
+import app.services.theta_distribution as theta_distribution
+from app.services.ability_analytics import compute_empirical_percentile
+from app.services.theta_distribution import (
+    MERGE_THRESHOLD,
+    ThetaDistributionSnapshot,
+    get_theta_distribution,
+    invalidate_theta_distribution,
+    record_ability,
+)
+
+
+# ============================================================================
+# Fixtures
+# ============================================================================
+
+@pytest.fixture
+def rows():
+    """Theta rows for two subjects, with ties and a subject-less row"""
+    rng = random.Random(11)
+    data = [("math", round(rng.gauss(0.0, 1.0), 2)) for _ in range(400)]
+    data += [("english", round(rng.gauss(0.5, 0.8), 2)) for _ in range(150)]
+    data.append((None, 0.0))
+    return data
+
+
+@pytest.fixture
+def db(rows):
+    """Async session answering the version query and the theta query"""
+    session = MagicMock()
+    session.version = (len(rows), None)
+
+    async def execute(stmt):
+        result = MagicMock()
+        if "count(" in str(stmt).lower():
+            result.one.return_value = session.version
+        else:
+            result.all.return_value = rows
+        return result
+
+    session.execute = AsyncMock(side_effect=execute)
+    return session
+
+
+@pytest.fixture(autouse=True)
+def reset_snapshot():
+    invalidate_theta_distribution()
+    yield
+    invalidate_theta_distribution()
+
+
+def count_percentile(rows, subject, theta):
+    """Reference: the original count(theta < x) / count(*) definition"""
+    thetas = [t for s, t in rows if s == subject]
+    if not thetas:
+        return 0
+    return max(0, min(100, int(round(sum(t < theta for t in thetas) / len(thetas) * 100))))
+
+
+# ============================================================================
+# Snapshot
+# ============================================================================
+
+def test_percentile_matches_count_definition(rows):
+    snapshot = ThetaDistributionSnapshot.from_rows(rows)
+
+    assert snapshot.subjects() == ["english", "math"]
+    assert snapshot.count("math") == 400
+    for subject in ("math", "english", "science"):
+        for theta in (-3.0, -0.5, 0.0, 0.01, 0.37, 1.2, 4.0):
+            assert snapshot.percentile(subject, theta) == count_percentile(
+                rows, subject, theta
+            )
+    # Exact ties count as "not below"
+    tied = next(t for s, t in rows if s == "math")
+    assert snapshot.percentile("math", tied) == count_percentile(rows, "math", tied)
+
+
+def test_incremental_adds_before_and_after_merge(rows):
+    snapshot = ThetaDistributionSnapshot.from_rows(rows)
+    added = list(rows)
+
+    rng = random.Random(3)
+    for i in range(MERGE_THRESHOLD + 10):
+        theta = round(rng.uniform(-2.0, 2.0), 2)
+        snapshot.add("math", theta)
+        added.append(("math", theta))
+        if i in (5, MERGE_THRESHOLD + 5):
+            assert snapshot.percentile("math", 0.2) == count_percentile(
+                added, "math", 0.2
+            )
+
+    snapshot.add("science", 1.0)
+    snapshot.add(None, 1.0)
+    assert snapshot.count("math") == 400 + MERGE_THRESHOLD + 10
+    assert snapshot.percentile("science", 1.5) == 100
+    assert snapshot.percentile("science", 1.0) == 0
+
+
+# ============================================================================
+# Process-wide snapshot
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_empirical_percentile_loads_snapshot_once(db, rows):
+    for theta in (-1.0, 0.0, 0.5, 1.0):
+        for subject in ("math", "english"):
+            assert await compute_empirical_percentile(
+                db, subject=subject, theta=theta
+            ) == count_percentile(rows, subject, theta)
+
+    assert db.execute.await_count == 2  # version stamp + thetas
+    sql = str(db.execute.await_args.args[0])
+    assert "count(" not in sql.lower()
+
+    # Abilities written in this process are visible without a reload
+    record_ability("math", -5.0)
+    assert await compute_empirical_percentile(db, "math", -4.0) == 0
+    assert (await get_theta_distribution(db)).count("math") == 401
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reloads_on_refresh_and_when_version_changes(db):
+    first = await get_theta_distribution(db)
+    assert await get_theta_distribution(db) is first
+
+    refreshed = await get_theta_distribution(db, refresh=True)
+    assert refreshed is not first
+    assert db.execute.await_count == 4
+
+    # Stale but unchanged: one version query, same snapshot
+    refreshed.loaded_at -= 1000
+    assert await get_theta_distribution(db, max_age_seconds=60) is refreshed
+    assert db.execute.await_count == 5
+    assert refreshed.age_seconds() < 60
+
+    # Calibration import in another process changes the stamp
+    db.version = (db.version[0] + 10, "2025-11-10T00:00:00")
+    refreshed.loaded_at -= 1000
+    reloaded = await get_theta_distribution(db, max_age_seconds=60)
+    assert reloaded is not refreshed
+    assert reloaded.version == db.version
+    assert db.execute.await_count == 8
+    assert theta_distribution._snapshot is reloaded
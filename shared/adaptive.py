@@ -43,6 +43,8 @@ else:
 
 irf_3pl = _irt_module.irf_3pl
 item_information_3pl = _irt_module.item_information_3pl
+mle_theta_fisher = _irt_module.mle_theta_fisher
+eap_theta = _irt_module.eap_theta
 
 try:  # noqa: E402 - after import of irt
     item_information_batch_np = _irt_module.item_information_batch_np  # type: ignore
@@ -303,9 +305,9 @@ def run_adaptive_session(
     - Uses deterministic pseudo responses: y = 1 if P >= 0.5 else 0.
     - Re-estimates θ after each item using MLE or EAP.
     Returns (estimated_theta, administered_ids)
-    """
-    from .irt import eap_theta, irf_3pl, mle_theta_fisher  # type: ignore
 
+    For many examinees at once see shared.adaptive_batch.simulate_batch.
+    """
     theta = 0.0
     used_ids: List = []
     asked: List[dict] = []
@@ -0,0 +1,421 @@
+"""Batch CAT simulation for calibration replay.
+
+Advances many simulated examinees through the same adaptive loop as
+shared.adaptive.run_adaptive_session, in lockstep and with NumPy:
+
+- a theta vector (one estimate per examinee)
+- an item-information matrix (examinees x items) per step
+- a masked argmax per row for maximum-information selection
+- vectorized Fisher-scoring MLE or incremental grid EAP updates
+
+With deterministic responses (the default, y = 1 if P >= 0.5) each row
+follows exactly the path of run_adaptive_session for the same true theta.
+Large runs can be sharded across a process pool.
+
+The result reports per-item exposure, bias/RMSE (overall and conditional
+on true theta) and test length, e.g. to vet a bank before release.
+
+Usage:
+    import numpy as np
+    from shared.adaptive_batch import simulate_batch
+
+    true_thetas = np.random.default_rng(0).normal(size=100_000)
+    result = simulate_batch(pool, true_thetas, max_items=20,
+                            sem_threshold=0.3, n_workers=8)
+    print(result.summary())
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .adaptive import KeyMap
+
+_EPS = 1e-12
+
+# Cap on examinees x items cells evaluated at once (memory bound per step)
+_BLOCK_CELLS = 1 << 22
+
+# MLE settings (match shared.irt.mle_theta_fisher defaults)
+_MLE_MAX_ITER = 25
+_MLE_TOL = 1e-4
+
+# EAP grid (matches shared.irt.eap_theta defaults)
+_EAP_GRID = np.linspace(-4.0, 4.0, 81)
+
+_THETA_BOUND = 4.0
+
+
+# ----------------------------
+# Vectorized 3PL
+# ----------------------------
+
+
+def _irf(theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """3PL probability with broadcasting (stable sigmoid, c clipped at 0)."""
+    z = a * (theta - b)
+    e = np.exp(-np.abs(z))
+    s = np.where(z >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+    c = np.maximum(c, 0.0)
+    return c + (1.0 - c) * s
+
+
+def _selection_info(
+    theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray
+) -> np.ndarray:
+    """Information as scored by choose_next_item (item_information_np)."""
+    P = _irf(theta, a, b, c)
+    P_clip = np.clip(P, _EPS, 1.0 - _EPS)
+    return (a * a) * ((1.0 - P) / P_clip) * (((P - c) / np.maximum(1.0 - c, 1e-12)) ** 2)
+
+
+def _fisher_info(
+    P: np.ndarray, a: np.ndarray, c: np.ndarray
+) -> np.ndarray:
+    """Information as item_information_3pl: zero at the P edges."""
+    valid = (P > _EPS) & (P < 1.0 - _EPS) & (np.abs(1.0 - c) >= 1e-9)
+    P_safe = np.where(valid, P, 0.5)
+    info = (a * a) * ((1.0 - P_safe) / P_safe) * (((P_safe - c) / np.where(valid, 1.0 - c, 1.0)) ** 2)
+    return np.where(valid, info, 0.0)
+
+
+# ----------------------------
+# Lockstep estimators
+# ----------------------------
+
+
+def _mle_update(
+    theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray, y: np.ndarray
+) -> np.ndarray:
+    """Row-wise Fisher scoring, as shared.irt.mle_theta_fisher.
+
+    theta: (R,) starting values; a, b, c, y: (R, k) administered items.
+    """
+    theta = theta.copy()
+    running = np.ones(len(theta), dtype=bool)
+    for _ in range(_MLE_MAX_ITER):
+        rows = np.flatnonzero(running)
+        if rows.size == 0:
+            break
+        t = theta[rows, None]
+        ar, br, cr = a[rows], b[rows], c[rows]
+        P = _irf(t, ar, br, cr)
+        valid = (P > _EPS) & (P < 1.0 - _EPS)
+        P_safe = np.where(valid, P, 0.5)
+        dP = ar * (P_safe - cr) * (1.0 - P_safe) / np.maximum(1.0 - cr, 1e-12)
+        g = np.where(valid, (y[rows] - P_safe) * (dP / (P_safe * (1.0 - P_safe))), 0.0).sum(axis=1)
+        i_tot = np.where(valid, _fisher_info(P, ar, cr), 0.0).sum(axis=1)
+
+        stalled = i_tot <= _EPS
+        step = np.where(stalled, 0.0, g / np.where(stalled, 1.0, i_tot))
+        theta[rows] += step
+        running[rows[stalled | (np.abs(step) < _MLE_TOL)]] = False
+    return theta
+
+
+def _eap_loglik(
+    a: np.ndarray, b: np.ndarray, c: np.ndarray, y: np.ndarray
+) -> np.ndarray:
+    """Log-likelihood of one response per row on the EAP grid, shape (R, grid)."""
+    P = _irf(_EAP_GRID[None, :], a[:, None], b[:, None], c[:, None])
+    P = np.clip(P, _EPS, 1.0 - _EPS)
+    return np.where(y[:, None] == 1, np.log(P), np.log(1.0 - P))
+
+
+def _eap_estimate(log_post: np.ndarray) -> np.ndarray:
+    """Posterior mean per row from unnormalized log posteriors."""
+    w = np.exp(log_post - log_post.max(axis=1, keepdims=True))
+    return (w @ _EAP_GRID) / w.sum(axis=1)
+
+
+# ----------------------------
+# Results
+# ----------------------------
+
+
+@dataclass
+class BatchSimulationResult:
+    """Outcome of a batch CAT simulation.
+
+    Attributes:
+        item_ids: Item IDs in pool order
+        true_theta: Generating abilities, shape (N,)
+        theta_hat: Final estimates, shape (N,)
+        sem: Final SEM from administered items, shape (N,)
+        test_length: Items administered per examinee, shape (N,)
+        administered: Pool positions per step, shape (N, max_items), -1 padded
+    """
+
+    item_ids: List[Any]
+    true_theta: np.ndarray
+    theta_hat: np.ndarray
+    sem: np.ndarray
+    test_length: np.ndarray
+    administered: np.ndarray
+
+    @classmethod
+    def concat(cls, parts: Sequence["BatchSimulationResult"]) -> "BatchSimulationResult":
+        """Join shard results (all over the same pool)."""
+        width = max(p.administered.shape[1] for p in parts)
+        return cls(
+            item_ids=parts[0].item_ids,
+            true_theta=np.concatenate([p.true_theta for p in parts]),
+            theta_hat=np.concatenate([p.theta_hat for p in parts]),
+            sem=np.concatenate([p.sem for p in parts]),
+            test_length=np.concatenate([p.test_length for p in parts]),
+            administered=np.concatenate(
+                [
+                    np.pad(
+                        p.administered,
+                        ((0, 0), (0, width - p.administered.shape[1])),
+                        constant_values=-1,
+                    )
+                    for p in parts
+                ]
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.true_theta)
+
+    def administered_ids(self, row: int) -> List[Any]:
+        """Item IDs given to one examinee, in order."""
+        return [self.item_ids[i] for i in self.administered[row] if i >= 0]
+
+    @property
+    def exposure(self) -> np.ndarray:
+        """Per-item exposure rate (share of examinees who saw the item)."""
+        given = self.administered[self.administered >= 0]
+        counts = np.bincount(given, minlength=len(self.item_ids))
+        return counts / max(len(self), 1)
+
+    @property
+    def bias(self) -> float:
+        return float(np.mean(self.theta_hat - self.true_theta))
+
+    @property
+    def rmse(self) -> float:
+        return float(np.sqrt(np.mean((self.theta_hat - self.true_theta) ** 2)))
+
+    def conditional_bias(
+        self, bins: Optional[Sequence[float]] = None
+    ) -> List[Dict[str, float]]:
+        """Bias, RMSE and mean test length by true-theta bin.
+
+        Args:
+            bins: Bin edges (default: -3..3 in steps of 0.5, open-ended ends)
+
+        Returns:
+            List of {"lo", "hi", "n", "bias", "rmse", "mean_length"}; empty bins omitted
+        """
+        edges = np.asarray(
+            bins if bins is not None else np.arange(-3.0, 3.01, 0.5), dtype=float
+        )
+        edges = np.concatenate([[-np.inf], edges, [np.inf]])
+        which = np.searchsorted(edges, self.true_theta, side="right") - 1
+        err = self.theta_hat - self.true_theta
+
+        rows: List[Dict[str, float]] = []
+        for k in range(len(edges) - 1):
+            sel = which == k
+            n = int(sel.sum())
+            if n == 0:
+                continue
+            rows.append(
+                {
+                    "lo": float(edges[k]),
+                    "hi": float(edges[k + 1]),
+                    "n": n,
+                    "bias": float(err[sel].mean()),
+                    "rmse": float(np.sqrt((err[sel] ** 2).mean())),
+                    "mean_length": float(self.test_length[sel].mean()),
+                }
+            )
+        return rows
+
+    def summary(self, top_exposed: int = 10) -> Dict[str, Any]:
+        """Headline numbers for a simulation run."""
+        exposure = self.exposure
+        top = np.argsort(-exposure, kind="stable")[:top_exposed]
+        return {
+            "n_examinees": len(self),
+            "bias": self.bias,
+            "rmse": self.rmse,
+            "mean_test_length": float(self.test_length.mean()) if len(self) else 0.0,
+            "max_exposure": float(exposure.max()) if exposure.size else 0.0,
+            "unused_items": int((exposure == 0).sum()),
+            "top_exposed": [
+                {"id": self.item_ids[i], "exposure": float(exposure[i])} for i in top
+            ],
+            "conditional": self.conditional_bias(),
+        }
+
+
+# ----------------------------
+# Simulation
+# ----------------------------
+
+
+def _simulate_shard(
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    true_theta: np.ndarray,
+    max_items: int,
+    sem_threshold: Optional[float],
+    estimator: str,
+    seed: Optional[np.random.SeedSequence],
+) -> Dict[str, np.ndarray]:
+    """Run one shard of examinees to completion (process-pool entry point)."""
+    n, n_items = len(true_theta), len(a)
+    steps = min(max_items, n_items)
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    theta = np.zeros(n)
+    used = np.zeros((n, n_items), dtype=bool)
+    administered = np.full((n, steps), -1, dtype=np.int32)
+    y_hist = np.zeros((n, steps))
+    length = np.zeros(n, dtype=np.int32)
+    sem = np.full(n, np.inf)
+    log_post = (
+        np.tile(-0.5 * _EAP_GRID**2, (n, 1)) if estimator == "eap" else None
+    )
+    active = np.arange(n)
+    block = max(1, _BLOCK_CELLS // max(n_items, 1))
+
+    for k in range(steps):
+        if active.size == 0:
+            break
+
+        # Masked argmax of information per row
+        picks = np.empty(active.size, dtype=np.int64)
+        for start in range(0, active.size, block):
+            rows = active[start : start + block]
+            info = _selection_info(theta[rows, None], a, b, c)
+            info[used[rows]] = -np.inf
+            picks[start : start + block] = info.argmax(axis=1)
+
+        used[active, picks] = True
+        administered[active, k] = picks
+        length[active] = k + 1
+
+        # Responses
+        p_true = _irf(true_theta[active], a[picks], b[picks], c[picks])
+        if rng is None:
+            y = (p_true >= 0.5).astype(float)
+        else:
+            y = (rng.random(active.size) < p_true).astype(float)
+        y_hist[active, k] = y
+
+        # Ability update on the k + 1 administered items
+        given = administered[active, : k + 1]
+        ag, bg, cg = a[given], b[given], c[given]
+        if log_post is not None:
+            log_post[active] += _eap_loglik(a[picks], b[picks], c[picks], y)
+            new_theta = _eap_estimate(log_post[active])
+        else:
+            new_theta = _mle_update(theta[active], ag, bg, cg, y_hist[active, : k + 1])
+        new_theta = np.clip(new_theta, -_THETA_BOUND, _THETA_BOUND)
+        theta[active] = new_theta
+
+        # SEM stopping rule
+        i_tot = _fisher_info(_irf(new_theta[:, None], ag, bg, cg), ag, cg).sum(axis=1)
+        sem_rows = np.where(i_tot > 1e-12, 1.0 / np.sqrt(np.maximum(i_tot, 1e-300)), np.inf)
+        sem[active] = sem_rows
+        if sem_threshold is not None:
+            active = active[sem_rows > sem_threshold]
+
+    return {
+        "theta_hat": theta,
+        "sem": sem,
+        "test_length": length,
+        "administered": administered,
+    }
+
+
+def simulate_batch(
+    pool: Sequence[Mapping],
+    true_thetas: Sequence[float],
+    max_items: int = 5,
+    sem_threshold: Optional[float] = None,
+    estimator: str = "mle",
+    keymap: Optional[KeyMap] = None,
+    stochastic: bool = False,
+    seed: Optional[int] = None,
+    n_workers: int = 1,
+    shard_size: int = 10_000,
+) -> BatchSimulationResult:
+    """Simulate an adaptive session for every true theta, in lockstep.
+
+    Same loop as run_adaptive_session: start at θ=0, pick the
+    maximum-information unused item, score the response, re-estimate θ
+    (clamped to [-4, 4]) and stop at max_items or when SEM <= sem_threshold.
+    Sessions also end when the pool is exhausted.
+
+    Args:
+        pool: Item mappings; fields mapped via keymap (default id,a,b,c)
+        true_thetas: Generating ability for each simulated examinee
+        max_items: Maximum test length
+        sem_threshold: Optional SEM stopping threshold
+        estimator: "mle" (Fisher scoring) or "eap" (81-point grid, N(0,1) prior)
+        keymap: Field mapping for pool items
+        stochastic: Draw responses ~ Bernoulli(P) instead of y = P >= 0.5
+        seed: Seed for stochastic responses (reproducible for a fixed shard_size)
+        n_workers: Processes to shard across (1 = run in this process)
+        shard_size: Examinees per shard when n_workers > 1
+
+    Returns:
+        BatchSimulationResult
+    """
+    if estimator not in ("mle", "eap"):
+        raise ValueError(f"Unknown estimator: {estimator}")
+    if not pool:
+        raise ValueError("Empty item pool")
+
+    km = keymap or KeyMap()
+    a = np.array([float(it[km.a]) for it in pool])
+    b = np.array([float(it[km.b]) for it in pool])
+    c = np.array([float(it.get(km.c) or 0.0) for it in pool])
+    true_theta = np.asarray(true_thetas, dtype=float)
+
+    bounds = list(range(0, len(true_theta), max(shard_size, 1))) or [0]
+    seeds: List[Optional[np.random.SeedSequence]] = (
+        list(np.random.SeedSequence(seed).spawn(len(bounds)))
+        if stochastic
+        else [None] * len(bounds)
+    )
+    jobs = [
+        (a, b, c, true_theta[lo : lo + shard_size], max_items, sem_threshold, estimator, s)
+        for lo, s in zip(bounds, seeds)
+    ]
+
+    if n_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            shards = list(executor.map(_simulate_shard, *zip(*jobs)))
+    else:
+        shards = [_simulate_shard(*job) for job in jobs]
+
+    item_ids = [it.get(km.id) for it in pool]
+    return BatchSimulationResult.concat(
+        [
+            BatchSimulationResult(
+                item_ids=item_ids,
+                true_theta=job[3],
+                theta_hat=out["theta_hat"],
+                sem=out["sem"],
+                test_length=out["test_length"],
+                administered=out["administered"],
+            )
+            for job, out in zip(jobs, shards)
+        ]
+    )
+
+
+__all__ = [
+    "BatchSimulationResult",
+    "simulate_batch",
+]
@@ -134,10 +134,20 @@ def item_information_batch(theta: float, items: list[dict]) -> list[float]:
     return infos
 
 
+def _current_info_index():
+    """Process-wide theta-grid index, or None if none is loaded/available."""
+    try:
+        from shared.irt.info_index import current_info_index
+    except ImportError:  # numpy/sqlalchemy not installed
+        return None
+    return current_info_index()
+
+
 def select_next_by_information(
     theta: float,
     items: list[dict],
     used_ids: set | None = None,
+    index=None,
 ) -> tuple[dict, float, int]:
     """Select the item with maximum information at ability theta.
 
@@ -149,6 +159,11 @@ def select_next_by_information(
       Each item dict must contain keys: id (hashable), a, b, optional c.
     used_ids : set | None
       If provided, excludes items whose id is in this set.
+    index : shared.irt.info_index.ThetaGridInfoIndex | None
+      Optional precomputed theta-grid index for the current calibration.
+      Defaults to the process-wide index when one is loaded. When it covers
+      every eligible item, the item comes from a grid lookup plus local
+      refinement; otherwise the full scan is used.
 
     Returns
     -------
@@ -156,6 +171,22 @@ def select_next_by_information(
       The chosen item dict, its information value, and its index in the input list.
     """
     used_ids = used_ids or set()
+    if index is None:
+        index = _current_info_index()
+    if index is not None:
+        positions = {
+            it.get("id"): idx
+            for idx, it in enumerate(items)
+            if it.get("id") not in used_ids
+        }
+        hit = (
+            index.select(theta, allowed_ids=positions.keys())
+            if index.covers(positions)
+            else None
+        )
+        if hit is not None:
+            best_idx = positions[hit[0]]
+            return items[best_idx], hit[1], best_idx
     best_idx = -1
     best_info = -1.0
     for idx, it in enumerate(items):
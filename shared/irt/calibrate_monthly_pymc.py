@@ -36,6 +36,8 @@ import pymc as pm
 import sqlalchemy as sa
 from sqlalchemy import text
 
+from .info_index import refresh_info_index
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 )
@@ -279,6 +281,11 @@ class IRTDatabase:
 
         logger.info(f"Updated parameters for {len(stable_items)} stable items")
 
+        # Published parameters change the theta-grid index version
+        with self.engine.connect() as conn:
+            index = refresh_info_index(conn)
+        logger.info(f"Rebuilt theta-grid information index ({len(index)} items)")
+
 
 # ==============================================================================
 # PyMC 2PL Model
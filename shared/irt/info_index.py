@@ -0,0 +1,398 @@
+"""
+Theta-Grid Information Index
+============================
+Precomputed Fisher information lookup for maximum-information (MFI) item selection.
+
+The index tabulates item information on a fixed theta grid (the same 81-point
+grid used by item_info_curve / fetch_item_info_curves) and keeps the items
+pre-sorted by information in every grid cell. Selecting the next item at an
+arbitrary theta becomes:
+
+1. Locate the two grid cells bracketing theta (O(1))
+2. Take the first few eligible items from each cell's sorted list
+3. Refine: recompute exact information at theta for those candidates only
+
+The index is built once per calibration and carries a version stamp taken from
+shared_irt.item_parameters_current. get_info_index() rebuilds it automatically
+when new parameters are published (update_current_params).
+
+Functions:
+- ThetaGridInfoIndex: The index itself (build from item dicts)
+- fetch_calibration_version(): Current parameter version stamp
+- load_info_index(): Build an index from item_parameters_current
+- get_info_index(): Process-wide cached index, rebuilt on version change
+- refresh_info_index(): Rebuild the cached index now (after publishing)
+- current_info_index(): Cached index without a database round trip
+- invalidate_info_index(): Drop the cached index
+
+Usage:
+    from shared.irt.info_index import get_info_index
+
+    with engine.connect() as conn:
+        index = get_info_index(conn)
+    item_id, info = index.select(theta=0.3, exclude_ids={12, 57})
+"""
+
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Default grid: matches fetch_item_info_curves(theta_min=-4, theta_max=4, steps=81)
+DEFAULT_THETA_MIN = -4.0
+DEFAULT_THETA_MAX = 4.0
+DEFAULT_GRID_STEPS = 81
+
+# Candidates taken from each bracketing cell before exact refinement
+DEFAULT_REFINE = 8
+
+# Items scanned per step when walking a cell's sorted list
+_SCAN_CHUNK = 64
+
+
+# ==============================================================================
+# Vectorized Information
+# ==============================================================================
+
+
+def info_matrix(
+    a: np.ndarray, b: np.ndarray, c: np.ndarray, thetas: np.ndarray
+) -> np.ndarray:
+    """
+    Fisher information for many items at many thetas.
+
+    Uses the 3PL form; 2PL items are passed with c = 0 (which reduces to
+    a² P Q) and 1PL items with a = 1, matching item_info_curve.
+
+    Args:
+        a: Discrimination parameters, shape (n_items,)
+        b: Difficulty parameters, shape (n_items,)
+        c: Guessing parameters, shape (n_items,)
+        thetas: Ability levels, shape (n_thetas,)
+
+    Returns:
+        Array of shape (n_items, n_thetas)
+    """
+    a = np.asarray(a, dtype=np.float64)[:, None]
+    b = np.asarray(b, dtype=np.float64)[:, None]
+    c = np.asarray(c, dtype=np.float64)[:, None]
+    thetas = np.asarray(thetas, dtype=np.float64)[None, :]
+
+    with np.errstate(over="ignore"):
+        P = c + (1 - c) / (1 + np.exp(-a * (thetas - b)))
+    Q = 1 - P
+
+    numerator = (a**2) * ((P - c) ** 2)
+    denominator = np.maximum(((1 - c) ** 2) * P * Q, 1e-10)
+    return numerator / denominator
+
+
+# ==============================================================================
+# Index
+# ==============================================================================
+
+
+class ThetaGridInfoIndex:
+    """
+    Items pre-sorted by Fisher information on a fixed theta grid.
+
+    Attributes:
+        item_ids: Item IDs, shape (n_items,)
+        thetas: Grid points, shape (n_grid,)
+        order: Item positions sorted by descending information per grid
+            cell, shape (n_grid, n_items)
+        version: Calibration version stamp the index was built from
+
+    Example:
+        >>> items = [
+        ...     {'id': 1, 'a': 1.2, 'b': -0.5, 'c': None, 'model': '2PL'},
+        ...     {'id': 2, 'a': 1.5, 'b': 0.0, 'c': None, 'model': '2PL'},
+        ... ]
+        >>> index = ThetaGridInfoIndex.from_items(items)
+        >>> item_id, info = index.select(theta=0.2)
+    """
+
+    def __init__(
+        self,
+        item_ids: Iterable[int],
+        a: Iterable[float],
+        b: Iterable[float],
+        c: Iterable[float],
+        thetas: Optional[np.ndarray] = None,
+        version: Hashable = None,
+    ):
+        self.item_ids = np.array(list(item_ids), dtype=np.int64)
+        self.a = np.array(list(a), dtype=np.float64)
+        self.b = np.array(list(b), dtype=np.float64)
+        self.c = np.array(list(c), dtype=np.float64)
+        if not (len(self.item_ids) == len(self.a) == len(self.b) == len(self.c)):
+            raise ValueError("item_ids, a, b and c must have the same length")
+
+        if thetas is None:
+            thetas = np.linspace(
+                DEFAULT_THETA_MIN, DEFAULT_THETA_MAX, DEFAULT_GRID_STEPS
+            )
+        self.thetas = np.asarray(thetas, dtype=np.float64)
+        if self.thetas.size < 2 or np.any(np.diff(self.thetas) <= 0):
+            raise ValueError("thetas must be strictly increasing with >= 2 points")
+
+        self.version = version
+        self._position: Dict[int, int] = {
+            int(item_id): pos for pos, item_id in enumerate(self.item_ids)
+        }
+
+        info = info_matrix(self.a, self.b, self.c, self.thetas)
+        # Stable sort keeps input order among ties
+        self.order = np.ascontiguousarray(
+            np.argsort(-info, axis=0, kind="stable").T.astype(np.int32)
+        )
+
+    @classmethod
+    def from_items(
+        cls,
+        items: List[dict],
+        thetas: Optional[np.ndarray] = None,
+        version: Hashable = None,
+    ) -> "ThetaGridInfoIndex":
+        """
+        Build an index from item dicts with keys {id, a, b, c, model}.
+
+        'model' defaults to 3PL when c is present and 2PL otherwise;
+        1PL items are indexed with a = 1.
+        """
+        a, b, c = [], [], []
+        for item in items:
+            model = item.get("model")
+            c_val = item.get("c")
+            a.append(1.0 if model == "1PL" else float(item["a"]))
+            b.append(float(item["b"]))
+            use_c = c_val is not None and model in (None, "3PL")
+            c.append(float(c_val) if use_c else 0.0)
+        return cls(
+            [item["id"] for item in items], a, b, c, thetas=thetas, version=version
+        )
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._position
+
+    def covers(self, item_ids: Iterable[Any]) -> bool:
+        """True if every given item ID is indexed."""
+        return all(item_id in self._position for item_id in item_ids)
+
+    # --------------------------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------------------------
+
+    def _bracket(self, theta: float) -> Tuple[int, int]:
+        """Grid cells on either side of theta (equal at the grid edges)."""
+        hi = int(np.searchsorted(self.thetas, theta))
+        if hi <= 0:
+            return 0, 0
+        if hi >= len(self.thetas):
+            last = len(self.thetas) - 1
+            return last, last
+        return hi - 1, hi
+
+    def _eligible(
+        self,
+        exclude_ids: Optional[Iterable[Any]],
+        allowed_ids: Optional[Iterable[Any]],
+    ) -> Optional[np.ndarray]:
+        """Boolean eligibility mask over item positions (None = all eligible)."""
+        if allowed_ids is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[[self._position[i] for i in allowed_ids if i in self._position]] = True
+        elif exclude_ids:
+            mask = np.ones(len(self), dtype=bool)
+        else:
+            return None
+        if exclude_ids:
+            mask[[self._position[i] for i in exclude_ids if i in self._position]] = False
+        return mask
+
+    def _top_in_cell(
+        self, cell: int, eligible: Optional[np.ndarray], k: int
+    ) -> np.ndarray:
+        """First k eligible item positions in a cell's sorted list."""
+        row = self.order[cell]
+        if eligible is None:
+            return row[:k]
+        found: List[np.ndarray] = []
+        n_found = 0
+        for start in range(0, len(row), _SCAN_CHUNK):
+            chunk = row[start : start + _SCAN_CHUNK]
+            hits = chunk[eligible[chunk]]
+            found.append(hits)
+            n_found += len(hits)
+            if n_found >= k:
+                break
+        return np.concatenate(found)[:k] if found else row[:0]
+
+    def candidates(
+        self,
+        theta: float,
+        exclude_ids: Optional[Iterable[Any]] = None,
+        allowed_ids: Optional[Iterable[Any]] = None,
+        refine: int = DEFAULT_REFINE,
+    ) -> List[Tuple[int, float]]:
+        """
+        Best items near theta, ranked by exact information at theta.
+
+        Args:
+            theta: Current ability estimate θ
+            exclude_ids: Item IDs to skip (already administered)
+            allowed_ids: If given, only these item IDs are considered
+            refine: Candidates taken from each bracketing grid cell
+
+        Returns:
+            List of (item_id, info) sorted by information (highest first)
+        """
+        eligible = self._eligible(exclude_ids, allowed_ids)
+        lo, hi = self._bracket(theta)
+        pos = self._top_in_cell(lo, eligible, refine)
+        if hi != lo:
+            pos = np.union1d(pos, self._top_in_cell(hi, eligible, refine))
+        if len(pos) == 0:
+            return []
+
+        info = info_matrix(self.a[pos], self.b[pos], self.c[pos], np.array([theta]))[
+            :, 0
+        ]
+        ranked = np.argsort(-info, kind="stable")
+        return [(int(self.item_ids[pos[r]]), float(info[r])) for r in ranked]
+
+    def select(
+        self,
+        theta: float,
+        exclude_ids: Optional[Iterable[Any]] = None,
+        allowed_ids: Optional[Iterable[Any]] = None,
+        refine: int = DEFAULT_REFINE,
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Maximum-information item at theta.
+
+        Returns:
+            (item_id, info) or None if no eligible item is indexed
+
+        Example:
+            >>> item_id, info = index.select(0.4, exclude_ids=used_ids)
+        """
+        ranked = self.candidates(theta, exclude_ids, allowed_ids, refine)
+        return ranked[0] if ranked else None
+
+
+# ==============================================================================
+# Database Operations
+# ==============================================================================
+
+
+def fetch_calibration_version(conn: Connection) -> Tuple[int, Optional[str]]:
+    """
+    Version stamp of the currently published item parameters.
+
+    update_current_params() sets effective_from = now() on every item it
+    publishes, so (item count, latest effective_from) changes exactly when a
+    calibration window is published.
+
+    Returns:
+        Tuple of (n_items, max_effective_from as ISO string or None)
+    """
+    row = conn.execute(
+        text(
+            """
+            SELECT COUNT(*), MAX(effective_from)
+            FROM shared_irt.item_parameters_current
+        """
+        )
+    ).one()
+    stamp = row[1].isoformat() if row[1] is not None else None
+    return (int(row[0]), stamp)
+
+
+def load_info_index(
+    conn: Connection, thetas: Optional[np.ndarray] = None
+) -> ThetaGridInfoIndex:
+    """
+    Build an index over all items in shared_irt.item_parameters_current.
+
+    Example:
+        >>> with engine.connect() as conn:
+        ...     index = load_info_index(conn)
+    """
+    version = fetch_calibration_version(conn)
+    result = conn.execute(
+        text(
+            """
+            SELECT
+                c.item_id AS id,
+                c.model,
+                COALESCE(c.a, 1.0) AS a,
+                COALESCE(c.b, 0.0) AS b,
+                c.c
+            FROM shared_irt.item_parameters_current c
+            ORDER BY c.item_id
+        """
+        )
+    )
+    items = [dict(row) for row in result.mappings().all()]
+    return ThetaGridInfoIndex.from_items(items, thetas=thetas, version=version)
+
+
+_cached_index: Optional[ThetaGridInfoIndex] = None
+_last_version_check = 0.0
+
+
+def get_info_index(
+    conn: Connection, max_age_seconds: float = 60.0
+) -> ThetaGridInfoIndex:
+    """
+    Process-wide index, rebuilt when the calibration version changes.
+
+    The version stamp is re-checked at most every max_age_seconds, so
+    new parameters are picked up within that interval in every process.
+
+    Args:
+        conn: SQLAlchemy connection
+        max_age_seconds: Minimum interval between version checks
+    """
+    global _cached_index, _last_version_check
+
+    now = time.monotonic()
+    if _cached_index is not None and now - _last_version_check < max_age_seconds:
+        return _cached_index
+
+    version = fetch_calibration_version(conn)
+    _last_version_check = now
+    if _cached_index is None or _cached_index.version != version:
+        _cached_index = load_info_index(conn)
+    return _cached_index
+
+
+def refresh_info_index(conn: Connection) -> ThetaGridInfoIndex:
+    """
+    Rebuild the process-wide index from the currently published parameters.
+
+    Called by update_current_params() right after a calibration window is
+    published; other processes pick up the new version via get_info_index().
+    """
+    global _cached_index, _last_version_check
+
+    _cached_index = load_info_index(conn)
+    _last_version_check = time.monotonic()
+    return _cached_index
+
+
+def current_info_index() -> Optional[ThetaGridInfoIndex]:
+    """Cached index if one has been loaded in this process, else None."""
+    return _cached_index
+
+
+def invalidate_info_index() -> None:
+    """Drop the cached index; the next get_info_index() call rebuilds it."""
+    global _cached_index
+    _cached_index = None
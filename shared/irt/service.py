@@ -25,6 +25,7 @@ import numpy as np
 from sqlalchemy import text
 from sqlalchemy.engine import Connection
 
+from .info_index import ThetaGridInfoIndex, current_info_index
 from .models import (
     InfoCurvePoint,
     IRTModel,
@@ -418,13 +419,21 @@ def standard_error_of_measurement(test_info: np.ndarray) -> np.ndarray:
 # ==============================================================================
 
 
-def select_next_item_mfi(remaining_items: List[dict], theta_current: float) -> int:
+def select_next_item_mfi(
+    remaining_items: List[dict],
+    theta_current: float,
+    index: Optional[ThetaGridInfoIndex] = None,
+) -> int:
     """
     Select next item using Maximum Fisher Information (MFI) criterion.
 
     Args:
         remaining_items: List of dicts with keys {id, a, b, c, model}
         theta_current: Current ability estimate θ
+        index: Optional ThetaGridInfoIndex built for the current calibration.
+            Defaults to the process-wide index (see get_info_index). When it
+            covers every remaining item, the best item comes from a grid
+            lookup plus local refinement instead of scoring every item.
 
     Returns:
         Index of selected item in remaining_items list
@@ -437,6 +446,15 @@ def select_next_item_mfi(remaining_items: List[dict], theta_current: float) -> i
         >>> idx = select_next_item_mfi(remaining, theta_current=0.2)
         >>> selected_item = remaining[idx]
     """
+    if index is None:
+        index = current_info_index()
+    if index is not None and remaining_items:
+        positions = {item["id"]: idx for idx, item in enumerate(remaining_items)}
+        if index.covers(positions):
+            hit = index.select(theta_current, allowed_ids=positions.keys())
+            if hit is not None:
+                return positions[hit[0]]
+
     max_info = -1.0
     best_idx = 0
 
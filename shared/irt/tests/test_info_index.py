@@ -0,0 +1,125 @@
+"""
+Theta-grid information index tests
+"""
+
+import numpy as np
+import pytest
+
+from shared.irt.info_index import ThetaGridInfoIndex
+from shared.irt.service import item_info_curve, select_next_item_mfi
+
+
+@pytest.fixture
+def items():
+    rng = np.random.default_rng(11)
+    return [
+        {
+            "id": i,
+            "a": float(rng.uniform(0.5, 2.5)),
+            "b": float(rng.uniform(-3.0, 3.0)),
+            "c": float(rng.uniform(0.0, 0.3)),
+            "model": "3PL",
+        }
+        for i in range(1, 2001)
+    ]
+
+
+def _exact_best(items, theta, used=()):
+    best = max(
+        (it for it in items if it["id"] not in used),
+        key=lambda it: item_info_curve(
+            it["a"], it["b"], it["c"], np.array([theta]), model="3PL"
+        )[0],
+    )
+    return best["id"]
+
+
+def test_select_matches_full_scan(items):
+    """그리드 인덱스 선택 = 전체 스캔 MFI 선택"""
+    index = ThetaGridInfoIndex.from_items(items, version="w1")
+    for theta in (-3.7, -1.23, 0.0, 0.456, 2.9, 5.0):
+        item_id, info = index.select(theta)
+        assert item_id == _exact_best(items, theta)
+        assert info > 0
+
+
+def test_select_excludes_used_items(items):
+    """사용한 문항은 제외"""
+    index = ThetaGridInfoIndex.from_items(items)
+    used = set()
+    for _ in range(20):
+        item_id, _ = index.select(0.3, exclude_ids=used)
+        assert item_id == _exact_best(items, 0.3, used)
+        used.add(item_id)
+
+
+def test_select_next_item_mfi_with_index(items):
+    """서비스 MFI 선택이 인덱스와 같은 문항을 반환"""
+    index = ThetaGridInfoIndex.from_items(items)
+    remaining = items[100:400]
+    idx_scan = select_next_item_mfi(remaining, theta_current=-0.8)
+    idx_index = select_next_item_mfi(remaining, theta_current=-0.8, index=index)
+    assert idx_scan == idx_index
+
+
+def test_select_returns_none_without_candidates(items):
+    """허용된 문항이 인덱스에 없으면 None"""
+    index = ThetaGridInfoIndex.from_items(items[:10])
+    assert index.select(0.0, allowed_ids=[99999]) is None
+
+
+def test_select_next_item_mfi_uses_cached_index(items, monkeypatch):
+    """로드된 프로세스 인덱스를 기본으로 사용 (미색인 문항이 있으면 전체 스캔)"""
+    from shared.irt import info_index
+
+    index = ThetaGridInfoIndex.from_items(items[:500])
+    calls = []
+    original = ThetaGridInfoIndex.select
+
+    def spy(self, *args, **kwargs):
+        calls.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(ThetaGridInfoIndex, "select", spy)
+    monkeypatch.setattr(info_index, "_cached_index", index)
+
+    remaining = items[100:400]
+    assert select_next_item_mfi(remaining, 0.7) == select_next_item_mfi(
+        remaining, 0.7, index=ThetaGridInfoIndex.from_items([])
+    )
+    assert len(calls) == 1
+
+    select_next_item_mfi(items[400:600], 0.7)  # 501번 이후 문항은 미색인
+    assert len(calls) == 1
+
+
+def test_refresh_info_index_rebuilds_from_published_params(items):
+    """발행된 파라미터로 인덱스를 즉시 재구축"""
+    from sqlalchemy import create_engine, text
+
+    from shared.irt import info_index
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS shared_irt"))
+        conn.execute(
+            text(
+                "CREATE TABLE shared_irt.item_parameters_current ("
+                "item_id INTEGER PRIMARY KEY, model TEXT, a REAL, b REAL, c REAL,"
+                " effective_from TIMESTAMP)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO shared_irt.item_parameters_current "
+                "VALUES (:id, :model, :a, :b, :c, NULL)"
+            ),
+            items[:50],
+        )
+        try:
+            index = info_index.refresh_info_index(conn)
+            assert info_index.current_info_index() is index
+            assert len(index) == 50
+            assert index.select(0.0)[0] == _exact_best(items[:50], 0.0)
+        finally:
+            info_index.invalidate_info_index()
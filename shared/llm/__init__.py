@@ -63,6 +63,18 @@ from .openai_compat import (
     CLIENT_DEEPSEEK,
 )
 
+# 공유 HTTP 커넥션 풀
+from .http_pool import (
+    ProviderPool,
+    ProviderStats,
+    get_pool,
+    provider_stats,
+    close_pools,
+)
+
+# 응답 캐시
+from .response_cache import ResponseCache
+
 __all__ = [
     # 타입 및 상수
     "SUPPORTED_LANGS",
@@ -94,4 +106,12 @@ __all__ = [
     "CLIENT",
     "CLIENT_LOCAL",
     "CLIENT_DEEPSEEK",
+    # 커넥션 풀
+    "ProviderPool",
+    "ProviderStats",
+    "get_pool",
+    "provider_stats",
+    "close_pools",
+    # 응답 캐시
+    "ResponseCache",
 ]
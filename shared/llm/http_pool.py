@@ -0,0 +1,353 @@
+"""
+Pooled HTTP clients for LLM providers
+=====================================
+One long-lived ``httpx.AsyncClient`` per backend instead of a new client
+(and TCP/TLS handshake) per completion.
+
+Each pool provides:
+- Keep-alive connection pooling (HTTP/2 for https backends when ``h2`` is
+  installed)
+- A per-backend concurrency cap; callers over the cap wait in a queue
+- Single-flight coalescing: identical requests already in flight share one
+  upstream call
+- A small retry budget for transport errors (stale keep-alive connections,
+  resets), capped at a fraction of recent traffic
+- Latency / queue-depth / error metrics (``ProviderStats``) that
+  ``SmartRouter`` reads when choosing a backend
+
+Environment:
+    LLM_MAX_CONCURRENCY: In-flight requests per backend (default: 16)
+    LLM_MAX_KEEPALIVE: Idle keep-alive connections per backend (default: 8)
+    LLM_RETRY_BUDGET: Retries allowed as a share of requests (default: 0.1)
+
+Usage:
+    from shared.llm.http_pool import get_pool, close_pools
+
+    pool = get_pool("https://api.deepseek.com/v1", headers={...})
+    js = await pool.post_json("/chat/completions", body, timeout=8.0)
+
+    # FastAPI shutdown
+    await close_pools()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import functools
+import hashlib
+import json as jsonlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "8"))
+RETRY_BUDGET = float(os.getenv("LLM_RETRY_BUDGET", "0.1"))
+
+# Retries always allowed before the budget ratio kicks in (cold start)
+MIN_RETRIES = 3
+
+# Smoothing factor for the latency moving average
+LATENCY_ALPHA = 0.2
+
+try:  # HTTP/2 needs the optional h2 package (httpx[http2])
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on environment
+    HTTP2_AVAILABLE = False
+
+
+@dataclass
+class ProviderStats:
+    """
+    Rolling metrics for one backend.
+
+    Attributes:
+        max_concurrency: Concurrency cap of the pool
+        in_flight: Upstream requests currently being sent
+        queued: Callers waiting for a concurrency slot
+        requests: Upstream requests sent (including retries)
+        errors: Requests that failed after retries
+        retries: Transport-error retries spent
+        coalesced: Callers served by another caller's in-flight request
+        latency_ms: Moving average of successful request latency
+    """
+
+    max_concurrency: int
+    in_flight: int = 0
+    queued: int = 0
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    coalesced: int = 0
+    latency_ms: Optional[float] = None
+
+    @property
+    def error_rate(self) -> float:
+        """Share of requests that failed."""
+        return self.errors / self.requests if self.requests else 0.0
+
+    def expected_wait_ms(self) -> float:
+        """
+        Rough time until a new request would complete.
+
+        Average latency scaled by the number of full "rounds" of queued work
+        ahead of it; 0 until the first request has completed.
+        """
+        latency = self.latency_ms or 0.0
+        return latency * (1 + self.queued / max(self.max_concurrency, 1))
+
+    def record_latency(self, elapsed_ms: float) -> None:
+        if self.latency_ms is None:
+            self.latency_ms = elapsed_ms
+        else:
+            self.latency_ms += LATENCY_ALPHA * (elapsed_ms - self.latency_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain dict for logging / metrics endpoints."""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "latency_ms": self.latency_ms,
+            "error_rate": self.error_rate,
+            "expected_wait_ms": self.expected_wait_ms(),
+        }
+
+
+class ProviderPool:
+    """
+    Connection-pooled, concurrency-limited client for one LLM backend.
+
+    The underlying ``httpx.AsyncClient`` and semaphore are created lazily
+    and re-created if the pool is used from a different event loop (e.g.
+    between test cases or worker restarts).
+    """
+
+    def __init__(
+        self,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        max_concurrency: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            base_url: Backend base URL (requests may use relative paths)
+            headers: Default headers sent with every request
+            timeout: Default request timeout in seconds
+            max_concurrency: In-flight cap (default: LLM_MAX_CONCURRENCY)
+            max_keepalive: Idle keep-alive connections (default: LLM_MAX_KEEPALIVE)
+            http2: Force HTTP/2 on/off (default: https backends when h2 is installed)
+            transport: Custom transport (tests)
+        """
+        self.base_url = base_url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency or MAX_CONCURRENCY
+        self.max_keepalive = min(max_keepalive or MAX_KEEPALIVE, self.max_concurrency)
+        if http2 is None:
+            http2 = HTTP2_AVAILABLE and base_url.startswith("https://")
+        self.http2 = http2
+        self.stats = ProviderStats(max_concurrency=self.max_concurrency)
+
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Clients and semaphores are bound to the loop that created them
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+                transport=self._transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        client, self._client = self._client, None
+        self._loop = None
+        if client is not None:
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _request_key(
+        url: str, body: Dict[str, Any], headers: Optional[Dict[str, str]]
+    ) -> str:
+        raw = jsonlib.dumps(
+            [url, body, sorted((headers or {}).items())],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def post_json(
+        self,
+        url: str,
+        json: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        coalesce: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        POST a JSON body and return the decoded JSON response.
+
+        Args:
+            url: Absolute URL or path relative to base_url
+            json: Request body
+            headers: Extra headers for this request
+            timeout: Request timeout in seconds (default: pool timeout)
+            coalesce: Share the response of an identical in-flight request
+
+        Returns:
+            Response JSON (callers never share the same dict object)
+
+        Raises:
+            httpx.HTTPError: On HTTP / transport error
+        """
+        self._ensure_client()
+        if not coalesce:
+            return await self._send(url, json, headers, timeout)
+
+        key = self._request_key(url, json, headers)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            # The upstream call runs in its own task so that cancelling one
+            # caller (leader included) never cancels the others
+            task = asyncio.ensure_future(self._send(url, json, headers, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # callers re-raise it; avoid "never retrieved"
+
+    def _retry_allowed(self) -> bool:
+        budget = max(MIN_RETRIES, RETRY_BUDGET * self.stats.requests)
+        return self.stats.retries < budget
+
+    async def _send(
+        self,
+        url: str,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        client = self._ensure_client()
+        assert self._semaphore is not None
+
+        self.stats.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats.queued -= 1
+
+        self.stats.in_flight += 1
+        try:
+            while True:
+                self.stats.requests += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        url,
+                        json=body,
+                        headers=headers,
+                        timeout=self.timeout if timeout is None else timeout,
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+                except httpx.TransportError as exc:
+                    if isinstance(exc, httpx.TimeoutException) or not self._retry_allowed():
+                        self.stats.errors += 1
+                        raise
+                    self.stats.retries += 1
+                    logger.warning(f"Retrying {self.base_url or url} after {exc!r}")
+                    continue
+                except Exception:
+                    self.stats.errors += 1
+                    raise
+                self.stats.record_latency((time.perf_counter() - started) * 1000)
+                return result
+        finally:
+            self.stats.in_flight -= 1
+            self._semaphore.release()
+
+
+# ----------------------------------------------------------------------
+# Process-wide pools
+# ----------------------------------------------------------------------
+
+_pools: Dict[str, ProviderPool] = {}
+
+
+def origin_of(url: str) -> str:
+    """scheme://host[:port] of a URL (one pool per origin)."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_pool(base_url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> ProviderPool:
+    """
+    Return the shared pool for a backend, creating it on first use.
+
+    Pools are keyed by base URL; headers/kwargs only apply on creation.
+    """
+    pool = _pools.get(base_url)
+    if pool is None:
+        pool = ProviderPool(base_url=base_url, headers=headers, **kwargs)
+        _pools[base_url] = pool
+    return pool
+
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics snapshot for every pool, keyed by base URL."""
+    return {base_url: pool.stats.snapshot() for base_url, pool in _pools.items()}
+
+
+async def close_pools() -> None:
+    """Close all shared pools (call on application shutdown)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        await pool.aclose()
@@ -9,6 +9,10 @@ Supports:
 - OpenAI API
 - Any OpenAI-compatible endpoint
 
+Requests go through the shared per-backend connection pool
+(shared.llm.http_pool): keep-alive connections, a concurrency cap and
+coalescing of identical in-flight requests.
+
 Usage:
     from shared.llm.openai_compat import CLIENT
 
@@ -23,8 +27,8 @@ Usage:
 
 from __future__ import annotations
 from typing import Optional
-import httpx
 from shared.config.llm import CFG
+from .http_pool import ProviderPool, get_pool, origin_of
 
 
 class LLMClient:
@@ -35,6 +39,7 @@ class LLMClient:
         base_url: API endpoint base URL
         api_key: API key for authentication
         headers: HTTP headers with authorization
+        pool: Shared connection pool for the backend origin
     """
 
     def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
@@ -51,6 +56,7 @@ class LLMClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        self.pool: ProviderPool = get_pool(origin_of(self.base_url))
 
     async def chat(
         self,
@@ -100,13 +106,13 @@ class LLMClient:
 
         t = timeout or CFG.request_timeout
 
-        async with httpx.AsyncClient(
-            base_url=self.base_url, headers=self.headers, timeout=t
-        ) as cli:
-            r = await cli.post("/chat/completions", json=data)
-            r.raise_for_status()
-            js = r.json()
-            return js["choices"][0]["message"]["content"].strip()
+        js = await self.pool.post_json(
+            f"{self.base_url.rstrip('/')}/chat/completions",
+            data,
+            headers=self.headers,
+            timeout=t,
+        )
+        return js["choices"][0]["message"]["content"].strip()
 
 
 # Global client instances
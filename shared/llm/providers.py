@@ -2,6 +2,7 @@
 LLM 프로바이더 어댑터
 ====================
 각 LLM 서비스(로컬/클라우드)에 대한 HTTP 클라이언트 어댑터.
+요청은 백엔드(origin)별 공유 커넥션 풀(http_pool)을 통해 전송된다.
 
 환경 변수:
     DEEPSEEK_API_KEY: DeepSeek API 키
@@ -14,8 +15,7 @@ import os
 import logging
 from typing import Any, Dict, Optional
 
-import httpx
-
+from .http_pool import get_pool, origin_of
 from .types import Provider
 
 logger = logging.getLogger(__name__)
@@ -36,6 +36,8 @@ async def post_json(
     """
     JSON POST 요청 헬퍼.
 
+    백엔드별 커넥션 풀을 재사용하며, 동일한 요청이 진행 중이면 그 응답을 공유한다.
+
     Args:
         url: 요청 URL
         json: 요청 바디
@@ -48,10 +50,8 @@ async def post_json(
     Raises:
         httpx.HTTPError: HTTP 에러
     """
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.post(url, json=json, headers=headers or {})
-        response.raise_for_status()
-        return response.json()
+    pool = get_pool(origin_of(url))
+    return await pool.post_json(url, json, headers=headers, timeout=timeout)
 
 
 async def call_deepseek(body: Dict[str, Any]) -> Dict[str, Any]:
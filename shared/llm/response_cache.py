@@ -0,0 +1,326 @@
+"""
+LLM response cache
+==================
+Cache in front of SmartRouter so repeated student questions do not reach
+the model again.
+
+Tiers:
+- Exact: key on the normalized (provider, model, system, user, temperature)
+  tuple. Normalization is NFKC + casefold + collapsed whitespace, so
+  differences in spacing, case and full-width characters still hit.
+- Similarity (optional): the user message is embedded with a small local
+  hashed character n-gram vector and compared (cosine) against cached
+  questions that share provider, model, system prompt and temperature.
+  Candidates must also contain exactly the same numbers as the new
+  question ("question 3" never matches "question 4", however close the
+  vectors are). The best live match above ``similarity_threshold`` is
+  returned; expired candidates are dropped and the next best is tried.
+
+Entries are partitioned per language; each partition has its own LRU bound
+(``max_entries``) and every entry expires after ``ttl_seconds``. Hit/miss
+counters per language are available from ``stats()``.
+
+Environment:
+    LLM_CACHE_ENABLED: Enable the SmartRouter cache (default: false). Opt-in
+        because a cached answer replaces a fresh sample even when the caller
+        asked for temperature > 0.
+    LLM_CACHE_TTL: Entry lifetime in seconds (default: 3600)
+    LLM_CACHE_MAX_ENTRIES: Entries per language partition (default: 2000)
+    LLM_CACHE_SIMILARITY: Cosine threshold for the similarity tier, e.g.
+        0.8 (default: unset, exact tier only)
+
+Usage:
+    cache = ResponseCache(similarity_threshold=0.8)
+    hit = cache.get("ko", "local", model, system, user, temperature)
+    if hit is None:
+        response = await client.chat(...)
+        cache.put("ko", "local", model, system, user, temperature, response)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+_similarity_env = os.getenv("LLM_CACHE_SIMILARITY")
+CACHE_SIMILARITY: Optional[float] = float(_similarity_env) if _similarity_env else None
+
+# Embedding dimension of the hashed n-gram vectors
+EMBEDDING_DIM = 512
+
+_WS_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,/]\d+)*")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, casefold and collapse whitespace."""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+def number_signature(text: str) -> str:
+    """Sorted numbers in a text; similar questions must agree on them."""
+    return " ".join(sorted(_NUMBER_RE.findall(normalize_text(text))))
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Hashed character n-gram embedding (L2-normalized).
+
+    Character 2/3-grams work for Korean and Chinese without a tokenizer;
+    whole words add weight for space-separated languages. crc32 keeps the
+    vectors stable across processes.
+    """
+    norm = normalize_text(text)
+    vec = np.zeros(dim, dtype=np.float32)
+    padded = f" {norm} "
+    features = [padded[i : i + n] for n in (2, 3) for i in range(len(padded) - n + 1)]
+    features += norm.split(" ")
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    length = float(np.linalg.norm(vec))
+    return vec / length if length else vec
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for one language partition."""
+
+    exact_hits: int = 0
+    similar_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    response: str
+    expires_at: float
+    group: str
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass
+class _Partition:
+    """One language: LRU entries plus a vector index per similarity group."""
+
+    entries: "OrderedDict[str, _Entry]" = field(default_factory=OrderedDict)
+    # similarity group -> (keys, stacked vectors); rebuilt lazily after changes
+    index: Dict[str, Tuple[List[str], np.ndarray]] = field(default_factory=dict)
+    stats: CacheStats = field(default_factory=CacheStats)
+
+
+class ResponseCache:
+    """
+    Two-tier (exact / similarity) LRU+TTL cache of chat responses.
+
+    Attributes:
+        max_entries: LRU bound per language partition
+        ttl_seconds: Entry lifetime
+        similarity_threshold: Cosine threshold (None: exact tier only)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL,
+        similarity_threshold: Optional[float] = CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._partitions: Dict[str, _Partition] = {}
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _context_key(
+        provider: str, model: str, system: str, temperature: float
+    ) -> str:
+        raw = "\x1f".join(
+            [provider, model, normalize_text(system), f"{float(temperature):.3f}"]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _group_key(context: str, user: str) -> str:
+        """Similarity group: same context and the same numbers."""
+        return f"{context}|{number_signature(user)}"
+
+    @staticmethod
+    def _exact_key(context: str, user: str) -> str:
+        raw = f"{context}\x1f{normalize_text(user)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _partition(self, lang: str) -> _Partition:
+        part = self._partitions.get(lang)
+        if part is None:
+            part = self._partitions[lang] = _Partition()
+        return part
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def get(
+        self,
+        lang: str,
+        provider: str,
+        model: str,
+        system: str,
+        user: str,
+        temperature: float,
+    ) -> Optional[str]:
+        """
+        Cached response for a request, or None on a miss.
+
+        Tries the exact tier first, then (if enabled) the nearest cached
+        question with the same provider/model/system/temperature and numbers.
+        """
+        part = self._partition(lang)
+        context = self._context_key(provider, model, system, temperature)
+        key = self._exact_key(context, user)
+        now = time.monotonic()
+
+        entry = self._live(part, key, now)
+        if entry is not None:
+            part.stats.exact_hits += 1
+            return entry.response
+
+        if self.similarity_threshold is not None:
+            group = self._group_key(context, user)
+            for similar_key in self._nearest(part, group, embed_text(user)):
+                entry = self._live(part, similar_key, now)
+                if entry is not None:
+                    part.stats.similar_hits += 1
+                    return entry.response
+
+        part.stats.misses += 1
+        return None
+
+    def put(
+        self,
+        lang: str,
+        provider: str,
+        model: str,
+        system: str,
+        user: str,
+        temperature: float,
+        response: str,
+    ) -> None:
+        """Store a response, evicting the least recently used entry if full."""
+        part = self._partition(lang)
+        context = self._context_key(provider, model, system, temperature)
+        key = self._exact_key(context, user)
+        vector = embed_text(user) if self.similarity_threshold is not None else None
+
+        if key in part.entries:
+            self._remove(part, key)
+        part.entries[key] = _Entry(
+            response=response,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            group=self._group_key(context, user),
+            vector=vector,
+        )
+        part.index.pop(part.entries[key].group, None)
+
+        while len(part.entries) > self.max_entries:
+            oldest = next(iter(part.entries))
+            self._remove(part, oldest)
+            part.stats.evictions += 1
+
+    def _live(self, part: _Partition, key: str, now: float) -> Optional[_Entry]:
+        """Entry for key if present and unexpired (refreshing its LRU slot)."""
+        entry = part.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(part, key)
+            part.stats.evictions += 1
+            return None
+        part.entries.move_to_end(key)
+        return entry
+
+    def _remove(self, part: _Partition, key: str) -> None:
+        entry = part.entries.pop(key)
+        part.index.pop(entry.group, None)
+
+    def _nearest(
+        self, part: _Partition, group: str, vector: np.ndarray
+    ) -> List[str]:
+        """
+        Cached questions in the same similarity group at or above the
+        threshold, most similar (cosine) first.
+        """
+        index = part.index.get(group)
+        if index is None:
+            keys = [
+                k
+                for k, e in part.entries.items()
+                if e.group == group and e.vector is not None
+            ]
+            if not keys:
+                return []
+            matrix = np.stack([part.entries[k].vector for k in keys])
+            index = part.index[group] = (keys, matrix)
+        keys, matrix = index
+        scores = matrix @ vector
+        order = np.argsort(-scores, kind="stable")
+        # Copy the keys out: _live() drops the group index on expiry
+        return [
+            keys[i] for i in order if scores[i] >= self.similarity_threshold
+        ]
+
+    # ------------------------------------------------------------------
+    # Maintenance / metrics
+    # ------------------------------------------------------------------
+    def clear(self, lang: Optional[str] = None) -> None:
+        """Drop all entries (or one language partition)."""
+        if lang is None:
+            self._partitions.clear()
+        else:
+            self._partitions.pop(lang, None)
+
+    def __len__(self) -> int:
+        return sum(len(p.entries) for p in self._partitions.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit-rate metrics per language and overall.
+
+        Returns:
+            {"languages": {lang: {...}}, "hit_rate": float, "entries": int}
+        """
+        languages = {}
+        total = CacheStats()
+        for lang, part in self._partitions.items():
+            s = part.stats
+            languages[lang] = {
+                "entries": len(part.entries),
+                "exact_hits": s.exact_hits,
+                "similar_hits": s.similar_hits,
+                "misses": s.misses,
+                "evictions": s.evictions,
+                "hit_rate": s.hit_rate,
+            }
+            total.exact_hits += s.exact_hits
+            total.similar_hits += s.similar_hits
+            total.misses += s.misses
+        return {"languages": languages, "hit_rate": total.hit_rate, "entries": len(self)}
@@ -10,8 +10,9 @@
 Features:
 - 자동 모델 선택
 - 폴백 메커니즘 (클라우드 장애 시 로컬로 폴백)
-- 캐싱 지원 (선택)
+- 응답 캐싱 (정확 일치 + 선택적 유사 질문 매칭, response_cache 참고)
 - 에러 핸들링
+- 부하 인지 라우팅 (클라우드 대기열이 길면 로컬로 우회, 선택)
 
 Usage:
     from shared.llm.smart_router import smart_chat
@@ -34,7 +35,8 @@ Usage:
 
 from __future__ import annotations
 import logging
-from typing import Optional
+import os
+from typing import Any, Dict, Optional
 from fastapi import Request
 
 from shared.config.llm import CFG
@@ -43,10 +45,15 @@ from .lang_detect import is_chinese, clamp_supported
 from .middleware import get_request_language
 from .types import Provider
 from .providers import dispatch_by_provider, PROVIDER_MAP
+from .response_cache import CACHE_ENABLED, ResponseCache
 
 
 logger = logging.getLogger(__name__)
 
+# 클라우드 예상 대기시간(ms)이 이 값을 넘으면 로컬로 우회 (미설정 시 비활성)
+_overload_env = os.getenv("LLM_OVERLOAD_WAIT_MS")
+OVERLOAD_WAIT_MS: Optional[float] = float(_overload_env) if _overload_env else None
+
 
 def choose_provider_by_lang(lang: str) -> str:
     """
@@ -106,6 +113,8 @@ class SmartRouter:
         local_client: 로컬 LLM 클라이언트 (RTX 5090)
         cloud_client: 클라우드 LLM 클라이언트 (DeepSeek)
         enable_fallback: 클라우드 장애 시 로컬 폴백 활성화
+        overload_wait_ms: 클라우드 예상 대기시간 임계값 (None: 부하 우회 비활성)
+        cache: 응답 캐시 (None: 캐시 비활성)
     """
 
     def __init__(
@@ -113,6 +122,8 @@ class SmartRouter:
         local_client: Optional[LLMClient] = None,
         cloud_client: Optional[LLMClient] = None,
         enable_fallback: bool = True,
+        overload_wait_ms: Optional[float] = OVERLOAD_WAIT_MS,
+        cache: Optional[ResponseCache] = None,
     ):
         """
         스마트 라우터 초기화.
@@ -121,10 +132,41 @@ class SmartRouter:
             local_client: 로컬 클라이언트 (기본값: CLIENT_LOCAL)
             cloud_client: 클라우드 클라이언트 (기본값: CLIENT_DEEPSEEK)
             enable_fallback: 폴백 활성화 (기본값: True)
+            overload_wait_ms: 부하 우회 임계값 (기본값: LLM_OVERLOAD_WAIT_MS)
+            cache: 응답 캐시 (기본값: 없음, 전역 ROUTER는 LLM_CACHE_ENABLED 설정에 따름)
         """
         self.local_client = local_client or CLIENT_LOCAL
         self.cloud_client = cloud_client or CLIENT_DEEPSEEK
         self.enable_fallback = enable_fallback
+        self.overload_wait_ms = overload_wait_ms
+        self.cache = cache
+
+    def provider_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        로컬/클라우드 백엔드의 지연시간·대기열 지표.
+
+        Returns:
+            {"local": {...}, "cloud": {...}} (풀이 없는 클라이언트는 생략)
+        """
+        metrics = {}
+        for name, client in (("local", self.local_client), ("cloud", self.cloud_client)):
+            pool = getattr(client, "pool", None)
+            if pool is not None:
+                metrics[name] = pool.stats.snapshot()
+        return metrics
+
+    def _cloud_overloaded(self) -> bool:
+        """클라우드 예상 대기시간이 임계값을 넘고 로컬이 더 빠른지 여부."""
+        if self.overload_wait_ms is None:
+            return False
+        metrics = self.provider_metrics()
+        cloud, local = metrics.get("cloud"), metrics.get("local")
+        if cloud is None or local is None:
+            return False
+        return (
+            cloud["expected_wait_ms"] > self.overload_wait_ms
+            and local["expected_wait_ms"] < cloud["expected_wait_ms"]
+        )
 
     def choose_client(self, lang: str) -> tuple[LLMClient, str]:
         """
@@ -140,8 +182,16 @@ class SmartRouter:
             - ko → (local, Qwen2.5-7B-Instruct)
             - en → (local, Llama-3.1-8B-Instruct)
             - zh-Hans, zh-Hant → (cloud, deepseek-chat)
+              (클라우드 과부하 시 폴백과 동일하게 local, model_ko)
         """
-        if is_chinese(lang):
+        if is_chinese(lang) and self._cloud_overloaded():
+            # 클라우드 대기열 과부하 → 로컬 모델로 우회
+            logger.warning(
+                f"Cloud backend overloaded for {lang}, routing to local: "
+                f"{self.provider_metrics()['cloud']}"
+            )
+            return self.local_client, CFG.model_ko
+        elif is_chinese(lang):
             # 중국어 → DeepSeek 클라우드
             return self.cloud_client, CFG.model_zh
         elif lang == "en":
@@ -151,6 +201,11 @@ class SmartRouter:
             # 한국어 (기본값) → 로컬 한국어 모델
             return self.local_client, CFG.model_ko
 
+    @staticmethod
+    def _cache_model(model: str, max_tokens: Optional[int]) -> str:
+        """캐시 키용 모델명 (max_tokens가 다르면 잘린 응답이 섞이지 않도록 포함)."""
+        return f"{model}:{max_tokens or CFG.max_tokens}"
+
     async def chat(
         self,
         lang: str,
@@ -159,10 +214,14 @@ class SmartRouter:
         max_tokens: Optional[int] = None,
         timeout: Optional[float] = None,
         temperature: float = 0.7,
+        use_cache: bool = True,
     ) -> str:
         """
         언어별 자동 라우팅 채팅.
 
+        캐시가 설정되어 있으면 (프로바이더, 모델, 시스템, 사용자, 온도) 기준으로
+        캐시된 응답을 먼저 확인하고, 모델 응답은 실제로 응답한 프로바이더 기준으로 저장한다.
+
         Args:
             lang: 언어 코드 (ko, en, zh-Hans, zh-Hant)
             system: 시스템 프롬프트
@@ -170,6 +229,7 @@ class SmartRouter:
             max_tokens: 최대 토큰 수
             timeout: 타임아웃 (초)
             temperature: 샘플링 온도
+            use_cache: 응답 캐시 사용 여부 (기본값: True)
 
         Returns:
             생성된 응답 텍스트
@@ -188,11 +248,28 @@ class SmartRouter:
         """
         client, model = self.choose_client(lang)
 
+        routed_to_cloud = client is self.cloud_client
+
         logger.info(
-            f"Routing to {'cloud' if is_chinese(lang) else 'local'} "
+            f"Routing to {'cloud' if routed_to_cloud else 'local'} "
             f"(lang={lang}, model={model})"
         )
 
+        cache = self.cache if use_cache else None
+        provider = "cloud" if routed_to_cloud else "local"
+        if cache is not None:
+            cached = cache.get(
+                lang,
+                provider,
+                self._cache_model(model, max_tokens),
+                system,
+                user,
+                temperature,
+            )
+            if cached is not None:
+                logger.info(f"Cache hit (lang={lang}, model={model})")
+                return cached
+
         try:
             response = await client.chat(
                 model=model,
@@ -202,11 +279,21 @@ class SmartRouter:
                 timeout=timeout,
                 temperature=temperature,
             )
+            if cache is not None:
+                cache.put(
+                    lang,
+                    provider,
+                    self._cache_model(model, max_tokens),
+                    system,
+                    user,
+                    temperature,
+                    response,
+                )
             return response
 
         except Exception as e:
             # 클라우드 장애 시 로컬로 폴백 (중국어만)
-            if self.enable_fallback and is_chinese(lang):
+            if self.enable_fallback and routed_to_cloud and is_chinese(lang):
                 logger.warning(
                     f"Cloud API failed for {lang}, falling back to local: {e}"
                 )
@@ -223,6 +310,16 @@ class SmartRouter:
                         timeout=timeout,
                         temperature=temperature,
                     )
+                    if cache is not None:
+                        cache.put(
+                            lang,
+                            "local",
+                            self._cache_model(fallback_model, max_tokens),
+                            system,
+                            user,
+                            temperature,
+                            response,
+                        )
                     return response
                 except Exception as fallback_error:
                     logger.error(f"Fallback also failed: {fallback_error}")
@@ -231,8 +328,8 @@ class SmartRouter:
                 raise
 
 
-# 전역 라우터 인스턴스
-ROUTER = SmartRouter()
+# 전역 라우터 인스턴스 (응답 캐시: LLM_CACHE_* 환경 변수)
+ROUTER = SmartRouter(cache=ResponseCache() if CACHE_ENABLED else None)
 
 
 async def smart_chat(
@@ -242,6 +339,7 @@ async def smart_chat(
     max_tokens: Optional[int] = None,
     timeout: Optional[float] = None,
     temperature: float = 0.7,
+    use_cache: bool = True,
 ) -> str:
     """
     언어별 자동 라우팅 채팅 (전역 라우터 사용).
@@ -253,6 +351,7 @@ async def smart_chat(
         max_tokens: 최대 토큰 수
         timeout: 타임아웃 (초)
         temperature: 샘플링 온도
+        use_cache: 응답 캐시 사용 여부
 
     Returns:
         생성된 응답 텍스트
@@ -271,6 +370,7 @@ async def smart_chat(
         max_tokens=max_tokens,
         timeout=timeout,
         temperature=temperature,
+        use_cache=use_cache,
     )
 
 
@@ -281,6 +381,7 @@ async def smart_chat_from_request(
     max_tokens: Optional[int] = None,
     timeout: Optional[float] = None,
     temperature: float = 0.7,
+    use_cache: bool = True,
 ) -> str:
     """
     Request 객체에서 언어를 자동 감지하여 채팅.
@@ -292,6 +393,7 @@ async def smart_chat_from_request(
         max_tokens: 최대 토큰 수
         timeout: 타임아웃 (초)
         temperature: 샘플링 온도
+        use_cache: 응답 캐시 사용 여부
 
     Returns:
         생성된 응답 텍스트
@@ -316,4 +418,5 @@ async def smart_chat_from_request(
         max_tokens=max_tokens,
         timeout=timeout,
         temperature=temperature,
+        use_cache=use_cache,
     )
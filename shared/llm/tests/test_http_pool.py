@@ -0,0 +1,187 @@
+"""
+Pooled LLM HTTP client tests
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from shared.llm import http_pool
+from shared.llm.http_pool import ProviderPool
+from shared.llm.openai_compat import LLMClient
+from shared.llm.smart_router import SmartRouter
+
+
+class SlowBackend:
+    """MockTransport handler that holds requests until released"""
+
+    def __init__(self, fail_first: int = 0):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.release = asyncio.Event()
+        self.fail_first = fail_first
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        if len(self.calls) <= self.fail_first:
+            raise httpx.ConnectError("connection reset", request=request)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.release.wait()
+        finally:
+            self.active -= 1
+        body = json.loads(request.content)
+        text = body["messages"][-1]["content"].upper()
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": f" {text} "}}]}
+        )
+
+
+def _pool(backend, **kwargs):
+    return ProviderPool(
+        base_url="http://llm.test", transport=httpx.MockTransport(backend), **kwargs
+    )
+
+
+def _body(text):
+    return {"model": "m", "messages": [{"role": "user", "content": text}]}
+
+
+@pytest.fixture(autouse=True)
+def isolated_pools(monkeypatch):
+    monkeypatch.setattr(http_pool, "_pools", {})
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_requests_share_one_call():
+    backend = SlowBackend()
+    pool = _pool(backend)
+
+    tasks = [
+        asyncio.create_task(pool.post_json("/chat/completions", _body("hi")))
+        for _ in range(5)
+    ]
+    other = asyncio.create_task(pool.post_json("/chat/completions", _body("bye")))
+    await asyncio.sleep(0.01)
+    backend.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert len(backend.calls) == 2
+    assert pool.stats.coalesced == 4
+    assert all(r == results[0] for r in results)
+    assert len({id(r) for r in results}) == 5  # callers get their own copy
+    assert (await other)["choices"][0]["message"]["content"] == " BYE "
+    assert pool.stats.latency_ms is not None
+
+    # Finished requests are not reused
+    await pool.post_json("/chat/completions", _body("hi"))
+    assert len(backend.calls) == 3
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    backend = SlowBackend()
+    pool = _pool(backend)
+
+    leader = asyncio.create_task(pool.post_json("/chat/completions", _body("hi")))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(pool.post_json("/chat/completions", _body("hi")))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    backend.release.set()
+
+    js = await follower
+    assert js["choices"][0]["message"]["content"] == " HI "
+    assert leader.cancelled()
+    assert len(backend.calls) == 1
+    assert pool.stats.coalesced == 1
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_queues_excess_requests():
+    backend = SlowBackend()
+    pool = _pool(backend, max_concurrency=2)
+
+    tasks = [
+        asyncio.create_task(pool.post_json("/chat/completions", _body(f"q{i}")))
+        for i in range(6)
+    ]
+    await asyncio.sleep(0.01)
+    assert backend.max_active == 2
+    assert pool.stats.in_flight == 2
+    assert pool.stats.queued == 4
+    assert pool.stats.snapshot()["queued"] == 4
+
+    backend.release.set()
+    await asyncio.gather(*tasks)
+    assert pool.stats.queued == pool.stats.in_flight == 0
+    assert pool.stats.requests == 6
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_transport_errors_retry_within_budget():
+    backend = SlowBackend(fail_first=1)
+    backend.release.set()
+    pool = _pool(backend)
+
+    js = await pool.post_json("/chat/completions", _body("x"))
+    assert js["choices"][0]["message"]["content"] == " X "
+    assert pool.stats.retries == 1
+    assert pool.stats.errors == 0
+
+    # Once the budget is spent the error surfaces
+    failing = _pool(SlowBackend(fail_first=100))
+    with pytest.raises(httpx.ConnectError):
+        await failing.post_json("/chat/completions", _body("x"))
+    assert failing.stats.retries == http_pool.MIN_RETRIES
+    assert failing.stats.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_clients_share_backend_pool(monkeypatch):
+    backend = SlowBackend()
+    backend.release.set()
+    a = LLMClient(base_url="http://vllm.test:8001/v1", api_key="k1")
+    b = LLMClient(base_url="http://vllm.test:8001/v1", api_key="k2")
+    assert a.pool is b.pool
+    monkeypatch.setattr(a.pool, "_transport", httpx.MockTransport(backend))
+
+    assert await a.chat(model="m", system="s", user="hello") == "HELLO"
+    await b.chat(model="m", system="s", user="hello")
+
+    assert [str(r.url) for r in backend.calls] == [
+        "http://vllm.test:8001/v1/chat/completions"
+    ] * 2
+    assert [r.headers["authorization"] for r in backend.calls] == [
+        "Bearer k1",
+        "Bearer k2",
+    ]
+    await a.pool.aclose()
+
+
+def test_router_diverts_chinese_when_cloud_queue_is_long():
+    local = LLMClient(base_url="http://local.test/v1", api_key="k")
+    cloud = LLMClient(base_url="https://cloud.test/v1", api_key="k")
+    router = SmartRouter(local_client=local, cloud_client=cloud, overload_wait_ms=2000)
+
+    assert router.choose_client("zh-Hans")[0] is cloud
+
+    cloud.pool.stats.latency_ms = 800.0
+    cloud.pool.stats.queued = cloud.pool.max_concurrency * 3
+    local.pool.stats.latency_ms = 200.0
+    assert router.provider_metrics()["cloud"]["expected_wait_ms"] == 3200.0
+    assert router.choose_client("zh-Hans")[0] is local
+    assert router.choose_client("en")[0] is local
+
+    # Disabled by default
+    assert SmartRouter(local, cloud, overload_wait_ms=None).choose_client("zh-Hant")[
+        0
+    ] is cloud
@@ -0,0 +1,145 @@
+"""
+SmartRouter response cache tests
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from shared.llm import response_cache
+from shared.llm.response_cache import ResponseCache, embed_text
+from shared.llm.smart_router import SmartRouter
+
+SYSTEM = "You are a math tutor. Explain item 42."
+Q = "Why is the answer to question 3 equal to 12?"
+
+
+def _get(cache, user, lang="en", temperature=0.7, provider="local"):
+    return cache.get(lang, provider, "m", SYSTEM, user, temperature)
+
+
+def _put(cache, user, response, lang="en", temperature=0.7, provider="local"):
+    cache.put(lang, provider, "m", SYSTEM, user, temperature, response)
+
+
+def test_exact_tier_normalizes_and_keys_on_full_tuple():
+    cache = ResponseCache(similarity_threshold=None)
+    _put(cache, Q, "because 3 x 4 = 12")
+
+    assert _get(cache, "  why is the ANSWER to question 3\nequal to 12? ") == (
+        "because 3 x 4 = 12"
+    )
+    assert _get(cache, Q, temperature=0.2) is None
+    assert _get(cache, Q, provider="cloud") is None
+    assert _get(cache, Q, lang="ko") is None
+    # Without the similarity tier a reworded question misses
+    assert _get(cache, "Why is the answer of question 3 equal to 12?") is None
+
+    stats = cache.stats()
+    assert stats["languages"]["en"]["exact_hits"] == 1
+    assert stats["languages"]["en"]["misses"] == 3
+    assert stats["hit_rate"] == pytest.approx(1 / 5)
+
+
+def test_similarity_tier_matches_near_duplicates_only():
+    cache = ResponseCache(similarity_threshold=0.7)
+    _put(cache, Q, "because 3 x 4 = 12")
+    _put(cache, "How do I convert 3/4 into a percentage?", "multiply by 100")
+
+    assert _get(cache, "why is the answer for question 3 equal 12?") == (
+        "because 3 x 4 = 12"
+    )
+    assert _get(cache, "What is the capital of France?") is None
+    # Nearly identical text with different numbers is a different question
+    assert _get(cache, "Why is the answer to question 4 equal to 12?") is None
+    # Same question under another system prompt is a different context
+    assert cache.get("en", "local", "m", "Explain item 7.", Q, 0.7) is None
+
+    ko = "3번 문제의 답이 왜 12인가요?"
+    _put(cache, ko, "3 곱하기 4는 12입니다", lang="ko")
+    assert _get(cache, "3번 문제 답이 왜 12 인가요?", lang="ko") == "3 곱하기 4는 12입니다"
+    assert _get(cache, "5번 문제의 답이 왜 7인가요?", lang="ko") is None
+    assert cache.stats()["languages"]["en"]["similar_hits"] == 1
+
+    a, b = embed_text(Q), embed_text(Q.upper())
+    assert float(a @ b) == pytest.approx(1.0)
+
+
+def test_lru_and_ttl_eviction_per_language(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.7)
+
+    _put(cache, "q1", "a1")
+    _put(cache, "q2", "a2")
+    _put(cache, "q1", "a1", lang="ko")
+    assert _get(cache, "q1") == "a1"  # q1 is now most recent
+    _put(cache, "q3", "a3")
+
+    assert _get(cache, "q2") is None
+    assert _get(cache, "q1") == "a1"
+    assert cache.stats()["languages"]["en"]["evictions"] == 1
+    assert len(cache) == 3
+
+    now[0] += 61
+    assert _get(cache, "q3") is None
+    assert _get(cache, "q1", lang="ko") is None
+    assert len(cache) == 1  # expired entries are dropped lazily on lookup
+
+
+def test_similarity_tier_skips_expired_best_match(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=60, similarity_threshold=0.5)
+
+    _put(cache, "why is the answer for question 3 equal 12?", "old")
+    now[0] += 30
+    _put(cache, Q, "because 3 x 4 = 12")
+    now[0] += 40  # the closer entry has expired, the other one has not
+
+    # Closest to the expired entry, but the live one is still above threshold
+    assert _get(cache, "why is the answer for question 3 equal 12 ?") == (
+        "because 3 x 4 = 12"
+    )
+    assert cache.stats()["languages"]["en"]["similar_hits"] == 1
+    assert len(cache) == 1
+
+
+def test_cache_is_opt_in(monkeypatch):
+    import importlib
+
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    assert importlib.reload(response_cache).CACHE_ENABLED is False
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    assert importlib.reload(response_cache).CACHE_ENABLED is True
+    monkeypatch.delenv("LLM_CACHE_ENABLED")
+    importlib.reload(response_cache)
+
+
+@pytest.mark.asyncio
+async def test_router_serves_repeats_from_cache():
+    local = MagicMock()
+    local.chat = AsyncMock(side_effect=["answer one", "answer two"])
+    cloud = MagicMock()
+    cloud.chat = AsyncMock(side_effect=RuntimeError("cloud down"))
+    cache = ResponseCache(similarity_threshold=None)
+    router = SmartRouter(local_client=local, cloud_client=cloud, cache=cache)
+
+    assert await router.chat(lang="ko", system=SYSTEM, user=Q) == "answer one"
+    assert await router.chat(lang="ko", system=SYSTEM, user=Q + " ") == "answer one"
+    assert local.chat.await_count == 1
+
+    # Different max_tokens or an explicit bypass goes to the model
+    assert await router.chat(lang="ko", system=SYSTEM, user=Q, max_tokens=20) == (
+        "answer two"
+    )
+    local.chat.side_effect = ["fresh"]
+    assert await router.chat(lang="ko", system=SYSTEM, user=Q, use_cache=False) == (
+        "fresh"
+    )
+
+    # Fallback answers are cached under the local model, not the cloud one
+    local.chat.side_effect = ["fallback"]
+    assert await router.chat(lang="zh-Hans", system=SYSTEM, user=Q) == "fallback"
+    assert len(cache) == 3
+    assert cache.stats()["languages"]["zh-Hans"]["misses"] == 1